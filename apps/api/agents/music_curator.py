@@ -1,15 +1,25 @@
 """
 MusicCuratorAgent: Curates music tracks matching workout phase requirements
 """
+import asyncio
+import contextvars
 import logging
 import random
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
+from models.candidate_pool import CandidatePool
 from models.schemas import Phase, Track
 from music_sources.base import MusicSource, TrackCandidate
 from config import settings
+from services import deadline, metrics, scoring
+from services.pool_cache import PoolCache, PoolKey, pool_key
+from services.preferences import PreferenceStore, default_store
 
 logger = logging.getLogger(__name__)
 
+SEARCH_MIN_BUDGET_S = 2.0  # Below this, search the bundled catalog instead of the network source
+
 
 def create_music_source() -> MusicSource:
     """Factory function to create the configured music source."""
@@ -96,19 +106,43 @@ class MusicCuratorAgent:
         "cooldown": 0.3
     }
 
-    def __init__(self, music_source: Optional[MusicSource] = None):
-        """Initialize the agent with a music source."""
+    def __init__(self, music_source: Optional[MusicSource] = None,
+                 preferences: Optional[PreferenceStore] = None):
+        """Initialize the agent with a music source (and the process-wide preference store by default)."""
         if music_source:
             self.source = music_source
         else:
             self.source = create_music_source()
+        self._local_source: Optional[MusicSource] = None
         logger.info(f"Using music source: {self.source.name}")
 
+        self.pool_cache: Optional[PoolCache] = None
+        if settings.pool_cache_size > 0:
+            self.pool_cache = PoolCache(
+                max_entries=settings.pool_cache_size,
+                ttl_s=settings.pool_cache_ttl_s,
+                source_ttls_s=settings.pool_cache_source_ttls_s,
+                stale_s=settings.pool_cache_stale_s,
+                sample=settings.pool_cache_sample,
+            )
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self.preferences = preferences if preferences is not None else default_store()
+
+    def _source_within_budget(self) -> MusicSource:
+        """The configured source, or the in-memory catalog once the request's budget is nearly spent."""
+        if self.source.name == "mock" or deadline.has_budget(SEARCH_MIN_BUDGET_S):
+            return self.source
+        deadline.degrade("local_catalog")
+        if self._local_source is None:
+            from music_sources.mock_source import MockMusicSource
+            self._local_source = MockMusicSource()
+        return self._local_source
+
     def search_tracks(self,
                      phase: Phase,
                      limit: int = 20,
                      genre: Optional[str] = None,
-                     min_energy: Optional[float] = None) -> list[Track]:
+                     min_energy: Optional[float] = None) -> CandidatePool:
         """
         Search for tracks matching phase requirements.
 
@@ -119,99 +153,251 @@ class MusicCuratorAgent:
             min_energy: Minimum energy override (uses intensity default if None)
 
         Returns:
-            List of candidate tracks
+            Pool of candidate tracks
         """
         bpm_min, bpm_max = phase.bpm_range
+        genre = genre or self.DEFAULT_GENRE
         if min_energy is None:
             min_energy = self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
 
+        # Shared pool from an earlier request; a stale one is re-searched in the background
+        key = pool_key(self.source.name, phase.bpm_range, genre, min_energy)
+        cached = self.pool_cache.get(key, limit=limit) if self._caches(self.source) else None
+        if cached is not None:
+            tracks, stale = cached
+            if stale and self.pool_cache.start_refresh(key):
+                threading.Thread(
+                    target=self._refresh_pool, args=(key, phase, genre, min_energy, limit),
+                    name="pool-refresh", daemon=True,
+                ).start()
+            logger.info(f"Cached pool: {len(tracks)} candidate tracks for {phase.name}")
+            return tracks
+
         logger.info(f"Searching tracks for {phase.name}: BPM {bpm_min}-{bpm_max}, energy >= {min_energy}")
 
         # Search via pluggable music source
-        candidates = self.source.search_by_bpm(
+        source = self._source_within_budget()
+        candidates = source.search_by_bpm(
             bpm_min=bpm_min,
             bpm_max=bpm_max,
-            genre=genre or self.DEFAULT_GENRE,
-            limit=limit,
+            genre=genre,
+            limit=self._fetch_limit(source, limit),
         )
 
-        # Convert TrackCandidates to Tracks, filtering by energy
-        tracks = []
-        for c in candidates:
-            if c.energy >= min_energy:
-                tracks.append(
-                    Track(
-                        id=c.source_id or f"{c.source}:{c.name}:{c.artist}",
-                        name=c.name,
-                        artist=c.artist,
-                        bpm=c.bpm,
-                        energy=c.energy,
-                        duration_ms=c.duration_ms,
-                    )
-                )
+        # Convert TrackCandidates to a pool, filtering by energy
+        tracks = self._remember_pool(source, phase, genre, min_energy, limit,
+                                     CandidatePool.from_candidates(candidates, min_energy))
+
+        logger.info(f"Found {len(tracks)} candidate tracks for {phase.name}")
+        return tracks
+
+    async def search_tracks_async(self,
+                                  phase: Phase,
+                                  limit: int = 20,
+                                  genre: Optional[str] = None,
+                                  min_energy: Optional[float] = None) -> CandidatePool:
+        """Async variant of search_tracks()."""
+        bpm_min, bpm_max = phase.bpm_range
+        genre = genre or self.DEFAULT_GENRE
+        if min_energy is None:
+            min_energy = self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
+
+        key = pool_key(self.source.name, phase.bpm_range, genre, min_energy)
+        cached = self.pool_cache.get(key, limit=limit) if self._caches(self.source) else None
+        if cached is not None:
+            tracks, stale = cached
+            if stale and self.pool_cache.start_refresh(key):
+                self._in_background(self._refresh_pool_async(key, phase, genre, min_energy, limit))
+            logger.info(f"Cached pool: {len(tracks)} candidate tracks for {phase.name}")
+            return tracks
+
+        logger.info(f"Searching tracks for {phase.name}: BPM {bpm_min}-{bpm_max}, energy >= {min_energy}")
+
+        source = self._source_within_budget()
+        candidates = await source.search_by_bpm_async(
+            bpm_min=bpm_min,
+            bpm_max=bpm_max,
+            genre=genre,
+            limit=self._fetch_limit(source, limit),
+        )
+
+        tracks = self._remember_pool(source, phase, genre, min_energy, limit,
+                                     CandidatePool.from_candidates(candidates, min_energy))
 
         logger.info(f"Found {len(tracks)} candidate tracks for {phase.name}")
         return tracks
 
+    def _caches(self, source: MusicSource) -> bool:
+        return self.pool_cache is not None and self.pool_cache.enabled_for(source.name)
+
+    def _fetch_limit(self, source: MusicSource, limit: int) -> int:
+        """Over-fetch searches whose pool will be cached, so requests can sample from it."""
+        return limit * settings.pool_cache_overfetch if self._caches(source) else limit
+
+    def _remember_pool(self, source: MusicSource, phase: Phase, genre: str, min_energy: float,
+                       limit: int, pool: CandidatePool) -> CandidatePool:
+        """Cache a freshly searched pool; this request samples it like later ones will."""
+        if not self._caches(source):
+            return pool
+        self.pool_cache.put(pool_key(source.name, phase.bpm_range, genre, min_energy), pool)
+        return self.pool_cache.sample(pool, limit=limit)
+
+    def _refresh_pool(self, key: PoolKey, phase: Phase, genre: str, min_energy: float, limit: int) -> None:
+        """Re-search a stale cached pool (background thread, outside any request budget)."""
+        try:
+            candidates = self.source.search_by_bpm(
+                phase.bpm_range[0], phase.bpm_range[1], genre, self._fetch_limit(self.source, limit),
+            )
+            self.pool_cache.put(key, CandidatePool.from_candidates(candidates, min_energy))
+        except Exception as e:
+            logger.warning(f"Pool refresh failed for {phase.name}: [{type(e).__name__}] {e}")
+        finally:
+            self.pool_cache.end_refresh(key)
+
+    async def _refresh_pool_async(self, key: PoolKey, phase: Phase, genre: str,
+                                  min_energy: float, limit: int) -> None:
+        """Async variant of _refresh_pool()."""
+        try:
+            with deadline.budget(None):
+                candidates = await self.source.search_by_bpm_async(
+                    phase.bpm_range[0], phase.bpm_range[1], genre, self._fetch_limit(self.source, limit),
+                )
+            self.pool_cache.put(key, CandidatePool.from_candidates(candidates, min_energy))
+        except Exception as e:
+            logger.warning(f"Pool refresh failed for {phase.name}: [{type(e).__name__}] {e}")
+        finally:
+            self.pool_cache.end_refresh(key)
+
+    def _in_background(self, coro) -> None:
+        """Run a refresh without holding up the request (kept referenced until done)."""
+        task = asyncio.ensure_future(coro)
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
     def score_candidates(self,
-                        tracks: list[Track],
+                        tracks: Union[CandidatePool, list[Track]],
                         phase: Phase,
                         used_artists: set[str],
                         boost_artists: Optional[set[str]] = None,
-                        hidden_tracks: Optional[set[str]] = None) -> list[tuple[Track, float]]:
+                        hidden_tracks: Optional[set[str]] = None,
+                        top_k: Optional[int] = None,
+                        user_id: Optional[str] = None) -> list[tuple[Track, float]]:
         """
         Score and rank candidate tracks for a phase.
 
         Args:
-            tracks: Candidate tracks
+            tracks: Candidate pool (or list of tracks)
             phase: Target phase requirements
             used_artists: Set of artists already used (to avoid repeats)
             boost_artists: Artists to boost from positive feedback (+15 pts)
             hidden_tracks: Track IDs to filter out from negative feedback
+            top_k: Only rank (and return) the k best; None ranks them all
+            user_id: Score with this user's learned weights, which replace
+                boost_artists once the user has any (see learn())
 
         Returns:
             List of (track, score) tuples, sorted by score descending
         """
-        bpm_min, bpm_max = phase.bpm_range
-        target_bpm = (bpm_min + bpm_max) / 2
+        pool = CandidatePool.of(tracks)
+        ranked = self.rank_pool(
+            pool, phase, used_artists,
+            boost_artists=boost_artists, hidden_tracks=hidden_tracks, top_k=top_k, user_id=user_id,
+        )
+        return [(pool.track(row), score) for row, score in ranked]
+
+    def rank_pool(self,
+                  pool: CandidatePool,
+                  phase: Phase,
+                  used_artists: set[str],
+                  boost_artists: Optional[set[str]] = None,
+                  hidden_tracks: Optional[set[str]] = None,
+                  top_k: Optional[int] = None,
+                  user_id: Optional[str] = None) -> list[tuple[int, float]]:
+        """
+        score_candidates() on the pool's columns: (row, score) pairs, best
+        first, without building a Track for any row.
+        """
         target_energy = self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
 
         # Filter out hidden tracks
+        rows = None
         if hidden_tracks:
-            tracks = [t for t in tracks if t.id not in hidden_tracks]
+            pool, rows = pool.without_ids(hidden_tracks)
+
+        # Learned weights: drop tracks the user turned down, score the rest
+        learned = None
+        weights = self.preferences.get(user_id) if self.preferences else None
+        if weights is not None and pool:
+            learned = weights.points(pool)
+            if None in learned:
+                keep = [i for i, points in enumerate(learned) if points is not None]
+                pool, learned = pool.take(keep), [learned[i] for i in keep]
+                rows = keep if rows is None else [rows[i] for i in keep]
+            boost_artists = None  # Merged into the learned artist weights (PreferenceStore.seed)
+        if not pool:
+            return []
+
+        if scoring.available(len(pool)):
+            scores = scoring.score(
+                pool.arrays(), phase.bpm_range, target_energy,
+                used_artists=used_artists, boost_artists=boost_artists, learned=learned,
+            )
+            ranked = [(int(i), float(scores[i])) for i in scoring.top_k(scores, top_k)]
+        else:
+            ranked = self._rank_python(pool, phase, target_energy, used_artists, boost_artists, top_k, learned)
 
-        scored_tracks = []
+        if rows is not None:  # Back to rows of the unfiltered pool
+            ranked = [(rows[i], score) for i, score in ranked]
+        return ranked
 
-        for track in tracks:
+    @staticmethod
+    def _rank_python(pool: CandidatePool,
+                     phase: Phase,
+                     target_energy: float,
+                     used_artists: set[str],
+                     boost_artists: Optional[set[str]],
+                     top_k: Optional[int],
+                     learned: Optional[list[float]] = None) -> list[tuple[int, float]]:
+        """The scoring loop without NumPy (and for pools too small to vectorize)."""
+        bpm_min, bpm_max = phase.bpm_range
+        target_bpm = (bpm_min + bpm_max) / 2
+        scored_rows = []
+
+        for row in range(len(pool)):
             score = 0.0
+            artist = pool.artist(row)
 
             # BPM match (most important) - score 0-50 points
-            bpm_diff = abs(track.bpm - target_bpm)
+            bpm_diff = abs(pool.bpm[row] - target_bpm)
             bpm_range_size = bpm_max - bpm_min
-            bpm_score = max(0, 50 - (bpm_diff / bpm_range_size * 50))
+            bpm_score = max(0, scoring.BPM_POINTS - (bpm_diff / bpm_range_size * scoring.BPM_POINTS))
             score += bpm_score
 
             # Energy match - score 0-30 points
-            energy_diff = abs(track.energy - target_energy)
-            energy_score = max(0, 30 - (energy_diff * 30))
+            energy_diff = abs(pool.energy[row] - target_energy)
+            energy_score = max(0, scoring.ENERGY_POINTS - (energy_diff * scoring.ENERGY_POINTS))
             score += energy_score
 
             # Artist diversity bonus - 20 points if not used
-            if track.artist not in used_artists:
-                score += 20
+            if artist not in used_artists:
+                score += scoring.NEW_ARTIST_BONUS
             else:
-                score -= 10  # Penalty for repeating artist
+                score += scoring.REPEAT_ARTIST_PENALTY  # Penalty for repeating artist
 
             # Boost artists from positive feedback - 15 bonus points
-            if boost_artists and track.artist in boost_artists:
-                score += 15
+            if boost_artists and artist in boost_artists:
+                score += scoring.BOOST_BONUS
 
-            scored_tracks.append((track, score))
+            # Learned per-user artist/track weights
+            if learned is not None:
+                score += learned[row]
+
+            scored_rows.append((row, score))
 
         # Sort by score descending
-        scored_tracks.sort(key=lambda x: x[1], reverse=True)
+        scored_rows.sort(key=lambda x: x[1], reverse=True)
 
-        return scored_tracks
+        return scored_rows[:top_k]
 
     def select_track_for_phase(self,
                               phase: Phase,
@@ -220,7 +406,8 @@ class MusicCuratorAgent:
                               genre: Optional[str] = None,
                               min_energy: Optional[float] = None,
                               boost_artists: Optional[set[str]] = None,
-                              hidden_tracks: Optional[set[str]] = None) -> Optional[Track]:
+                              hidden_tracks: Optional[set[str]] = None,
+                              user_id: Optional[str] = None) -> Optional[Track]:
         """
         Select the best track for a workout phase.
 
@@ -232,6 +419,7 @@ class MusicCuratorAgent:
             min_energy: Optional minimum energy override
             boost_artists: Artists to boost from positive feedback
             hidden_tracks: Track IDs to filter out from negative feedback
+            user_id: User whose learned preference weights to score with
 
         Returns:
             Selected track or None if no suitable tracks found
@@ -246,7 +434,7 @@ class MusicCuratorAgent:
         # Score and rank candidates
         scored_candidates = self.score_candidates(
             candidates, phase, used_artists,
-            boost_artists=boost_artists, hidden_tracks=hidden_tracks,
+            boost_artists=boost_artists, hidden_tracks=hidden_tracks, top_k=5, user_id=user_id,
         )
 
         if not scored_candidates:
@@ -276,82 +464,236 @@ class MusicCuratorAgent:
         min_energy: Optional[float] = None,
         exclude_artists: Optional[set[str]] = None,
         boost_artists: Optional[set[str]] = None,
-    ) -> dict[str, list[Track]]:
+    ) -> dict[str, CandidatePool]:
         """
         Search for tracks across all phases. Uses a single API call if the source supports it,
-        otherwise falls back to per-phase search.
+        otherwise falls back to per-phase searches, run concurrently (up to
+        PHASE_SEARCH_CONCURRENCY, capped by the source's max_concurrent_searches).
+        Phases with a cached pool (see PoolCache) are not searched; batch results
+        fetched with exclude/boost artists are personalized and not cached.
 
         Returns:
-            Dict mapping phase name → list of candidate Tracks
+            Dict mapping phase name → pool of candidate tracks
         """
         effective_genre = genre or self.DEFAULT_GENRE
+        result: dict[str, CandidatePool] = {}
+        pending = phases
 
         # Use batch search if the source supports it (e.g. ClaudeMusicSource)
-        if hasattr(self.source, 'batch_search'):
-            phases_info = []
-            for phase in phases:
-                bpm_min, bpm_max = phase.bpm_range
-                energy = min_energy or self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
-                phases_info.append({
-                    "name": phase.name,
-                    "bpm_min": bpm_min,
-                    "bpm_max": bpm_max,
-                    "duration_min": phase.duration_min,
-                    "energy": energy,
-                })
+        if hasattr(self.source, 'batch_search') and deadline.has_budget(SEARCH_MIN_BUDGET_S):
+            result, pending, stale = self._cached_batch(phases, effective_genre, min_energy)
+            if stale:
+                threading.Thread(
+                    target=self._refresh_batch, args=(stale, effective_genre, min_energy),
+                    name="pool-refresh", daemon=True,
+                ).start()
+            if not pending:
+                return result
 
             raw_results = self.source.batch_search(
-                phases_info,
+                self._phases_info(pending, min_energy),
                 genre=effective_genre,
                 exclude_artists=exclude_artists,
                 boost_artists=boost_artists,
             )
 
             if raw_results:
-                result = {}
-                for phase in phases:
-                    candidates = raw_results.get(phase.name, [])
-                    # Relaxed energy filter for batch results: Claude already received
-                    # energy guidance in the prompt, and the scoring function penalizes
-                    # low-energy tracks. A strict filter here causes empty pools.
-                    base_threshold = min_energy or self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
-                    energy_threshold = max(0.3, base_threshold - 0.2)
-                    tracks = []
-                    for c in candidates:
-                        if c.energy >= energy_threshold:
-                            tracks.append(
-                                Track(
-                                    id=c.source_id or f"{c.source}:{c.name}:{c.artist}",
-                                    name=c.name,
-                                    artist=c.artist,
-                                    bpm=c.bpm,
-                                    energy=c.energy,
-                                    duration_ms=c.duration_ms,
-                                )
-                            )
-                    result[phase.name] = tracks
-                    logger.info(f"Batch: {len(tracks)} tracks for {phase.name}")
+                pools = self._batch_results_to_pools(pending, raw_results, min_energy)
+                if not (exclude_artists or boost_artists):
+                    self._remember_batch(pending, pools, effective_genre, min_energy)
+                result.update(pools)
+                return {phase.name: result[phase.name] for phase in phases}
+            else:
+                logger.warning("Batch search returned empty, falling back to per-phase search")
+                metrics.record_fallback("batch_search_empty")
+
+        # Fallback: per-phase search (used by mock, getsongbpm, soundnet sources),
+        # phases in parallel threads that keep the request's deadline context
+        workers = self._phase_search_limit(pending)
+        logger.info(f"Using per-phase search ({workers} at a time)")
+        if workers == 1:
+            pools = [
+                self.search_tracks(phase, limit=20, genre=effective_genre, min_energy=min_energy)
+                for phase in pending
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="phase-search") as executor:
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run, self.search_tracks,
+                        phase, 20, effective_genre, min_energy,
+                    )
+                    for phase in pending
+                ]
+                pools = [future.result() for future in futures]
+        result.update(zip([phase.name for phase in pending], pools))
+        return {phase.name: result[phase.name] for phase in phases}
+
+    async def batch_search_tracks_async(
+        self,
+        phases: list[Phase],
+        genre: Optional[str] = None,
+        min_energy: Optional[float] = None,
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+    ) -> dict[str, CandidatePool]:
+        """Async variant of batch_search_tracks()."""
+        effective_genre = genre or self.DEFAULT_GENRE
+        result: dict[str, CandidatePool] = {}
+        pending = phases
+
+        if hasattr(self.source, 'batch_search_async') and deadline.has_budget(SEARCH_MIN_BUDGET_S):
+            result, pending, stale = self._cached_batch(phases, effective_genre, min_energy)
+            if stale:
+                self._in_background(self._refresh_batch_async(stale, effective_genre, min_energy))
+            if not pending:
                 return result
+
+            raw_results = await self.source.batch_search_async(
+                self._phases_info(pending, min_energy),
+                genre=effective_genre,
+                exclude_artists=exclude_artists,
+                boost_artists=boost_artists,
+            )
+
+            if raw_results:
+                pools = self._batch_results_to_pools(pending, raw_results, min_energy)
+                if not (exclude_artists or boost_artists):
+                    self._remember_batch(pending, pools, effective_genre, min_energy)
+                result.update(pools)
+                return {phase.name: result[phase.name] for phase in phases}
             else:
                 logger.warning("Batch search returned empty, falling back to per-phase search")
+                metrics.record_fallback("batch_search_empty")
+
+        workers = self._phase_search_limit(pending)
+        logger.info(f"Using per-phase search ({workers} at a time)")
+        semaphore = asyncio.Semaphore(workers)
+
+        async def search_phase(phase: Phase) -> CandidatePool:
+            async with semaphore:
+                return await self.search_tracks_async(
+                    phase, limit=20, genre=effective_genre, min_energy=min_energy,
+                )
+
+        pools = await asyncio.gather(*(search_phase(phase) for phase in pending))
+        result.update(zip([phase.name for phase in pending], pools))
+        return {phase.name: result[phase.name] for phase in phases}
+
+    def _batch_key(self, phase: Phase, genre: str, min_energy: Optional[float]) -> PoolKey:
+        energy = min_energy or self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
+        return pool_key(self.source.name, phase.bpm_range, genre, energy)
+
+    def _cached_batch(
+        self, phases: list[Phase], genre: str, min_energy: Optional[float],
+    ) -> tuple[dict[str, CandidatePool], list[Phase], list[Phase]]:
+        """Pools the cache serves, the phases still to search, and stale phases this caller refreshes."""
+        if not self._caches(self.source):
+            return {}, list(phases), []
+        result, missing, stale = {}, [], []
+        for phase in phases:
+            key = self._batch_key(phase, genre, min_energy)
+            cached = self.pool_cache.get(key, duration_min=phase.duration_min)
+            if cached is None:
+                missing.append(phase)
+                continue
+            result[phase.name] = cached[0]
+            if cached[1] and self.pool_cache.start_refresh(key):
+                stale.append(phase)
+        if result:
+            logger.info(f"Cached pools for {len(result)}/{len(phases)} phases")
+        return result, missing, stale
+
+    def _remember_batch(self, phases: list[Phase], pools: dict[str, CandidatePool],
+                        genre: str, min_energy: Optional[float]) -> None:
+        """Cache batch pools, each good for phases up to the duration it was fetched for."""
+        if not self._caches(self.source):
+            return
+        for phase in phases:
+            self.pool_cache.put(self._batch_key(phase, genre, min_energy), pools[phase.name],
+                                covers_min=phase.duration_min)
+
+    def _refresh_batch(self, phases: list[Phase], genre: str, min_energy: Optional[float]) -> None:
+        """Re-search stale cached batch pools in one call (background thread)."""
+        try:
+            raw_results = self.source.batch_search(self._phases_info(phases, min_energy), genre=genre)
+            if raw_results:
+                self._remember_batch(phases, self._batch_results_to_pools(phases, raw_results, min_energy),
+                                     genre, min_energy)
+        except Exception as e:
+            logger.warning(f"Pool refresh failed: [{type(e).__name__}] {e}")
+        finally:
+            for phase in phases:
+                self.pool_cache.end_refresh(self._batch_key(phase, genre, min_energy))
+
+    async def _refresh_batch_async(self, phases: list[Phase], genre: str, min_energy: Optional[float]) -> None:
+        """Async variant of _refresh_batch()."""
+        try:
+            with deadline.budget(None):
+                raw_results = await self.source.batch_search_async(
+                    self._phases_info(phases, min_energy), genre=genre,
+                )
+            if raw_results:
+                self._remember_batch(phases, self._batch_results_to_pools(phases, raw_results, min_energy),
+                                     genre, min_energy)
+        except Exception as e:
+            logger.warning(f"Pool refresh failed: [{type(e).__name__}] {e}")
+        finally:
+            for phase in phases:
+                self.pool_cache.end_refresh(self._batch_key(phase, genre, min_energy))
+
+    def _phase_search_limit(self, phases: list[Phase]) -> int:
+        """How many phases the per-phase fallback searches at once."""
+        return max(1, min(len(phases), settings.phase_search_concurrency,
+                          self.source.max_concurrent_searches))
 
-        # Fallback: per-phase search (used by mock, getsongbpm, soundnet sources)
-        logger.info("Using per-phase search")
+    def _phases_info(self, phases: list[Phase], min_energy: Optional[float]) -> list[dict]:
+        """Describe each phase for a source's batch_search."""
+        phases_info = []
+        for phase in phases:
+            bpm_min, bpm_max = phase.bpm_range
+            energy = min_energy or self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
+            phases_info.append({
+                "name": phase.name,
+                "bpm_min": bpm_min,
+                "bpm_max": bpm_max,
+                "duration_min": phase.duration_min,
+                "energy": energy,
+            })
+        return phases_info
+
+    def _batch_results_to_pools(
+        self,
+        phases: list[Phase],
+        raw_results: dict[str, list[TrackCandidate]],
+        min_energy: Optional[float],
+    ) -> dict[str, CandidatePool]:
+        """Convert batch_search candidates to per-phase pools."""
         result = {}
         for phase in phases:
-            result[phase.name] = self.search_tracks(
-                phase, limit=20, genre=effective_genre, min_energy=min_energy,
-            )
+            candidates = raw_results.get(phase.name, [])
+            # Relaxed energy filter for batch results: Claude already received
+            # energy guidance in the prompt, and the scoring function penalizes
+            # low-energy tracks. A strict filter here causes empty pools.
+            base_threshold = min_energy or self.DEFAULT_MIN_ENERGY.get(phase.intensity, 0.5)
+            energy_threshold = max(0.3, base_threshold - 0.2)
+            tracks = CandidatePool.from_candidates(candidates, energy_threshold)
+            result[phase.name] = tracks
+            logger.info(f"Batch: {len(tracks)} tracks for {phase.name}")
         return result
 
-    def learn(self, track: Track, feedback: dict) -> None:
+    def learn(self, user_id: str, track_id: str, artist: Optional[str], rating: int) -> None:
         """
-        Learn from user feedback (future implementation).
+        Learn from user feedback: update the user's artist and track weights.
 
         Args:
-            track: Track that received feedback
-            feedback: User feedback data (rating, context, etc.)
+            user_id: User who gave the feedback
+            track_id: Track that received feedback
+            artist: The track's artist (None if unknown; only the track is weighted)
+            rating: 1 (thumbs up), -1 (thumbs down) or 0 to withdraw an earlier rating
         """
-        # Future: Update track preferences based on feedback
-        logger.debug(f"Learning from feedback for track {track.id}: {feedback}")
-        pass
+        if self.preferences is None:
+            logger.debug(f"Preference learning disabled; ignoring feedback for track {track_id}")
+            return
+        self.preferences.learn(user_id, track_id, artist, rating)
+        logger.debug(f"Learned rating {rating} for track {track_id} by {artist}")
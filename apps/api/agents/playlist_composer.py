@@ -3,9 +3,11 @@ PlaylistComposerAgent: Composes final playlists with optimal track ordering
 """
 import logging
 import time as _time
-from typing import Optional
+from typing import AsyncIterator, Optional
+from models.candidate_pool import CandidatePool
 from models.schemas import WorkoutStructure, Phase, Track, Playlist
 from agents.music_curator import MusicCuratorAgent
+from services import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +19,31 @@ MAX_DURATION_DIFF_MIN = 5.0  # Maximum difference between playlist and workout d
 MIN_ARTIST_DIVERSITY = 0.7  # Require at least 70% unique artists
 MAX_RECOMMENDED_TRACKS = 15  # Warn if playlist exceeds this many tracks
 MAX_BPM_JUMP = 30  # Maximum BPM change between consecutive tracks
+MAX_BUCKET_DURATION_MIN = 60  # Cap on the duration a shared batch bucket requests tracks for
+SELECTION_TOP_K = 200  # Candidates ranked per phase; a 60-min phase fills from ~20 of them
+
+BucketKey = tuple[tuple[int, int], str]
+
+
+def bucket_key(phase: Phase) -> BucketKey:
+    """Phases with the same BPM range and intensity can share a candidate pool."""
+    return tuple(phase.bpm_range), phase.intensity
+
+
+def merge_speculative_pools(
+    pools: list[dict[BucketKey, tuple[Phase, CandidatePool]]],
+) -> dict[BucketKey, tuple[Phase, CandidatePool]]:
+    """
+    Combine several prefetch_speculative_async() results. Where two guesses
+    share a bucket, the one fetched for the longer phase wins (it covers more).
+    """
+    merged: dict[BucketKey, tuple[Phase, CandidatePool]] = {}
+    for pool in pools:
+        for key, guess in pool.items():
+            current = merged.get(key)
+            if current is None or guess[0].duration_min > current[0].duration_min:
+                merged[key] = guess
+    return merged
 
 
 class PlaylistComposerAgent:
@@ -38,6 +65,7 @@ class PlaylistComposerAgent:
         exclude_artists: Optional[set[str]] = None,
         boost_artists: Optional[set[str]] = None,
         hidden_tracks: Optional[set[str]] = None,
+        user_id: Optional[str] = None,
     ) -> Playlist:
         """
         Compose a complete playlist for a workout.
@@ -52,13 +80,14 @@ class PlaylistComposerAgent:
 
         # PREFETCH: Get all track candidates in one batch (single API call for Claude source)
         prefetch_start = _time.time()
-        track_pools = self.curator.batch_search_tracks(
-            workout.phases,
-            genre=genre,
-            min_energy=min_energy,
-            exclude_artists=exclude_artists,
-            boost_artists=boost_artists,
-        )
+        with metrics.timed(metrics.PREFETCH_SECONDS, source=self.curator.source.name):
+            track_pools = self.curator.batch_search_tracks(
+                workout.phases,
+                genre=genre,
+                min_energy=min_energy,
+                exclude_artists=exclude_artists,
+                boost_artists=boost_artists,
+            )
         prefetch_elapsed = _time.time() - prefetch_start
         total_candidates = sum(len(v) for v in track_pools.values())
         logger.info(f"Track prefetch: {total_candidates} candidates in {prefetch_elapsed:.1f}s")
@@ -74,13 +103,16 @@ class PlaylistComposerAgent:
                     target_duration_ms=phase_duration_ms,
                     boost_artists=boost_artists,
                     hidden_tracks=hidden_tracks,
+                    user_id=user_id,
                 )
             else:
                 logger.warning(f"No tracks in pool for phase {phase.name}, trying direct search")
+                metrics.record_fallback("empty_pool_direct_search")
                 phase_tracks = self._select_tracks_for_phase(
                     phase, phase_duration_ms, used_artists,
                     genre=genre, min_energy=min_energy,
                     boost_artists=boost_artists, hidden_tracks=hidden_tracks,
+                    user_id=user_id,
                 )
 
             tracks.extend(phase_tracks)
@@ -89,6 +121,228 @@ class PlaylistComposerAgent:
 
             logger.info(f"Phase {i+1} ({phase.name}): {len(phase_tracks)} track(s)")
 
+        return self.build_playlist(workout, tracks)
+
+    async def compose_async(
+        self,
+        workout: WorkoutStructure,
+        genre: Optional[str] = None,
+        min_energy: Optional[float] = None,
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+        hidden_tracks: Optional[set[str]] = None,
+        user_id: Optional[str] = None,
+    ) -> Playlist:
+        """Async variant of compose()."""
+        tracks = []
+        async for _, phase_tracks in self.iter_phases_async(
+            workout, genre=genre, min_energy=min_energy,
+            exclude_artists=exclude_artists,
+            boost_artists=boost_artists, hidden_tracks=hidden_tracks,
+            user_id=user_id,
+        ):
+            tracks.extend(phase_tracks)
+
+        return self.build_playlist(workout, tracks)
+
+    async def prefetch_async(
+        self,
+        workout: WorkoutStructure,
+        genre: Optional[str] = None,
+        min_energy: Optional[float] = None,
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+        speculative_pools: Optional[dict[BucketKey, tuple[Phase, CandidatePool]]] = None,
+    ) -> dict[str, CandidatePool]:
+        """
+        Fetch candidate pools for every phase (one batch call where supported).
+
+        speculative_pools, from prefetch_speculative_async(), serves every
+        phase whose bucket was guessed with at least the phase's duration;
+        only the remaining phases are searched. Unused guesses are dropped.
+        """
+        track_pools: dict[str, CandidatePool] = {}
+        missing = list(workout.phases)
+        if speculative_pools:
+            missing = []
+            used = set()
+            for phase in workout.phases:
+                key = bucket_key(phase)
+                guess = speculative_pools.get(key)
+                if guess and guess[1] and guess[0].duration_min >= phase.duration_min:
+                    track_pools[phase.name] = guess[1]
+                    used.add(key)
+                else:
+                    missing.append(phase)
+            metrics.record_speculation("hit", len(workout.phases) - len(missing))
+            metrics.record_speculation("miss", len(missing))
+            metrics.record_speculation("discarded", len(speculative_pools) - len(used))
+            logger.info(f"Speculative prefetch: {len(workout.phases) - len(missing)}/"
+                        f"{len(workout.phases)} phases served, "
+                        f"{len(speculative_pools) - len(used)} guesses discarded")
+            if not missing:
+                return track_pools
+
+        prefetch_start = _time.time()
+        with metrics.timed(metrics.PREFETCH_SECONDS, source=self.curator.source.name):
+            track_pools.update(await self.curator.batch_search_tracks_async(
+                missing,
+                genre=genre,
+                min_energy=min_energy,
+                exclude_artists=exclude_artists,
+                boost_artists=boost_artists,
+            ))
+        prefetch_elapsed = _time.time() - prefetch_start
+        total_candidates = sum(len(v) for v in track_pools.values())
+        logger.info(f"Track prefetch: {total_candidates} candidates in {prefetch_elapsed:.1f}s")
+        return track_pools
+
+    async def prefetch_speculative_async(
+        self,
+        phases: list[Phase],
+        genre: Optional[str] = None,
+        min_energy: Optional[float] = None,
+        boost_artists: Optional[set[str]] = None,
+    ) -> dict[BucketKey, tuple[Phase, CandidatePool]]:
+        """
+        Fetch pools for predicted phases (WorkoutParserAgent.plan()) while the
+        parse is still running. Returns {bucket: (predicted phase, pool)} for
+        prefetch_async(speculative_pools=...). Never raises: a failed guess
+        just means the phases are searched after the parse as usual.
+        """
+        predicted = {bucket_key(phase): phase for phase in phases}
+        try:
+            with metrics.timed(metrics.PREFETCH_SECONDS, source=self.curator.source.name):
+                pools = await self.curator.batch_search_tracks_async(
+                    list(predicted.values()),
+                    genre=genre,
+                    min_energy=min_energy,
+                    boost_artists=boost_artists,
+                )
+        except Exception as e:
+            logger.warning(f"Speculative prefetch failed: [{type(e).__name__}] {e}")
+            return {}
+        return {key: (phase, pools.get(phase.name, [])) for key, phase in predicted.items()}
+
+    async def prefetch_batch_async(
+        self,
+        workouts: list[WorkoutStructure],
+        genre: Optional[str] = None,
+        min_energy: Optional[float] = None,
+        boost_artists: Optional[set[str]] = None,
+    ) -> list[dict[str, CandidatePool]]:
+        """
+        Fetch candidate pools for many workouts with one shared prefetch.
+
+        Phases are grouped across workouts by (bpm_range, intensity), so every
+        workout needing e.g. a 160-175 very_high block shares one pool. Each
+        bucket asks for enough tracks to cover all of its phases (capped at
+        MAX_BUCKET_DURATION_MIN). Returns one {phase name: pool} dict per
+        workout, in input order, for iter_phases_async(track_pools=...).
+        """
+        buckets: dict[BucketKey, Phase] = {}
+        for workout in workouts:
+            for phase in workout.phases:
+                key = bucket_key(phase)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = Phase(
+                        name=f"{phase.intensity} {phase.bpm_range[0]}-{phase.bpm_range[1]}",
+                        duration_min=phase.duration_min,
+                        intensity=phase.intensity,
+                        bpm_range=phase.bpm_range,
+                    )
+                else:
+                    bucket.duration_min = min(
+                        bucket.duration_min + phase.duration_min, MAX_BUCKET_DURATION_MIN,
+                    )
+
+        total_phases = sum(len(w.phases) for w in workouts)
+        logger.info(f"Batch prefetch: {total_phases} phases across {len(workouts)} workouts "
+                    f"-> {len(buckets)} buckets")
+
+        prefetch_start = _time.time()
+        with metrics.timed(metrics.PREFETCH_SECONDS, source=self.curator.source.name):
+            bucket_pools = await self.curator.batch_search_tracks_async(
+                list(buckets.values()),
+                genre=genre,
+                min_energy=min_energy,
+                boost_artists=boost_artists,
+            )
+        logger.info(f"Batch prefetch: {sum(len(v) for v in bucket_pools.values())} candidates "
+                    f"in {_time.time() - prefetch_start:.1f}s")
+
+        return [
+            {
+                phase.name: bucket_pools.get(
+                    buckets[bucket_key(phase)].name, [],
+                )
+                for phase in workout.phases
+            }
+            for workout in workouts
+        ]
+
+    async def iter_phases_async(
+        self,
+        workout: WorkoutStructure,
+        genre: Optional[str] = None,
+        min_energy: Optional[float] = None,
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+        hidden_tracks: Optional[set[str]] = None,
+        track_pools: Optional[dict[str, CandidatePool]] = None,
+        avoid_artists: Optional[set[str]] = None,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[tuple[Phase, list[Track]]]:
+        """
+        Prefetch candidates, then yield (phase, tracks) as each phase is finalized.
+
+        Pass track_pools to select from pools fetched elsewhere (e.g. shared
+        between coalesced requests; lists of Tracks are accepted too); they
+        are never mutated, and tracks by
+        exclude_artists are filtered out here since the shared fetch could not
+        know about them. avoid_artists are only penalized like artists already
+        in the playlist (used for variety across a batch of playlists), and
+        user_id scores with that user's learned preference weights. When a
+        phase's pool is empty, a single async search refills it instead of the
+        per-track search loop used by the sync path.
+        """
+        logger.info(f"Composing playlist for '{workout.workout_name}'")
+
+        used_artists = set(exclude_artists or set()) | set(avoid_artists or set())
+
+        if track_pools is None:
+            track_pools = await self.prefetch_async(
+                workout, genre=genre, min_energy=min_energy,
+                exclude_artists=exclude_artists, boost_artists=boost_artists,
+            )
+
+        for i, phase in enumerate(workout.phases):
+            pool = CandidatePool.of(track_pools.get(phase.name, []))
+            if exclude_artists:
+                pool = pool.without_artists(exclude_artists)
+            if not pool:
+                logger.warning(f"No tracks in pool for phase {phase.name}, trying direct search")
+                metrics.record_fallback("empty_pool_direct_search")
+                pool = await self.curator.search_tracks_async(
+                    phase, genre=genre, min_energy=min_energy,
+                )
+
+            phase_tracks = self._select_tracks_from_pool(
+                phase, pool, used_artists,
+                target_duration_ms=phase.duration_min * MS_PER_MINUTE,
+                boost_artists=boost_artists,
+                hidden_tracks=hidden_tracks,
+                user_id=user_id,
+            )
+            for track in phase_tracks:
+                used_artists.add(track.artist)
+
+            logger.info(f"Phase {i+1} ({phase.name}): {len(phase_tracks)} track(s)")
+            yield phase, phase_tracks
+
+    @staticmethod
+    def build_playlist(workout: WorkoutStructure, tracks: list[Track]) -> Playlist:
         playlist = Playlist(
             name=f"CrossFit: {workout.workout_name}",
             tracks=tracks,
@@ -100,41 +354,50 @@ class PlaylistComposerAgent:
 
         return playlist
 
+    @metrics.timed(metrics.SELECTION_SECONDS)
     def _select_tracks_from_pool(
         self,
         phase: Phase,
-        pool: list[Track],
+        pool: CandidatePool,
         used_artists: set[str],
         target_duration_ms: int,
         boost_artists: Optional[set[str]] = None,
         hidden_tracks: Optional[set[str]] = None,
+        user_id: Optional[str] = None,
     ) -> list[Track]:
-        """Select tracks from a pre-fetched pool to fill a phase duration."""
-        scored = self.curator.score_candidates(
+        """
+        Select tracks from a pre-fetched pool to fill a phase duration. Ranking
+        works on the pool's columns; only the selected rows become Tracks.
+        """
+        pool = CandidatePool.of(pool)
+        ranked = self.curator.rank_pool(
             pool, phase, used_artists,
             boost_artists=boost_artists,
             hidden_tracks=hidden_tracks,
+            top_k=SELECTION_TOP_K,
+            user_id=user_id,
         )
 
         phase_tracks = []
         accumulated_ms = 0
         max_duration = target_duration_ms + PHASE_DURATION_TOLERANCE_MS
 
-        for track, score in scored:
+        for row, score in ranked:
             if accumulated_ms >= target_duration_ms:
                 break
             if max_duration - accumulated_ms < MIN_REMAINING_DURATION_MS:
                 break
-            if accumulated_ms + track.duration_ms > max_duration and phase_tracks:
+            duration_ms = pool.duration_ms[row]
+            if accumulated_ms + duration_ms > max_duration and phase_tracks:
                 continue
 
-            phase_tracks.append(track)
-            used_artists.add(track.artist)
-            accumulated_ms += track.duration_ms
+            phase_tracks.append(pool.track(row))
+            used_artists.add(pool.artist(row))
+            accumulated_ms += duration_ms
 
         # Ensure at least one track per phase
-        if not phase_tracks and scored:
-            phase_tracks.append(scored[0][0])
+        if not phase_tracks and ranked:
+            phase_tracks.append(pool.track(ranked[0][0]))
 
         return phase_tracks
 
@@ -147,6 +410,7 @@ class PlaylistComposerAgent:
         min_energy: Optional[float] = None,
         boost_artists: Optional[set[str]] = None,
         hidden_tracks: Optional[set[str]] = None,
+        user_id: Optional[str] = None,
     ) -> list[Track]:
         """Fallback: select tracks via per-track API calls (used when pool is empty)."""
         phase_tracks = []
@@ -165,6 +429,7 @@ class PlaylistComposerAgent:
                 target_duration_ms=remaining_ms,
                 genre=genre, min_energy=min_energy,
                 boost_artists=boost_artists, hidden_tracks=hidden_tracks,
+                user_id=user_id,
             )
 
             if not track:
@@ -183,6 +448,7 @@ class PlaylistComposerAgent:
             track = self.curator.select_track_for_phase(
                 phase, used_artists, genre=genre, min_energy=min_energy,
                 boost_artists=boost_artists, hidden_tracks=hidden_tracks,
+                user_id=user_id,
             )
             if track:
                 phase_tracks.append(track)
@@ -190,6 +456,7 @@ class PlaylistComposerAgent:
 
         return phase_tracks
     
+    @metrics.timed(metrics.VALIDATION_SECONDS, target="playlist")
     def validate_playlist(self, 
                          playlist: Playlist, 
                          workout: WorkoutStructure) -> tuple[bool, Optional[str]]:
@@ -247,6 +514,7 @@ class PlaylistComposerAgent:
         exclude_artists: Optional[set[str]] = None,
         boost_artists: Optional[set[str]] = None,
         hidden_tracks: Optional[set[str]] = None,
+        user_id: Optional[str] = None,
     ) -> Playlist:
         """
         Complete workflow: compose and validate playlist.
@@ -258,6 +526,7 @@ class PlaylistComposerAgent:
             exclude_artists: Optional set of artists to exclude
             boost_artists: Optional set of artists to boost (from positive feedback)
             hidden_tracks: Optional set of track IDs to exclude (from negative feedback)
+            user_id: Optional user whose learned preference weights to score with
 
         Returns:
             Validated playlist
@@ -270,6 +539,7 @@ class PlaylistComposerAgent:
             workout, genre=genre, min_energy=min_energy,
             exclude_artists=exclude_artists,
             boost_artists=boost_artists, hidden_tracks=hidden_tracks,
+            user_id=user_id,
         )
         
         # Validate
@@ -279,3 +549,34 @@ class PlaylistComposerAgent:
         
         return playlist
 
+    async def compose_and_validate_async(
+        self,
+        workout: WorkoutStructure,
+        genre: Optional[str] = None,
+        min_energy: Optional[float] = None,
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+        hidden_tracks: Optional[set[str]] = None,
+        user_id: Optional[str] = None,
+    ) -> Playlist:
+        """Async variant of compose_and_validate()."""
+        playlist = await self.compose_async(
+            workout, genre=genre, min_energy=min_energy,
+            exclude_artists=exclude_artists,
+            boost_artists=boost_artists, hidden_tracks=hidden_tracks,
+            user_id=user_id,
+        )
+        return self.finalize_playlist(playlist, workout)
+
+    def finalize_playlist(self, playlist: Playlist, workout: WorkoutStructure) -> Playlist:
+        """
+        Validate an assembled playlist, raising ValueError if it is invalid.
+
+        Shared by compose_and_validate_async() and the streaming endpoint,
+        which assembles the playlist itself from iter_phases_async().
+        """
+        is_valid, error_msg = self.validate_playlist(playlist, workout)
+        if not is_valid:
+            raise ValueError(f"Invalid playlist: {error_msg}")
+
+        return playlist
@@ -1,14 +1,37 @@
 """
 WorkoutParserAgent: Parses CrossFit workout text into structured format
 """
+import asyncio
 import logging
-from typing import Optional
-from models.schemas import WorkoutStructure
+import re
+from typing import Callable, Optional
+from models.schemas import WorkoutStructure, Phase
 from mocks.anthropic_mock import MockAnthropicClient
 from config import settings
+from services import image_preprocess, metrics
+from services.image_cache import ImageFingerprint, ImageParseCache
+from services.named_wods import NamedWodRegistry
+from services.parse_cache import ParseCache
+from services.rule_parser import RuleBasedParser, extract_features
+from services.similar_parses import SimilarParseIndex
 
 logger = logging.getLogger(__name__)
 
+# Buckets SYSTEM_PROMPT assigns to the work phase of each workout type,
+# used to guess the parse and prefetch music before it returns.
+WORK_BUCKETS = {
+    "AMRAP": ("high", (145, 160)),
+    "RFT": ("very_high", (160, 175)),
+    "EMOM": ("moderate", (130, 145)),
+    "Tabata": ("very_high", (160, 175)),
+    "Chipper": ("moderate", (130, 145)),
+}
+# Upper end of the prompt's "typically 3-5" / "2-3" minutes, so a speculative
+# pool is large enough for what the parse usually returns.
+PREDICTED_WARM_UP = Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120))
+PREDICTED_COOLDOWN = Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100))
+DEFAULT_WORK_DURATION_MIN = 20
+
 
 class WorkoutParserAgent:
     """
@@ -28,6 +51,38 @@ class WorkoutParserAgent:
             logger.info(f"Using real Anthropic client (model: {settings.anthropic_model})")
             self.client = AnthropicClient()
 
+        self.named_wods = NamedWodRegistry.load(validate=self.validate)
+
+        # The mock client is itself a local regex parser, so rules only front the real one
+        self.rule_parser: Optional[RuleBasedParser] = None
+        if settings.rule_parser and not settings.use_mock_anthropic:
+            self.rule_parser = RuleBasedParser()
+
+        self.cache: Optional[ParseCache] = None
+        if settings.parse_cache_size > 0:
+            self.cache = ParseCache(
+                max_entries=settings.parse_cache_size,
+                ttl_s=settings.parse_cache_ttl_s,
+                sqlite_path=settings.parse_cache_sqlite_path,
+                namespace=f"{type(self.client).__name__}:{getattr(self.client, 'model', '')}",
+            )
+
+        self.similar: Optional[SimilarParseIndex] = None
+        if settings.similar_parse_size > 0:
+            self.similar = SimilarParseIndex(
+                max_entries=settings.similar_parse_size,
+                ttl_s=settings.parse_cache_ttl_s,
+                min_similarity=settings.similar_parse_min_similarity,
+            )
+
+        self.image_cache: Optional[ImageParseCache] = None
+        if settings.image_cache_size > 0:
+            self.image_cache = ImageParseCache(
+                max_entries=settings.image_cache_size,
+                ttl_s=settings.image_cache_ttl_s,
+                namespace=f"{type(self.client).__name__}:{getattr(self.client, 'model', '')}",
+            )
+
     def plan(self, workout_text: str) -> dict:
         """
         Plan the parsing approach based on workout text.
@@ -40,6 +95,8 @@ class WorkoutParserAgent:
             workout_type = "AMRAP"
         elif any(kw in workout_lower for kw in ["rft", "for time", "rounds for time"]):
             workout_type = "RFT"
+        elif re.search(r'\b\d+-\d+-\d+\b', workout_lower):
+            workout_type = "RFT"  # Descending reps, e.g. 21-15-9
         elif "emom" in workout_lower:
             workout_type = "EMOM"
         elif "tabata" in workout_lower:
@@ -47,18 +104,48 @@ class WorkoutParserAgent:
         else:
             workout_type = "Chipper"
 
+        # The short per-format prompt only when the rule parser's classifier
+        # agrees and the workout is a single part; otherwise the full prompt.
+        features = extract_features(workout_text)
+        confident = features.workout_type == workout_type and not features.multi_part
+
         return {
             "workout_type": workout_type,
+            "prompt_type": workout_type if confident else None,
             "strategy": f"Parse as {workout_type} format",
-            "expected_phases": ["warm_up", "main_work", "cooldown"]
+            "expected_phases": ["warm_up", "main_work", "cooldown"],
+            "predicted_phases": self._predict_phases(workout_type, workout_lower),
         }
 
-    def execute(self, workout_text: str) -> WorkoutStructure:
+    @staticmethod
+    def _predict_phases(workout_type: str, workout_lower: str) -> list[Phase]:
+        """
+        Guess the phases the parse will return, from SYSTEM_PROMPT's rules.
+
+        Only the intensity/BPM bucket and a generous duration matter: the
+        guess is used to start candidate prefetch while the parse runs.
+        """
+        if not workout_lower.strip():
+            return [PREDICTED_WARM_UP, PREDICTED_COOLDOWN]
+
+        intensity, bpm_range = WORK_BUCKETS[workout_type]
+        duration_match = re.search(r'(\d+)\s*(?:minute|min)', workout_lower)
+        duration_min = int(duration_match.group(1)) if duration_match else DEFAULT_WORK_DURATION_MIN
+        work = Phase(
+            name=f"{workout_type} Work",
+            duration_min=max(1, duration_min),
+            intensity=intensity,
+            bpm_range=bpm_range,
+        )
+        return [PREDICTED_WARM_UP, work, PREDICTED_COOLDOWN]
+
+    def execute(self, workout_text: str, workout_type: Optional[str] = None) -> WorkoutStructure:
         """
         Execute the parsing of workout text.
 
         Args:
             workout_text: Raw workout description
+            workout_type: plan()'s prompt_type, to parse with that format's short prompt
 
         Returns:
             Structured workout with phases and BPM ranges
@@ -66,7 +153,7 @@ class WorkoutParserAgent:
         logger.info(f"Parsing workout: {workout_text[:50]}...")
 
         try:
-            workout_structure = self.client.parse_workout(workout_text)
+            workout_structure = self.client.parse_workout(workout_text, workout_type=workout_type)
             logger.info(f"Successfully parsed workout: {workout_structure.workout_name}")
             return workout_structure
         except Exception as e:
@@ -107,6 +194,54 @@ class WorkoutParserAgent:
             logger.error(f"Error parsing workout image: {e}")
             raise
 
+    async def execute_async(
+        self,
+        workout_text: str,
+        on_phase: Optional[Callable[[Phase], None]] = None,
+        workout_type: Optional[str] = None,
+    ) -> WorkoutStructure:
+        """
+        Async variant of execute() for the async pipeline. With on_phase (and
+        a client that can stream), each phase is reported as soon as it is
+        parsed, before the whole workout is complete.
+        """
+        logger.info(f"Parsing workout: {workout_text[:50]}...")
+
+        try:
+            if on_phase is not None and settings.streaming_parse and hasattr(self.client, "parse_workout_stream_async"):
+                workout_structure = await self.client.parse_workout_stream_async(
+                    workout_text, on_phase, workout_type=workout_type,
+                )
+            else:
+                workout_structure = await self.client.parse_workout_async(workout_text, workout_type=workout_type)
+            logger.info(f"Successfully parsed workout: {workout_structure.workout_name}")
+            return workout_structure
+        except Exception as e:
+            logger.error(f"Error parsing workout: {e}")
+            raise
+
+    async def execute_from_image_async(
+        self, image_base64: str, media_type: str, additional_text: str = ""
+    ) -> WorkoutStructure:
+        """Async variant of execute_from_image() for the async pipeline."""
+        if settings.use_mock_anthropic:
+            raise NotImplementedError(
+                "Image parsing requires real Anthropic API. "
+                "Set USE_MOCK_ANTHROPIC=false and provide ANTHROPIC_API_KEY."
+            )
+
+        logger.info("Parsing workout from image...")
+        try:
+            workout_structure = await self.client.parse_workout_from_image_async(
+                image_base64, media_type, additional_text
+            )
+            logger.info(f"Successfully parsed workout from image: {workout_structure.workout_name}")
+            return workout_structure
+        except Exception as e:
+            logger.error(f"Error parsing workout image: {e}")
+            raise
+
+    @metrics.timed(metrics.VALIDATION_SECONDS, target="workout")
     def validate(self, workout: WorkoutStructure) -> tuple[bool, Optional[str]]:
         """
         Validate the parsed workout structure.
@@ -153,20 +288,91 @@ class WorkoutParserAgent:
         Raises:
             ValueError: If validation fails
         """
+        known = self._known_parse(workout_text)
+        if known is not None:
+            return known
+
         # Plan
         plan = self.plan(workout_text)
         logger.debug(f"Parse plan: {plan}")
 
         # Execute
-        workout = self.execute(workout_text)
+        workout = self.execute(workout_text, workout_type=self._prompt_type(plan))
 
         # Validate
         is_valid, error_msg = self.validate(workout)
         if not is_valid:
             raise ValueError(f"Invalid workout structure: {error_msg}")
 
+        self._remember(workout_text, workout)
         return workout
 
+    @staticmethod
+    def _prompt_type(plan: dict) -> Optional[str]:
+        return plan["prompt_type"] if settings.specialized_prompts else None
+
+    def _remember(self, workout_text: str, workout: WorkoutStructure) -> None:
+        """Store a validated client parse for exact and near-duplicate reuse."""
+        if self.cache is not None:
+            self.cache.put(workout_text, workout)
+        if self.similar is not None:
+            self.similar.put(workout_text, workout)
+
+    def _known_parse(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """
+        Return a named WOD, a cached parse of equivalent or near-duplicate
+        text, or a confident local rule parse, without calling the client.
+        """
+        workout = self._named_parse(workout_text)
+        if workout is None and self.cache is not None:
+            workout = self._cache_hit(self.cache.get(workout_text))
+        return workout or self._local_parse(workout_text)
+
+    async def _known_parse_async(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """Async variant of _known_parse(); the parse cache's SQLite tier is read off the event loop."""
+        workout = self._named_parse(workout_text)
+        if workout is None and self.cache is not None:
+            workout = self._cache_hit(await self.cache.get_async(workout_text))
+        return workout or self._local_parse(workout_text)
+
+    def _named_parse(self, workout_text: str) -> Optional[WorkoutStructure]:
+        workout = self.named_wods.match(workout_text)
+        if workout is not None:
+            logger.info(f"Named WOD: {workout.workout_name}")
+            metrics.record_parse_cache("named_wod")
+        return workout
+
+    @staticmethod
+    def _cache_hit(workout: Optional[WorkoutStructure]) -> Optional[WorkoutStructure]:
+        if workout is not None:
+            logger.info(f"Parse cache hit: {workout.workout_name}")
+        return workout
+
+    def _local_parse(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """A near-duplicate's cached parse, or a confident rule parse."""
+        if self.similar is not None:
+            workout = self.similar.get(workout_text)
+            if workout is not None:
+                return workout
+        return self._rule_parse(workout_text)
+
+    def _rule_parse(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """The rule parser's answer if it clears settings.rule_parser_min_confidence."""
+        if self.rule_parser is None:
+            return None
+        result = self.rule_parser.parse(workout_text)
+        if result is None or result.confidence < settings.rule_parser_min_confidence:
+            metrics.record_rule_parse("fallback")
+            return None
+        is_valid, error_msg = self.validate(result.workout)
+        if not is_valid:
+            logger.warning(f"Rule parse rejected: {error_msg}")
+            metrics.record_rule_parse("invalid")
+            return None
+        logger.info(f"Rule parse ({result.confidence:.2f}): {result.workout.workout_name}")
+        metrics.record_rule_parse("accepted")
+        return result.workout
+
     def parse_image_and_validate(
         self, image_base64: str, media_type: str, additional_text: str = ""
     ) -> WorkoutStructure:
@@ -184,10 +390,96 @@ class WorkoutParserAgent:
         Raises:
             ValueError: If validation fails
         """
+        cached, fp, image_base64, media_type = self._prepare_image(image_base64, media_type, additional_text)
+        if cached is not None:
+            return cached
+
         workout = self.execute_from_image(image_base64, media_type, additional_text)
 
         is_valid, error_msg = self.validate(workout)
         if not is_valid:
             raise ValueError(f"Invalid workout structure: {error_msg}")
 
+        if fp is not None:
+            self.image_cache.put(fp, workout)
+        return workout
+
+    def _prepare_image(
+        self, image_base64: str, media_type: str, additional_text: str
+    ) -> tuple[Optional[WorkoutStructure], Optional[ImageFingerprint], str, str]:
+        """
+        Decode the upload once, look it up in the image cache and, on a miss,
+        shrink it for the vision call.
+
+        Returns:
+            (cached workout or None, cache fingerprint, image_base64, media_type)
+            where the last two are what should be sent to the client
+        """
+        if self.image_cache is None and not settings.image_preprocess:
+            return None, None, image_base64, media_type
+        loaded = image_preprocess.load(image_base64, settings.image_max_edge_px, settings.image_grayscale)
+        if loaded is None:
+            return None, None, image_base64, media_type
+
+        fp = None
+        if self.image_cache is not None:
+            fp = self.image_cache.fingerprint(loaded.data, additional_text)
+            cached = self.image_cache.get(fp)
+            if cached is not None:
+                logger.info(f"Image parse cache hit: {cached.workout_name}")
+                return cached, fp, image_base64, media_type
+
+        if settings.image_preprocess:
+            shrunk = image_preprocess.shrink(
+                loaded, image_base64, media_type,
+                max_edge_px=settings.image_max_edge_px,
+                grayscale=settings.image_grayscale,
+                output_format=settings.image_output_format,
+            )
+            image_base64, media_type = shrunk.image_base64, shrunk.media_type
+        return None, fp, image_base64, media_type
+
+    async def parse_and_validate_async(
+        self, workout_text: str, on_phase: Optional[Callable[[Phase], None]] = None
+    ) -> WorkoutStructure:
+        """
+        Async variant of parse_and_validate(). on_phase is passed to
+        execute_async(); it is not called for named, cached or rule parses,
+        which return immediately. Streamed phases are not yet validated.
+        """
+        known = await self._known_parse_async(workout_text)
+        if known is not None:
+            return known
+
+        plan = self.plan(workout_text)
+        logger.debug(f"Parse plan: {plan}")
+
+        workout = await self.execute_async(workout_text, on_phase, workout_type=self._prompt_type(plan))
+
+        is_valid, error_msg = self.validate(workout)
+        if not is_valid:
+            raise ValueError(f"Invalid workout structure: {error_msg}")
+
+        self._remember(workout_text, workout)
+        return workout
+
+    async def parse_image_and_validate_async(
+        self, image_base64: str, media_type: str, additional_text: str = ""
+    ) -> WorkoutStructure:
+        """Async variant of parse_image_and_validate()."""
+        # Decoding and re-encoding a phone photo takes long enough to stall the event loop
+        cached, fp, image_base64, media_type = await asyncio.to_thread(
+            self._prepare_image, image_base64, media_type, additional_text
+        )
+        if cached is not None:
+            return cached
+
+        workout = await self.execute_from_image_async(image_base64, media_type, additional_text)
+
+        is_valid, error_msg = self.validate(workout)
+        if not is_valid:
+            raise ValueError(f"Invalid workout structure: {error_msg}")
+
+        if fp is not None:
+            self.image_cache.put(fp, workout)
         return workout
@@ -0,0 +1,143 @@
+"""
+Input-token / latency comparison of the per-format parse prompts.
+
+For every WOD in data/wod_corpus.json, builds the parse request with the
+monolithic SYSTEM_PROMPT and with the prompt plan() routes to, and reports
+input tokens per request for both. Offline counts use the SDK's local
+tokenizer (an approximation; characters / 4 if it is unavailable). With
+--live (needs ANTHROPIC_API_KEY) each routed WOD is parsed both ways and
+the reported input tokens, latency and correctness against the labels are
+compared instead.
+
+    python -m benchmarks.parse_prompts [--live] [--verbose]
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+
+from benchmarks.rule_parser import is_correct, load_corpus
+
+
+def _token_counter():
+    try:
+        import anthropic
+        counter = anthropic.Anthropic(api_key="offline")
+        counter.count_tokens("warm up")
+        return counter.count_tokens
+    except Exception:
+        return lambda text: max(1, len(text) // 4)
+
+
+def request_tokens(request: dict, count) -> int:
+    """Approximate input tokens of a messages.create request (system, tools, messages)."""
+    system = request["system"]
+    system_text = system if isinstance(system, str) else "".join(block["text"] for block in system)
+    return (
+        count(system_text)
+        + count(json.dumps(request["tools"]))
+        + sum(count(message["content"]) for message in request["messages"])
+    )
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run(corpus: list[dict] = None, client=None) -> dict:
+    """Offline comparison: routing coverage and estimated input tokens per request."""
+    from agents.workout_parser import WorkoutParserAgent
+    from clients.anthropic_client import AnthropicClient
+
+    corpus = corpus if corpus is not None else load_corpus()
+    client = client or AnthropicClient(api_key="offline")
+    parser = WorkoutParserAgent()
+    count = _token_counter()
+    rows = []
+    for wod in corpus:
+        prompt_type = parser.plan(wod["text"])["prompt_type"]
+        rows.append({
+            "text": wod["text"],
+            "prompt_type": prompt_type,
+            "monolithic_tokens": request_tokens(client._text_request(wod["text"]), count),
+            "routed_tokens": request_tokens(client._text_request(wod["text"], workout_type=prompt_type), count),
+        })
+
+    routed = [r for r in rows if r["prompt_type"]]
+    monolithic = statistics.mean(r["monolithic_tokens"] for r in rows)
+    mixed = statistics.mean(r["routed_tokens"] for r in rows)
+    return {
+        "wods": len(rows),
+        "routed": round(len(routed) / len(rows), 3),
+        "by_type": dict(Counter(r["prompt_type"] or "full" for r in rows)),
+        "monolithic_tokens_mean": round(monolithic, 1),
+        "routed_tokens_mean": round(statistics.mean(r["routed_tokens"] for r in routed), 1) if routed else None,
+        "mixed_tokens_mean": round(mixed, 1),
+        "token_savings": round(1 - mixed / monolithic, 3),
+        "rows": rows,
+    }
+
+
+def run_live(corpus: list[dict] = None, client=None) -> dict:
+    """Parse every routed WOD with both prompts and compare what the API reports."""
+    from agents.workout_parser import WorkoutParserAgent
+    from clients.anthropic_client import AnthropicClient
+
+    corpus = corpus if corpus is not None else load_corpus()
+    client = client or AnthropicClient()
+    parser = WorkoutParserAgent()
+    results = {"monolithic": [], "routed": []}
+    for wod in corpus:
+        prompt_type = parser.plan(wod["text"])["prompt_type"]
+        if prompt_type is None:
+            continue
+        for variant, workout_type in (("monolithic", None), ("routed", prompt_type)):
+            start = time.perf_counter()
+            response = client.client.messages.create(
+                **client._text_request(wod["text"], workout_type=workout_type)
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            results[variant].append({
+                "input_tokens": response.usage.input_tokens,
+                "latency_ms": elapsed_ms,
+                "correct": is_correct(client._extract_workout(response), wod["work_phases"]),
+            })
+
+    report = {}
+    for variant, rows in results.items():
+        if not rows:
+            continue
+        latencies = [r["latency_ms"] for r in rows]
+        report[variant] = {
+            "wods": len(rows),
+            "input_tokens_mean": round(statistics.mean(r["input_tokens"] for r in rows), 1),
+            "p50_ms": round(statistics.median(latencies)),
+            "p95_ms": round(_percentile(latencies, 0.95)),
+            "accuracy": round(sum(r["correct"] for r in rows) / len(rows), 3),
+        }
+    return report
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--live", action="store_true", help="Call the API (needs ANTHROPIC_API_KEY)")
+    arg_parser.add_argument("--verbose", action="store_true", help="Print every WOD (offline mode)")
+    args = arg_parser.parse_args()
+
+    if args.live:
+        print(json.dumps(run_live(), indent=2))
+        return
+
+    report = run()
+    if args.verbose:
+        for row in report["rows"]:
+            print(f"{row['prompt_type'] or 'full':8} {row['monolithic_tokens']:5} -> {row['routed_tokens']:5}  "
+                  f"{row['text'][:60]!r}")
+    summary = {k: v for k, v in report.items() if k != "rows"}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Accuracy / latency benchmark for the local rule parser.
+
+Runs RuleBasedParser over the labeled corpus in data/wod_corpus.json and
+reports, for a confidence threshold, how many WODs it would answer locally
+(coverage), how many of those it gets right (precision), and parse latency.
+
+    python -m benchmarks.rule_parser [--threshold 0.8] [--verbose]
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from models.schemas import WorkoutStructure
+from services.rule_parser import RuleBasedParser
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / "data" / "wod_corpus.json"
+DURATION_TOLERANCE = 0.1  # Work minutes may differ by 10% (at least 1 min)
+
+
+def load_corpus(path: Path = CORPUS_PATH) -> list[dict]:
+    return json.loads(path.read_text(encoding="utf-8"))["wods"]
+
+
+def is_correct(workout: WorkoutStructure, work_phases: list[dict]) -> bool:
+    """Work phases (between warm-up and cooldown) match the label in intensity and duration."""
+    parsed = workout.phases[1:-1]
+    if len(parsed) != len(work_phases):
+        return False
+    for phase, label in zip(parsed, work_phases):
+        tolerance = max(1, label["duration_min"] * DURATION_TOLERANCE)
+        if phase.intensity != label["intensity"] or abs(phase.duration_min - label["duration_min"]) > tolerance:
+            return False
+    return True
+
+
+def run(threshold: float, corpus: list[dict] = None, repeat: int = 20) -> dict:
+    corpus = corpus if corpus is not None else load_corpus()
+    parser = RuleBasedParser()
+    rows, latencies_ms = [], []
+    for wod in corpus:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = parser.parse(wod["text"])
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+        rows.append({
+            "text": wod["text"],
+            "confidence": result.confidence,
+            "accepted": result.confidence >= threshold,
+            "correct": is_correct(result.workout, wod["work_phases"]),
+        })
+
+    accepted = [r for r in rows if r["accepted"]]
+    latencies_ms.sort()
+    return {
+        "threshold": threshold,
+        "wods": len(rows),
+        "coverage": round(len(accepted) / len(rows), 3),
+        "precision": round(sum(r["correct"] for r in accepted) / len(accepted), 3) if accepted else 0.0,
+        "accuracy_all": round(sum(r["correct"] for r in rows) / len(rows), 3),
+        "p50_ms": round(statistics.median(latencies_ms), 4),
+        "p99_ms": round(latencies_ms[int(len(latencies_ms) * 0.99) - 1], 4),
+        "rows": rows,
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--threshold", type=float, default=None,
+                            help="Confidence threshold (default: settings.rule_parser_min_confidence)")
+    arg_parser.add_argument("--verbose", action="store_true", help="Print every WOD")
+    args = arg_parser.parse_args()
+
+    if args.threshold is None:
+        from config import settings
+        args.threshold = settings.rule_parser_min_confidence
+
+    report = run(args.threshold)
+    if args.verbose:
+        for row in report["rows"]:
+            mark = ("ok " if row["correct"] else "BAD") if row["accepted"] else "llm"
+            print(f"{mark} {row['confidence']:.2f}  {row['text'][:70]!r}")
+    summary = {k: v for k, v in report.items() if k != "rows"}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
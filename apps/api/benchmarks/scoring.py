@@ -0,0 +1,110 @@
+"""
+Per-phase candidate pool build and scoring time at different pool sizes.
+
+Reports the median time to turn a source's TrackCandidates into Pydantic
+Tracks (what the curator used to do for every candidate) against building a
+CandidatePool, then ranking the pool's top k: with the pure-Python loop
+(NumPy patched out), with rank_pool() as shipped (vectorized from
+scoring.MIN_VECTOR_POOL candidates up), and with the NumPy engine alone.
+
+    python -m benchmarks.scoring [--sizes 20,1000,100000] [--top-k 200]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from models.candidate_pool import CandidatePool
+from models.schemas import Phase, Track
+from music_sources.base import TrackCandidate
+from services import scoring
+
+PHASE = Phase(name="Main WOD", duration_min=20, intensity="high", bpm_range=(145, 160))
+TARGET_ENERGY = 0.75
+
+
+def make_candidates(size: int, seed: int = 0) -> list[TrackCandidate]:
+    rng = random.Random(seed)
+    artists = [f"Artist {i}" for i in range(max(10, size // 8))]
+    return [
+        TrackCandidate(
+            name=f"Track {i}",
+            artist=rng.choice(artists),
+            bpm=rng.randint(120, 185),
+            energy=round(rng.uniform(0.4, 1.0), 2),
+            duration_ms=rng.randint(150_000, 300_000),
+            source="bench",
+            source_id=f"t{i}",
+        )
+        for i in range(size)
+    ]
+
+
+def to_tracks(candidates: list[TrackCandidate]) -> list[Track]:
+    return [
+        Track(id=c.source_id, name=c.name, artist=c.artist, bpm=c.bpm,
+              energy=c.energy, duration_ms=c.duration_ms)
+        for c in candidates
+    ]
+
+
+def make_pool(size: int, seed: int = 0) -> list[Track]:
+    return to_tracks(make_candidates(size, seed))
+
+
+def _median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 4)
+
+
+def run(sizes: list[int], top_k: int = 200) -> list[dict]:
+    from agents.music_curator import MusicCuratorAgent
+
+    curator = MusicCuratorAgent()
+    rows = []
+    for size in sizes:
+        candidates = make_candidates(size)
+        pool = CandidatePool.from_candidates(candidates)
+        used = {pool.artist(0), pool.artist(size - 1)}
+        boost = {pool.artist(size // 2)}
+        arrays = pool.arrays()
+        repeat = 200 if size <= 1000 else 5
+
+        def rank():
+            curator.rank_pool(pool, PHASE, used, boost_artists=boost, top_k=top_k)
+
+        def python_loop():
+            with patch.object(scoring, "np", None):
+                rank()
+
+        def engine():
+            scoring.top_k(scoring.score(arrays, PHASE.bpm_range, TARGET_ENERGY, used, boost), top_k)
+
+        rows.append({
+            "pool": size,
+            "track_build_ms": _median_ms(lambda: to_tracks(candidates), repeat),
+            "pool_build_ms": _median_ms(lambda: CandidatePool.from_candidates(candidates), repeat),
+            "python_ms": _median_ms(python_loop, repeat),
+            "rank_ms": _median_ms(rank, repeat),
+            "engine_ms": _median_ms(engine, repeat),
+        })
+    return rows
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--sizes", default="20,1000,100000", help="Comma-separated pool sizes")
+    arg_parser.add_argument("--top-k", type=int, default=200, help="Candidates ranked per phase")
+    args = arg_parser.parse_args()
+
+    print(json.dumps(run([int(s) for s in args.sizes.split(",")], args.top_k), indent=2))
+
+
+if __name__ == "__main__":
+    main()
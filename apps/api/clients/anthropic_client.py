@@ -2,18 +2,24 @@
 Real Anthropic Claude API client for workout parsing.
 Uses tool_use for structured output.
 """
+import copy
 import json
 import logging
 import time
-from typing import Optional
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Optional, TypeVar
 
 import anthropic
 
 from config import settings
+from services import deadline, metrics, token_usage
+from services.hedging import Hedge
 from models.schemas import WorkoutStructure, Phase
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # BPM mapping used in the system prompt
 BPM_MAPPING = {
     "warm_up": (100, 120),
@@ -120,21 +126,229 @@ SYSTEM_PROMPT = """You are a CrossFit workout parser. Your job is to analyze wor
 
 Always use the parse_workout tool to return structured output."""
 
+# Short per-format prompts, used instead of SYSTEM_PROMPT when plan() is
+# confident of the workout type: only that type's work-phase rule and one
+# example, and a tool schema whose intensity enum has just the three
+# intensities the parse can use. Ambiguous workouts keep the full prompt.
+TYPE_RULES = {
+    "AMRAP": (
+        "high",
+        'The work phase lasts the stated AMRAP time ("15:00 AMRAP" = 15 min).',
+        '"AMRAP 20 minutes: 5 pull-ups, 10 push-ups" → 5 warm-up + 20 high + 3 cooldown = 28 min',
+    ),
+    "RFT": (
+        "very_high",
+        "Estimate the work time from rounds, reps and movements (a 21-15-9 couplet is about 12 min); "
+        "a stated time cap is the work duration.",
+        '"21-15-9 thrusters and pull-ups" → 5 warm-up + 12 very_high + 3 cooldown = 20 min',
+    ),
+    "EMOM": (
+        "moderate",
+        'The work phase lasts the whole EMOM ("E2MOM x 10" = 20 min).',
+        '"EMOM 12 minutes: 10 burpees" → 5 warm-up + 12 moderate + 3 cooldown = 20 min',
+    ),
+    "Tabata": (
+        "very_high",
+        "Each Tabata movement is 4 minutes (8 x 20s work / 10s rest).",
+        '"Tabata: push-ups, air squats" → 5 warm-up + 8 very_high + 3 cooldown = 16 min',
+    ),
+    "Chipper": (
+        "moderate",
+        "Estimate the work time from the total volume (about 2 min per movement, at least 15); "
+        "a stated time cap is the work duration.",
+        '"Chipper: 50 box jumps, 50 KB swings, 50 wall balls" → 5 warm-up + 15 moderate + 3 cooldown = 23 min',
+    ),
+}
+
+TYPE_PROMPT = """You are a CrossFit workout parser. Break this {workout_type} workout into phases for music matching.
+
+## Rules
+1. Phases: warm-up (3-5 min, "warm_up", BPM [100, 120]), the work, cooldown (2-3 min, "cooldown", BPM [80, 100]).
+2. Work: "{intensity}", BPM [{bpm_min}, {bpm_max}]. {duration_rule}
+3. Phase durations MUST sum to total_duration_min.
+
+Example: {example}
+
+Always use the parse_workout tool."""
+
+
+def _type_tool(intensity: str) -> dict:
+    """WORKOUT_TOOL restricted to warm_up, `intensity` and cooldown."""
+    tool = copy.deepcopy(WORKOUT_TOOL)
+    phase = tool["input_schema"]["properties"]["phases"]["items"]["properties"]
+    phase["intensity"]["enum"] = ["warm_up", intensity, "cooldown"]
+    phase["intensity"].pop("description")
+    phase["bpm_range"]["description"] = "[min, max] BPM for the intensity, as given in the rules"
+    phase["name"]["description"] = "Phase name, e.g. 'Warm-up', 'AMRAP Work', 'Cooldown'"
+    return tool
+
+
+TYPE_PROMPTS = {
+    workout_type: (
+        TYPE_PROMPT.format(
+            workout_type=workout_type,
+            intensity=intensity,
+            bpm_min=BPM_MAPPING[intensity][0],
+            bpm_max=BPM_MAPPING[intensity][1],
+            duration_rule=duration_rule,
+            example=example,
+        ),
+        _type_tool(intensity),
+    )
+    for workout_type, (intensity, duration_rule, example) in TYPE_RULES.items()
+}
+
+
+class PhaseStream:
+    """
+    Incremental scanner over the streamed parse_workout tool input.
+
+    feed() takes each input_json_delta fragment and returns the objects of
+    the top-level "phases" array that the fragment completed, so a phase is
+    available as soon as its closing brace arrives rather than when the
+    whole tool call has been generated.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None  # Last complete string at depth 1 (the key before a value)
+        self._in_phases = False
+        self._phase_start: Optional[int] = None
+
+    def feed(self, fragment: str) -> list[dict]:
+        self.text += fragment
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start:i + 1]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._last_string == '"phases"':
+                    self._in_phases = True
+                elif c == "{" and self._depth == 3 and self._in_phases:
+                    self._phase_start = i
+            elif c in "}]":
+                if c == "}" and self._depth == 3 and self._phase_start is not None:
+                    try:
+                        completed.append(json.loads(text[self._phase_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass  # Left for the full parse to report
+                    self._phase_start = None
+                elif c == "]" and self._depth == 2:
+                    self._in_phases = False
+                self._depth -= 1
+        self._pos = len(text)
+        return completed
+
 
 class AnthropicClient:
     """Real Claude API client for workout parsing using tool_use."""
 
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        hedge_model: Optional[str] = None,
+    ):
         self.api_key = api_key or settings.anthropic_api_key
         self.model = model or settings.anthropic_model
+        self.hedge_model = hedge_model or settings.parse_hedge_model or self.model
         self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=self.api_key)
+        # Async parses only: the backup attempt needs the event loop
+        self.hedges = {
+            operation: Hedge(
+                operation,
+                percentile=settings.parse_hedge_percentile,
+                min_delay_s=settings.parse_hedge_min_delay_s,
+                default_delay_s=settings.parse_hedge_default_delay_s,
+            )
+            for operation in ("parse_workout", "parse_workout_from_image")
+        }
+
+    async def _hedged(self, operation: str, attempt: Callable[[str], Awaitable[T]]) -> T:
+        """Run attempt(model), hedged with attempt(hedge_model) if it runs long."""
+        if not settings.parse_hedging:
+            return await attempt(self.model)
+        return await self.hedges[operation].run(
+            lambda: attempt(self.model), lambda: attempt(self.hedge_model),
+        )
 
-    def parse_workout(self, workout_text: str) -> WorkoutStructure:
+    def _text_request(
+        self, workout_text: str, model: Optional[str] = None, workout_type: Optional[str] = None,
+    ) -> dict:
+        """
+        Build messages.create kwargs for a text parse, with the short prompt
+        for workout_type if there is one (see TYPE_PROMPTS).
+        """
+        system, tool = TYPE_PROMPTS.get(workout_type, (SYSTEM_PROMPT, WORKOUT_TOOL))
+        return dict(
+            model=model or self.model,
+            max_tokens=1024,
+            system=system,
+            tools=[tool],
+            tool_choice={"type": "tool", "name": "parse_workout"},
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"Parse this CrossFit workout:\n\n{workout_text}",
+                }
+            ],
+            timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+        )
+
+    def _image_request(
+        self, image_base64: str, media_type: str, additional_text: str = "", model: Optional[str] = None,
+    ) -> dict:
+        """Build messages.create kwargs for a whiteboard photo parse."""
+        content = [
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": media_type,
+                    "data": image_base64,
+                },
+            },
+            {
+                "type": "text",
+                "text": f"Parse the CrossFit workout shown in this image (likely a whiteboard photo).{f' Additional context: {additional_text}' if additional_text else ''}",
+            },
+        ]
+        return dict(
+            model=model or self.model,
+            max_tokens=1024,
+            system=SYSTEM_PROMPT,
+            tools=[WORKOUT_TOOL],
+            tool_choice={"type": "tool", "name": "parse_workout"},
+            messages=[{"role": "user", "content": content}],
+            timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+        )
+
+    def parse_workout(self, workout_text: str, workout_type: Optional[str] = None) -> WorkoutStructure:
         """
         Parse workout text into structured format using Claude API with tool_use.
 
         Args:
             workout_text: Raw workout description text
+            workout_type: Format from WorkoutParserAgent.plan(), to use its short prompt
 
         Returns:
             Parsed WorkoutStructure
@@ -143,27 +357,121 @@ class AnthropicClient:
         start = time.time()
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                system=SYSTEM_PROMPT,
-                tools=[WORKOUT_TOOL],
-                tool_choice={"type": "tool", "name": "parse_workout"},
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"Parse this CrossFit workout:\n\n{workout_text}",
-                    }
-                ],
-            )
+            with metrics.upstream("claude", "parse_workout"):
+                response = self.client.messages.create(
+                    **self._text_request(workout_text, workout_type=workout_type)
+                )
+            elapsed = time.time() - start
+            usage = token_usage.record_usage("parse_workout", response.usage)
+            logger.info(f"Claude parse response in {elapsed:.1f}s — usage: {usage}")
+            return self._extract_workout(response)
+        except anthropic.APIError as e:
+            elapsed = time.time() - start
+            logger.error(f"Claude API error after {elapsed:.1f}s: [{type(e).__name__}] {e}")
+            raise
+
+    async def parse_workout_async(
+        self, workout_text: str, workout_type: Optional[str] = None,
+    ) -> WorkoutStructure:
+        """
+        Async variant of parse_workout using AsyncAnthropic. Hedged: a backup
+        call to hedge_model starts if this one runs past its recent p90.
+        """
+        return await self._hedged(
+            "parse_workout",
+            lambda model: self._parse_workout_attempt_async(workout_text, model, workout_type),
+        )
+
+    async def _parse_workout_attempt_async(
+        self, workout_text: str, model: str, workout_type: Optional[str],
+    ) -> WorkoutStructure:
+        logger.info(f"Calling Claude API ({model}) to parse workout (async)")
+        start = time.time()
+
+        try:
+            with metrics.upstream("claude", "parse_workout"):
+                response = await self.async_client.messages.create(
+                    **self._text_request(workout_text, model, workout_type)
+                )
             elapsed = time.time() - start
-            logger.info(f"Claude parse response in {elapsed:.1f}s — usage: {response.usage.input_tokens}in/{response.usage.output_tokens}out")
+            usage = token_usage.record_usage("parse_workout", response.usage)
+            logger.info(f"Claude parse response in {elapsed:.1f}s — usage: {usage}")
             return self._extract_workout(response)
         except anthropic.APIError as e:
             elapsed = time.time() - start
             logger.error(f"Claude API error after {elapsed:.1f}s: [{type(e).__name__}] {e}")
             raise
 
+    async def parse_workout_stream_async(
+        self, workout_text: str, on_phase: Callable[[Phase], None], workout_type: Optional[str] = None,
+    ) -> WorkoutStructure:
+        """
+        Streaming variant of parse_workout_async: calls on_phase(phase) for
+        each phase as soon as Claude has finished emitting it, then returns
+        the complete WorkoutStructure. Callers can start work for phase 1
+        while phases 2..N are still being generated.
+
+        When the parse is hedged, phase i is reported by whichever attempt
+        emits it first, so on_phase sees each position once.
+        """
+        reported = 0
+
+        def attempt(model: str) -> Awaitable[WorkoutStructure]:
+            emitted = 0
+
+            def forward(phase: Phase) -> None:
+                nonlocal reported, emitted
+                emitted += 1
+                if emitted > reported:
+                    reported = emitted
+                    on_phase(phase)
+
+            return self._parse_workout_stream_attempt_async(workout_text, forward, model, workout_type)
+
+        return await self._hedged("parse_workout", attempt)
+
+    async def _parse_workout_stream_attempt_async(
+        self, workout_text: str, on_phase: Callable[[Phase], None], model: str, workout_type: Optional[str],
+    ) -> WorkoutStructure:
+        logger.info(f"Calling Claude API ({model}) to parse workout (streaming)")
+        start = time.time()
+        phases = PhaseStream()
+        usage = SimpleNamespace()
+
+        try:
+            with metrics.upstream("claude", "parse_workout"):
+                stream = await self.async_client.messages.create(
+                    **self._text_request(workout_text, model, workout_type), stream=True,
+                )
+                try:
+                    async for event in stream:
+                        if event.type == "message_start":
+                            usage = event.message.usage
+                        elif event.type == "message_delta":
+                            usage.output_tokens = event.usage.output_tokens
+                        elif event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                            for data in phases.feed(event.delta.partial_json):
+                                try:
+                                    phase = self._phase_from_input(data)
+                                except (KeyError, TypeError, ValueError) as e:
+                                    logger.warning(f"Skipping malformed streamed phase: [{type(e).__name__}] {e}")
+                                    continue
+                                logger.debug(f"Streamed phase after {time.time() - start:.1f}s: {phase.name}")
+                                on_phase(phase)
+                finally:
+                    await stream.close()  # Release the connection when cancelled (lost hedge) or failing
+            elapsed = time.time() - start
+            logger.info(f"Claude streamed parse in {elapsed:.1f}s — usage: "
+                        f"{token_usage.record_usage('parse_workout', usage)}")
+        except anthropic.APIError as e:
+            elapsed = time.time() - start
+            logger.error(f"Claude API error after {elapsed:.1f}s: [{type(e).__name__}] {e}")
+            raise
+
+        if not phases.text:
+            raise ValueError("Claude did not return a parse_workout tool call")
+        return self._workout_from_input(json.loads(phases.text))
+
     def parse_workout_from_image(
         self, image_base64: str, media_type: str, additional_text: str = ""
     ) -> WorkoutStructure:
@@ -181,32 +489,43 @@ class AnthropicClient:
         logger.info(f"Calling Claude Vision API ({self.model}) to parse workout image")
         start = time.time()
 
-        content = [
-            {
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": media_type,
-                    "data": image_base64,
-                },
-            },
-            {
-                "type": "text",
-                "text": f"Parse the CrossFit workout shown in this image (likely a whiteboard photo).{f' Additional context: {additional_text}' if additional_text else ''}",
-            },
-        ]
+        try:
+            with metrics.upstream("claude", "parse_workout_from_image"):
+                response = self.client.messages.create(
+                    **self._image_request(image_base64, media_type, additional_text)
+                )
+            elapsed = time.time() - start
+            usage = token_usage.record_usage("parse_workout_from_image", response.usage)
+            logger.info(f"Claude vision response in {elapsed:.1f}s — usage: {usage}")
+            return self._extract_workout(response)
+        except anthropic.APIError as e:
+            elapsed = time.time() - start
+            logger.error(f"Claude Vision API error after {elapsed:.1f}s: [{type(e).__name__}] {e}")
+            raise
+
+    async def parse_workout_from_image_async(
+        self, image_base64: str, media_type: str, additional_text: str = ""
+    ) -> WorkoutStructure:
+        """Async variant of parse_workout_from_image using AsyncAnthropic (hedged)."""
+        return await self._hedged(
+            "parse_workout_from_image",
+            lambda model: self._parse_image_attempt_async(image_base64, media_type, additional_text, model),
+        )
+
+    async def _parse_image_attempt_async(
+        self, image_base64: str, media_type: str, additional_text: str, model: str,
+    ) -> WorkoutStructure:
+        logger.info(f"Calling Claude Vision API ({model}) to parse workout image (async)")
+        start = time.time()
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                system=SYSTEM_PROMPT,
-                tools=[WORKOUT_TOOL],
-                tool_choice={"type": "tool", "name": "parse_workout"},
-                messages=[{"role": "user", "content": content}],
-            )
+            with metrics.upstream("claude", "parse_workout_from_image"):
+                response = await self.async_client.messages.create(
+                    **self._image_request(image_base64, media_type, additional_text, model)
+                )
             elapsed = time.time() - start
-            logger.info(f"Claude vision response in {elapsed:.1f}s — usage: {response.usage.input_tokens}in/{response.usage.output_tokens}out")
+            usage = token_usage.record_usage("parse_workout_from_image", response.usage)
+            logger.info(f"Claude vision response in {elapsed:.1f}s — usage: {usage}")
             return self._extract_workout(response)
         except anthropic.APIError as e:
             elapsed = time.time() - start
@@ -217,23 +536,24 @@ class AnthropicClient:
         """Extract WorkoutStructure from Claude's tool_use response."""
         for block in response.content:
             if block.type == "tool_use" and block.name == "parse_workout":
-                data = block.input
-                logger.info(f"Parsed workout: {data.get('workout_name', 'unknown')}")
-
-                phases = [
-                    Phase(
-                        name=p["name"],
-                        duration_min=p["duration_min"],
-                        intensity=p["intensity"],
-                        bpm_range=tuple(p["bpm_range"]),
-                    )
-                    for p in data["phases"]
-                ]
-
-                return WorkoutStructure(
-                    workout_name=data["workout_name"],
-                    total_duration_min=data["total_duration_min"],
-                    phases=phases,
-                )
+                return self._workout_from_input(block.input)
 
         raise ValueError("Claude did not return a parse_workout tool call")
+
+    @staticmethod
+    def _phase_from_input(p: dict) -> Phase:
+        return Phase(
+            name=p["name"],
+            duration_min=p["duration_min"],
+            intensity=p["intensity"],
+            bpm_range=tuple(p["bpm_range"]),
+        )
+
+    def _workout_from_input(self, data: dict) -> WorkoutStructure:
+        """Build a WorkoutStructure from parse_workout tool input."""
+        logger.info(f"Parsed workout: {data.get('workout_name', 'unknown')}")
+        return WorkoutStructure(
+            workout_name=data["workout_name"],
+            total_duration_min=data["total_duration_min"],
+            phases=[self._phase_from_input(p) for p in data["phases"]],
+        )
@@ -8,6 +8,7 @@ from typing import Optional
 import requests
 
 from config import settings
+from services import deadline, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -26,13 +27,14 @@ class LastFmClient:
         if not self.api_key:
             return []
         try:
-            resp = requests.get(LASTFM_API_URL, params={
-                "method": "artist.getSimilar",
-                "artist": artist,
-                "api_key": self.api_key,
-                "format": "json",
-                "limit": limit,
-            }, timeout=5)
+            with metrics.upstream("lastfm", "get_similar_artists"):
+                resp = requests.get(LASTFM_API_URL, params={
+                    "method": "artist.getSimilar",
+                    "artist": artist,
+                    "api_key": self.api_key,
+                    "format": "json",
+                    "limit": limit,
+                }, timeout=deadline.timeout(5))
             if resp.status_code != 200:
                 return []
             data = resp.json()
@@ -46,12 +48,13 @@ class LastFmClient:
         if not self.api_key:
             return []
         try:
-            resp = requests.get(LASTFM_API_URL, params={
-                "method": "artist.getTopTags",
-                "artist": artist,
-                "api_key": self.api_key,
-                "format": "json",
-            }, timeout=5)
+            with metrics.upstream("lastfm", "get_artist_tags"):
+                resp = requests.get(LASTFM_API_URL, params={
+                    "method": "artist.getTopTags",
+                    "artist": artist,
+                    "api_key": self.api_key,
+                    "format": "json",
+                }, timeout=deadline.timeout(5))
             if resp.status_code != 200:
                 return []
             data = resp.json()
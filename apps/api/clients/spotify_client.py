@@ -3,20 +3,28 @@ Spotify API client for searching and resolving tracks.
 Uses spotipy with client credentials for search,
 user auth for playback features.
 """
+import asyncio
 import logging
+import math
 import time
-from typing import Optional
+from typing import AsyncIterator, Optional
 from dataclasses import dataclass
 
+import httpx
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 
+from clients.http import DEFAULT_TIMEOUT, get_async_client
 from config import settings
+from services import deadline, metrics
+from services.coalescing import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 MAX_RETRIES = 3
 RETRY_BASE_DELAY = 1.0  # seconds
+MAX_CONCURRENT_SEARCHES = 5  # Parallel searches per async resolve call
+SPOTIFY_SEARCH_URL = "https://api.spotify.com/v1/search"
 
 
 @dataclass
@@ -51,11 +59,12 @@ class SpotifyClient:
                 "SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET are required"
             )
 
-        auth_manager = SpotifyClientCredentials(
+        self._auth_manager = SpotifyClientCredentials(
             client_id=self.client_id,
             client_secret=self.client_secret,
         )
-        self.sp = spotipy.Spotify(auth_manager=auth_manager)
+        self.sp = spotipy.Spotify(auth_manager=self._auth_manager)
+        self._search_flights = SingleFlight("spotify_search")
 
     def search_track(
         self, name: str, artist: str
@@ -74,47 +83,22 @@ class SpotifyClient:
 
         for attempt in range(MAX_RETRIES):
             try:
-                results = self.sp.search(q=query, type="track", limit=1)
+                with metrics.upstream("spotify", "search"):
+                    results = self.sp.search(q=query, type="track", limit=1)
                 items = results.get("tracks", {}).get("items", [])
 
                 if not items:
                     # Retry with just the track name (less specific)
-                    results = self.sp.search(q=name, type="track", limit=5)
-                    items = results.get("tracks", {}).get("items", [])
-                    # Try to find a match by artist
-                    for item in items:
-                        item_artists = [a["name"].lower() for a in item.get("artists", [])]
-                        if artist.lower() in " ".join(item_artists):
-                            items = [item]
-                            break
-                    else:
-                        # Take the first result as best guess
-                        if items:
-                            items = [items[0]]
+                    metrics.record_fallback("spotify_name_only_search")
+                    with metrics.upstream("spotify", "search"):
+                        results = self.sp.search(q=name, type="track", limit=5)
+                    items = self._match_artist(results.get("tracks", {}).get("items", []), artist)
 
                 if not items:
                     logger.debug(f"No Spotify match for '{name}' by {artist}")
                     return None
 
-                track = items[0]
-                album_images = track.get("album", {}).get("images", [])
-                # Prefer 300px image, fallback to first available
-                album_art = None
-                for img in album_images:
-                    if img.get("width", 0) == 300:
-                        album_art = img["url"]
-                        break
-                if not album_art and album_images:
-                    album_art = album_images[0]["url"]
-
-                return SpotifyTrack(
-                    spotify_uri=track["uri"],
-                    spotify_url=track["external_urls"].get("spotify", ""),
-                    name=track["name"],
-                    artist=", ".join(a["name"] for a in track.get("artists", [])),
-                    album_art_url=album_art,
-                    duration_ms=track.get("duration_ms", 0),
-                )
+                return self._to_spotify_track(items[0])
 
             except spotipy.SpotifyException as e:
                 if e.http_status == 429:
@@ -124,6 +108,9 @@ class SpotifyClient:
                     except (ValueError, TypeError):
                         retry_after = 0
                     retry_after = max(retry_after, int(RETRY_BASE_DELAY * (2 ** attempt)))
+                    if not deadline.has_budget(retry_after):
+                        deadline.degrade("spotify_backoff")
+                        return None
                     logger.warning(f"Spotify rate limited, retrying in {retry_after}s")
                     time.sleep(retry_after)
                     continue
@@ -131,13 +118,119 @@ class SpotifyClient:
                 return None
             except Exception as e:
                 logger.error(f"Unexpected error searching Spotify for '{name}': {e}")
-                if attempt < MAX_RETRIES - 1:
+                if attempt < MAX_RETRIES - 1 and deadline.has_budget(RETRY_BASE_DELAY * (2 ** attempt)):
                     time.sleep(RETRY_BASE_DELAY * (2 ** attempt))
                     continue
                 return None
 
         return None
 
+    async def search_track_async(
+        self, name: str, artist: str
+    ) -> Optional[SpotifyTrack]:
+        """
+        Async variant of search_track.
+
+        Calls the Web API search endpoint through the pooled httpx.AsyncClient,
+        reusing spotipy's client-credentials token cache for auth. Concurrent
+        lookups of the same track (coalesced generate requests resolving the
+        same playlist) share one search.
+        """
+        key = (name.lower(), artist.lower())
+        return await self._search_flights.do(key, lambda: self._search_track_async(name, artist))
+
+    async def _search_track_async(
+        self, name: str, artist: str
+    ) -> Optional[SpotifyTrack]:
+        query = f"track:{name} artist:{artist}"
+
+        for attempt in range(MAX_RETRIES):
+            try:
+                results = await self._search_async(query, limit=1)
+                items = results.get("tracks", {}).get("items", [])
+
+                if not items:
+                    # Retry with just the track name (less specific)
+                    metrics.record_fallback("spotify_name_only_search")
+                    results = await self._search_async(name, limit=5)
+                    items = self._match_artist(results.get("tracks", {}).get("items", []), artist)
+
+                if not items:
+                    logger.debug(f"No Spotify match for '{name}' by {artist}")
+                    return None
+
+                return self._to_spotify_track(items[0])
+
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 429:
+                    # Rate limited — retry with backoff
+                    try:
+                        retry_after = int(e.response.headers.get("Retry-After", 0))
+                    except (ValueError, TypeError):
+                        retry_after = 0
+                    retry_after = max(retry_after, int(RETRY_BASE_DELAY * (2 ** attempt)))
+                    if not deadline.has_budget(retry_after):
+                        deadline.degrade("spotify_backoff")
+                        return None
+                    logger.warning(f"Spotify rate limited, retrying in {retry_after}s")
+                    await asyncio.sleep(retry_after)
+                    continue
+                logger.error(f"Spotify API error searching '{name}': {e}")
+                return None
+            except Exception as e:
+                logger.error(f"Unexpected error searching Spotify for '{name}': {e}")
+                if attempt < MAX_RETRIES - 1 and deadline.has_budget(RETRY_BASE_DELAY * (2 ** attempt)):
+                    await asyncio.sleep(RETRY_BASE_DELAY * (2 ** attempt))
+                    continue
+                return None
+
+        return None
+
+    async def _search_async(self, query: str, limit: int) -> dict:
+        """Run a track search against the Web API. Raises httpx.HTTPStatusError on non-2xx."""
+        # Token is cached by spotipy; a refresh is a blocking HTTP call, so keep it off the loop
+        token = await asyncio.to_thread(self._auth_manager.get_access_token, False)
+        with metrics.upstream("spotify", "search"):
+            response = await get_async_client().get(
+                SPOTIFY_SEARCH_URL,
+                params={"q": query, "type": "track", "limit": limit},
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=deadline.timeout(DEFAULT_TIMEOUT),
+            )
+            response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _match_artist(items: list[dict], artist: str) -> list[dict]:
+        """Pick the result whose artists include `artist`, else the first result."""
+        for item in items:
+            item_artists = [a["name"].lower() for a in item.get("artists", [])]
+            if artist.lower() in " ".join(item_artists):
+                return [item]
+        # Take the first result as best guess
+        return items[:1]
+
+    @staticmethod
+    def _to_spotify_track(track: dict) -> SpotifyTrack:
+        album_images = track.get("album", {}).get("images", [])
+        # Prefer 300px image, fallback to first available
+        album_art = None
+        for img in album_images:
+            if img.get("width", 0) == 300:
+                album_art = img["url"]
+                break
+        if not album_art and album_images:
+            album_art = album_images[0]["url"]
+
+        return SpotifyTrack(
+            spotify_uri=track["uri"],
+            spotify_url=track["external_urls"].get("spotify", ""),
+            name=track["name"],
+            artist=", ".join(a["name"] for a in track.get("artists", [])),
+            album_art_url=album_art,
+            duration_ms=track.get("duration_ms", 0),
+        )
+
     def resolve_tracks(
         self, tracks: list[dict],
     ) -> list[dict]:
@@ -161,19 +254,68 @@ class SpotifyClient:
             name = track_data.get("name", "")
             artist = track_data.get("artist", "")
 
-            result = dict(track_data)
             spotify_track = self.search_track(name, artist)
-
             if spotify_track:
-                result["spotify_uri"] = spotify_track.spotify_uri
-                result["spotify_url"] = spotify_track.spotify_url
-                result["album_art_url"] = spotify_track.album_art_url
-                # Use Spotify's duration if available (more accurate)
-                if spotify_track.duration_ms > 0:
-                    result["duration_ms"] = spotify_track.duration_ms
                 resolved_count += 1
-
-            resolved.append(result)
+            resolved.append(self._merge_resolved(track_data, spotify_track))
 
         logger.info(f"Resolved {resolved_count}/{len(tracks)} tracks on Spotify")
         return resolved
+
+    async def resolve_tracks_async(
+        self, tracks: list[dict],
+    ) -> list[dict]:
+        """
+        Async variant of resolve_tracks. Searches run concurrently (at most
+        MAX_CONCURRENT_SEARCHES at a time); output order matches input order.
+        """
+        resolved: list[dict] = [dict(t) for t in tracks]
+        async for index, result in self.iter_resolve_tracks_async(tracks):
+            resolved[index] = result
+        return resolved
+
+    async def iter_resolve_tracks_async(
+        self, tracks: list[dict],
+    ) -> AsyncIterator[tuple[int, dict]]:
+        """
+        Resolve tracks concurrently, yielding (index, resolved_dict) as each
+        search finishes — in completion order, not input order. Stops at the
+        request's deadline; tracks not resolved by then are not yielded.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+        async def resolve_one(index: int, track_data: dict) -> tuple[int, dict]:
+            async with semaphore:
+                spotify_track = await self.search_track_async(
+                    track_data.get("name", ""), track_data.get("artist", ""),
+                )
+            return index, self._merge_resolved(track_data, spotify_track)
+
+        pending = [asyncio.ensure_future(resolve_one(i, t)) for i, t in enumerate(tracks)]
+        resolved_count = 0
+        remaining = deadline.remaining()
+        try:
+            for next_done in asyncio.as_completed(pending, timeout=None if remaining == math.inf else remaining):
+                index, result = await next_done
+                if "spotify_uri" in result:
+                    resolved_count += 1
+                yield index, result
+        except asyncio.TimeoutError:
+            deadline.degrade("spotify_resolution")
+        finally:
+            for task in pending:
+                task.cancel()
+        logger.info(f"Resolved {resolved_count}/{len(tracks)} tracks on Spotify")
+
+    @staticmethod
+    def _merge_resolved(track_data: dict, spotify_track: Optional[SpotifyTrack]) -> dict:
+        """Copy track_data, adding Spotify fields when the track was found."""
+        result = dict(track_data)
+        if spotify_track:
+            result["spotify_uri"] = spotify_track.spotify_uri
+            result["spotify_url"] = spotify_track.spotify_url
+            result["album_art_url"] = spotify_track.album_art_url
+            # Use Spotify's duration if available (more accurate)
+            if spotify_track.duration_ms > 0:
+                result["duration_ms"] = spotify_track.duration_ms
+        return result
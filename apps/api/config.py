@@ -30,8 +30,16 @@ class Settings(BaseSettings):
     # API Security
     api_shared_secret: Optional[str] = None  # HMAC shared secret with frontend
 
-    # PostHog
+    # Analytics: events are buffered and exported in the background
     posthog_api_key: Optional[str] = None
+    analytics_sink: str = "posthog"  # "posthog" (needs POSTHOG_API_KEY), "file", "stdout", "none"
+    analytics_file_path: str = "analytics.jsonl"  # For analytics_sink="file"
+    analytics_buffer_size: int = 10000  # Oldest events are dropped beyond this
+    analytics_batch_size: int = 100
+    analytics_flush_interval_s: float = 5.0
+
+    # Prometheus /metrics (bearer token required when set)
+    metrics_token: Optional[str] = None
 
     # Supabase
     supabase_url: Optional[str] = None
@@ -40,6 +48,83 @@ class Settings(BaseSettings):
     # Feature Flags
     use_mock_anthropic: bool = True
     use_mock_spotify: bool = True
+    speculative_prefetch: bool = True  # Fetch predicted phase pools while the parse runs
+    streaming_parse: bool = True  # Stream the parse and prefetch each phase as soon as Claude emits it
+    rule_parser: bool = True  # Parse unambiguous text locally instead of calling Claude
+    rule_parser_min_confidence: float = 0.8  # See `python -m benchmarks.rule_parser`
+    specialized_prompts: bool = True  # Short per-format parse prompt when plan() is confident (see benchmarks.parse_prompts)
+
+    # Hedged Claude parses: if a parse outlives the recent p90, start a backup
+    # call and keep whichever answers first (the other is cancelled)
+    parse_hedging: bool = True
+    parse_hedge_percentile: float = 0.9
+    parse_hedge_min_delay_s: float = 1.0  # Never hedge sooner than this
+    parse_hedge_default_delay_s: float = 4.0  # Until 20 parses have been timed
+    parse_hedge_model: Optional[str] = None  # Backup model (default: ANTHROPIC_MODEL)
+
+    # Workout parse cache (text input only)
+    parse_cache_size: int = 1024  # In-memory entries; 0 disables the cache
+    parse_cache_ttl_s: int = 7 * 24 * 3600
+    parse_cache_sqlite_path: Optional[str] = None  # e.g. /var/data/parse_cache.db to survive restarts
+
+    # Near-duplicate parse reuse (character trigram similarity; numbers must match)
+    similar_parse_size: int = 1024  # Indexed parses; 0 disables
+    similar_parse_min_similarity: float = 0.85  # Cosine similarity of the texts' trigram vectors
+
+    # Per-phase search when the music source has no batch search
+    phase_search_concurrency: int = 4  # Phases searched at once (capped per source); 1 = sequential
+
+    # Candidate pools shared across requests, by (source, BPM range, genre, energy floor)
+    pool_cache_size: int = 256  # Cached pools; 0 disables
+    pool_cache_ttl_s: int = 6 * 3600  # Sources not listed below
+    pool_cache_source_ttls_s: dict[str, float] = {
+        "mock": 0,  # In-memory catalog; nothing to save
+        "deezer": 6 * 3600,
+        "getsongbpm": 24 * 3600,
+        "soundnet": 24 * 3600,
+        "claude": 24 * 3600,
+        "claude_two_step": 24 * 3600,
+        "claude_deezer_verify": 24 * 3600,
+        "deezer_claude_rerank": 12 * 3600,
+        "hybrid": 12 * 3600,
+    }
+    pool_cache_stale_s: int = 3600  # Served past its TTL this long while one background search refreshes it
+    pool_cache_sample: float = 0.75  # Share of a cached pool each request draws at random, for variety
+    pool_cache_overfetch: int = 2  # Per-phase searches that fill the cache ask for this many times the limit
+
+    # Per-user artist/track weights learned online from /api/v1/feedback
+    preference_users: int = 10_000  # Users kept in memory (least recently seen evicted); 0 disables
+    preference_buckets: int = 256  # Hashed artist weight slots per user (power of two; 1 KB, allocated on first use)
+    preference_half_life_days: float = 30.0  # Feedback loses half its weight in this long
+    preference_ratings_per_user: int = 1000  # Track ratings kept per user (oldest forgotten first)
+
+    # Whiteboard photo parse cache (exact content hash + additional text)
+    image_cache_size: int = 256  # 0 disables the cache
+    image_cache_ttl_s: int = 24 * 3600
+
+    # Whiteboard photo preprocessing before vision parsing
+    image_preprocess: bool = True
+    image_max_edge_px: int = 1568  # Claude downsizes larger images itself
+    image_grayscale: bool = True  # Grayscale, contrast-stretched when the photo is washed out
+    image_output_format: str = "jpeg"  # or: webp
+
+    # Per-request time budget in seconds, by music strategy. Stages degrade
+    # (skip re-rank/verification, local catalog, no Spotify URIs) as it runs out.
+    generate_budget_s: float = 45.0  # Strategies not listed below; 0 = unlimited
+    strategy_budgets_s: dict[str, float] = {
+        "mock": 10.0,
+        "deezer": 30.0,
+        "claude": 45.0,
+        "hybrid": 45.0,
+        "claude_deezer_verify": 50.0,
+        "deezer_claude_rerank": 50.0,
+        "claude_two_step": 60.0,
+    }
+
+    # Background generate jobs (POST /api/v1/jobs/generate)
+    job_workers: int = 2  # Concurrent jobs per process
+    job_queue_depth: int = 20  # Queued jobs before new submissions get 503
+    job_ttl_s: int = 900  # How long finished jobs stay pollable
 
     # Server Configuration
     host: str = "0.0.0.0"
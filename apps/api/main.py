@@ -1,31 +1,40 @@
 """
 FastAPI application for CrossFit Playlist Generator
 """
+import asyncio
 import hashlib
 import hmac
+import json
 import logging
 import math
 import time as _time
 from contextlib import asynccontextmanager
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Optional
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from starlette.middleware.base import BaseHTTPMiddleware
 
-try:
-    import posthog as _posthog_module
-except ImportError:
-    _posthog_module = None
-
 from config import settings
-from models.schemas import GeneratePlaylistRequest, GeneratePlaylistResponse, Track
+from models.schemas import (
+    GenerateBatchItem, GenerateBatchRequest, GenerateBatchResponse, GenerateError,
+    GenerateJobResponse, GeneratePlaylistRequest, GeneratePlaylistResponse, Phase, Track,
+    TrackFeedbackRequest,
+)
 from agents.workout_parser import WorkoutParserAgent
 from agents.music_curator import MusicCuratorAgent
-from agents.playlist_composer import PlaylistComposerAgent
+from agents.playlist_composer import PlaylistComposerAgent, bucket_key, merge_speculative_pools
+from clients.http import aclose_async_client
+from services import deadline, metrics
+from services.analytics import AnalyticsExporter, create_sink
+from services.coalescing import SingleFlight
+from services.job_queue import JobQueue, QueueFullError
+from services.strategy_registry import StrategyRegistry
 
 # Configure logging
 logging.basicConfig(
@@ -46,46 +55,76 @@ def get_real_client_ip(request: Request) -> str:
 # Configure rate limiting
 limiter = Limiter(key_func=get_real_client_ip)
 
+MAX_HEADER_ITEMS = 100
+ALLOWED_GENRES = {"rock", "hip-hop", "edm", "metal", "pop", "punk", "country", "indie"}
+ALLOWED_STRATEGIES = {"claude", "deezer", "claude_deezer_verify", "claude_two_step", "hybrid", "deezer_claude_rerank", "mock"}
+JOB_RETRY_AFTER_S = 15  # Retry-After sent when the job queue is full
+JOB_POLL_INTERVAL_S = 2  # Retry-After hint on job status responses until the job finishes
+SPOTIFY_MIN_BUDGET_S = 1.0  # Below this, return the playlist without Spotify URIs
+
+
 # Global agent instances
 workout_parser: WorkoutParserAgent
 music_curator: MusicCuratorAgent
 playlist_composer: PlaylistComposerAgent
 spotify_client: Optional[object] = None
-_posthog_enabled = False
+strategy_registry: StrategyRegistry
+job_queue: JobQueue
+analytics: Optional[AnalyticsExporter] = None
 
+# Identical concurrent generate calls (e.g. a whole class submitting the
+# day's WOD) share one parse and one candidate prefetch.
+_parse_flights = SingleFlight("parse")
+_prefetch_flights = SingleFlight("prefetch")
+_speculative_flights = SingleFlight("speculative_prefetch")
 
-def _ph_capture(distinct_id: str, event: str, properties: Optional[dict] = None):
-    """Capture a PostHog event. No-ops if PostHog is not configured."""
-    if not _posthog_enabled or _posthog_module is None:
-        return
-    try:
-        _posthog_module.capture(distinct_id, event, properties or {})
-    except Exception as e:
-        logger.debug(f"PostHog capture failed: {e}")
+
+def _capture(distinct_id: str, event: str, properties: Optional[dict] = None):
+    """Queue an analytics event for the background exporter. No-ops if analytics is disabled."""
+    if analytics is not None:
+        analytics.capture(distinct_id, event, properties)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize and cleanup application resources"""
-    global workout_parser, music_curator, playlist_composer, spotify_client, _posthog_enabled
+    global workout_parser, music_curator, playlist_composer, spotify_client, strategy_registry, job_queue, analytics
 
     logger.info("Validating configuration...")
     settings.validate_api_keys()
 
-    # Initialize PostHog if configured
-    if settings.posthog_api_key and _posthog_module is not None:
-        _posthog_module.api_key = settings.posthog_api_key
-        _posthog_module.host = "https://us.i.posthog.com"
-        _posthog_enabled = True
-        logger.info("PostHog analytics initialized")
+    # Start the analytics exporter if a sink is configured
+    sink = create_sink(
+        settings.analytics_sink,
+        posthog_api_key=settings.posthog_api_key,
+        path=settings.analytics_file_path,
+    )
+    if sink is not None:
+        analytics = AnalyticsExporter(
+            sink,
+            capacity=settings.analytics_buffer_size,
+            batch_size=settings.analytics_batch_size,
+            flush_interval_s=settings.analytics_flush_interval_s,
+        )
+        analytics.start()
     else:
-        logger.info("PostHog analytics disabled (no API key or module not installed)")
+        logger.info(f"Analytics disabled (sink '{settings.analytics_sink}' not configured or unavailable)")
 
     logger.info("Initializing agents...")
     workout_parser = WorkoutParserAgent()
     music_curator = MusicCuratorAgent()
     playlist_composer = PlaylistComposerAgent(curator=music_curator)
 
+    # One long-lived composer per strategy. The default composer (MUSIC_SOURCE)
+    # is built above and the default MUSIC_STRATEGY here, in a worker thread;
+    # other overrides are built on first use, also off the event loop.
+    strategy_registry = StrategyRegistry(
+        ALLOWED_STRATEGIES,
+        default_composer=playlist_composer,
+        default_strategy=settings.music_source,
+    )
+    await asyncio.to_thread(strategy_registry.warm, [settings.music_strategy])
+
     # Initialize Spotify client if credentials are available
     if not settings.use_mock_spotify and settings.spotify_client_id and settings.spotify_client_secret:
         try:
@@ -100,14 +139,21 @@ async def lifespan(app: FastAPI):
 
     logger.info("Agents initialized successfully")
 
+    job_queue = JobQueue(
+        workers=settings.job_workers,
+        max_depth=settings.job_queue_depth,
+        ttl_s=settings.job_ttl_s,
+    )
+    await job_queue.start()
+
     yield
 
     logger.info("Shutting down...")
-    if _posthog_enabled and _posthog_module is not None:
-        try:
-            _posthog_module.shutdown()
-        except Exception:
-            pass
+    await job_queue.stop()
+    await aclose_async_client()
+    if analytics is not None:
+        await asyncio.to_thread(analytics.stop)
+        analytics = None
 
 
 # Create FastAPI application
@@ -184,11 +230,26 @@ async def health_check():
         if not hasattr(playlist_composer, 'compose_and_validate'):
             agent_status["playlist_composer"] = "invalid"
 
-        all_healthy = all(status == "healthy" for status in agent_status.values())
+        strategy_status = strategy_registry.health()
+
+        all_healthy = (
+            all(status == "healthy" for status in agent_status.values())
+            and "failed" not in strategy_status.values()
+        )
 
         return {
             "status": "healthy" if all_healthy else "degraded",
             "agents": agent_status,
+            "strategies": strategy_status,
+            "parse_cache": workout_parser.cache.stats() if workout_parser.cache else None,
+            "similar_parses": workout_parser.similar.stats() if workout_parser.similar else None,
+            "image_cache": workout_parser.image_cache.stats() if workout_parser.image_cache else None,
+            "pool_cache": music_curator.pool_cache.stats() if music_curator.pool_cache else None,
+            "preferences": music_curator.preferences.stats() if music_curator.preferences else None,
+            "parse_hedging": (
+                {op: hedge.stats() for op, hedge in workout_parser.client.hedges.items()}
+                if hasattr(workout_parser.client, "hedges") else None
+            ),
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -198,84 +259,28 @@ async def health_check():
         }
 
 
-def _resolve_spotify(playlist, distinct_id: str = "anonymous") -> None:
-    """Resolve playlist tracks to Spotify URIs if Spotify client is available."""
-    if not spotify_client:
-        logger.debug("Spotify client not available — skipping track resolution")
-        return
-
-    logger.info("Step 3: Resolving tracks on Spotify...")
-    start = _time.time()
-    track_dicts = [
-        {"name": t.name, "artist": t.artist}
-        for t in playlist.tracks
-    ]
-
-    try:
-        resolved = spotify_client.resolve_tracks(track_dicts)
-    except Exception as e:
-        elapsed = _time.time() - start
-        logger.error(f"Spotify resolution failed after {elapsed:.1f}s: [{type(e).__name__}] {e}")
-        _ph_capture(distinct_id, "spotify_resolution_error", {
-            "elapsed_ms": int(elapsed * 1000),
-            "error_type": type(e).__name__,
-            "track_count": len(track_dicts),
-        })
-        return
-
-    resolved_count = 0
-    for i, resolved_data in enumerate(resolved):
-        track = playlist.tracks[i]
-        if "spotify_uri" in resolved_data:
-            playlist.tracks[i] = Track(
-                id=track.id,
-                name=track.name,
-                artist=track.artist,
-                bpm=track.bpm,
-                energy=track.energy,
-                duration_ms=resolved_data.get("duration_ms", track.duration_ms),
-                spotify_url=resolved_data.get("spotify_url"),
-                spotify_uri=resolved_data.get("spotify_uri"),
-                album_art_url=resolved_data.get("album_art_url"),
-            )
-            resolved_count += 1
-
-    elapsed = _time.time() - start
-    logger.info(f"Spotify resolution complete: {resolved_count}/{len(track_dicts)} tracks in {elapsed:.1f}s")
-    _ph_capture(distinct_id, "spotify_resolution_completed", {
-        "elapsed_ms": int(elapsed * 1000),
-        "resolved_count": resolved_count,
-        "total_tracks": len(track_dicts),
-    })
+@dataclass
+class GenerationPreferences:
+    """User preferences extracted from request headers (set by Next.js server actions)."""
+    user_id: Optional[str] = None
+    genre: Optional[str] = None
+    min_energy: Optional[float] = None
+    exclude_artists: set[str] = field(default_factory=set)
+    boost_artists: set[str] = field(default_factory=set)
+    hidden_tracks: set[str] = field(default_factory=set)
+    music_strategy: str = ""
 
 
-@app.post("/api/v1/generate", response_model=GeneratePlaylistResponse)
-@limiter.limit("10/minute")
-def generate_playlist(body: GeneratePlaylistRequest, request: Request):
-    """
-    Generate a playlist from workout text or image.
-
-    Accepts either:
-    - workout_text: Text description of a workout
-    - workout_image_base64 + image_media_type: Photo of a whiteboard
+def _header_set(value: Optional[str]) -> set[str]:
+    """Split a comma-separated header into a set, capped at MAX_HEADER_ITEMS."""
+    if not value:
+        return set()
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    return set(items[:MAX_HEADER_ITEMS])
 
-    Rate limit: 10 requests per minute per IP address.
 
-    Pipeline:
-    1. Parse workout (text or image) → structured phases
-    2. Find tracks matching each phase's BPM range → compose playlist
-    3. Resolve tracks on Spotify (if enabled) → URIs + album art
-    """
-    has_text = body.workout_text and body.workout_text.strip()
-    has_image = body.workout_image_base64 and body.image_media_type
-
-    if not has_text and not has_image:
-        raise HTTPException(
-            status_code=400,
-            detail="Either workout_text or workout_image_base64 (with image_media_type) is required"
-        )
-
-    # Extract user preference headers (set by Next.js server actions)
+def _extract_preferences(request: Request) -> GenerationPreferences:
+    """Read and sanitize the user preference headers for a generate request."""
     user_id = request.headers.get("X-User-ID")
 
     # Verify X-User-ID signature — reject if secret not configured
@@ -294,11 +299,9 @@ def generate_playlist(body: GeneratePlaylistRequest, request: Request):
                 logger.warning("Invalid HMAC signature for request")
                 user_id = None
 
-    ALLOWED_GENRES = {"rock", "hip-hop", "edm", "metal", "pop", "punk", "country", "indie"}
     user_genre = request.headers.get("X-User-Genre")
     if user_genre and user_genre.lower() not in ALLOWED_GENRES:
         user_genre = None
-    user_exclude_artists = request.headers.get("X-User-Exclude-Artists")
     user_min_energy_str = request.headers.get("X-User-Min-Energy")
     user_min_energy = None
     if user_min_energy_str:
@@ -308,11 +311,8 @@ def generate_playlist(body: GeneratePlaylistRequest, request: Request):
                 user_min_energy = val
         except (ValueError, TypeError):
             pass
-    user_boost_artists = request.headers.get("X-User-Boost-Artists")
-    user_hidden_tracks = request.headers.get("X-User-Hidden-Tracks")
     if user_id:
         logger.info("Authenticated request received")
-    ALLOWED_STRATEGIES = {"claude", "deezer", "claude_deezer_verify", "claude_two_step", "hybrid", "deezer_claude_rerank", "mock"}
     music_strategy = request.headers.get("X-Music-Strategy", settings.music_strategy)
     if music_strategy not in ALLOWED_STRATEGIES:
         music_strategy = settings.music_strategy
@@ -321,133 +321,647 @@ def generate_playlist(body: GeneratePlaylistRequest, request: Request):
     if user_genre:
         logger.info(f"User genre preference: {user_genre}")
 
+    return GenerationPreferences(
+        user_id=user_id,
+        genre=user_genre,
+        min_energy=user_min_energy,
+        exclude_artists=_header_set(request.headers.get("X-User-Exclude-Artists")),
+        boost_artists=_header_set(request.headers.get("X-User-Boost-Artists")),
+        hidden_tracks=_header_set(request.headers.get("X-User-Hidden-Tracks")),
+        music_strategy=music_strategy,
+    )
+
+
+def _seed_preferences(composer: PlaylistComposerAgent, prefs: GenerationPreferences) -> Optional[str]:
+    """
+    Merge the user's feedback headers into their learned preference weights,
+    which then stand in for the headers' boosts. Returns the user to score
+    for, or None for anonymous requests.
+    """
+    store = composer.curator.preferences
+    if not prefs.user_id or store is None:
+        return None
+    store.seed(prefs.user_id, boost_artists=prefs.boost_artists, hidden_tracks=prefs.hidden_tracks)
+    return prefs.user_id
+
+
+def _validate_generate_input(body: GeneratePlaylistRequest) -> bool:
+    """Reject requests with neither text nor image. Returns True for image input."""
+    has_text = body.workout_text and body.workout_text.strip()
+    has_image = body.workout_image_base64 and body.image_media_type
+
+    if not has_text and not has_image:
+        raise HTTPException(
+            status_code=400,
+            detail="Either workout_text or workout_image_base64 (with image_media_type) is required"
+        )
+
     if has_text:
         logger.info(f"Received text-based request: {body.workout_text[:50]}...")
     else:
         logger.info(f"Received image-based request ({body.image_media_type})")
+    return bool(has_image)
 
-    # Distinct ID for PostHog: prefer user_id, fall back to client IP
-    distinct_id = user_id or get_real_client_ip(request)
-    input_type = "image" if has_image else "text"
 
-    _ph_capture(distinct_id, "api_request_received", {
-        "has_image": bool(has_image),
-        "genre": user_genre,
-        "authenticated": bool(user_id),
-        "input_type": input_type,
-    })
+def _budget_for_strategy(music_strategy: str) -> float:
+    """Per-request time budget in seconds (STRATEGY_BUDGETS_S, else GENERATE_BUDGET_S)."""
+    return settings.strategy_budgets_s.get(music_strategy, settings.generate_budget_s)
 
-    request_start = _time.time()
 
+async def _composer_for_strategy(music_strategy: str) -> PlaylistComposerAgent:
+    """Return the long-lived composer for a strategy (the default one if it doesn't override the source)."""
+    return await strategy_registry.get_async(music_strategy)
+
+
+async def _iter_spotify_resolution(playlist, distinct_id: str = "anonymous") -> AsyncIterator[tuple[int, Track]]:
+    """
+    Resolve playlist tracks to Spotify URIs, yielding (index, track) as each one resolves.
+
+    Resolved tracks are written back into playlist.tracks in place. Yields
+    nothing if the Spotify client is unavailable or resolution fails.
+    """
+    if not spotify_client:
+        logger.debug("Spotify client not available — skipping track resolution")
+        return
+    if not deadline.has_budget(SPOTIFY_MIN_BUDGET_S):
+        deadline.degrade("skip_spotify")
+        return
+
+    logger.info("Step 3: Resolving tracks on Spotify...")
+    start = _time.time()
+    track_dicts = [
+        {"name": t.name, "artist": t.artist}
+        for t in playlist.tracks
+    ]
+
+    resolved_count = 0
     try:
-        # Step 1: Parse workout
-        logger.info("Step 1: Parsing workout...")
-        step1_start = _time.time()
+        async for i, resolved_data in spotify_client.iter_resolve_tracks_async(track_dicts):
+            if "spotify_uri" not in resolved_data:
+                continue
+            track = playlist.tracks[i]
+            playlist.tracks[i] = Track(
+                id=track.id,
+                name=track.name,
+                artist=track.artist,
+                bpm=track.bpm,
+                energy=track.energy,
+                duration_ms=resolved_data.get("duration_ms", track.duration_ms),
+                spotify_url=resolved_data.get("spotify_url"),
+                spotify_uri=resolved_data.get("spotify_uri"),
+                album_art_url=resolved_data.get("album_art_url"),
+            )
+            resolved_count += 1
+            yield i, playlist.tracks[i]
+    except Exception as e:
+        elapsed = _time.time() - start
+        metrics.SPOTIFY_RESOLUTION_SECONDS.observe(elapsed)
+        logger.error(f"Spotify resolution failed after {elapsed:.1f}s: [{type(e).__name__}] {e}")
+        _capture(distinct_id, "spotify_resolution_error", {
+            "elapsed_ms": int(elapsed * 1000),
+            "error_type": type(e).__name__,
+            "track_count": len(track_dicts),
+        })
+        return
+
+    elapsed = _time.time() - start
+    metrics.SPOTIFY_RESOLUTION_SECONDS.observe(elapsed)
+    logger.info(f"Spotify resolution complete: {resolved_count}/{len(track_dicts)} tracks in {elapsed:.1f}s")
+    _capture(distinct_id, "spotify_resolution_completed", {
+        "elapsed_ms": int(elapsed * 1000),
+        "resolved_count": resolved_count,
+        "total_tracks": len(track_dicts),
+    })
+
+
+async def _resolve_spotify(playlist, distinct_id: str = "anonymous") -> None:
+    """Resolve playlist tracks to Spotify URIs if Spotify client is available."""
+    async for _ in _iter_spotify_resolution(playlist, distinct_id=distinct_id):
+        pass
+
+
+def _input_key(body: GeneratePlaylistRequest, has_image: bool) -> str:
+    """Hash the workout input so equivalent submissions share a coalescing key."""
+    text = " ".join((body.workout_text or "").lower().split())
+    digest = hashlib.sha256()
+    if has_image:
+        digest.update(body.image_media_type.encode())
+        digest.update(b"\0")
+        digest.update(body.workout_image_base64.encode())
+        digest.update(b"\0")
+    digest.update(text.encode())
+    return f"{'image' if has_image else 'text'}:{digest.hexdigest()}"
+
+
+async def _parse_workout(
+    body: GeneratePlaylistRequest,
+    has_image: bool,
+    distinct_id: str,
+    on_phase: Optional[Callable[[Phase], None]] = None,
+):
+    """
+    Parse the workout from text or image (step 1 of the pipeline). on_phase
+    is called with each phase as a streamed text parse produces it.
+    """
+    input_type = "image" if has_image else "text"
+    logger.info("Step 1: Parsing workout...")
+    step1_start = _time.time()
+    with metrics.timed(metrics.PARSE_SECONDS, input_type=input_type):
         if has_image:
-            workout = workout_parser.parse_image_and_validate(
+            workout = await workout_parser.parse_image_and_validate_async(
                 body.workout_image_base64,
                 body.image_media_type,
                 additional_text=body.workout_text or "",
             )
         else:
-            workout = workout_parser.parse_and_validate(body.workout_text)
-        logger.info(f"Parsed workout: {workout.workout_name} ({workout.total_duration_min} min)")
-        _ph_capture(distinct_id, "parsing_completed", {
-            "elapsed_ms": int((_time.time() - step1_start) * 1000),
-            "phase_count": len(workout.phases),
-            "input_type": input_type,
-            "workout_name": workout.workout_name,
-        })
+            workout = await workout_parser.parse_and_validate_async(body.workout_text, on_phase=on_phase)
+    logger.info(f"Parsed workout: {workout.workout_name} ({workout.total_duration_min} min)")
+    _capture(distinct_id, "parsing_completed", {
+        "elapsed_ms": int((_time.time() - step1_start) * 1000),
+        "phase_count": len(workout.phases),
+        "input_type": input_type,
+        "workout_name": workout.workout_name,
+    })
+    return workout
+
+
+def _discard_tasks(tasks: list[asyncio.Future]) -> None:
+    """Cancel unfinished tasks and mark finished ones' exceptions as retrieved."""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+
+async def _generate_events(
+    body: GeneratePlaylistRequest,
+    prefs: GenerationPreferences,
+    distinct_id: str,
+    has_image: bool,
+) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Run the generate pipeline, yielding (event, payload) as each stage completes.
+
+    Events, in order: "workout" (WorkoutStructure), one "phase" per workout
+    phase ({index, phase, tracks}), "playlist" (Playlist, before Spotify),
+    one "track" per Spotify-resolved track ({index, track}), and finally
+    "done" (GeneratePlaylistResponse). Both /generate and /generate/stream
+    consume this, so the two endpoints cannot drift apart.
+    """
+    # Step 1: Parse workout (coalesced with identical in-flight requests).
+    # Meanwhile, speculatively fetch pools for the phases plan() predicts
+    # (warm-up, cooldown and the likely work bucket), and for each real phase
+    # as a streamed parse emits it, unless a guess already covers its bucket.
+    input_key = _input_key(body, has_image)
+    request_composer = await _composer_for_strategy(prefs.music_strategy)
+    prefetch_key = (
+        input_key,
+        prefs.music_strategy,
+        prefs.genre,
+        prefs.min_energy,
+        frozenset(prefs.boost_artists),
+    )
+    speculation = None
+    covered: dict = {}
+    if settings.speculative_prefetch:
+        predicted = workout_parser.plan(body.workout_text or "")["predicted_phases"]
+        covered = {bucket_key(phase): phase.duration_min for phase in predicted}
+        speculation = asyncio.ensure_future(_speculative_flights.do(
+            prefetch_key,
+            lambda: request_composer.prefetch_speculative_async(
+                predicted,
+                genre=prefs.genre,
+                min_energy=prefs.min_energy,
+                boost_artists=prefs.boost_artists,
+            ),
+        ))
+
+    streamed: list[asyncio.Future] = []
+    handed_off = False  # Set once this request leads the prefetch flight, whose task owns the tasks above
+
+    def on_phase(phase: Phase) -> None:
+        key = bucket_key(phase)
+        if covered.get(key, -1) >= phase.duration_min:
+            return
+        covered[key] = phase.duration_min
+        streamed.append(asyncio.ensure_future(request_composer.prefetch_speculative_async(
+            [phase],
+            genre=prefs.genre,
+            min_energy=prefs.min_energy,
+            boost_artists=prefs.boost_artists,
+        )))
 
-        # Step 2: Compose playlist (with user preferences)
+    try:
+        workout = await _parse_flights.do(
+            input_key, lambda: _parse_workout(
+                body, has_image, distinct_id,
+                on_phase=on_phase if settings.speculative_prefetch else None,
+            ),
+        )
+        yield "workout", workout
+
+        # Step 2: Compose playlist (with user preferences), phase by phase.
+        # The candidate prefetch is shared by requests with the same input and
+        # preferences; hidden_tracks/exclude_artists are applied per request below.
+        # Phases the speculative prefetch guessed right are not searched again.
         logger.info("Step 2: Composing playlist...")
         step2_start = _time.time()
 
-        # Override music source based on strategy header
-        request_composer = playlist_composer  # default
-        if music_strategy and music_strategy != settings.music_source:
-            from agents.music_curator import create_music_source_by_name
-            override_source = create_music_source_by_name(music_strategy)
-            if override_source:
-                from agents.music_curator import MusicCuratorAgent
-                from agents.playlist_composer import PlaylistComposerAgent
-                request_curator = MusicCuratorAgent(music_source=override_source)
-                request_composer = PlaylistComposerAgent(curator=request_curator)
-                logger.info(f"Using override strategy: {music_strategy}")
-        MAX_HEADER_ITEMS = 100
-        exclude_set = set()
-        if user_exclude_artists:
-            items = [a.strip() for a in user_exclude_artists.split(",") if a.strip()]
-            exclude_set = set(items[:MAX_HEADER_ITEMS])
-        boost_set = set()
-        if user_boost_artists:
-            items = [a.strip() for a in user_boost_artists.split(",") if a.strip()]
-            boost_set = set(items[:MAX_HEADER_ITEMS])
-        hidden_set = set()
-        if user_hidden_tracks:
-            items = [t.strip() for t in user_hidden_tracks.split(",") if t.strip()]
-            hidden_set = set(items[:MAX_HEADER_ITEMS])
-        playlist = request_composer.compose_and_validate(
-            workout,
-            genre=user_genre,
-            min_energy=user_min_energy,
-            exclude_artists=exclude_set,
-            boost_artists=boost_set,
-            hidden_tracks=hidden_set,
-        )
-        logger.info(f"Composed playlist: {len(playlist.tracks)} tracks")
-        total_duration_ms = sum(t.duration_ms for t in playlist.tracks)
-        _ph_capture(distinct_id, "composition_completed", {
-            "elapsed_ms": int((_time.time() - step2_start) * 1000),
-            "track_count": len(playlist.tracks),
-            "duration_ms": total_duration_ms,
-        })
+        async def prefetch():
+            guesses = [await speculation] if speculation is not None else []
+            guesses.extend(await asyncio.gather(*streamed))
+            speculative_pools = merge_speculative_pools(guesses) if guesses else None
+            return await request_composer.prefetch_async(
+                workout,
+                genre=prefs.genre,
+                min_energy=prefs.min_energy,
+                boost_artists=prefs.boost_artists,
+                speculative_pools=speculative_pools,
+            )
+
+        def start_prefetch():
+            # Called by the flight as it creates the leader task, so the hand-off
+            # is recorded before this request can be cancelled
+            nonlocal handed_off
+            handed_off = True
+            return prefetch()
+
+        track_pools = await _prefetch_flights.do(prefetch_key, start_prefetch)
+    finally:
+        # A follower of the prefetch flight uses the leader's pools and never
+        # awaits its own prefetches; a request that fails or is abandoned
+        # before step 2 leaves them running too. Stop whatever is left. Once
+        # this request leads the flight, its task awaits them, shielded for
+        # its followers.
+        if not handed_off:
+            _discard_tasks(([speculation] if speculation is not None else []) + streamed)
+
+    tracks = []
+    phase_index = 0
+    async for phase, phase_tracks in request_composer.iter_phases_async(
+        workout,
+        genre=prefs.genre,
+        min_energy=prefs.min_energy,
+        exclude_artists=prefs.exclude_artists,
+        boost_artists=prefs.boost_artists,
+        hidden_tracks=prefs.hidden_tracks,
+        track_pools=track_pools,
+        user_id=_seed_preferences(request_composer, prefs),
+    ):
+        tracks.extend(phase_tracks)
+        yield "phase", {"index": phase_index, "phase": phase, "tracks": phase_tracks}
+        phase_index += 1
+
+    playlist = request_composer.finalize_playlist(
+        request_composer.build_playlist(workout, tracks), workout,
+    )
+    logger.info(f"Composed playlist: {len(playlist.tracks)} tracks")
+    total_duration_ms = sum(t.duration_ms for t in playlist.tracks)
+    _capture(distinct_id, "composition_completed", {
+        "elapsed_ms": int((_time.time() - step2_start) * 1000),
+        "track_count": len(playlist.tracks),
+        "duration_ms": total_duration_ms,
+    })
+    yield "playlist", playlist
 
-        # Step 3: Resolve on Spotify (if enabled)
-        _resolve_spotify(playlist, distinct_id=distinct_id)
+    # Step 3: Resolve on Spotify (if enabled)
+    async for index, track in _iter_spotify_resolution(playlist, distinct_id=distinct_id):
+        yield "track", {"index": index, "track": track}
 
-        # Return response
-        response = GeneratePlaylistResponse(
-            workout=workout,
-            playlist=playlist
-        )
+    yield "done", GeneratePlaylistResponse(workout=workout, playlist=playlist)
 
-        total_elapsed = int((_time.time() - request_start) * 1000)
-        logger.info("Successfully generated playlist")
-        _ph_capture(distinct_id, "api_request_completed", {
-            "elapsed_ms": total_elapsed,
-            "track_count": len(playlist.tracks),
-            "phase_count": len(workout.phases),
-        })
-        return response
 
-    except ValueError as e:
+def _generate_error(e: Exception, distinct_id: str, request_start: float) -> HTTPException:
+    """Log and record a pipeline failure, mapping it to the HTTP error returned to clients."""
+    if isinstance(e, ValueError):
         logger.error(f"Validation error: {e}")
-        _ph_capture(distinct_id, "generate_error", {
-            "error_type": "validation_error",
-            "elapsed_ms": int((_time.time() - request_start) * 1000),
-        })
-        raise HTTPException(status_code=400, detail="Invalid workout data. Please check your input.")
-
-    except NotImplementedError as e:
+        error_type = "validation_error"
+        error = HTTPException(status_code=400, detail="Invalid workout data. Please check your input.")
+    elif isinstance(e, NotImplementedError):
         logger.error(f"Feature not available: {e}")
-        _ph_capture(distinct_id, "generate_error", {
-            "error_type": "not_implemented",
-            "elapsed_ms": int((_time.time() - request_start) * 1000),
-        })
-        raise HTTPException(status_code=400, detail="This feature is not yet available.")
+        error_type = "not_implemented"
+        error = HTTPException(status_code=400, detail="This feature is not yet available.")
+    else:
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+        error_type = "internal_error"
+        error = HTTPException(status_code=500, detail="Failed to generate playlist. Please try again.")
+
+    _capture(distinct_id, "generate_error", {
+        "error_type": error_type,
+        "elapsed_ms": int((_time.time() - request_start) * 1000),
+    })
+    return error
+
+
+def _start_generate(body: GeneratePlaylistRequest, request: Request) -> tuple[GenerationPreferences, str, bool]:
+    """Validate input, read preferences and record the request. Shared by both generate endpoints."""
+    has_image = _validate_generate_input(body)
+    prefs = _extract_preferences(request)
+
+    # Distinct ID for PostHog: prefer user_id, fall back to client IP
+    distinct_id = prefs.user_id or get_real_client_ip(request)
+
+    _capture(distinct_id, "api_request_received", {
+        "has_image": has_image,
+        "genre": prefs.genre,
+        "authenticated": bool(prefs.user_id),
+        "input_type": "image" if has_image else "text",
+    })
+    return prefs, distinct_id, has_image
+
 
+def _record_completed(response: GeneratePlaylistResponse, distinct_id: str, request_start: float) -> None:
+    total_elapsed = int((_time.time() - request_start) * 1000)
+    logger.info("Successfully generated playlist")
+    _capture(distinct_id, "api_request_completed", {
+        "elapsed_ms": total_elapsed,
+        "track_count": len(response.playlist.tracks),
+        "phase_count": len(response.workout.phases),
+    })
+
+
+@app.post("/api/v1/generate", response_model=GeneratePlaylistResponse)
+@limiter.limit("10/minute")
+async def generate_playlist(body: GeneratePlaylistRequest, request: Request):
+    """
+    Generate a playlist from workout text or image.
+
+    Accepts either:
+    - workout_text: Text description of a workout
+    - workout_image_base64 + image_media_type: Photo of a whiteboard
+
+    Rate limit: 10 requests per minute per IP address.
+
+    Pipeline:
+    1. Parse workout (text or image) → structured phases
+    2. Find tracks matching each phase's BPM range → compose playlist
+    3. Resolve tracks on Spotify (if enabled) → URIs + album art
+
+    Every stage is async end to end (AsyncAnthropic, httpx.AsyncClient), so
+    a request holds no worker thread while waiting on upstream APIs.
+    """
+    prefs, distinct_id, has_image = _start_generate(body, request)
+    return await _run_generate(body, prefs, distinct_id, has_image)
+
+
+async def _run_generate(
+    body: GeneratePlaylistRequest,
+    prefs: GenerationPreferences,
+    distinct_id: str,
+    has_image: bool,
+    endpoint: str = "generate",
+) -> GeneratePlaylistResponse:
+    """Run the whole pipeline to completion, raising HTTPException on failure."""
+    request_start = _time.time()
+
+    try:
+        response = None
+        with metrics.in_flight(endpoint), deadline.budget(_budget_for_strategy(prefs.music_strategy)):
+            async for event, payload in _generate_events(body, prefs, distinct_id, has_image):
+                if event == "done":
+                    response = payload
     except Exception as e:
-        logger.error(f"Unexpected error: {e}", exc_info=True)
-        _ph_capture(distinct_id, "generate_error", {
-            "error_type": "internal_error",
-            "elapsed_ms": int((_time.time() - request_start) * 1000),
-        })
+        raise _generate_error(e, distinct_id, request_start)
+
+    _record_completed(response, distinct_id, request_start)
+    return response
+
+
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@app.post("/api/v1/generate/stream")
+@limiter.limit("10/minute")
+async def generate_playlist_stream(body: GeneratePlaylistRequest, request: Request):
+    """
+    Generate a playlist, streaming progress as Server-Sent Events.
+
+    Same input, headers and rate limit as /api/v1/generate. Events:
+    - workout: parsed WorkoutStructure, sent as soon as parsing finishes
+    - phase: {index, phase, tracks} as each phase's tracks are selected
+    - playlist: the composed playlist (before Spotify resolution)
+    - track: {index, track} as each track resolves on Spotify (URI + album art)
+    - done: the full GeneratePlaylistResponse
+    - error: {status_code, detail} if the pipeline fails; the stream then ends
+    """
+    prefs, distinct_id, has_image = _start_generate(body, request)
+    request_start = _time.time()
+
+    async def event_stream():
+        try:
+            with metrics.in_flight("stream"), deadline.budget(_budget_for_strategy(prefs.music_strategy)):
+                async for event, payload in _generate_events(body, prefs, distinct_id, has_image):
+                    yield _sse(event, payload)
+                    if event == "done":
+                        _record_completed(payload, distinct_id, request_start)
+        except Exception as e:
+            error = _generate_error(e, distinct_id, request_start)
+            yield _sse("error", {"status_code": error.status_code, "detail": error.detail})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/v1/generate/batch", response_model=GenerateBatchResponse)
+@limiter.limit("2/minute")
+async def generate_batch(body: GenerateBatchRequest, request: Request):
+    """
+    Generate playlists for many workouts in one call (e.g. a week of programming).
+
+    Uses the same preference headers as /api/v1/generate, applied to every
+    workout. Workouts are parsed concurrently, then phases are grouped across
+    workouts by BPM range and intensity so one candidate prefetch serves every
+    workout needing that bucket. With artist_variety="across_batch", artists
+    used in one playlist are avoided in the following ones.
+
+    A workout that fails (bad input, parse error) gets an error entry; the
+    rest of the batch still succeeds.
+
+    Rate limit: 2 requests per minute per IP address.
+    """
+    prefs = _extract_preferences(request)
+    distinct_id = prefs.user_id or get_real_client_ip(request)
+    request_start = _time.time()
+    count = len(body.workouts)
+    logger.info(f"Received batch request: {count} workouts")
+    _capture(distinct_id, "batch_request_received", {
+        "workout_count": count,
+        "genre": prefs.genre,
+        "authenticated": bool(prefs.user_id),
+        "artist_variety": body.artist_variety,
+    })
+
+    with metrics.in_flight("batch"), deadline.budget(_budget_for_strategy(prefs.music_strategy)):
+        results = await _generate_batch_results(body, prefs, distinct_id, request_start)
+
+    succeeded = sum(1 for r in results if r.playlist)
+    logger.info(f"Batch complete: {succeeded}/{count} playlists in {_time.time() - request_start:.1f}s")
+    _capture(distinct_id, "batch_request_completed", {
+        "elapsed_ms": int((_time.time() - request_start) * 1000),
+        "workout_count": count,
+        "succeeded_count": succeeded,
+    })
+    return GenerateBatchResponse(results=results)
+
+
+async def _generate_batch_results(
+    body: GenerateBatchRequest,
+    prefs: GenerationPreferences,
+    distinct_id: str,
+    request_start: float,
+) -> list[GenerateBatchItem]:
+    """Parse, prefetch, compose and resolve every workout of a batch."""
+    results = [GenerateBatchItem(index=i) for i in range(len(body.workouts))]
+
+    def fail(i: int, e: Exception) -> None:
+        error = e if isinstance(e, HTTPException) else _generate_error(e, distinct_id, request_start)
+        results[i].error = GenerateError(status_code=error.status_code, detail=error.detail)
+
+    # Step 1: Parse every workout concurrently (coalesced like single requests)
+    async def parse_one(item: GeneratePlaylistRequest):
+        has_image = _validate_generate_input(item)
+        return await _parse_flights.do(
+            _input_key(item, has_image), lambda: _parse_workout(item, has_image, distinct_id),
+        )
+
+    parsed = await asyncio.gather(*(parse_one(w) for w in body.workouts), return_exceptions=True)
+    parsed_indexes = []
+    for i, outcome in enumerate(parsed):
+        if isinstance(outcome, Exception):
+            fail(i, outcome)
+        else:
+            results[i].workout = outcome
+            parsed_indexes.append(i)
+
+    try:
+        # Step 2: One shared prefetch for all phase buckets, then compose each playlist
+        request_composer = await _composer_for_strategy(prefs.music_strategy)
+        workouts = [results[i].workout for i in parsed_indexes]
+        pools = await request_composer.prefetch_batch_async(
+            workouts,
+            genre=prefs.genre,
+            min_energy=prefs.min_energy,
+            boost_artists=prefs.boost_artists,
+        ) if workouts else []
+    except Exception as e:
+        raise _generate_error(e, distinct_id, request_start)
+
+    user_id = _seed_preferences(request_composer, prefs)
+    batch_artists: set[str] = set()
+    for i, track_pools in zip(parsed_indexes, pools):
+        workout = results[i].workout
+        try:
+            tracks = []
+            async for _, phase_tracks in request_composer.iter_phases_async(
+                workout,
+                genre=prefs.genre,
+                min_energy=prefs.min_energy,
+                exclude_artists=prefs.exclude_artists,
+                boost_artists=prefs.boost_artists,
+                hidden_tracks=prefs.hidden_tracks,
+                track_pools=track_pools,
+                avoid_artists=batch_artists if body.artist_variety == "across_batch" else None,
+                user_id=user_id,
+            ):
+                tracks.extend(phase_tracks)
+            results[i].playlist = request_composer.finalize_playlist(
+                request_composer.build_playlist(workout, tracks), workout,
+            )
+            batch_artists.update(t.artist for t in tracks)
+        except Exception as e:
+            fail(i, e)
+
+    # Step 3: Resolve every playlist on Spotify concurrently
+    playlists = [r.playlist for r in results if r.playlist]
+    await asyncio.gather(*(_resolve_spotify(p, distinct_id=distinct_id) for p in playlists))
+    return results
+
+
+@app.post("/api/v1/jobs/generate", response_model=GenerateJobResponse, status_code=202)
+@limiter.limit("10/minute")
+async def submit_generate_job(body: GeneratePlaylistRequest, request: Request):
+    """
+    Enqueue a playlist generation and return a job id immediately.
+
+    Same input, headers and rate limit as /api/v1/generate. Poll
+    GET /api/v1/jobs/{job_id} for the result, which has the same shape as
+    the /api/v1/generate response. Returns 503 with Retry-After when the
+    queue is full.
+    """
+    prefs, distinct_id, has_image = _start_generate(body, request)
+
+    try:
+        job = job_queue.submit(lambda: _run_generate(body, prefs, distinct_id, has_image, endpoint="job"))
+    except QueueFullError as e:
+        logger.warning(f"Rejected job submission: {e}")
+        _capture(distinct_id, "job_rejected", {"queue_depth": job_queue.depth()})
         raise HTTPException(
-            status_code=500,
-            detail="Failed to generate playlist. Please try again."
+            status_code=503,
+            detail="Too many playlists are being generated right now. Please retry shortly.",
+            headers={"Retry-After": str(JOB_RETRY_AFTER_S)},
         )
 
+    return job_queue.to_response(job)
+
+
+@app.get("/api/v1/jobs/{job_id}", response_model=GenerateJobResponse)
+@limiter.limit("600/minute")
+async def get_generate_job(job_id: str, request: Request, response: Response):
+    """
+    Status of a background generate job; includes the result once it has succeeded.
+
+    Meant to be polled: while the job is queued or running, Retry-After gives
+    the seconds to wait before polling again.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job.status in ("queued", "running"):
+        response.headers["Retry-After"] = str(JOB_POLL_INTERVAL_S)
+    return job_queue.to_response(job)
+
+
+@app.post("/api/v1/feedback", status_code=204)
+@limiter.limit("60/minute")
+async def submit_feedback(body: TrackFeedbackRequest, request: Request):
+    """
+    Learn a track rating into the user's preference weights, which later
+    generate requests from the same user are scored with.
+
+    Requires a signed X-User-ID (see /api/v1/generate); returns 401 without one.
+    """
+    prefs = _extract_preferences(request)
+    if not prefs.user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    music_curator.learn(prefs.user_id, body.track_id, body.artist, body.rating)
+    return Response(status_code=204)
+
+
+@app.get("/metrics")
+async def prometheus_metrics(request: Request):
+    """
+    Prometheus metrics: per-stage and per-upstream-call latency histograms,
+    fallback counters and in-flight gauges.
+
+    Requires "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is set.
+    """
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+
+    rendered = metrics.render()
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Metrics are not enabled")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
+
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
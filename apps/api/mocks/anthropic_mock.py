@@ -3,7 +3,7 @@ Mock Anthropic API implementation for workout parsing
 Uses pattern matching instead of real Claude API calls
 """
 import re
-from typing import Optional
+from typing import Callable, Optional
 from models.schemas import WorkoutStructure, Phase
 
 
@@ -14,8 +14,8 @@ class MockAnthropicClient:
         """Initialize mock client (api_key not required)"""
         self.api_key = api_key
     
-    def parse_workout(self, workout_text: str) -> WorkoutStructure:
-        """Parse workout text into structured format"""
+    def parse_workout(self, workout_text: str, workout_type: Optional[str] = None) -> WorkoutStructure:
+        """Parse workout text into structured format (workout_type is ignored)"""
         workout_text_lower = workout_text.lower()
         
         # Detect workout type and parse accordingly
@@ -29,6 +29,19 @@ class MockAnthropicClient:
             return self._parse_tabata(workout_text)
         else:
             return self._parse_chipper(workout_text)
+
+    async def parse_workout_async(self, workout_text: str, workout_type: Optional[str] = None) -> WorkoutStructure:
+        """Async variant for the async pipeline (pattern matching is CPU-only)"""
+        return self.parse_workout(workout_text)
+
+    async def parse_workout_stream_async(
+        self, workout_text: str, on_phase: Callable[[Phase], None], workout_type: Optional[str] = None
+    ) -> WorkoutStructure:
+        """Streaming variant: reports each phase via on_phase, then returns the workout"""
+        workout = self.parse_workout(workout_text)
+        for phase in workout.phases:
+            on_phase(phase)
+        return workout
     
     def _parse_amrap(self, workout_text: str) -> WorkoutStructure:
         """Parse AMRAP (As Many Rounds As Possible) workouts"""
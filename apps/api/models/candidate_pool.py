@@ -0,0 +1,150 @@
+"""
+Columnar candidate pool.
+Sources return hundreds of TrackCandidates per phase and a playlist keeps a
+dozen, so pools are held as columns (ids, names, interned artists, BPM,
+energy, duration) from the source through scoring and selection; a Pydantic
+Track is only built for a row that is actually selected or read.
+"""
+import logging
+from array import array
+from typing import Iterable, Iterator, Optional, Union
+
+from models.schemas import Track
+from music_sources.base import TrackCandidate
+from services import scoring
+
+logger = logging.getLogger(__name__)
+
+
+class CandidatePool:
+    """
+    Immutable columns for a phase's candidates, indexed by row.
+
+    Iterating or indexing yields Tracks (built on first access and kept), so
+    code that treats a pool as a list of Tracks keeps working; scoring reads
+    the columns directly. Pools derived with take() share the artist table.
+    """
+
+    __slots__ = ("ids", "names", "artist_ids", "bpm", "energy", "duration_ms",
+                 "artists", "_artist_index", "_tracks", "_arrays")
+
+    def __init__(self, artists: Optional[list[str]] = None, artist_index: Optional[dict[str, int]] = None):
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.artist_ids = array("i")
+        self.bpm = array("i")
+        self.energy = array("d")
+        self.duration_ms = array("q")
+        self.artists: list[str] = artists if artists is not None else []  # Interned artist names
+        self._artist_index: dict[str, int] = artist_index if artist_index is not None else {}
+        self._tracks: list[Optional[Track]] = []
+        self._arrays: Optional[scoring.PoolArrays] = None
+
+    @classmethod
+    def from_candidates(cls, candidates: Iterable[TrackCandidate], energy_threshold: float = 0.0) -> "CandidatePool":
+        """Pool of the candidates at or above energy_threshold; rows Track would reject are dropped."""
+        pool = cls()
+        for c in candidates:
+            if c.energy < energy_threshold:
+                continue
+            if c.bpm <= 0 or c.energy > 1 or c.duration_ms <= 0:
+                logger.debug(f"Dropping invalid candidate '{c.name}' by {c.artist} from {c.source}")
+                continue
+            pool._append(c.source_id or f"{c.source}:{c.name}:{c.artist}",
+                         c.name, c.artist, c.bpm, c.energy, c.duration_ms, None)
+        return pool
+
+    @classmethod
+    def from_tracks(cls, tracks: Iterable[Track]) -> "CandidatePool":
+        """Pool over existing Tracks (kept, so rows map back to the same objects)."""
+        pool = cls()
+        for t in tracks:
+            pool._append(t.id, t.name, t.artist, t.bpm, t.energy, t.duration_ms, t)
+        return pool
+
+    @classmethod
+    def of(cls, pool: Union["CandidatePool", Iterable[Track]]) -> "CandidatePool":
+        """The pool itself, or a pool over a list of Tracks."""
+        return pool if isinstance(pool, CandidatePool) else cls.from_tracks(pool)
+
+    def _append(self, track_id: str, name: str, artist: str, bpm: int, energy: float,
+                duration_ms: int, track: Optional[Track]) -> None:
+        artist_id = self._artist_index.get(artist)
+        if artist_id is None:
+            artist_id = self._artist_index[artist] = len(self.artists)
+            self.artists.append(artist)
+        self.ids.append(track_id)
+        self.names.append(name)
+        self.artist_ids.append(artist_id)
+        self.bpm.append(int(bpm))
+        self.energy.append(float(energy))
+        self.duration_ms.append(int(duration_ms))
+        self._tracks.append(track)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Track]:
+        return (self.track(i) for i in range(len(self.ids)))
+
+    def __getitem__(self, index: int) -> Track:
+        return self.track(range(len(self.ids))[index])
+
+    def __repr__(self) -> str:
+        return f"CandidatePool({len(self.ids)} candidates, {len(self.artists)} artists)"
+
+    def artist(self, row: int) -> str:
+        return self.artists[self.artist_ids[row]]
+
+    def track(self, row: int) -> Track:
+        """The row as a Track, built (without re-validation) on first access."""
+        track = self._tracks[row]
+        if track is None:
+            track = self._tracks[row] = Track.model_construct(
+                id=self.ids[row],
+                name=self.names[row],
+                artist=self.artist(row),
+                bpm=self.bpm[row],
+                energy=self.energy[row],
+                duration_ms=self.duration_ms[row],
+            )
+        return track
+
+    def take(self, rows: Iterable[int]) -> "CandidatePool":
+        """New pool of the given rows, in order."""
+        pool = CandidatePool(self.artists, self._artist_index)
+        for row in rows:
+            pool.ids.append(self.ids[row])
+            pool.names.append(self.names[row])
+            pool.artist_ids.append(self.artist_ids[row])
+            pool.bpm.append(self.bpm[row])
+            pool.energy.append(self.energy[row])
+            pool.duration_ms.append(self.duration_ms[row])
+            pool._tracks.append(self._tracks[row])
+        return pool
+
+    def without_artists(self, names: Optional[set[str]]) -> "CandidatePool":
+        """This pool minus rows by any of names (itself if none match)."""
+        excluded = {self._artist_index[n] for n in names or () if n in self._artist_index}
+        if not excluded:
+            return self
+        return self.take(i for i, a in enumerate(self.artist_ids) if a not in excluded)
+
+    def without_ids(self, track_ids: Optional[set[str]]) -> tuple["CandidatePool", list[int]]:
+        """This pool minus rows with one of track_ids, and the kept row numbers."""
+        rows = [i for i, track_id in enumerate(self.ids) if track_id not in (track_ids or ())]
+        if len(rows) == len(self.ids):
+            return self, rows
+        return self.take(rows), rows
+
+    def arrays(self) -> scoring.PoolArrays:
+        """NumPy views of the numeric columns for services.scoring (no copy)."""
+        if self._arrays is None:
+            np = scoring.np
+            self._arrays = scoring.PoolArrays(
+                bpm=np.frombuffer(self.bpm, dtype=np.intc) if self.bpm else np.empty(0, dtype=np.intc),
+                energy=np.frombuffer(self.energy, dtype=np.float64) if self.energy else np.empty(0),
+                artist_ids=np.frombuffer(self.artist_ids, dtype=np.intc) if self.artist_ids else np.empty(0, dtype=np.intc),
+                artists=self._artist_index,
+            )
+        return self._arrays
@@ -134,3 +134,88 @@ class GeneratePlaylistResponse(BaseModel):
     """Response containing parsed workout and generated playlist"""
     workout: WorkoutStructure
     playlist: Playlist
+
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class GenerateError(BaseModel):
+    """Error for a failed background job or batch item"""
+    status_code: int = Field(..., description="HTTP status the synchronous endpoint would have returned")
+    detail: str = Field(..., description="Error message")
+
+
+class GenerateJobResponse(BaseModel):
+    """Status (and, once finished, result) of a background generate job"""
+    job_id: str = Field(..., description="Job ID to poll at /api/v1/jobs/{job_id}")
+    status: JobStatus = Field(..., description="Current job status")
+    created_at: float = Field(..., description="Unix time the job was enqueued")
+    started_at: Optional[float] = Field(None, description="Unix time a worker picked the job up")
+    finished_at: Optional[float] = Field(None, description="Unix time the job finished")
+    queue_position: Optional[int] = Field(None, description="Jobs ahead of this one (queued jobs only)")
+    result: Optional[GeneratePlaylistResponse] = Field(None, description="Result, when status is succeeded")
+    error: Optional[GenerateError] = Field(None, description="Error, when status is failed")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "3f6c1e0b9a2d4c7e8f1a2b3c4d5e6f70",
+                "status": "queued",
+                "created_at": 1767225600.0,
+                "queue_position": 2,
+            }
+        }
+
+
+class GenerateBatchRequest(BaseModel):
+    """Request to generate playlists for many workouts (e.g. a week of programming)"""
+    workouts: list[GeneratePlaylistRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=30,
+        description="Workouts to generate playlists for (max 30)"
+    )
+    artist_variety: Literal["per_playlist", "across_batch"] = Field(
+        "per_playlist",
+        description="'across_batch' avoids reusing an artist in later playlists of the batch"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "workouts": [
+                    {"workout_text": "21-15-9 thrusters 95lbs and pull-ups"},
+                    {"workout_text": "20 min AMRAP: 5 pull-ups, 10 push-ups, 15 squats"}
+                ],
+                "artist_variety": "across_batch"
+            }
+        }
+
+
+class GenerateBatchItem(BaseModel):
+    """Result for one workout of a batch, in request order"""
+    index: int = Field(..., description="Position of the workout in the request")
+    workout: Optional[WorkoutStructure] = None
+    playlist: Optional[Playlist] = None
+    error: Optional[GenerateError] = Field(None, description="Set when this workout failed")
+
+
+class GenerateBatchResponse(BaseModel):
+    """Response containing one result per requested workout"""
+    results: list[GenerateBatchItem]
+
+
+class TrackFeedbackRequest(BaseModel):
+    """A user's rating of a track, learned into their preference weights"""
+    track_id: str = Field(..., min_length=1, max_length=500, description="Track ID as returned in a playlist")
+    artist: Optional[str] = Field(None, max_length=200, description="The track's artist")
+    rating: Literal[1, -1, 0] = Field(..., description="1 = thumbs up, -1 = thumbs down, 0 = withdraw an earlier rating")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "track_id": "3n3Ppam7vgaVa1iaRUc9Lp",
+                "artist": "The Killers",
+                "rating": 1
+            }
+        }
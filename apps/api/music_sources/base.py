@@ -2,6 +2,7 @@
 Abstract base class for pluggable music sources.
 All music sources implement this interface to search tracks by BPM range.
 """
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Optional
@@ -26,6 +27,10 @@ class TrackCandidate:
 class MusicSource(ABC):
     """Abstract interface for music track discovery by BPM range."""
 
+    # Phases a curator may search at once through this source when it has no
+    # batch_search (see MusicCuratorAgent.batch_search_tracks)
+    max_concurrent_searches: int = 4
+
     @abstractmethod
     def search_by_bpm(
         self,
@@ -48,6 +53,22 @@ class MusicSource(ABC):
         """
         ...
 
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        """
+        Async variant of search_by_bpm.
+
+        Sources backed by network I/O override this with a native
+        implementation; the default runs the sync search in a worker thread
+        so the event loop is never blocked.
+        """
+        return await asyncio.to_thread(self.search_by_bpm, bpm_min, bpm_max, genre, limit)
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -2,19 +2,23 @@
 Claude + Deezer verification music source.
 Claude suggests songs, Deezer confirms they exist and provides verified BPM.
 """
+import asyncio
 import logging
 from typing import Optional
 
 import requests
 
+from clients.http import get_async_client
 from music_sources.base import MusicSource, TrackCandidate
 from config import settings
+from services import deadline, metrics
 
 logger = logging.getLogger(__name__)
 
 DEEZER_SEARCH_URL = "https://api.deezer.com/search"
 DEEZER_TRACK_URL = "https://api.deezer.com/track"
 REQUEST_TIMEOUT = 5
+VERIFY_MIN_BUDGET_S = 3.0  # Below this, return Claude's suggestions unverified
 
 
 class ClaudeDeezerVerifySource(MusicSource):
@@ -39,10 +43,7 @@ class ClaudeDeezerVerifySource(MusicSource):
         limit: int = 10,
     ) -> list[TrackCandidate]:
         candidates = self._claude.search_by_bpm(bpm_min, bpm_max, genre, limit)
-        verified = []
-        for c in candidates:
-            result = self._verify_with_deezer(c, bpm_min, bpm_max)
-            verified.append(result)
+        verified = self._verify_all(candidates, bpm_min, bpm_max)
         logger.info(f"Claude+Deezer verify: {sum(1 for c in verified if c.verified_bpm)}/{len(verified)} verified")
         return verified
 
@@ -56,24 +57,81 @@ class ClaudeDeezerVerifySource(MusicSource):
         raw = self._claude.batch_search(phases_info, genre, exclude_artists, boost_artists)
         result = {}
         for phase_name, candidates in raw.items():
-            verified = []
             phase_info = next((p for p in phases_info if p["name"] == phase_name), None)
             bpm_min = phase_info["bpm_min"] if phase_info else 80
             bpm_max = phase_info["bpm_max"] if phase_info else 180
-            for c in candidates:
-                verified.append(self._verify_with_deezer(c, bpm_min, bpm_max))
-            result[phase_name] = verified
+            result[phase_name] = self._verify_all(candidates, bpm_min, bpm_max)
         return result
 
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        """Async variant: verifies all Claude suggestions against Deezer concurrently."""
+        candidates = await self._claude.search_by_bpm_async(bpm_min, bpm_max, genre, limit)
+        verified = await self._verify_all_async(candidates, bpm_min, bpm_max)
+        logger.info(f"Claude+Deezer verify: {sum(1 for c in verified if c.verified_bpm)}/{len(verified)} verified")
+        return verified
+
+    async def batch_search_async(
+        self,
+        phases_info: list[dict],
+        genre: str = "rock",
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+    ) -> dict[str, list[TrackCandidate]]:
+        """Async variant of batch_search; verification fans out across all phases."""
+        raw = await self._claude.batch_search_async(phases_info, genre, exclude_artists, boost_artists)
+        if not deadline.has_budget(VERIFY_MIN_BUDGET_S):
+            deadline.degrade("skip_verification")
+            return raw
+        result = {}
+        for phase_name, candidates in raw.items():
+            phase_info = next((p for p in phases_info if p["name"] == phase_name), None)
+            bpm_min = phase_info["bpm_min"] if phase_info else 80
+            bpm_max = phase_info["bpm_max"] if phase_info else 180
+            result[phase_name] = asyncio.gather(
+                *(self._verify_with_deezer_async(c, bpm_min, bpm_max) for c in candidates)
+            )
+        return {name: list(await pending) for name, pending in result.items()}
+
+    def _verify_all(
+        self, candidates: list[TrackCandidate], bpm_min: int, bpm_max: int,
+    ) -> list[TrackCandidate]:
+        """Verify candidates one by one; once the budget runs low, keep the rest unverified."""
+        verified = []
+        for i, c in enumerate(candidates):
+            if not deadline.has_budget(VERIFY_MIN_BUDGET_S):
+                deadline.degrade("skip_verification")
+                return verified + candidates[i:]
+            verified.append(self._verify_with_deezer(c, bpm_min, bpm_max))
+        return verified
+
+    async def _verify_all_async(
+        self, candidates: list[TrackCandidate], bpm_min: int, bpm_max: int,
+    ) -> list[TrackCandidate]:
+        """Verify candidates concurrently, or skip verification if the budget is low."""
+        if not deadline.has_budget(VERIFY_MIN_BUDGET_S):
+            deadline.degrade("skip_verification")
+            return list(candidates)
+        return list(await asyncio.gather(
+            *(self._verify_with_deezer_async(c, bpm_min, bpm_max) for c in candidates)
+        ))
+
     def _verify_with_deezer(self, candidate: TrackCandidate, bpm_min: int, bpm_max: int) -> TrackCandidate:
         try:
             query = f'track:"{candidate.name}" artist:"{candidate.artist}"'
-            resp = requests.get(DEEZER_SEARCH_URL, params={"q": query, "limit": 1}, timeout=REQUEST_TIMEOUT)
+            with metrics.upstream("deezer", "search"):
+                resp = requests.get(DEEZER_SEARCH_URL, params={"q": query, "limit": 1}, timeout=deadline.timeout(REQUEST_TIMEOUT))
             if resp.status_code != 200 or not resp.json().get("data"):
                 return candidate
 
             track_id = resp.json()["data"][0]["id"]
-            detail = requests.get(f"{DEEZER_TRACK_URL}/{track_id}", timeout=REQUEST_TIMEOUT)
+            with metrics.upstream("deezer", "track_detail"):
+                detail = requests.get(f"{DEEZER_TRACK_URL}/{track_id}", timeout=deadline.timeout(REQUEST_TIMEOUT))
             if detail.status_code != 200:
                 return candidate
 
@@ -96,3 +154,39 @@ class ClaudeDeezerVerifySource(MusicSource):
         except Exception as e:
             logger.debug(f"Deezer verify failed for {candidate.name}: {e}")
             return candidate
+
+    async def _verify_with_deezer_async(
+        self, candidate: TrackCandidate, bpm_min: int, bpm_max: int
+    ) -> TrackCandidate:
+        try:
+            client = get_async_client()
+            query = f'track:"{candidate.name}" artist:"{candidate.artist}"'
+            with metrics.upstream("deezer", "search"):
+                resp = await client.get(DEEZER_SEARCH_URL, params={"q": query, "limit": 1}, timeout=deadline.timeout(REQUEST_TIMEOUT))
+            if resp.status_code != 200 or not resp.json().get("data"):
+                return candidate
+
+            track_id = resp.json()["data"][0]["id"]
+            with metrics.upstream("deezer", "track_detail"):
+                detail = await client.get(f"{DEEZER_TRACK_URL}/{track_id}", timeout=deadline.timeout(REQUEST_TIMEOUT))
+            if detail.status_code != 200:
+                return candidate
+
+            deezer_bpm = float(detail.json().get("bpm", 0))
+
+            if deezer_bpm > 0:
+                return TrackCandidate(
+                    name=candidate.name,
+                    artist=candidate.artist,
+                    bpm=int(deezer_bpm),
+                    energy=candidate.energy,
+                    duration_ms=candidate.duration_ms,
+                    source="claude_deezer_verify",
+                    source_id=str(track_id),
+                    verified_bpm=True,
+                )
+            return candidate
+
+        except Exception as e:
+            logger.debug(f"Deezer verify failed for {candidate.name}: {e}")
+            return candidate
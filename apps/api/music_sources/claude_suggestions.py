@@ -14,6 +14,7 @@ import anthropic
 
 from music_sources.base import MusicSource, TrackCandidate
 from config import settings
+from services import deadline, metrics, token_usage
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +70,7 @@ class ClaudeMusicSource(MusicSource):
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY is required for Claude music source")
         self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=self.api_key)
 
     @property
     def name(self) -> str:
@@ -85,79 +87,140 @@ class ClaudeMusicSource(MusicSource):
         candidates = []
 
         try:
-            prompt = SUGGESTION_PROMPT.format(
-                limit=limit,
-                bpm_min=bpm_min,
-                bpm_max=bpm_max,
-                genre=genre,
-            )
-
             start = _time.time()
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            elapsed = _time.time() - start
-            logger.debug(f"Claude music suggestion API call: {elapsed:.1f}s, {response.usage.input_tokens}in/{response.usage.output_tokens}out")
-
-            # Extract JSON from response
-            text = response.content[0].text
-
-            # Try to find JSON array in response
-            start_idx = text.find("[")
-            end_idx = text.rfind("]") + 1
-            if start_idx >= 0 and end_idx > start_idx:
-                songs = json.loads(text[start_idx:end_idx])
-                for song in songs[:limit]:
-                    bpm = int(song.get("bpm", 0))
-                    if bpm_min <= bpm <= bpm_max:
-                        candidates.append(
-                            TrackCandidate(
-                                name=song.get("title", "Unknown"),
-                                artist=song.get("artist", "Unknown"),
-                                bpm=bpm,
-                                energy=float(song.get("energy", 0.7)),
-                                duration_ms=int(song.get("duration_sec", 210)) * 1000,
-                                source="claude",
-                                verified_bpm=False,  # Claude suggestions are unverified
-                            )
-                        )
-            else:
-                logger.warning(f"Claude music response contained no JSON array. Response text: {text[:200]}")
-
-        except json.JSONDecodeError as e:
-            response_preview = text[:200] if 'text' in locals() else 'N/A'
-            logger.error(f"Failed to parse Claude music suggestions: {e}. Response text: {response_preview}")
-        except anthropic.APIError as e:
-            logger.error(f"Claude API error for music suggestions: [{type(e).__name__}] {e}")
+            with metrics.upstream("claude", "suggest"):
+                response = self.client.messages.create(**self._suggest_request(bpm_min, bpm_max, genre, limit))
+            candidates = self._suggest_result(response, _time.time() - start, bpm_min, bpm_max, limit)
         except Exception as e:
-            logger.error(f"Claude music source unexpected error: [{type(e).__name__}] {e}", exc_info=True)
+            self._log_suggest_error(e)
 
         logger.info(f"Claude: suggested {len(candidates)} tracks for BPM {bpm_min}-{bpm_max}")
         return candidates
 
-    def batch_search(
+    async def search_by_bpm_async(
         self,
-        phases_info: list[dict],
+        bpm_min: int,
+        bpm_max: int,
         genre: str = "rock",
-        exclude_artists: Optional[set[str]] = None,
-        boost_artists: Optional[set[str]] = None,
-        taste_description: Optional[str] = None,
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        """Async variant of search_by_bpm using AsyncAnthropic."""
+        candidates = []
+
+        try:
+            start = _time.time()
+            with metrics.upstream("claude", "suggest"):
+                response = await self.async_client.messages.create(
+                    **self._suggest_request(bpm_min, bpm_max, genre, limit)
+                )
+            candidates = self._suggest_result(response, _time.time() - start, bpm_min, bpm_max, limit)
+        except Exception as e:
+            self._log_suggest_error(e)
+
+        logger.info(f"Claude: suggested {len(candidates)} tracks for BPM {bpm_min}-{bpm_max}")
+        return candidates
+
+    # Request building and response handling shared by the sync and async paths
+
+    def _suggest_request(self, bpm_min: int, bpm_max: int, genre: str, limit: int) -> dict:
+        """messages.create() arguments for a single-range suggestion."""
+        prompt = SUGGESTION_PROMPT.format(limit=limit, bpm_min=bpm_min, bpm_max=bpm_max, genre=genre)
+        return dict(
+            model=self.model,
+            max_tokens=1024,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+        )
+
+    def _suggest_result(
+        self, response, elapsed: float, bpm_min: int, bpm_max: int, limit: int
+    ) -> list[TrackCandidate]:
+        usage = token_usage.record_usage("suggest", response.usage)
+        logger.debug(f"Claude music suggestion API call: {elapsed:.1f}s, {usage}")
+        return self._parse_suggestions(response.content[0].text, bpm_min, bpm_max, limit)
+
+    @staticmethod
+    def _log_suggest_error(e: Exception) -> None:
+        if isinstance(e, anthropic.APIError):
+            logger.error(f"Claude API error for music suggestions: [{type(e).__name__}] {e}")
+        else:
+            logger.error(f"Claude music source unexpected error: [{type(e).__name__}] {e}", exc_info=True)
+
+    def _batch_request(self, prompt: str) -> dict:
+        """messages.create() arguments for a batch suggestion."""
+        return dict(
+            model=self.model,
+            max_tokens=4096,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+        )
+
+    def _batch_result(
+        self, response, elapsed: float, phases_info: list[dict]
     ) -> dict[str, list[TrackCandidate]]:
-        """
-        Single Claude API call to get track suggestions for ALL workout phases.
+        usage = token_usage.record_usage("batch_suggest", response.usage)
+        logger.info(f"Claude batch music suggestion: {elapsed:.1f}s, {usage} ({len(phases_info)} phases)")
+        return self._parse_batch(response.content[0].text, phases_info)
+
+    @staticmethod
+    def _batch_failed(e: Exception) -> dict[str, list[TrackCandidate]]:
+        """Log a failed batch call; callers fall back to per-phase search on the empty result."""
+        if isinstance(e, json.JSONDecodeError):
+            logger.error(f"Failed to parse Claude batch response: {e}")
+        elif isinstance(e, anthropic.APIError):
+            logger.error(f"Claude API error for batch music suggestions: [{type(e).__name__}] {e}")
+        else:
+            logger.error(f"Claude batch music unexpected error: [{type(e).__name__}] {e}", exc_info=True)
+        return {}
+
+    @staticmethod
+    def _song_candidate(song: dict, bpm: int) -> TrackCandidate:
+        """TrackCandidate for one suggested song (unverified: Claude may hallucinate)."""
+        return TrackCandidate(
+            name=song.get("title", "Unknown"),
+            artist=song.get("artist", "Unknown"),
+            bpm=bpm,
+            energy=float(song.get("energy", 0.7)),
+            duration_ms=int(song.get("duration_sec", 210)) * 1000,
+            source="claude",
+            verified_bpm=False,
+        )
 
-        Args:
-            phases_info: List of dicts with keys: name, bpm_min, bpm_max, duration_min, energy
-            genre: Music genre preference
-            exclude_artists: Artists to never suggest
-            boost_artists: Artists to prefer
+    @staticmethod
+    def _parse_suggestions(
+        text: str, bpm_min: int, bpm_max: int, limit: int
+    ) -> list[TrackCandidate]:
+        """Extract TrackCandidates from a single-range suggestion response."""
+        candidates = []
 
-        Returns:
-            Dict mapping phase name → list of TrackCandidates
-        """
-        # Build phases text block
+        # Try to find JSON array in response
+        start_idx = text.find("[")
+        end_idx = text.rfind("]") + 1
+        if start_idx < 0 or end_idx <= start_idx:
+            logger.warning(f"Claude music response contained no JSON array. Response text: {text[:200]}")
+            return candidates
+
+        try:
+            songs = json.loads(text[start_idx:end_idx])
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse Claude music suggestions: {e}. Response text: {text[:200]}")
+            return candidates
+
+        for song in songs[:limit]:
+            bpm = int(song.get("bpm", 0))
+            if bpm_min <= bpm <= bpm_max:
+                candidates.append(ClaudeMusicSource._song_candidate(song, bpm))
+        return candidates
+
+    @staticmethod
+    def _batch_prompt(
+        phases_info: list[dict],
+        genre: str,
+        exclude_artists: Optional[set[str]],
+        boost_artists: Optional[set[str]],
+        taste_description: Optional[str],
+    ) -> str:
+        """Build the single-call prompt covering every workout phase."""
         phases_lines = []
         for i, p in enumerate(phases_info, 1):
             tracks_needed = math.ceil(p["duration_min"] / 3.0) + 4
@@ -180,7 +243,7 @@ class ClaudeMusicSource(MusicSource):
         if taste_description:
             taste_line = f"- The user's musical taste: {taste_description}\n"
 
-        prompt = BATCH_SUGGESTION_PROMPT.format(
+        return BATCH_SUGGESTION_PROMPT.format(
             num_phases=len(phases_info),
             genre=genre,
             exclude_line=exclude_line,
@@ -189,72 +252,91 @@ class ClaudeMusicSource(MusicSource):
             phases_text="\n".join(phases_lines),
         )
 
+    @staticmethod
+    def _parse_batch(text: str, phases_info: list[dict]) -> dict[str, list[TrackCandidate]]:
+        """Convert a batch response to TrackCandidates grouped by phase name."""
+        # Extract JSON object from response
+        start_idx = text.find("{")
+        end_idx = text.rfind("}") + 1
+        if start_idx < 0 or end_idx <= start_idx:
+            logger.warning(f"Claude batch response contained no JSON object. Response: {text[:300]}")
+            return {}
+
+        raw = json.loads(text[start_idx:end_idx])
+
+        # Response uses numbered keys ("1", "2", ...) — map back to phase names
+        result: dict[str, list[TrackCandidate]] = {}
+        for key, songs in raw.items():
+            # Map numbered key to phase info by index
+            try:
+                idx = int(key) - 1
+                phase_info = phases_info[idx] if 0 <= idx < len(phases_info) else None
+            except (ValueError, IndexError):
+                phase_info = None
+                logger.warning(f"Unexpected phase key in batch response: {key}")
+
+            phase_name = phase_info["name"] if phase_info else key
+            candidates = []
+            for song in songs:
+                bpm = int(song.get("bpm", 0))
+                if phase_info and not (phase_info["bpm_min"] <= bpm <= phase_info["bpm_max"]):
+                    continue
+                candidates.append(ClaudeMusicSource._song_candidate(song, bpm))
+            result[phase_name] = candidates
+
+        total_tracks = sum(len(v) for v in result.values())
+        logger.info(f"Claude batch: {total_tracks} tracks across {len(result)} phases")
+        return result
+
+    def batch_search(
+        self,
+        phases_info: list[dict],
+        genre: str = "rock",
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+        taste_description: Optional[str] = None,
+    ) -> dict[str, list[TrackCandidate]]:
+        """
+        Single Claude API call to get track suggestions for ALL workout phases.
+
+        Args:
+            phases_info: List of dicts with keys: name, bpm_min, bpm_max, duration_min, energy
+            genre: Music genre preference
+            exclude_artists: Artists to never suggest
+            boost_artists: Artists to prefer
+
+        Returns:
+            Dict mapping phase name → list of TrackCandidates
+        """
+        prompt = self._batch_prompt(
+            phases_info, genre, exclude_artists, boost_artists, taste_description,
+        )
+
         try:
             start = _time.time()
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4096,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            elapsed = _time.time() - start
-            logger.info(
-                f"Claude batch music suggestion: {elapsed:.1f}s, "
-                f"{response.usage.input_tokens}in/{response.usage.output_tokens}out "
-                f"({len(phases_info)} phases)"
-            )
+            with metrics.upstream("claude", "batch_suggest"):
+                response = self.client.messages.create(**self._batch_request(prompt))
+            return self._batch_result(response, _time.time() - start, phases_info)
+        except Exception as e:
+            return self._batch_failed(e)
 
-            text = response.content[0].text
-
-            # Extract JSON object from response
-            start_idx = text.find("{")
-            end_idx = text.rfind("}") + 1
-            if start_idx < 0 or end_idx <= start_idx:
-                logger.warning(f"Claude batch response contained no JSON object. Response: {text[:300]}")
-                return {}
-
-            raw = json.loads(text[start_idx:end_idx])
-
-            # Convert to TrackCandidates grouped by phase name
-            # Response uses numbered keys ("1", "2", ...) — map back to phase names
-            result: dict[str, list[TrackCandidate]] = {}
-            for key, songs in raw.items():
-                # Map numbered key to phase info by index
-                try:
-                    idx = int(key) - 1
-                    phase_info = phases_info[idx] if 0 <= idx < len(phases_info) else None
-                except (ValueError, IndexError):
-                    phase_info = None
-                    logger.warning(f"Unexpected phase key in batch response: {key}")
-
-                phase_name = phase_info["name"] if phase_info else key
-                candidates = []
-                for song in songs:
-                    bpm = int(song.get("bpm", 0))
-                    if phase_info and not (phase_info["bpm_min"] <= bpm <= phase_info["bpm_max"]):
-                        continue
-                    candidates.append(
-                        TrackCandidate(
-                            name=song.get("title", "Unknown"),
-                            artist=song.get("artist", "Unknown"),
-                            bpm=bpm,
-                            energy=float(song.get("energy", 0.7)),
-                            duration_ms=int(song.get("duration_sec", 210)) * 1000,
-                            source="claude",
-                            verified_bpm=False,
-                        )
-                    )
-                result[phase_name] = candidates
-
-            total_tracks = sum(len(v) for v in result.values())
-            logger.info(f"Claude batch: {total_tracks} tracks across {len(result)} phases")
-            return result
+    async def batch_search_async(
+        self,
+        phases_info: list[dict],
+        genre: str = "rock",
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+        taste_description: Optional[str] = None,
+    ) -> dict[str, list[TrackCandidate]]:
+        """Async variant of batch_search using AsyncAnthropic."""
+        prompt = self._batch_prompt(
+            phases_info, genre, exclude_artists, boost_artists, taste_description,
+        )
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse Claude batch response: {e}")
-            return {}
-        except anthropic.APIError as e:
-            logger.error(f"Claude API error for batch music suggestions: [{type(e).__name__}] {e}")
-            return {}
+        try:
+            start = _time.time()
+            with metrics.upstream("claude", "batch_suggest"):
+                response = await self.async_client.messages.create(**self._batch_request(prompt))
+            return self._batch_result(response, _time.time() - start, phases_info)
         except Exception as e:
-            logger.error(f"Claude batch music unexpected error: [{type(e).__name__}] {e}", exc_info=True)
-            return {}
+            return self._batch_failed(e)
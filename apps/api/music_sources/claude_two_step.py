@@ -13,9 +13,12 @@ import anthropic
 
 from music_sources.base import MusicSource, TrackCandidate
 from config import settings
+from services import deadline, metrics, token_usage
 
 logger = logging.getLogger(__name__)
 
+RERANK_MIN_BUDGET_S = 8.0  # Below this, skip step 2 and return the step-1 pool
+
 GENERATE_PROMPT = """Suggest {limit} real songs for a CrossFit workout at {bpm_min}-{bpm_max} BPM.
 
 Genre preference: {genre}
@@ -54,6 +57,7 @@ class TwoStepClaudeMusicSource(MusicSource):
         if not settings.anthropic_api_key:
             raise ValueError("ANTHROPIC_API_KEY is required")
         self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
         self.model = settings.anthropic_model
 
     @property
@@ -68,91 +72,183 @@ class TwoStepClaudeMusicSource(MusicSource):
         limit: int = 10,
         boost_artists: Optional[set[str]] = None,
     ) -> list[TrackCandidate]:
-        pool_size = max(limit * 4, 40)
-        boost_line = ""
-        if boost_artists:
-            boost_line = f"- PREFER songs by: {', '.join(sorted(boost_artists))}\n"
-
-        prompt = GENERATE_PROMPT.format(
-            limit=pool_size, bpm_min=bpm_min, bpm_max=bpm_max,
-            genre=genre, boost_line=boost_line,
-        )
+        prompt = self._generate_prompt(bpm_min, bpm_max, genre, limit, boost_artists)
 
         try:
             start = _time.time()
-            gen_resp = self.client.messages.create(
-                model=self.model, max_tokens=4096,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            with metrics.upstream("claude", "two_step_generate"):
+                gen_resp = self.client.messages.create(
+                    model=self.model, max_tokens=4096,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+                )
             gen_elapsed = _time.time() - start
-            logger.info(f"Two-step generate: {gen_elapsed:.1f}s, "
-                        f"{gen_resp.usage.input_tokens}in/{gen_resp.usage.output_tokens}out")
-
-            text = gen_resp.content[0].text
-            start_idx = text.find("[")
-            end_idx = text.rfind("]") + 1
-            if start_idx < 0 or end_idx <= start_idx:
-                return []
-
-            songs = json.loads(text[start_idx:end_idx])
-
-            candidates = []
-            for song in songs:
-                bpm = int(song.get("bpm", 0))
-                if bpm_min <= bpm <= bpm_max:
-                    candidates.append(
-                        TrackCandidate(
-                            name=song.get("title", "Unknown"),
-                            artist=song.get("artist", "Unknown"),
-                            bpm=bpm,
-                            energy=float(song.get("energy", 0.7)),
-                            duration_ms=int(song.get("duration_sec", 210)) * 1000,
-                            source="claude_two_step",
-                            verified_bpm=False,
-                        )
-                    )
+            usage = token_usage.record_usage("two_step_generate", gen_resp.usage)
+            logger.info(f"Two-step generate: {gen_elapsed:.1f}s, {usage}")
+
+            candidates = self._parse_pool(gen_resp.content[0].text, bpm_min, bpm_max)
 
             if len(candidates) <= limit:
                 return candidates
 
-            # Step 2: Re-rank
-            rerank_pool = candidates[:min(20, len(candidates))]
-            random.shuffle(rerank_pool)
-
-            candidates_text = "\n".join(
-                f'{i}. "{c.name}" - {c.artist} (BPM: {c.bpm}, Energy: {c.energy:.2f})'
-                for i, c in enumerate(rerank_pool)
-            )
+            if not deadline.has_budget(RERANK_MIN_BUDGET_S):
+                deadline.degrade("skip_rerank")
+                return candidates[:limit]
 
-            rerank_prompt = RERANK_PROMPT.format(
-                intensity="high", bpm_min=bpm_min, bpm_max=bpm_max,
-                genre=genre, candidates_text=candidates_text,
-                select_count=limit,
+            # Step 2: Re-rank
+            rerank_pool, rerank_prompt = self._rerank_request(
+                candidates, bpm_min, bpm_max, genre, limit,
             )
 
             start = _time.time()
-            rank_resp = self.client.messages.create(
-                model=self.model, max_tokens=1024,
-                messages=[{"role": "user", "content": rerank_prompt}],
-            )
+            with metrics.upstream("claude", "two_step_rerank"):
+                rank_resp = self.client.messages.create(
+                    model=self.model, max_tokens=1024,
+                    messages=[{"role": "user", "content": rerank_prompt}],
+                    timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+                )
             rank_elapsed = _time.time() - start
-            logger.info(f"Two-step re-rank: {rank_elapsed:.1f}s")
+            usage = token_usage.record_usage("two_step_rerank", rank_resp.usage)
+            logger.info(f"Two-step re-rank: {rank_elapsed:.1f}s, {usage}")
+
+            return self._apply_rankings(rank_resp.content[0].text, rerank_pool, candidates, limit)
+
+        except Exception as e:
+            logger.error(f"Two-step Claude error: [{type(e).__name__}] {e}")
+            return []
+
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+        boost_artists: Optional[set[str]] = None,
+    ) -> list[TrackCandidate]:
+        """Async variant of search_by_bpm using AsyncAnthropic."""
+        prompt = self._generate_prompt(bpm_min, bpm_max, genre, limit, boost_artists)
 
-            rank_text = rank_resp.content[0].text
-            r_start = rank_text.find("[")
-            r_end = rank_text.rfind("]") + 1
-            if r_start < 0 or r_end <= r_start:
+        try:
+            start = _time.time()
+            with metrics.upstream("claude", "two_step_generate"):
+                gen_resp = await self.async_client.messages.create(
+                    model=self.model, max_tokens=4096,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+                )
+            gen_elapsed = _time.time() - start
+            usage = token_usage.record_usage("two_step_generate", gen_resp.usage)
+            logger.info(f"Two-step generate: {gen_elapsed:.1f}s, {usage}")
+
+            candidates = self._parse_pool(gen_resp.content[0].text, bpm_min, bpm_max)
+
+            if len(candidates) <= limit:
+                return candidates
+
+            if not deadline.has_budget(RERANK_MIN_BUDGET_S):
+                deadline.degrade("skip_rerank")
                 return candidates[:limit]
 
-            rankings = json.loads(rank_text[r_start:r_end])
-            reranked = []
-            for entry in rankings[:limit]:
-                idx = entry.get("index", 0)
-                if 0 <= idx < len(rerank_pool):
-                    reranked.append(rerank_pool[idx])
+            rerank_pool, rerank_prompt = self._rerank_request(
+                candidates, bpm_min, bpm_max, genre, limit,
+            )
+
+            start = _time.time()
+            with metrics.upstream("claude", "two_step_rerank"):
+                rank_resp = await self.async_client.messages.create(
+                    model=self.model, max_tokens=1024,
+                    messages=[{"role": "user", "content": rerank_prompt}],
+                    timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+                )
+            rank_elapsed = _time.time() - start
+            usage = token_usage.record_usage("two_step_rerank", rank_resp.usage)
+            logger.info(f"Two-step re-rank: {rank_elapsed:.1f}s, {usage}")
 
-            return reranked if reranked else candidates[:limit]
+            return self._apply_rankings(rank_resp.content[0].text, rerank_pool, candidates, limit)
 
         except Exception as e:
             logger.error(f"Two-step Claude error: [{type(e).__name__}] {e}")
             return []
+
+    @staticmethod
+    def _generate_prompt(
+        bpm_min: int, bpm_max: int, genre: str, limit: int,
+        boost_artists: Optional[set[str]],
+    ) -> str:
+        pool_size = max(limit * 4, 40)
+        boost_line = ""
+        if boost_artists:
+            boost_line = f"- PREFER songs by: {', '.join(sorted(boost_artists))}\n"
+
+        return GENERATE_PROMPT.format(
+            limit=pool_size, bpm_min=bpm_min, bpm_max=bpm_max,
+            genre=genre, boost_line=boost_line,
+        )
+
+    @staticmethod
+    def _parse_pool(text: str, bpm_min: int, bpm_max: int) -> list[TrackCandidate]:
+        """Parse the step-1 candidate pool, keeping only in-range BPMs."""
+        start_idx = text.find("[")
+        end_idx = text.rfind("]") + 1
+        if start_idx < 0 or end_idx <= start_idx:
+            return []
+
+        songs = json.loads(text[start_idx:end_idx])
+
+        candidates = []
+        for song in songs:
+            bpm = int(song.get("bpm", 0))
+            if bpm_min <= bpm <= bpm_max:
+                candidates.append(
+                    TrackCandidate(
+                        name=song.get("title", "Unknown"),
+                        artist=song.get("artist", "Unknown"),
+                        bpm=bpm,
+                        energy=float(song.get("energy", 0.7)),
+                        duration_ms=int(song.get("duration_sec", 210)) * 1000,
+                        source="claude_two_step",
+                        verified_bpm=False,
+                    )
+                )
+        return candidates
+
+    @staticmethod
+    def _rerank_request(
+        candidates: list[TrackCandidate], bpm_min: int, bpm_max: int,
+        genre: str, limit: int,
+    ) -> tuple[list[TrackCandidate], str]:
+        """Pick the shuffled re-rank pool and build the step-2 prompt."""
+        rerank_pool = candidates[:min(20, len(candidates))]
+        random.shuffle(rerank_pool)
+
+        candidates_text = "\n".join(
+            f'{i}. "{c.name}" - {c.artist} (BPM: {c.bpm}, Energy: {c.energy:.2f})'
+            for i, c in enumerate(rerank_pool)
+        )
+
+        rerank_prompt = RERANK_PROMPT.format(
+            intensity="high", bpm_min=bpm_min, bpm_max=bpm_max,
+            genre=genre, candidates_text=candidates_text,
+            select_count=limit,
+        )
+        return rerank_pool, rerank_prompt
+
+    @staticmethod
+    def _apply_rankings(
+        rank_text: str, rerank_pool: list[TrackCandidate],
+        candidates: list[TrackCandidate], limit: int,
+    ) -> list[TrackCandidate]:
+        """Order the re-rank pool by Claude's selected indices."""
+        r_start = rank_text.find("[")
+        r_end = rank_text.rfind("]") + 1
+        if r_start < 0 or r_end <= r_start:
+            return candidates[:limit]
+
+        rankings = json.loads(rank_text[r_start:r_end])
+        reranked = []
+        for entry in rankings[:limit]:
+            idx = entry.get("index", 0)
+            if 0 <= idx < len(rerank_pool):
+                reranked.append(rerank_pool[idx])
+
+        return reranked if reranked else candidates[:limit]
@@ -3,19 +3,25 @@ Deezer-based music source.
 Uses Deezer's free, unauthenticated API for BPM-based track discovery.
 BPM data coverage is incomplete — tracks with BPM=0 are filtered out.
 """
+import asyncio
 import logging
 import time as _time
 from typing import Optional
 
+import httpx
 import requests
 
+from clients.http import get_async_client
 from music_sources.base import MusicSource, TrackCandidate
+from services import deadline, metrics
 
 logger = logging.getLogger(__name__)
 
 DEEZER_SEARCH_URL = "https://api.deezer.com/search"
 DEEZER_TRACK_URL = "https://api.deezer.com/track"
 REQUEST_TIMEOUT = 10
+DETAIL_BATCH_SIZE = 10  # Concurrent track-detail lookups per round (async path)
+DETAIL_MIN_BUDGET_S = 1.0  # Stop BPM lookups and return what is verified below this
 
 
 class DeezerMusicSource(MusicSource):
@@ -35,69 +41,146 @@ class DeezerMusicSource(MusicSource):
         candidates = []
 
         try:
-            query = f'{genre} bpm_min:"{bpm_min}" bpm_max:"{bpm_max}"'
-            params = {"q": query, "limit": min(limit * 3, 100)}
-
             start = _time.time()
-            resp = requests.get(DEEZER_SEARCH_URL, params=params, timeout=REQUEST_TIMEOUT)
-            elapsed = _time.time() - start
-
-            if resp.status_code != 200:
-                logger.error(f"Deezer search failed: HTTP {resp.status_code}")
-                return []
-
-            data = resp.json()
-            tracks = data.get("data", [])
-            logger.info(f"Deezer search: {len(tracks)} results in {elapsed:.1f}s for BPM {bpm_min}-{bpm_max} ({genre})")
+            with metrics.upstream("deezer", "search"):
+                resp = requests.get(
+                    DEEZER_SEARCH_URL,
+                    params=self._search_params(bpm_min, bpm_max, genre, limit),
+                    timeout=deadline.timeout(REQUEST_TIMEOUT),
+                )
+            tracks = self._search_results(resp, _time.time() - start, bpm_min, bpm_max, genre)
 
             for track_data in tracks:
-                if len(candidates) >= limit:
+                if len(candidates) >= limit or self._out_of_budget():
                     break
+                candidate = self._verified(track_data, self._fetch_bpm(track_data["id"]), bpm_min, bpm_max)
+                if candidate is not None:
+                    candidates.append(candidate)
+
+        except Exception as e:
+            logger.error(f"Deezer music source error: [{type(e).__name__}] {e}")
 
-                track_id = track_data.get("id")
-                if not track_id:
-                    continue
-
-                try:
-                    detail_resp = requests.get(
-                        f"{DEEZER_TRACK_URL}/{track_id}",
-                        timeout=REQUEST_TIMEOUT,
-                    )
-                    if detail_resp.status_code != 200:
-                        continue
-
-                    detail = detail_resp.json()
-                    bpm = float(detail.get("bpm", 0))
-
-                    if bpm <= 0:
-                        continue
-
-                    if not (bpm_min <= bpm <= bpm_max):
-                        continue
-
-                    artist_name = track_data.get("artist", {}).get("name", "Unknown")
-                    duration_sec = track_data.get("duration", 210)
-                    rank = track_data.get("rank", 0)
-                    energy = min(1.0, max(0.3, rank / 1_000_000))
-
-                    candidates.append(
-                        TrackCandidate(
-                            name=track_data.get("title", "Unknown"),
-                            artist=artist_name,
-                            bpm=int(bpm),
-                            energy=energy,
-                            duration_ms=duration_sec * 1000,
-                            source="deezer",
-                            source_id=str(track_id),
-                            verified_bpm=True,
-                        )
-                    )
-
-                except requests.RequestException:
-                    continue
+        logger.info(f"Deezer: {len(candidates)} verified tracks for BPM {bpm_min}-{bpm_max}")
+        return candidates
+
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        """
+        Async search. Track-detail lookups run concurrently in rounds of
+        DETAIL_BATCH_SIZE, stopping as soon as `limit` verified tracks are found
+        or the request's deadline is nearly used up.
+        """
+        candidates = []
+
+        try:
+            client = get_async_client()
+            start = _time.time()
+            with metrics.upstream("deezer", "search"):
+                resp = await client.get(
+                    DEEZER_SEARCH_URL,
+                    params=self._search_params(bpm_min, bpm_max, genre, limit),
+                    timeout=deadline.timeout(REQUEST_TIMEOUT),
+                )
+            tracks = self._search_results(resp, _time.time() - start, bpm_min, bpm_max, genre)
+
+            for i in range(0, len(tracks), DETAIL_BATCH_SIZE):
+                if len(candidates) >= limit or self._out_of_budget():
+                    break
+                chunk = tracks[i:i + DETAIL_BATCH_SIZE]
+                bpms = await asyncio.gather(
+                    *(self._fetch_bpm_async(client, t["id"]) for t in chunk)
+                )
+                for track_data, bpm in zip(chunk, bpms):
+                    if len(candidates) >= limit:
+                        break
+                    candidate = self._verified(track_data, bpm, bpm_min, bpm_max)
+                    if candidate is not None:
+                        candidates.append(candidate)
 
         except Exception as e:
             logger.error(f"Deezer music source error: [{type(e).__name__}] {e}")
 
         logger.info(f"Deezer: {len(candidates)} verified tracks for BPM {bpm_min}-{bpm_max}")
         return candidates
+
+    @staticmethod
+    def _fetch_bpm(track_id) -> Optional[float]:
+        """Fetch a track's BPM from the detail endpoint. Returns None on failure."""
+        try:
+            with metrics.upstream("deezer", "track_detail"):
+                resp = requests.get(f"{DEEZER_TRACK_URL}/{track_id}", timeout=deadline.timeout(REQUEST_TIMEOUT))
+            return DeezerMusicSource._detail_bpm(resp)
+        except (requests.RequestException, ValueError):
+            return None
+
+    @staticmethod
+    async def _fetch_bpm_async(client: httpx.AsyncClient, track_id) -> Optional[float]:
+        """Async variant of _fetch_bpm()."""
+        try:
+            with metrics.upstream("deezer", "track_detail"):
+                resp = await client.get(f"{DEEZER_TRACK_URL}/{track_id}", timeout=deadline.timeout(REQUEST_TIMEOUT))
+            return DeezerMusicSource._detail_bpm(resp)
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    # Request building and response handling shared by the sync and async paths
+
+    @staticmethod
+    def _search_params(bpm_min: int, bpm_max: int, genre: str, limit: int) -> dict:
+        return {"q": f'{genre} bpm_min:"{bpm_min}" bpm_max:"{bpm_max}"', "limit": min(limit * 3, 100)}
+
+    @staticmethod
+    def _search_results(resp, elapsed: float, bpm_min: int, bpm_max: int, genre: str) -> list[dict]:
+        """Search hits that have a track id, from a requests or httpx response (empty on an HTTP error)."""
+        if resp.status_code != 200:
+            logger.error(f"Deezer search failed: HTTP {resp.status_code}")
+            return []
+        tracks = [t for t in resp.json().get("data", []) if t.get("id")]
+        logger.info(f"Deezer search: {len(tracks)} results in {elapsed:.1f}s for BPM {bpm_min}-{bpm_max} ({genre})")
+        return tracks
+
+    @staticmethod
+    def _detail_bpm(resp) -> Optional[float]:
+        """BPM from a track-detail response (requests or httpx), None on an HTTP error."""
+        if resp.status_code != 200:
+            return None
+        return float(resp.json().get("bpm", 0))
+
+    @staticmethod
+    def _out_of_budget() -> bool:
+        """Whether too little of the request's deadline is left for more BPM lookups."""
+        if deadline.has_budget(DETAIL_MIN_BUDGET_S):
+            return False
+        deadline.degrade("deezer_detail_lookups")
+        return True
+
+    @classmethod
+    def _verified(cls, track_data: dict, bpm: Optional[float], bpm_min: int, bpm_max: int) -> Optional[TrackCandidate]:
+        """The candidate if its looked-up BPM is known and in range (Deezer reports 0 when unknown)."""
+        if not bpm or not (bpm_min <= bpm <= bpm_max):
+            return None
+        return cls._to_candidate(track_data, bpm)
+
+    @staticmethod
+    def _to_candidate(track_data: dict, bpm: float) -> TrackCandidate:
+        """Build a TrackCandidate from a Deezer search result and its verified BPM."""
+        artist_name = track_data.get("artist", {}).get("name", "Unknown")
+        duration_sec = track_data.get("duration", 210)
+        rank = track_data.get("rank", 0)
+        energy = min(1.0, max(0.3, rank / 1_000_000))
+
+        return TrackCandidate(
+            name=track_data.get("title", "Unknown"),
+            artist=artist_name,
+            bpm=int(bpm),
+            energy=energy,
+            duration_ms=duration_sec * 1000,
+            source="deezer",
+            source_id=str(track_data.get("id")),
+            verified_bpm=True,
+        )
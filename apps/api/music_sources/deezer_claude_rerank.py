@@ -12,9 +12,12 @@ import anthropic
 
 from music_sources.base import MusicSource, TrackCandidate
 from config import settings
+from services import deadline, metrics, token_usage
 
 logger = logging.getLogger(__name__)
 
+RERANK_MIN_BUDGET_S = 8.0  # Below this, return Deezer's order instead of waiting on Claude
+
 RERANK_PROMPT = """You are a CrossFit workout DJ. Re-rank these candidate tracks for a workout phase.
 
 Target BPM: {bpm_min}-{bpm_max}
@@ -41,6 +44,7 @@ class DeezerClaudeRerankSource(MusicSource):
             self._deezer = DeezerMusicSource()
 
         self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
         self.model = settings.anthropic_model
 
     @property
@@ -60,6 +64,78 @@ class DeezerClaudeRerankSource(MusicSource):
         if len(pool) <= limit:
             return pool
 
+        if not deadline.has_budget(RERANK_MIN_BUDGET_S):
+            deadline.degrade("skip_rerank")
+            return pool[:limit]
+
+        rerank_pool, prompt = self._rerank_request(
+            pool, bpm_min, bpm_max, genre, limit, taste_description,
+        )
+
+        try:
+            start = _time.time()
+            with metrics.upstream("claude", "deezer_rerank"):
+                resp = self.client.messages.create(
+                    model=self.model, max_tokens=1024,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+                )
+            elapsed = _time.time() - start
+            usage = token_usage.record_usage("deezer_rerank", resp.usage)
+            logger.info(f"Deezer+Claude re-rank: {elapsed:.1f}s, {usage}")
+
+            return self._apply_rankings(resp.content[0].text, rerank_pool, pool, limit)
+
+        except Exception as e:
+            logger.error(f"Claude re-rank failed: [{type(e).__name__}] {e}")
+            return pool[:limit]
+
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+        taste_description: Optional[str] = None,
+    ) -> list[TrackCandidate]:
+        """Async variant: async Deezer search, then AsyncAnthropic re-rank."""
+        pool = await self._deezer.search_by_bpm_async(bpm_min, bpm_max, genre, limit=min(50, limit * 5))
+
+        if len(pool) <= limit:
+            return pool
+
+        if not deadline.has_budget(RERANK_MIN_BUDGET_S):
+            deadline.degrade("skip_rerank")
+            return pool[:limit]
+
+        rerank_pool, prompt = self._rerank_request(
+            pool, bpm_min, bpm_max, genre, limit, taste_description,
+        )
+
+        try:
+            start = _time.time()
+            with metrics.upstream("claude", "deezer_rerank"):
+                resp = await self.async_client.messages.create(
+                    model=self.model, max_tokens=1024,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+                )
+            elapsed = _time.time() - start
+            usage = token_usage.record_usage("deezer_rerank", resp.usage)
+            logger.info(f"Deezer+Claude re-rank: {elapsed:.1f}s, {usage}")
+
+            return self._apply_rankings(resp.content[0].text, rerank_pool, pool, limit)
+
+        except Exception as e:
+            logger.error(f"Claude re-rank failed: [{type(e).__name__}] {e}")
+            return pool[:limit]
+
+    @staticmethod
+    def _rerank_request(
+        pool: list[TrackCandidate], bpm_min: int, bpm_max: int, genre: str,
+        limit: int, taste_description: Optional[str],
+    ) -> tuple[list[TrackCandidate], str]:
+        """Pick the shuffled re-rank pool and build the re-rank prompt."""
         rerank_pool = pool[:20]
         random.shuffle(rerank_pool)
 
@@ -75,31 +151,24 @@ class DeezerClaudeRerankSource(MusicSource):
             taste_line=taste_line, candidates_text=candidates_text,
             select_count=limit,
         )
+        return rerank_pool, prompt
 
-        try:
-            start = _time.time()
-            resp = self.client.messages.create(
-                model=self.model, max_tokens=1024,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            elapsed = _time.time() - start
-            logger.info(f"Deezer+Claude re-rank: {elapsed:.1f}s")
-
-            text = resp.content[0].text
-            s = text.find("[")
-            e = text.rfind("]") + 1
-            if s < 0 or e <= s:
-                return pool[:limit]
-
-            rankings = json.loads(text[s:e])
-            reranked = []
-            for entry in rankings[:limit]:
-                idx = entry.get("index", 0)
-                if 0 <= idx < len(rerank_pool):
-                    reranked.append(rerank_pool[idx])
+    @staticmethod
+    def _apply_rankings(
+        text: str, rerank_pool: list[TrackCandidate],
+        pool: list[TrackCandidate], limit: int,
+    ) -> list[TrackCandidate]:
+        """Order the re-rank pool by Claude's selected indices."""
+        s = text.find("[")
+        e = text.rfind("]") + 1
+        if s < 0 or e <= s:
+            return pool[:limit]
 
-            return reranked if reranked else pool[:limit]
+        rankings = json.loads(text[s:e])
+        reranked = []
+        for entry in rankings[:limit]:
+            idx = entry.get("index", 0)
+            if 0 <= idx < len(rerank_pool):
+                reranked.append(rerank_pool[idx])
 
-        except Exception as e:
-            logger.error(f"Claude re-rank failed: [{type(e).__name__}] {e}")
-            return pool[:limit]
+        return reranked if reranked else pool[:limit]
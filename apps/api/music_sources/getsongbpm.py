@@ -8,8 +8,10 @@ from typing import Optional
 
 import httpx
 
+from clients.http import get_async_client
 from music_sources.base import MusicSource, TrackCandidate
 from config import settings
+from services import deadline, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,8 @@ GETSONGBPM_API_URL = "https://api.getsongbpm.com"
 class GetSongBPMMusicSource(MusicSource):
     """Music source using the GetSongBPM API for BPM-based track discovery."""
 
+    max_concurrent_searches = 2  # Rate-limited API keys
+
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or settings.getsongbpm_api_key
         if not self.api_key:
@@ -45,38 +49,51 @@ class GetSongBPMMusicSource(MusicSource):
         candidates = []
 
         try:
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(
+            with httpx.Client(timeout=deadline.timeout(10.0)) as client:
+                with metrics.upstream("getsongbpm", "tempo_search"):
+                    response = client.get(
+                        f"{GETSONGBPM_API_URL}/tempo/",
+                        params={
+                            "api_key": self.api_key,
+                            "bpm": target_bpm,
+                        },
+                    )
+                    response.raise_for_status()
+                data = response.json()
+
+            candidates = self._parse_songs(data, bpm_min, bpm_max, limit)
+
+        except httpx.HTTPError as e:
+            logger.error(f"GetSongBPM API error: {e}")
+        except Exception as e:
+            logger.error(f"GetSongBPM unexpected error: {e}")
+
+        logger.info(f"GetSongBPM: found {len(candidates)} tracks for BPM {bpm_min}-{bpm_max}")
+        return candidates
+
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        """Async variant of search_by_bpm using the pooled AsyncClient."""
+        target_bpm = (bpm_min + bpm_max) // 2
+        candidates = []
+
+        try:
+            with metrics.upstream("getsongbpm", "tempo_search"):
+                response = await get_async_client().get(
                     f"{GETSONGBPM_API_URL}/tempo/",
                     params={
                         "api_key": self.api_key,
                         "bpm": target_bpm,
                     },
+                    timeout=deadline.timeout(10.0),
                 )
                 response.raise_for_status()
-                data = response.json()
-
-            songs = data.get("tempo", [])
-            for song in songs[:limit * 2]:  # Fetch extra to filter
-                song_bpm = int(song.get("song_tempo", 0))
-                if bpm_min <= song_bpm <= bpm_max:
-                    candidates.append(
-                        TrackCandidate(
-                            name=song.get("song_title", "Unknown"),
-                            artist=song.get("artist", {}).get("name", "Unknown"),
-                            bpm=song_bpm,
-                            energy=self._estimate_energy(song_bpm),
-                            duration_ms=210000,  # Default ~3.5 min, API doesn't provide duration
-                            source="getsongbpm",
-                            source_id=song.get("song_id"),
-                            album=song.get("album", {}).get("title"),
-                            year=self._parse_year(song.get("album", {}).get("year")),
-                            verified_bpm=True,
-                        )
-                    )
-
-                if len(candidates) >= limit:
-                    break
+            candidates = self._parse_songs(response.json(), bpm_min, bpm_max, limit)
 
         except httpx.HTTPError as e:
             logger.error(f"GetSongBPM API error: {e}")
@@ -86,6 +103,34 @@ class GetSongBPMMusicSource(MusicSource):
         logger.info(f"GetSongBPM: found {len(candidates)} tracks for BPM {bpm_min}-{bpm_max}")
         return candidates
 
+    def _parse_songs(
+        self, data: dict, bpm_min: int, bpm_max: int, limit: int
+    ) -> list[TrackCandidate]:
+        """Convert a /tempo/ response into in-range TrackCandidates."""
+        candidates = []
+        songs = data.get("tempo", [])
+        for song in songs[:limit * 2]:  # Fetch extra to filter
+            song_bpm = int(song.get("song_tempo", 0))
+            if bpm_min <= song_bpm <= bpm_max:
+                candidates.append(
+                    TrackCandidate(
+                        name=song.get("song_title", "Unknown"),
+                        artist=song.get("artist", {}).get("name", "Unknown"),
+                        bpm=song_bpm,
+                        energy=self._estimate_energy(song_bpm),
+                        duration_ms=210000,  # Default ~3.5 min, API doesn't provide duration
+                        source="getsongbpm",
+                        source_id=song.get("song_id"),
+                        album=song.get("album", {}).get("title"),
+                        year=self._parse_year(song.get("album", {}).get("year")),
+                        verified_bpm=True,
+                    )
+                )
+
+            if len(candidates) >= limit:
+                break
+        return candidates
+
     @staticmethod
     def _estimate_energy(bpm: int) -> float:
         """Estimate energy level from BPM (rough heuristic)."""
@@ -1,14 +1,18 @@
 """
 Hybrid music source: Deezer primary, Claude fallback.
 """
+import asyncio
 import logging
 from typing import Optional
 
 from music_sources.base import MusicSource, TrackCandidate
+from services import metrics
 
 logger = logging.getLogger(__name__)
 
 MIN_COVERAGE_RATIO = 0.5
+BATCH_PHASE_LIMIT = 20  # Tracks searched per phase by batch_search
+BATCH_MIN_DEEZER = 5  # Deezer tracks for a phase below which Claude fills in
 
 
 class HybridMusicSource(MusicSource):
@@ -39,21 +43,11 @@ class HybridMusicSource(MusicSource):
         limit: int = 10,
     ) -> list[TrackCandidate]:
         candidates = self._deezer.search_by_bpm(bpm_min, bpm_max, genre, limit)
-
-        if len(candidates) >= max(1, int(limit * MIN_COVERAGE_RATIO)):
-            logger.info(f"Hybrid: Deezer provided {len(candidates)} tracks (sufficient)")
+        if self._sufficient(candidates, limit):
             return candidates
 
-        logger.info(f"Hybrid: Deezer returned {len(candidates)}, falling back to Claude")
         claude_candidates = self._claude.search_by_bpm(bpm_min, bpm_max, genre, limit)
-
-        seen_artists = {c.artist for c in candidates}
-        for c in claude_candidates:
-            if c.artist not in seen_artists:
-                candidates.append(c)
-                seen_artists.add(c.artist)
-
-        return candidates[:limit]
+        return self._merge(candidates, claude_candidates)[:limit]
 
     def batch_search(
         self,
@@ -64,16 +58,74 @@ class HybridMusicSource(MusicSource):
     ) -> dict[str, list[TrackCandidate]]:
         result = {}
         for p in phases_info:
-            deezer_tracks = self._deezer.search_by_bpm(p["bpm_min"], p["bpm_max"], genre, limit=20)
-            if len(deezer_tracks) >= 5:
+            deezer_tracks = self._deezer.search_by_bpm(
+                p["bpm_min"], p["bpm_max"], genre, limit=BATCH_PHASE_LIMIT,
+            )
+            if len(deezer_tracks) >= BATCH_MIN_DEEZER:
                 result[p["name"]] = deezer_tracks
             else:
-                claude_tracks = self._claude.search_by_bpm(p["bpm_min"], p["bpm_max"], genre, limit=20)
-                seen = {t.artist for t in deezer_tracks}
-                merged = list(deezer_tracks)
-                for t in claude_tracks:
-                    if t.artist not in seen:
-                        merged.append(t)
-                        seen.add(t.artist)
-                result[p["name"]] = merged
+                claude_tracks = self._claude.search_by_bpm(
+                    p["bpm_min"], p["bpm_max"], genre, limit=BATCH_PHASE_LIMIT,
+                )
+                result[p["name"]] = self._merge(deezer_tracks, claude_tracks)
         return result
+
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        candidates = await self._deezer.search_by_bpm_async(bpm_min, bpm_max, genre, limit)
+        if self._sufficient(candidates, limit):
+            return candidates
+
+        claude_candidates = await self._claude.search_by_bpm_async(bpm_min, bpm_max, genre, limit)
+        return self._merge(candidates, claude_candidates)[:limit]
+
+    async def batch_search_async(
+        self,
+        phases_info: list[dict],
+        genre: str = "rock",
+        exclude_artists: Optional[set[str]] = None,
+        boost_artists: Optional[set[str]] = None,
+    ) -> dict[str, list[TrackCandidate]]:
+        """Async variant of batch_search; phases are searched concurrently."""
+
+        async def search_phase(p: dict) -> list[TrackCandidate]:
+            deezer_tracks = await self._deezer.search_by_bpm_async(
+                p["bpm_min"], p["bpm_max"], genre, limit=BATCH_PHASE_LIMIT,
+            )
+            if len(deezer_tracks) >= BATCH_MIN_DEEZER:
+                return deezer_tracks
+            claude_tracks = await self._claude.search_by_bpm_async(
+                p["bpm_min"], p["bpm_max"], genre, limit=BATCH_PHASE_LIMIT,
+            )
+            return self._merge(deezer_tracks, claude_tracks)
+
+        pools = await asyncio.gather(*(search_phase(p) for p in phases_info))
+        return {p["name"]: pool for p, pool in zip(phases_info, pools)}
+
+    @staticmethod
+    def _sufficient(candidates: list[TrackCandidate], limit: int) -> bool:
+        """Whether Deezer covered enough of `limit` to skip the Claude fallback."""
+        if len(candidates) >= max(1, int(limit * MIN_COVERAGE_RATIO)):
+            logger.info(f"Hybrid: Deezer provided {len(candidates)} tracks (sufficient)")
+            return True
+        logger.info(f"Hybrid: Deezer returned {len(candidates)}, falling back to Claude")
+        metrics.record_fallback("hybrid_claude")
+        return False
+
+    @staticmethod
+    def _merge(
+        primary: list[TrackCandidate], fallback: list[TrackCandidate]
+    ) -> list[TrackCandidate]:
+        """Append fallback tracks whose artist isn't already represented."""
+        seen = {t.artist for t in primary}
+        merged = list(primary)
+        for t in fallback:
+            if t.artist not in seen:
+                merged.append(t)
+                seen.add(t.artist)
+        return merged
@@ -49,3 +49,13 @@ class MockMusicSource(MusicSource):
             )
             for t in tracks
         ]
+
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        # In-memory lookup — no need to hop to a worker thread
+        return self.search_by_bpm(bpm_min, bpm_max, genre, limit)
@@ -8,8 +8,10 @@ from typing import Optional
 
 import httpx
 
+from clients.http import get_async_client
 from music_sources.base import MusicSource, TrackCandidate
 from config import settings
+from services import deadline, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,8 @@ SOUNDNET_API_URL = "https://track-analysis.p.rapidapi.com"
 class SoundNetMusicSource(MusicSource):
     """Music source using SoundNet Track Analysis API via RapidAPI."""
 
+    max_concurrent_searches = 2  # Rate-limited API keys
+
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or settings.soundnet_api_key
         if not self.api_key:
@@ -41,8 +45,47 @@ class SoundNetMusicSource(MusicSource):
         candidates = []
 
         try:
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(
+            with httpx.Client(timeout=deadline.timeout(10.0)) as client:
+                with metrics.upstream("soundnet", "track_search"):
+                    response = client.get(
+                        f"{SOUNDNET_API_URL}/v1/tracks/search",
+                        params={
+                            "bpm_min": bpm_min,
+                            "bpm_max": bpm_max,
+                            "genre": genre,
+                            "limit": limit,
+                        },
+                        headers={
+                            "X-RapidAPI-Key": self.api_key,
+                            "X-RapidAPI-Host": "track-analysis.p.rapidapi.com",
+                        },
+                    )
+                    response.raise_for_status()
+                data = response.json()
+
+            candidates = self._parse_tracks(data, bpm_min, bpm_max, limit)
+
+        except httpx.HTTPError as e:
+            logger.error(f"SoundNet API error: {e}")
+        except Exception as e:
+            logger.error(f"SoundNet unexpected error: {e}")
+
+        logger.info(f"SoundNet: found {len(candidates)} tracks for BPM {bpm_min}-{bpm_max}")
+        return candidates
+
+    async def search_by_bpm_async(
+        self,
+        bpm_min: int,
+        bpm_max: int,
+        genre: str = "rock",
+        limit: int = 10,
+    ) -> list[TrackCandidate]:
+        """Async variant of search_by_bpm using the pooled AsyncClient."""
+        candidates = []
+
+        try:
+            with metrics.upstream("soundnet", "track_search"):
+                response = await get_async_client().get(
                     f"{SOUNDNET_API_URL}/v1/tracks/search",
                     params={
                         "bpm_min": bpm_min,
@@ -54,30 +97,10 @@ class SoundNetMusicSource(MusicSource):
                         "X-RapidAPI-Key": self.api_key,
                         "X-RapidAPI-Host": "track-analysis.p.rapidapi.com",
                     },
+                    timeout=deadline.timeout(10.0),
                 )
                 response.raise_for_status()
-                data = response.json()
-
-            tracks = data.get("tracks", data) if isinstance(data, dict) else data
-            if not isinstance(tracks, list):
-                tracks = []
-
-            for track in tracks[:limit]:
-                bpm = int(track.get("bpm", track.get("tempo", 0)))
-                if bpm_min <= bpm <= bpm_max:
-                    candidates.append(
-                        TrackCandidate(
-                            name=track.get("title", track.get("name", "Unknown")),
-                            artist=track.get("artist", "Unknown"),
-                            bpm=bpm,
-                            energy=float(track.get("energy", 0.5)),
-                            duration_ms=int(track.get("duration_ms", 210000)),
-                            source="soundnet",
-                            source_id=track.get("id"),
-                            album=track.get("album"),
-                            verified_bpm=True,
-                        )
-                    )
+            candidates = self._parse_tracks(response.json(), bpm_min, bpm_max, limit)
 
         except httpx.HTTPError as e:
             logger.error(f"SoundNet API error: {e}")
@@ -86,3 +109,29 @@ class SoundNetMusicSource(MusicSource):
 
         logger.info(f"SoundNet: found {len(candidates)} tracks for BPM {bpm_min}-{bpm_max}")
         return candidates
+
+    @staticmethod
+    def _parse_tracks(data, bpm_min: int, bpm_max: int, limit: int) -> list[TrackCandidate]:
+        """Convert a search response into in-range TrackCandidates."""
+        tracks = data.get("tracks", data) if isinstance(data, dict) else data
+        if not isinstance(tracks, list):
+            tracks = []
+
+        candidates = []
+        for track in tracks[:limit]:
+            bpm = int(track.get("bpm", track.get("tempo", 0)))
+            if bpm_min <= bpm <= bpm_max:
+                candidates.append(
+                    TrackCandidate(
+                        name=track.get("title", track.get("name", "Unknown")),
+                        artist=track.get("artist", "Unknown"),
+                        bpm=bpm,
+                        energy=float(track.get("energy", 0.5)),
+                        duration_ms=int(track.get("duration_ms", 210000)),
+                        source="soundnet",
+                        source_id=track.get("id"),
+                        album=track.get("album"),
+                        verified_bpm=True,
+                    )
+                )
+        return candidates
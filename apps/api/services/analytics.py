@@ -0,0 +1,205 @@
+"""
+Background analytics exporter.
+Request handlers only append events to a bounded in-memory buffer; a worker
+thread ships them to the configured sink (PostHog, a JSON-lines file or
+stdout) in batches, so a slow or unreachable analytics endpoint never adds
+latency to a request.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from services import metrics
+
+try:
+    import posthog as _posthog_module
+except ImportError:
+    _posthog_module = None
+
+logger = logging.getLogger(__name__)
+
+POSTHOG_HOST = "https://us.i.posthog.com"
+
+
+class AnalyticsSink(ABC):
+    """Destination for batches of events ({distinct_id, event, properties, timestamp})."""
+
+    name = "sink"
+
+    @abstractmethod
+    def send(self, events: list[dict]) -> None:
+        """Deliver one batch; raise to have it counted as failed."""
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class PostHogSink(AnalyticsSink):
+    name = "posthog"
+
+    def __init__(self, api_key: str, host: str = POSTHOG_HOST):
+        if _posthog_module is None:
+            raise ValueError("posthog is not installed")
+        _posthog_module.api_key = api_key
+        _posthog_module.host = host
+        self._posthog = _posthog_module
+
+    def send(self, events: list[dict]) -> None:
+        for e in events:
+            # Keywords only: the positional order differs between posthog 3.x and later
+            self._posthog.capture(
+                distinct_id=e["distinct_id"],
+                event=e["event"],
+                properties=e["properties"],
+                timestamp=datetime.fromtimestamp(e["timestamp"], tz=timezone.utc),
+            )
+        self._posthog.flush()
+
+    def close(self) -> None:
+        self._posthog.shutdown()
+
+
+class FileSink(AnalyticsSink):
+    """Append events as JSON lines to a local file."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, events: list[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for e in events:
+                f.write(json.dumps(e, default=str) + "\n")
+
+
+class StdoutSink(AnalyticsSink):
+    name = "stdout"
+
+    def send(self, events: list[dict]) -> None:
+        sys.stdout.write("".join(json.dumps(e, default=str) + "\n" for e in events))
+        sys.stdout.flush()
+
+
+def create_sink(name: str, posthog_api_key: Optional[str] = None, path: str = "") -> Optional[AnalyticsSink]:
+    """Build a sink by name ("posthog", "file", "stdout"). Returns None if it cannot be used."""
+    try:
+        n = name.lower()
+        if n == "posthog":
+            return PostHogSink(posthog_api_key) if posthog_api_key else None
+        elif n == "file":
+            return FileSink(path)
+        elif n == "stdout":
+            return StdoutSink()
+        elif n != "none":
+            logger.warning(f"Unknown analytics sink: {name}")
+        return None
+    except Exception as e:
+        logger.warning(f"Analytics sink '{name}' unavailable: {e}")
+        return None
+
+
+class AnalyticsExporter:
+    """
+    Ring buffer + flush thread in front of an AnalyticsSink.
+
+    capture() never blocks on I/O: when `capacity` events are already
+    waiting, the oldest is dropped (and counted). The worker sends a batch
+    as soon as `batch_size` events are buffered, or every `flush_interval_s`
+    otherwise. stop() drains what is left before closing the sink.
+    """
+
+    def __init__(
+        self,
+        sink: AnalyticsSink,
+        capacity: int = 10000,
+        batch_size: int = 100,
+        flush_interval_s: float = 5.0,
+    ):
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._buffer: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.captured = 0
+        self.dropped = 0
+        self.exported = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="analytics-exporter", daemon=True)
+        self._thread.start()
+        logger.info(f"Analytics exporter started (sink: {self.sink.name})")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything buffered, then close the sink."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.sink.close()
+        except Exception as e:
+            logger.debug(f"Analytics sink close failed: {e}")
+        logger.info(f"Analytics exporter stopped: {self.stats()}")
+
+    def capture(self, distinct_id: str, event: str, properties: Optional[dict] = None) -> None:
+        entry = {
+            "distinct_id": distinct_id,
+            "event": event,
+            "properties": properties or {},
+            "timestamp": time.time(),
+        }
+        with self._lock:
+            if len(self._buffer) == self.capacity:
+                self.dropped += 1
+                metrics.record_analytics("dropped")
+            self._buffer.append(entry)
+            self.captured += 1
+            full_batch = len(self._buffer) >= self.batch_size
+        if full_batch:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Send everything currently buffered, one batch at a time."""
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return
+            try:
+                self.sink.send(batch)
+                self.exported += len(batch)
+                metrics.record_analytics("exported", len(batch))
+            except Exception as e:
+                self.failed += len(batch)
+                metrics.record_analytics("failed", len(batch))
+                logger.debug(f"Analytics export of {len(batch)} events failed: [{type(e).__name__}] {e}")
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "exported": self.exported,
+            "failed": self.failed,
+        }
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+        self.flush()
@@ -9,6 +9,7 @@ from typing import Optional
 import anthropic
 
 from config import settings
+from services import deadline, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -55,11 +56,13 @@ class ArtistExpansionService:
                 f"Suggest {limit * len(artists)} similar artists that would work well for workout playlists. "
                 f"Return ONLY a JSON array of artist names: [\"Artist 1\", \"Artist 2\", ...]"
             )
-            resp = client.messages.create(
-                model=settings.anthropic_model,
-                max_tokens=512,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            with metrics.upstream("claude", "artist_expansion"):
+                resp = client.messages.create(
+                    model=settings.anthropic_model,
+                    max_tokens=512,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=deadline.timeout(deadline.CLAUDE_TIMEOUT_S),
+                )
             text = resp.content[0].text
             s = text.find("[")
             e = text.rfind("]") + 1
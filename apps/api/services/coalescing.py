@@ -0,0 +1,64 @@
+"""
+Single-flight request coalescing.
+Concurrent callers with the same key await one in-flight computation
+instead of each repeating the same upstream work.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent async calls by key.
+
+    The first caller for a key (the leader) starts the computation as a task;
+    callers arriving while it runs await the same task. Nothing is cached once
+    the task finishes — a later call with the same key starts a fresh one.
+
+    The task is shielded, so a caller that disconnects (is cancelled) does not
+    cancel the computation for everyone else waiting on it. Exceptions are
+    propagated to every waiter.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() for key, or join the call already in flight for it."""
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            self.coalesced += 1
+            logger.info(f"[{self.name}] Joined in-flight call ({len(self._inflight)} in flight)")
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        self.started += 1
+
+        def _forget(done: asyncio.Future) -> None:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            # Mark the exception retrieved if every waiter was cancelled
+            if not done.cancelled():
+                done.exception()
+
+        task.add_done_callback(_forget)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,76 @@
+"""
+Per-request time budget for the generate pipeline.
+The orchestrator opens a budget() per request; the composer, curator, music
+sources and Spotify client read it from a context variable to cap upstream
+timeouts and to skip optional stages (Claude re-rank, Deezer verification,
+Spotify resolution) when too little time is left. The context variable
+follows the request into asyncio tasks and to_thread workers. With no
+budget set every helper behaves as if time were unlimited.
+"""
+import logging
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+MIN_TIMEOUT_S = 0.5  # Never hand an upstream call a zero or negative timeout
+CLAUDE_TIMEOUT_S = 120.0  # Cap for one Claude call (the SDK default is 10 minutes)
+
+
+class Deadline:
+    """A point in monotonic time by which the request should be answered."""
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def budget(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Run the with-block under a deadline `seconds` from now (None or 0: unlimited)."""
+    deadline = Deadline(seconds) if seconds else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> float:
+    """Seconds left in the current budget (math.inf if none is set)."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline else math.inf
+
+
+def has_budget(seconds: float) -> bool:
+    """True if at least `seconds` are left in the current budget."""
+    return remaining() >= seconds
+
+
+def timeout(default: float) -> float:
+    """An upstream timeout: `default`, shortened to what is left of the budget."""
+    return max(MIN_TIMEOUT_S, min(default, remaining()))
+
+
+def degrade(stage: str) -> None:
+    """Record that `stage` was skipped or cut short to stay within the budget."""
+    logger.warning(f"Deadline: {stage} ({remaining():.1f}s left)")
+    metrics.record_fallback(f"deadline_{stage}")
@@ -0,0 +1,119 @@
+"""
+Hedged requests for latency-critical upstream calls.
+If the primary attempt has not finished after a delay taken from a recent
+percentile of its own latency, a backup attempt is started and whichever
+finishes first wins; the other is cancelled. Hedging at the p90 adds a
+second call for roughly one request in ten while cutting off the slow tail.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WINDOW_SIZE = 200  # Recent primary latencies the percentile is taken over
+MIN_SAMPLES = 20  # Below this, the configured default delay is used
+
+
+class Hedge:
+    """
+    Hedging policy for one operation (e.g. "parse_workout").
+
+    Keeps a sliding window of primary latencies, recorded only when a call
+    succeeds: the primary's own time when it wins, or, when the backup wins,
+    the time the still-running primary was cut off at (a lower bound that
+    keeps the percentile from drifting below the real tail). A call whose
+    attempts all fail records nothing.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        percentile: float = 0.9,
+        min_delay_s: float = 1.0,
+        default_delay_s: float = 4.0,
+    ):
+        self.operation = operation
+        self.percentile = percentile
+        self.min_delay_s = min_delay_s
+        self.default_delay_s = default_delay_s
+        self._latencies: deque[float] = deque(maxlen=WINDOW_SIZE)
+        self.fired = 0
+        self.backup_wins = 0
+
+    def observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def delay(self) -> float:
+        """Seconds to wait on the primary before starting the backup."""
+        if len(self._latencies) < MIN_SAMPLES:
+            return self.default_delay_s
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return max(self.min_delay_s, ordered[index])
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        backup: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        Await primary(); if it is still running after delay(), also start
+        backup() and return the first successful result. An attempt that
+        fails while the other is still running is ignored; if both fail,
+        the primary's exception is raised. A primary that fails before the
+        hedge fires is not retried.
+        """
+        start = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        delay = self.delay()
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except BaseException:
+            first.cancel()
+            raise
+        if done:
+            if first.exception() is None:  # Fast failures (auth, 400s) would drag the percentile down
+                self.observe(time.monotonic() - start)
+            metrics.record_hedge(self.operation, "not_needed")
+            return first.result()
+
+        self.fired += 1
+        metrics.record_hedge(self.operation, "fired")
+        logger.info(f"[hedge] {self.operation}: primary still running after {delay:.1f}s, starting backup")
+        second = asyncio.ensure_future(backup())
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (first, second):
+                    if task in done and task.exception() is None:
+                        winner = "primary" if task is first else "backup"
+                        self.observe(time.monotonic() - start)
+                        if task is second:
+                            self.backup_wins += 1
+                        metrics.record_hedge(self.operation, f"{winner}_won")
+                        logger.info(f"[hedge] {self.operation}: {winner} won after {time.monotonic() - start:.1f}s")
+                        return task.result()
+            second.exception()  # Retrieved; the primary's error is the one reported
+            raise first.exception()
+        finally:
+            for task in (first, second):
+                if not task.done():
+                    task.cancel()
+                    metrics.record_hedge(self.operation, "cancelled")
+
+    def stats(self) -> dict:
+        return {
+            "delay_s": round(self.delay(), 2),
+            "samples": len(self._latencies),
+            "fired": self.fired,
+            "backup_wins": self.backup_wins,
+        }
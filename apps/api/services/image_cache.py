@@ -0,0 +1,99 @@
+"""
+Cache of validated workout parses from whiteboard photos.
+A whole class photographs the same whiteboard, so each upload is keyed by a
+content hash of the decoded bytes; an exact re-upload returns the cached
+WorkoutStructure instead of a Claude Vision call. Near-duplicate photos are
+deliberately not matched: a perceptual hash cannot tell "AMRAP 20" from
+"AMRAP 12" on the same board, and a wrong parse would be served silently.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from models.schemas import WorkoutStructure
+from services import metrics
+from services.parse_cache import canonicalize
+
+logger = logging.getLogger(__name__)
+
+
+class ImageFingerprint(NamedTuple):
+    """Hash identifying a photo plus the text sent along with it."""
+    sha256: str
+    text_key: str
+
+
+class ImageParseCache:
+    """
+    LRU (with TTL) of WorkoutStructure by image fingerprint.
+
+    Entries only match the same image bytes sent with the same
+    (canonicalized) additional text, since that text changes the parse.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_s: float = 24 * 3600,
+        namespace: str = "",
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.namespace = namespace
+        self._entries: OrderedDict[str, tuple[float, WorkoutStructure]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, image_bytes: bytes, additional_text: str = "") -> ImageFingerprint:
+        """Hash the upload once per request; pass the result to get() and put()."""
+        return ImageFingerprint(
+            sha256=hashlib.sha256(image_bytes).hexdigest(),
+            text_key=f"{self.namespace}\0{canonicalize(additional_text)}",
+        )
+
+    def get(self, fp: ImageFingerprint) -> Optional[WorkoutStructure]:
+        """Return a copy of the parse of this exact photo and text, or None."""
+        key = self._key(fp)
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.record_parse_cache("image_hit")
+                return entry[1].model_copy(deep=True)
+
+            self.misses += 1
+            metrics.record_parse_cache("image_miss")
+            return None
+
+    def put(self, fp: ImageFingerprint, workout: WorkoutStructure) -> None:
+        key = self._key(fp)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_s, workout.model_copy(deep=True))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _key(fp: ImageFingerprint) -> str:
+        return f"{fp.text_key}\0{fp.sha256}"
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
@@ -0,0 +1,156 @@
+"""
+Preprocessing for whiteboard photos before vision parsing.
+Phones upload 12-megapixel photos, but Claude downsizes anything larger than
+about 1568 px on the long edge (~1.15 MP) before reading it, so the extra
+pixels only cost upload time. The photo is decoded once, auto-oriented,
+downscaled to that size, optionally turned into high-contrast grayscale and
+re-encoded as a compact JPEG/WebP.
+"""
+import base64
+import binascii
+import io
+import logging
+import math
+from typing import NamedTuple, Optional
+
+from services import metrics
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Photos are forwarded unchanged
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Largest image the vision model uses without resizing it first
+MAX_EDGE_PX = 1568
+MAX_PIXELS = 1_150_000
+JPEG_QUALITY = 85
+# Grayscale boards whose 1st-99th percentile brightness spans fewer levels
+# than this (glare, dim gym lighting) get their contrast stretched
+LOW_CONTRAST_SPREAD = 160
+
+OUTPUT_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+class LoadedImage(NamedTuple):
+    """An upload decoded once: raw bytes plus the oriented picture (None without Pillow or if unreadable)."""
+    data: bytes
+    image: Optional["Image.Image"]
+    original_size: Optional[tuple[int, int]]
+
+
+class ShrunkImage(NamedTuple):
+    image_base64: str
+    media_type: str
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def target_size(width: int, height: int, max_edge_px: int = MAX_EDGE_PX) -> tuple[int, int]:
+    """Size the image is scaled to: within max_edge_px and MAX_PIXELS, never upscaled."""
+    scale = min(1.0, max_edge_px / max(width, height), math.sqrt(MAX_PIXELS / (width * height)))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def load(image_base64: str, max_edge_px: int = MAX_EDGE_PX, grayscale: bool = True) -> Optional[LoadedImage]:
+    """
+    Decode the upload. Returns None if the base64 is invalid. JPEGs are
+    decoded straight to (about) the target size, which is much faster than
+    decoding all 12 MP and resizing.
+    """
+    try:
+        data = base64.b64decode(image_base64, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if Image is None:
+        return LoadedImage(data, None, None)
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        original_size = img.size
+        img.draft("L" if grayscale else "RGB", target_size(*img.size, max_edge_px))
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"Could not decode workout image: [{type(e).__name__}] {e}")
+        return LoadedImage(data, None, None)
+    return LoadedImage(data, img, original_size)
+
+
+def shrink(
+    loaded: LoadedImage,
+    image_base64: str,
+    media_type: str,
+    max_edge_px: int = MAX_EDGE_PX,
+    grayscale: bool = True,
+    output_format: str = "jpeg",
+    quality: int = JPEG_QUALITY,
+) -> ShrunkImage:
+    """
+    Downscale and re-encode a loaded photo. The original upload is kept when
+    it could not be decoded or when re-encoding would not make it smaller.
+    """
+    before = len(loaded.data)
+    unchanged = ShrunkImage(image_base64, media_type, before, before)
+    if loaded.image is None:
+        metrics.record_image_bytes(before, before)
+        return unchanged
+
+    img = _flatten(loaded.image)
+    if img.size != target_size(*img.size, max_edge_px):
+        img = img.resize(target_size(*img.size, max_edge_px), Image.Resampling.LANCZOS)
+    if grayscale:
+        img = _high_contrast(img.convert("L"))
+
+    fmt, out_media_type = OUTPUT_FORMATS.get(output_format, OUTPUT_FORMATS["jpeg"])
+    buf = io.BytesIO()
+    img.save(buf, fmt, quality=quality, optimize=True)
+    data = buf.getvalue()
+
+    if len(data) >= before:
+        metrics.record_image_bytes(before, before)
+        return unchanged
+
+    w0, h0 = loaded.original_size
+    logger.info(
+        f"Workout image {w0}x{h0} {media_type} -> {img.width}x{img.height} {out_media_type}: "
+        f"{before} -> {len(data)} bytes ({before - len(data)} saved)"
+    )
+    metrics.record_image_bytes(before, len(data))
+    return ShrunkImage(base64.b64encode(data).decode("ascii"), out_media_type, before, len(data))
+
+
+def _flatten(img: "Image.Image") -> "Image.Image":
+    """First frame on a white background, as RGB or L."""
+    if img.mode in ("RGB", "L"):
+        return img
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _high_contrast(gray: "Image.Image") -> "Image.Image":
+    histogram = gray.histogram()
+    total = sum(histogram)
+    lo, hi = _percentile(histogram, total * 0.01), _percentile(histogram, total * 0.99)
+    if hi - lo < LOW_CONTRAST_SPREAD:
+        return ImageOps.autocontrast(gray, cutoff=1)
+    return gray
+
+
+def _percentile(histogram: list[int], rank: float) -> int:
+    seen = 0
+    for level, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return level
+    return len(histogram) - 1
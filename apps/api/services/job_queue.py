@@ -0,0 +1,165 @@
+"""
+In-process background job queue for long-running generate calls.
+A fixed pool of asyncio workers drains a bounded queue; finished jobs are
+kept for a TTL so clients can poll for the result.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from models.schemas import GenerateError, GenerateJobResponse
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    id: str
+    run: Callable[[], Awaitable[Any]] = field(repr=False)
+    seq: int = 0
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[GenerateError] = None
+
+
+class JobQueue:
+    """
+    Bounded worker pool for generate jobs.
+
+    submit() never blocks: when max_depth jobs are already waiting it raises
+    QueueFullError so the endpoint can answer 503 instead of accepting work
+    it cannot start soon. A job's run() raising an exception with status_code
+    and detail attributes (e.g. HTTPException) is recorded as that error;
+    anything else is recorded as a 500.
+    """
+
+    def __init__(self, workers: int, max_depth: int, ttl_s: float):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.ttl_s = ttl_s
+        self._jobs: dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._seq = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue started: {self.workers} workers, depth {self.max_depth}")
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs still queued or running are marked failed."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            if job.status in ("queued", "running"):
+                self._finish(job, error=GenerateError(status_code=503, detail="Server shutting down. Please retry."))
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, run: Callable[[], Awaitable[Any]]) -> Job:
+        """Enqueue run() and return its Job. Raises QueueFullError if the queue is full."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been called")
+        self._prune()
+
+        self._seq += 1
+        job = Job(id=uuid.uuid4().hex, run=run, seq=self._seq)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"Job queue full ({self.max_depth} waiting)")
+
+        self._jobs[job.id] = job
+        logger.info(f"Job {job.id} queued (depth {self.depth()})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if unknown or expired."""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def to_response(self, job: Job) -> GenerateJobResponse:
+        queue_position = None
+        if job.status == "queued":
+            queue_position = sum(
+                1 for other in self._jobs.values()
+                if other.status == "queued" and other.seq < job.seq
+            )
+        return GenerateJobResponse(
+            job_id=job.id,
+            status=job.status,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            queue_position=queue_position,
+            result=job.result,
+            error=job.error,
+        )
+
+    def stats(self) -> dict:
+        counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {**counts, "depth": self.depth(), "rejected": self.rejected}
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        wait_s = job.started_at - job.created_at
+        logger.info(f"Job {job.id} started after {wait_s:.1f}s in queue")
+        try:
+            result = await job.run()
+        except asyncio.CancelledError:
+            self._finish(job, error=GenerateError(status_code=503, detail="Server shutting down. Please retry."))
+            raise
+        except Exception as e:
+            status_code = getattr(e, "status_code", 500)
+            detail = getattr(e, "detail", None) or "Failed to generate playlist. Please try again."
+            self._finish(job, error=GenerateError(status_code=status_code, detail=str(detail)))
+            logger.warning(f"Job {job.id} failed: [{type(e).__name__}] {detail}")
+            return
+        self._finish(job, result=result)
+        logger.info(f"Job {job.id} succeeded in {job.finished_at - job.started_at:.1f}s")
+
+    @staticmethod
+    def _finish(job: Job, result: Any = None, error: Optional[GenerateError] = None) -> None:
+        job.status = "failed" if error else "succeeded"
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.run = None  # Drop the closure (request body, image) once done
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the TTL."""
+        cutoff = time.time() - self.ttl_s
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
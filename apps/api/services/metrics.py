@@ -0,0 +1,210 @@
+"""
+Prometheus metrics for the generate pipeline, exposed at /metrics.
+Per-stage and per-upstream-call latency histograms, fallback counters and
+in-flight gauges. Every helper is a no-op if prometheus_client is not installed.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import prometheus_client as _prom
+except ImportError:
+    _prom = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds. Local stages land in the low buckets, Claude calls in the high ones.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus_client is unavailable."""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+
+_NOOP = _NoopMetric()
+
+
+def _histogram(name: str, documentation: str, labelnames: tuple = ()):
+    if _prom is None:
+        return _NOOP
+    return _prom.Histogram(name, documentation, labelnames, buckets=LATENCY_BUCKETS)
+
+
+def _counter(name: str, documentation: str, labelnames: tuple = ()):
+    if _prom is None:
+        return _NOOP
+    return _prom.Counter(name, documentation, labelnames)
+
+
+def _gauge(name: str, documentation: str, labelnames: tuple = ()):
+    if _prom is None:
+        return _NOOP
+    return _prom.Gauge(name, documentation, labelnames)
+
+
+PARSE_SECONDS = _histogram(
+    "crank_parse_seconds", "Workout parse latency", ("input_type",))
+PREFETCH_SECONDS = _histogram(
+    "crank_prefetch_seconds", "Candidate prefetch latency per music source", ("source",))
+SELECTION_SECONDS = _histogram(
+    "crank_selection_seconds", "Local scoring and selection latency per phase")
+VALIDATION_SECONDS = _histogram(
+    "crank_validation_seconds", "Validation latency", ("target",))
+SPOTIFY_RESOLUTION_SECONDS = _histogram(
+    "crank_spotify_resolution_seconds", "Spotify resolution latency for a whole playlist")
+UPSTREAM_SECONDS = _histogram(
+    "crank_upstream_request_seconds", "Latency of individual upstream API calls",
+    ("service", "operation", "outcome"))
+FALLBACKS = _counter(
+    "crank_fallbacks_total", "Degraded paths taken (empty batch search, source fallback, ...)", ("kind",))
+SPECULATIVE_PREFETCH = _counter(
+    "crank_speculative_prefetch_total",
+    "Phases served by (hit) or missing from (miss) a speculative prefetch, and unused guesses (discarded)",
+    ("outcome",))
+PARSE_CACHE = _counter(
+    "crank_parse_cache_total",
+    "Workout parse lookups by outcome (named_wod, memory_hit, sqlite_hit, miss, "
+    "similar_hit, similar_miss, image_hit, image_miss)",
+    ("outcome",))
+POOL_CACHE = _counter(
+    "crank_pool_cache_total",
+    "Candidate pool cache lookups by outcome (hit, stale_hit, miss, expired)", ("outcome",))
+FEEDBACK = _counter(
+    "crank_feedback_total", "Track feedback events learned by rating (like, dislike, clear)", ("rating",))
+CLAUDE_TOKENS = _counter(
+    "crank_claude_tokens_total",
+    "Claude tokens by operation and kind (input, output)",
+    ("operation", "kind"))
+RULE_PARSES = _counter(
+    "crank_rule_parser_total", "Local rule parses by outcome (accepted, fallback, invalid)", ("outcome",))
+IMAGE_BYTES = _counter(
+    "crank_image_bytes_total", "Workout photo bytes uploaded (original) and sent to vision (sent)", ("stage",))
+HEDGED_REQUESTS = _counter(
+    "crank_hedged_requests_total",
+    "Hedged upstream calls by outcome (not_needed, fired, primary_won, backup_won, cancelled)",
+    ("operation", "outcome"))
+ANALYTICS_EVENTS = _counter(
+    "crank_analytics_events_total", "Analytics events by outcome (exported, dropped, failed)", ("outcome",))
+IN_FLIGHT = _gauge(
+    "crank_in_flight", "Generate requests currently being processed", ("endpoint",))
+UPSTREAM_IN_FLIGHT = _gauge(
+    "crank_upstream_in_flight", "Upstream API calls currently waiting on a response", ("service",))
+
+
+def enabled() -> bool:
+    return _prom is not None
+
+
+@contextmanager
+def timed(histogram, **labels) -> Iterator[None]:
+    """Observe the duration of the with-block (also on exceptions)."""
+    metric = histogram.labels(**labels) if labels else histogram
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start)
+
+
+@contextmanager
+def upstream(service: str, operation: str) -> Iterator[None]:
+    """
+    Time one upstream API call (claude, deezer, spotify, lastfm, getsongbpm, soundnet).
+
+    Works around both sync calls and awaits. An exception escaping the block
+    is recorded with outcome="error" and re-raised.
+    """
+    gauge = UPSTREAM_IN_FLIGHT.labels(service=service)
+    gauge.inc()
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        outcome = "cancelled"  # e.g. the losing attempt of a hedged request
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        gauge.dec()
+        UPSTREAM_SECONDS.labels(service=service, operation=operation, outcome=outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+@contextmanager
+def in_flight(endpoint: str) -> Iterator[None]:
+    """Count a generate request as in flight for the duration of the block."""
+    gauge = IN_FLIGHT.labels(endpoint=endpoint)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def record_fallback(kind: str) -> None:
+    FALLBACKS.labels(kind=kind).inc()
+
+
+def record_speculation(outcome: str, count: int = 1) -> None:
+    if count:
+        SPECULATIVE_PREFETCH.labels(outcome=outcome).inc(count)
+
+
+def record_parse_cache(outcome: str) -> None:
+    PARSE_CACHE.labels(outcome=outcome).inc()
+
+
+def record_pool_cache(outcome: str) -> None:
+    POOL_CACHE.labels(outcome=outcome).inc()
+
+
+def record_feedback(rating: str) -> None:
+    FEEDBACK.labels(rating=rating).inc()
+
+
+def record_claude_tokens(operation: str, tokens: dict[str, int]) -> None:
+    for kind, count in tokens.items():
+        if count:
+            CLAUDE_TOKENS.labels(operation=operation, kind=kind).inc(count)
+
+
+def record_rule_parse(outcome: str) -> None:
+    RULE_PARSES.labels(outcome=outcome).inc()
+
+
+def record_image_bytes(original: int, sent: int) -> None:
+    IMAGE_BYTES.labels(stage="original").inc(original)
+    IMAGE_BYTES.labels(stage="sent").inc(sent)
+
+
+def record_hedge(operation: str, outcome: str) -> None:
+    HEDGED_REQUESTS.labels(operation=operation, outcome=outcome).inc()
+
+
+def record_analytics(outcome: str, count: int = 1) -> None:
+    ANALYTICS_EVENTS.labels(outcome=outcome).inc(count)
+
+
+def render() -> Optional[tuple[bytes, str]]:
+    """Return (body, content type) in the Prometheus text format, or None if disabled."""
+    if _prom is None:
+        return None
+    return _prom.generate_latest(), _prom.CONTENT_TYPE_LATEST
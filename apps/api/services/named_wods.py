@@ -0,0 +1,99 @@
+"""
+Registry of benchmark and hero WODs (Fran, Murph, Grace, ...).
+Loaded from data/named_wods.json at startup; each entry is a pre-validated
+WorkoutStructure plus the aliases it is commonly submitted as, so these
+workouts are answered without a Claude call.
+"""
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Callable, Optional
+
+from models.schemas import WorkoutStructure
+from services.parse_cache import canonicalize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "named_wods.json"
+
+# Words that do not change which benchmark a submission refers to
+FILLER_WORDS = {"and", "&", "rx", "the", "wod", "benchmark", "workout", "lb", "kg", "with"}
+
+
+def alias_key(text: str) -> str:
+    """
+    Canonical text with the details athletes vary but that do not change the
+    WOD dropped: Rx weights ("95/65", "135 lb"), time estimates ("~5-10 min")
+    and filler words. "Fran 95/65" and "fran" share a key.
+    """
+    t = canonicalize(text)
+    t = re.sub(r"~\s*\d+(?:-\d+)?\s*min", " ", t)
+    t = re.sub(r"\b\d+(?:/\d+)+\b", " ", t)
+    t = re.sub(r"\b\d+ (?=lb\b|kg\b)", " ", t)
+    return " ".join(w for w in t.split() if w not in FILLER_WORDS)
+
+
+class NamedWodRegistry:
+    """Exact alias lookup from workout text to a named WorkoutStructure."""
+
+    def __init__(self, wods: Optional[dict[str, WorkoutStructure]] = None):
+        self._wods: dict[str, WorkoutStructure] = wods or {}
+        self._aliases: dict[str, str] = {}
+
+    @classmethod
+    def load(
+        cls,
+        path: Path = DEFAULT_PATH,
+        validate: Optional[Callable[[WorkoutStructure], tuple[bool, Optional[str]]]] = None,
+    ) -> "NamedWodRegistry":
+        """
+        Build the registry from a JSON data file. Entries that fail `validate`
+        (e.g. WorkoutParserAgent.validate) are skipped with a warning; a
+        missing or unreadable file gives an empty registry.
+        """
+        registry = cls()
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Named WOD registry not loaded from {path}: [{type(e).__name__}] {e}")
+            return registry
+
+        for entry in data.get("wods", []):
+            try:
+                workout = WorkoutStructure.model_validate(entry["workout"])
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping named WOD {entry.get('name')}: [{type(e).__name__}] {e}")
+                continue
+            if validate is not None:
+                is_valid, error_msg = validate(workout)
+                if not is_valid:
+                    logger.warning(f"Skipping named WOD {entry['name']}: {error_msg}")
+                    continue
+            registry.add(entry["name"], workout, entry.get("aliases", []))
+
+        logger.info(f"Loaded {len(registry)} named WODs from {Path(path).name}")
+        return registry
+
+    def add(self, name: str, workout: WorkoutStructure, aliases: list[str]) -> None:
+        self._wods[name] = workout
+        for alias in [name, *aliases]:
+            key = alias_key(alias)
+            existing = self._aliases.get(key)
+            if existing and existing != name:
+                logger.warning(f"Named WOD alias '{alias}' of {name} already maps to {existing}")
+                continue
+            self._aliases[key] = name
+
+    def match(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """Return a copy of the named WOD this text refers to, or None."""
+        name = self._aliases.get(alias_key(workout_text))
+        if name is None:
+            return None
+        return self._wods[name].model_copy(deep=True)
+
+    def names(self) -> list[str]:
+        return list(self._wods)
+
+    def __len__(self) -> int:
+        return len(self._wods)
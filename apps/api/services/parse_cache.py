@@ -0,0 +1,219 @@
+"""
+Cache of validated workout parses, keyed by canonicalized workout text.
+The same WOD is submitted by many athletes on the same day, and again on
+later days, so repeat parses are served from an in-memory LRU (with TTL)
+and, optionally, a SQLite file that survives restarts. Only the LRU is
+touched on the event loop: get_async() reads SQLite in a worker thread and
+put() hands the write to a background writer.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from models.schemas import WorkoutStructure
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Unit spellings -> one canonical form. Applied to whole words only.
+UNIT_ALIASES = {
+    "min": ("minutes", "minute", "mins"),
+    "sec": ("seconds", "second", "secs"),
+    "lb": ("pounds", "pound", "lbs"),
+    "kg": ("kilograms", "kilogram", "kgs", "kilos"),
+    "m": ("meters", "meter", "metres", "metre"),
+    "cal": ("calories", "calorie", "cals"),
+    "rounds": ("round", "rds", "rd", "rnds"),
+}
+_UNIT_PATTERNS = [
+    (re.compile(r"\b(?:" + "|".join(aliases) + r")\b"), unit)
+    for unit, aliases in UNIT_ALIASES.items()
+]
+# Rep schemes: 21 - 15 - 9, 21/15/9, 21,15,9 (three or more numbers)
+REP_SCHEME = re.compile(r"\b\d+(?:\s*[-/,]\s*\d+){2,}\b")
+DASHES = re.compile(r"[‐-―−]")
+
+
+def normalize_rep_schemes(text: str) -> str:
+    """Unify dashes and write every rep scheme as "21-15-9"."""
+    text = DASHES.sub("-", text)
+    return REP_SCHEME.sub(lambda m: "-".join(re.findall(r"\d+", m.group(0))), text)
+
+
+def canonicalize(text: str) -> str:
+    """
+    Normalize workout text so trivially different submissions share a key.
+
+    Lowercases, unifies dashes and rep-scheme punctuation ("21 – 15 – 9",
+    "21/15/9" -> "21-15-9"), splits numbers from units ("20mins" -> "20 min"),
+    maps unit spellings to one form, drops hyphens inside words and
+    sentence punctuation, and collapses whitespace.
+    """
+    t = normalize_rep_schemes(text.lower())
+    t = re.sub(r"(\d)\s*#", r"\1 lb", t)
+    t = re.sub(r"(\d)([a-z])", r"\1 \2", t)
+    for pattern, unit in _UNIT_PATTERNS:
+        t = pattern.sub(unit, t)
+    t = re.sub(r"(?<=[a-z])-(?=[a-z])", "", t)
+    t = re.sub(r"[:;,!?()]|\.(?!\d)", " ", t)
+    return " ".join(t.split())
+
+
+class ParseCache:
+    """
+    Two-tier cache of WorkoutStructure by canonical text.
+
+    `namespace` separates parsers that may answer differently (mock vs Claude,
+    different models). The SQLite tier is optional; its hits are promoted to
+    memory, and writes to it are queued behind put() (see flush()). Entries
+    older than ttl_s are ignored in both tiers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 7 * 24 * 3600,
+        sqlite_path: Optional[str] = None,
+        namespace: str = "",
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.namespace = namespace
+        self._memory: OrderedDict[str, tuple[float, WorkoutStructure]] = OrderedDict()
+        self._lock = threading.Lock()  # Guards the LRU and counters
+        self._db_lock = threading.Lock()  # Guards the connection, shared by readers and the writer
+        self._db: Optional[sqlite3.Connection] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+
+        if sqlite_path:
+            try:
+                self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS parse_cache "
+                    "(key TEXT PRIMARY KEY, workout TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.commit()
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="parse-cache")
+                logger.info(f"Parse cache persisted to {sqlite_path}")
+            except sqlite3.Error as e:
+                logger.warning(f"Parse cache SQLite tier disabled: [{type(e).__name__}] {e}")
+                self._db = None
+
+    def key(self, workout_text: str) -> str:
+        canonical = canonicalize(workout_text)
+        return hashlib.sha256(f"{self.namespace}\0{canonical}".encode()).hexdigest()
+
+    def get(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """Return a copy of the cached parse, or None. Reads SQLite on the calling thread."""
+        key = self.key(workout_text)
+        now = time.time()
+        workout = self._memory_get(key, now)
+        if workout is None and self._db is not None:
+            workout = self._disk_get(key, now)
+        if workout is None:
+            self._miss()
+        return workout
+
+    async def get_async(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """Async variant of get(): a memory miss is looked up in SQLite off the event loop."""
+        key = self.key(workout_text)
+        now = time.time()
+        workout = self._memory_get(key, now)
+        if workout is None and self._db is not None:
+            workout = await asyncio.to_thread(self._disk_get, key, now)
+        if workout is None:
+            self._miss()
+        return workout
+
+    def put(self, workout_text: str, workout: WorkoutStructure) -> None:
+        """Store in memory now; the SQLite write runs on the background writer."""
+        key = self.key(workout_text)
+        now = time.time()
+        stored = workout.model_copy(deep=True)
+        with self._lock:
+            self._remember(key, stored, now)
+        if self._writer is not None:
+            self._writer.submit(self._sqlite_put, key, stored.model_dump_json(), now + self.ttl_s)
+
+    def flush(self) -> None:
+        """Block until every queued SQLite write has been committed."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "sqlite_hits": self.sqlite_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, workout: WorkoutStructure, now: float) -> None:
+        self._memory[key] = (now + self.ttl_s, workout)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _memory_get(self, key: str, now: float) -> Optional[WorkoutStructure]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                metrics.record_parse_cache("memory_hit")
+                return entry[1].model_copy(deep=True)
+            if entry:
+                del self._memory[key]
+            return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[WorkoutStructure]:
+        workout = self._sqlite_get(key, now)
+        if workout is None:
+            return None
+        with self._lock:
+            self._remember(key, workout, now)
+            self.hits += 1
+            self.sqlite_hits += 1
+        metrics.record_parse_cache("sqlite_hit")
+        return workout.model_copy(deep=True)
+
+    def _miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+        metrics.record_parse_cache("miss")
+
+    def _sqlite_get(self, key: str, now: float) -> Optional[WorkoutStructure]:
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT workout, expires_at FROM parse_cache WHERE key = ?", (key,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Parse cache read failed: [{type(e).__name__}] {e}")
+            return None
+        if row is None or row[1] <= now:
+            return None
+        return WorkoutStructure.model_validate_json(row[0])
+
+    def _sqlite_put(self, key: str, workout_json: str, expires_at: float) -> None:
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO parse_cache (key, workout, expires_at) VALUES (?, ?, ?)",
+                    (key, workout_json, expires_at),
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Parse cache write failed: [{type(e).__name__}] {e}")
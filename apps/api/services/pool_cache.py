@@ -0,0 +1,157 @@
+"""
+Cross-request cache of candidate pools.
+Phases map onto a handful of BPM buckets (BPM_MAPPING) and genres, so nearly
+every request asks the music source the same few dozen questions. Pools are
+cached by (source, BPM range, genre, energy floor) in a size-bounded LRU with
+a TTL per source. Past its TTL an entry is still served for a grace period
+while one background search refreshes it, and every request draws a random
+sample of the cached pool so repeat requests still get varied playlists.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from models.candidate_pool import CandidatePool
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+PoolKey = tuple[str, int, int, str, float]  # source, bpm_min, bpm_max, genre, energy floor
+
+
+def pool_key(source: str, bpm_range: tuple[int, int], genre: str, energy: float) -> PoolKey:
+    return source, bpm_range[0], bpm_range[1], genre.lower(), round(energy, 2)
+
+
+@dataclass
+class _Entry:
+    pool: CandidatePool
+    covers_min: float  # Longest phase the pool was fetched for (inf: duration-independent search)
+    fresh_until: float
+    stale_until: float
+
+
+class PoolCache:
+    """
+    LRU of CandidatePools with per-source TTLs and stale-while-revalidate.
+
+    get() returns (sampled pool, stale); when stale is True the caller should
+    refresh the entry, and start_refresh() makes sure only one caller does.
+    A source with a TTL of 0 is never cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_s: float = 6 * 3600,
+        source_ttls_s: Optional[dict[str, float]] = None,
+        stale_s: float = 3600,
+        sample: float = 0.75,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.source_ttls_s = source_ttls_s or {}
+        self.stale_s = stale_s
+        self.sample_ratio = sample
+        self._entries: OrderedDict[PoolKey, _Entry] = OrderedDict()
+        self._refreshing: set[PoolKey] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def enabled_for(self, source: str) -> bool:
+        return self.ttl(source) > 0
+
+    def ttl(self, source: str) -> float:
+        return self.source_ttls_s.get(source, self.ttl_s)
+
+    def get(
+        self,
+        key: PoolKey,
+        duration_min: float = 0,
+        limit: Optional[int] = None,
+    ) -> Optional[tuple[CandidatePool, bool]]:
+        """
+        A sample of the cached pool and whether it is stale, or None. Pools
+        fetched for a shorter phase than duration_min do not count as hits.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.covers_min < duration_min:
+                self.misses += 1
+                metrics.record_pool_cache("miss")
+                return None
+            if entry.stale_until <= now:
+                del self._entries[key]
+                self.misses += 1
+                metrics.record_pool_cache("expired")
+                return None
+            self._entries.move_to_end(key)
+            stale = entry.fresh_until <= now
+            if stale:
+                self.stale_hits += 1
+                metrics.record_pool_cache("stale_hit")
+            else:
+                self.hits += 1
+                metrics.record_pool_cache("hit")
+            pool, covers_min = entry.pool, entry.covers_min
+        return self.sample(pool, limit=limit, need=duration_min / covers_min if covers_min else 0), stale
+
+    def put(self, key: PoolKey, pool: CandidatePool, covers_min: float = math.inf) -> None:
+        """Store a freshly fetched pool (empty pools are not cached)."""
+        ttl = self.ttl(key[0])
+        with self._lock:
+            self._refreshing.discard(key)
+            if ttl <= 0 or not pool:
+                return
+            now = time.monotonic()
+            self._entries[key] = _Entry(pool, covers_min, now + ttl, now + ttl + self.stale_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def start_refresh(self, key: PoolKey) -> bool:
+        """Claim the refresh of a stale entry; False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def end_refresh(self, key: PoolKey) -> None:
+        """Release a refresh claim (put() does this on success)."""
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def sample(self, pool: CandidatePool, limit: Optional[int] = None, need: float = 0) -> CandidatePool:
+        """
+        Random rows of pool, in pool order: sample_ratio of them (at most
+        limit), but never fewer than the share `need` a phase requires.
+        """
+        size = math.ceil(len(pool) * self.sample_ratio)
+        if limit is not None:
+            size = min(size, limit)
+        size = min(len(pool), max(size, math.ceil(len(pool) * need)))
+        if size >= len(pool):
+            return pool
+        return pool.take(sorted(random.sample(range(len(pool)), size)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
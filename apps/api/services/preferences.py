@@ -0,0 +1,221 @@
+"""
+Online per-user preference weights learned from track feedback.
+Each feedback event updates a user's weights in O(1). Track ratings are kept
+exactly, by track id, so only a track the user rated can be hidden or get a
+like bonus; artist affinity lives in a small array of hashed slots (allocated
+on the first artist update), where a collision only shifts a score. Both
+decay with a half-life, the slots through a per-user scale factor instead of
+touching every slot. Scoring reads one slot per distinct artist and one dict
+entry per candidate track. The boost/hidden header sets the frontend sends
+are merged into the weights on every request (new entries applied, dropped
+ones withdrawn), so they need not be applied separately and are not lost
+when feedback reached the store first.
+"""
+import logging
+import math
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from models.candidate_pool import CandidatePool
+from services import metrics, scoring
+
+logger = logging.getLogger(__name__)
+
+HIDE_TRACK_BELOW = -0.5  # Track weight at or below which a candidate is dropped (a recent thumbs down)
+RESCALE_AFTER = 2.0 ** 20  # Fold decay into the slots once the scale factor grows this large
+MAX_RATINGS = 1000  # Track ratings kept per user; the oldest is forgotten beyond this
+
+
+class UserWeights:
+    """
+    One user's weights: exact track ratings, and hashed artist slots. A slot
+    holds weight * exp(rate * (t - ref)), so a decayed read is
+    slot * exp(-rate * (now - ref)) and an update at t adds
+    delta * exp(rate * (t - ref)), both without visiting other slots.
+    """
+
+    __slots__ = ("slots", "mask", "rate", "ref", "ratings", "max_ratings", "header_artists", "header_tracks")
+
+    def __init__(self, buckets: int, rate: float, now: float, max_ratings: int = MAX_RATINGS):
+        self.slots: Optional[array] = None  # Artist slots, allocated on the first artist update
+        self.mask = buckets - 1
+        self.rate = rate
+        self.ref = now
+        self.ratings: dict[str, tuple[int, float, Optional[str]]] = {}  # track_id -> (rating, time, artist), oldest first
+        self.max_ratings = max_ratings
+        self.header_artists: dict[str, tuple[str, float]] = {}  # lowercased -> (artist, time) boosted from headers
+        self.header_tracks: set[str] = set()  # Ratings that came from the hidden-tracks header
+
+    def _slot(self, artist: str) -> int:
+        return zlib.crc32(artist.lower().encode()) & self.mask
+
+    def _add_artist(self, artist: str, delta: float, at: float) -> None:
+        if self.slots is None:
+            self.slots = array("f", bytes(4 * (self.mask + 1)))
+        self.slots[self._slot(artist)] += delta * math.exp(self.rate * (at - self.ref))
+
+    def rate_track(self, track_id: str, artist: Optional[str], rating: int, now: float) -> None:
+        """Apply a rating (1, -1, or 0 to clear), replacing this track's previous one."""
+        if self.rate * (now - self.ref) > math.log(RESCALE_AFTER):
+            self._rescale(now)
+        self._forget(track_id)
+        if rating:
+            if artist:
+                self._add_artist(artist, rating, now)
+            self.ratings[track_id] = (rating, now, artist)
+            while len(self.ratings) > self.max_ratings:
+                self._forget(next(iter(self.ratings)))
+
+    def apply_headers(self, boost_artists: Iterable[str], hidden_tracks: Iterable[str], now: float) -> None:
+        """
+        Merge the current header sets: boost artists and hide tracks not yet
+        applied, and withdraw header boosts and hides the frontend dropped.
+        Tracks the user rated directly are left to their own rating.
+        """
+        artists = {artist.lower(): artist for artist in boost_artists}
+        for key in self.header_artists.keys() - artists.keys():
+            artist, boosted_at = self.header_artists.pop(key)
+            self._add_artist(artist, -1.0, boosted_at)
+        for key in artists.keys() - self.header_artists.keys():
+            self._add_artist(artists[key], 1.0, now)
+            self.header_artists[key] = (artists[key], now)
+
+        hidden = set(hidden_tracks)
+        for track_id in self.header_tracks - hidden:
+            self.rate_track(track_id, None, 0, now)
+        for track_id in hidden - self.header_tracks:
+            if track_id not in self.ratings:
+                self.rate_track(track_id, None, -1, now)
+                self.header_tracks.add(track_id)
+
+    def decay(self, now: float) -> float:
+        return math.exp(-self.rate * (now - self.ref))
+
+    def artist(self, artist: str, now: float) -> float:
+        if self.slots is None:
+            return 0.0
+        return self.slots[self._slot(artist)] * self.decay(now)
+
+    def track(self, track_id: str, now: float) -> float:
+        """The track's decayed rating (0.0 if the user never rated it)."""
+        rated = self.ratings.get(track_id)
+        if rated is None:
+            return 0.0
+        rating, rated_at, _ = rated
+        return rating * math.exp(-self.rate * (now - rated_at))
+
+    def points(self, pool: CandidatePool, now: Optional[float] = None) -> list[Optional[float]]:
+        """Learned score points per row of pool; None for tracks the user turned down."""
+        now = time.time() if now is None else now
+        if self.slots is None:
+            artist_points = [0.0] * len(pool.artists)
+        else:
+            decay = self.decay(now)
+            artist_points = [
+                scoring.BOOST_BONUS * max(-1.0, min(1.0, self.slots[self._slot(name)] * decay))
+                for name in pool.artists
+            ]
+        points: list[Optional[float]] = []
+        for track_id, artist_id in zip(pool.ids, pool.artist_ids):
+            weight = self.track(track_id, now)
+            if weight <= HIDE_TRACK_BELOW:
+                points.append(None)
+            else:
+                points.append(artist_points[artist_id] + scoring.LIKED_TRACK_BONUS * max(0.0, min(1.0, weight)))
+        return points
+
+    def _forget(self, track_id: str) -> None:
+        self.header_tracks.discard(track_id)
+        previous = self.ratings.pop(track_id, None)
+        if previous is not None:
+            old_rating, rated_at, old_artist = previous
+            if old_artist:
+                self._add_artist(old_artist, -old_rating, rated_at)
+
+    def _rescale(self, now: float) -> None:
+        if self.slots is not None:
+            decay = self.decay(now)
+            for i, value in enumerate(self.slots):
+                if value:
+                    self.slots[i] = value * decay
+        self.ref = now
+
+
+class PreferenceStore:
+    """LRU of UserWeights by user id (thread-safe)."""
+
+    def __init__(self, max_users: int = 10_000, buckets: int = 256, half_life_s: float = 30 * 86400,
+                 max_ratings: int = MAX_RATINGS):
+        if buckets & (buckets - 1):
+            raise ValueError("buckets must be a power of two")
+        self.max_users = max_users
+        self.buckets = buckets
+        self.rate = math.log(2) / half_life_s
+        self.max_ratings = max_ratings
+        self._users: OrderedDict[str, UserWeights] = OrderedDict()
+        self._lock = threading.Lock()
+        self.events = 0
+
+    def get(self, user_id: Optional[str]) -> Optional[UserWeights]:
+        """The user's weights, or None if they have no feedback on record here."""
+        if not user_id:
+            return None
+        with self._lock:
+            weights = self._users.get(user_id)
+            if weights is not None:
+                self._users.move_to_end(user_id)
+            return weights
+
+    def learn(self, user_id: str, track_id: str, artist: Optional[str], rating: int,
+              now: Optional[float] = None) -> None:
+        """Record one feedback event (rating 1, -1, or 0 to withdraw an earlier one)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._user(user_id, now).rate_track(track_id, artist, rating, now)
+            self.events += 1
+        metrics.record_feedback("like" if rating > 0 else "dislike" if rating < 0 else "clear")
+
+    def seed(self, user_id: str, boost_artists: Iterable[str] = (), hidden_tracks: Iterable[str] = (),
+             now: Optional[float] = None) -> None:
+        """Merge the user's current feedback header sets into their weights (see UserWeights.apply_headers)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._user(user_id, now).apply_headers(boost_artists, hidden_tracks, now)
+
+    def stats(self) -> dict:
+        return {"users": len(self._users), "events": self.events}
+
+    def _user(self, user_id: str, now: float) -> UserWeights:
+        weights = self._users.get(user_id)
+        if weights is None:
+            weights = self._users[user_id] = UserWeights(self.buckets, self.rate, now, self.max_ratings)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return weights
+
+
+_default: Optional[PreferenceStore] = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> Optional[PreferenceStore]:
+    """The process-wide store every curator shares (None when PREFERENCE_USERS is 0)."""
+    global _default
+    from config import settings
+
+    if settings.preference_users <= 0:
+        return None
+    with _default_lock:
+        if _default is None:
+            _default = PreferenceStore(
+                max_users=settings.preference_users,
+                buckets=settings.preference_buckets,
+                half_life_s=settings.preference_half_life_days * 86400,
+                max_ratings=settings.preference_ratings_per_user,
+            )
+        return _default
@@ -0,0 +1,282 @@
+"""
+Local rule-based workout parser with a confidence score.
+Grown from MockAnthropicClient's regexes: extracts the workout type,
+durations, time caps, rounds, rep schemes and movements, builds the
+warm-up / work / cooldown structure SYSTEM_PROMPT asks Claude for, and
+scores how sure it is. WorkoutParserAgent uses confident parses directly
+and sends ambiguous text (multi-part workouts, estimated durations) to Claude.
+"""
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from models.schemas import Phase, WorkoutStructure
+from services.parse_cache import canonicalize, normalize_rep_schemes
+
+logger = logging.getLogger(__name__)
+
+# Work phase per workout type, as in SYSTEM_PROMPT: (phase name, intensity, BPM range)
+WORK_PHASES = {
+    "AMRAP": ("AMRAP Work", "high", (145, 160)),
+    "RFT": ("Main WOD", "very_high", (160, 175)),
+    "EMOM": ("EMOM Work", "moderate", (130, 145)),
+    "Tabata": ("Tabata Intervals", "very_high", (160, 175)),
+    "Chipper": ("Chipper", "moderate", (130, 145)),
+    "Strength": ("Strength", "low", (120, 130)),
+}
+WARM_UP = Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120))
+COOLDOWN = Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100))
+
+# Confidence by how the work duration was found
+CONFIDENCE_EXPLICIT = 0.95  # "20 min AMRAP", "EMOM x 12"
+CONFIDENCE_PROMPT_EXAMPLE = 0.9  # 21-15-9 couplet, which SYSTEM_PROMPT pins at 12 min
+CONFIDENCE_LOOSE = 0.85  # A time cap, a bare "N min", Tabata stations
+CONFIDENCE_ESTIMATED = 0.55  # Work time guessed from rounds and reps
+CONFIDENCE_UNKNOWN_TYPE = 0.3
+# Multipliers for signs the text is not a single-part workout
+PENALTY_MULTI_PART = 0.5
+PENALTY_NO_MOVEMENTS = 0.8
+
+TABATA_STATION_MIN = 4  # 8 x (20s on / 10s off)
+# Rough pacing for estimated durations
+SECONDS_PER_REP = 3.0
+SECONDS_PER_CAL = 4.0
+METERS_PER_MIN = 250.0
+
+_TYPE_PATTERNS = {
+    "AMRAP": re.compile(r"\bamrap\b|\bas many (?:rounds|reps)\b"),
+    "EMOM": re.compile(r"\bemom\b|\be \d+ mom\b|\be\d+ mom\b|\bevery (?:\d+(?:\.\d+)? )?min\b|\bon the min\b|\botm\b"),
+    "Tabata": re.compile(r"\btabata\b"),
+    "RFT": re.compile(r"\bfor time\b|\brft\b"),
+    "Chipper": re.compile(r"\bchipper\b"),
+    "Strength": re.compile(
+        r"\b\d+ rm\b|\bsets? of\b|\bbuild to\b|\bwork up to\b|\bheavy (?:single|double|triple)\b"
+        r"|\b\d+ ?x ?\d+\b(?! ?(?:m|cal|min|sec)\b)"
+    ),
+}
+_MULTI_PART = re.compile(r"\bpart [a-d1-4]\b|\bthen\b|\bbuyin\b|\bcashout\b|\brest \d+(?:\.\d+)? min\b(?! between)")
+_SECTION_LABEL = re.compile(r"^\s*(?:[a-d]|[1-4])[).:]\s", re.MULTILINE | re.IGNORECASE)
+_CLOCK = re.compile(r"\b(\d{1,2}):([0-5]\d)\b")
+_QUANTITY = re.compile(r"^(\d+(?:\.\d+)?) (?:(m|km|mile|miles|cal) )?([a-z].*)$")
+_MINUTES = re.compile(r"(?<!rest )(?<!every )\b(\d+(?:\.\d+)?) min\b")
+_TIME_CAP = re.compile(r"\b(?:time cap|tc|cap)(?: of)? (\d+(?:\.\d+)?)(?: min)?\b|\b(\d+(?:\.\d+)?) min (?:time )?cap\b")
+_ROUNDS = re.compile(r"\b(\d+) (?:rounds|rft)\b")
+# Format words, durations and loads: what is left of a line after removing them names movements
+_NOT_MOVEMENT = re.compile(
+    r"\b(?:for time|as many|as possible|amrap|emom|e\d+ mom|mom|tabata|chipper|rft|every|on the|"
+    r"min|sec|rounds|reps?|of|in|for|x|tc|time cap|cap|odd|even|each)\b"
+    r"|\d+(?:\.\d+)?(?:/\d+)?(?: ?(?:lb|kg|%))?|[%@]"
+)
+
+
+@dataclass
+class WodFeatures:
+    """What the rules read from the text, before any durations are guessed."""
+    workout_type: Optional[str] = None
+    types_seen: list[str] = field(default_factory=list)
+    explicit_min: Optional[float] = None
+    time_cap_min: Optional[float] = None
+    rounds: Optional[int] = None
+    rep_scheme: list[int] = field(default_factory=list)
+    movements: list[tuple[float, str, str]] = field(default_factory=list)  # (amount, unit, name)
+    multi_part: bool = False
+
+
+@dataclass
+class RuleParse:
+    workout: WorkoutStructure
+    confidence: float
+    features: WodFeatures
+
+
+def _minutes_from_clock(match: re.Match) -> str:
+    minutes = int(match.group(1)) + int(match.group(2)) / 60
+    return f"{minutes:g} min"
+
+
+def _items(workout_text: str) -> list[str]:
+    """Lines / comma-separated parts of the workout, each canonicalized."""
+    text = normalize_rep_schemes(workout_text.lower())
+    text = _CLOCK.sub(_minutes_from_clock, text)
+    return [item for item in (canonicalize(part) for part in re.split(r"[\n,;:]+", text)) if item]
+
+
+def extract_features(workout_text: str) -> WodFeatures:
+    items = _items(workout_text)
+    full = " ".join(items)
+    f = WodFeatures()
+
+    f.types_seen = [name for name, pattern in _TYPE_PATTERNS.items() if pattern.search(full)]
+    if not f.types_seen and re.search(r"\b\d+(?:-\d+){2,}\b", full):
+        f.types_seen = ["RFT"]  # Descending reps (21-15-9) are for time
+    # "5 rounds for time" of a chipper, or a Tabata "for time", still have one format
+    primary = [t for t in f.types_seen if t != "RFT"] or f.types_seen
+    f.workout_type = primary[0] if primary else None
+    f.multi_part = (
+        bool(_MULTI_PART.search(full))
+        or len(_SECTION_LABEL.findall(workout_text)) > 1
+        or len(primary) > 1
+    )
+
+    f.explicit_min = _explicit_duration(f.workout_type, items)
+    cap = _TIME_CAP.search(full)
+    if cap:
+        f.time_cap_min = float(cap.group(1) or cap.group(2))
+    rounds = _ROUNDS.search(full)
+    if rounds:
+        f.rounds = int(rounds.group(1))
+    scheme = re.search(r"\b\d+(?:-\d+){2,}\b", full)
+    if scheme:
+        f.rep_scheme = [int(n) for n in scheme.group(0).split("-")]
+
+    for item in items:
+        match = _QUANTITY.match(item)
+        if match and not re.match(r"(?:min|sec|rounds|rft|lb|kg|x)\b", match.group(3)):
+            f.movements.append((float(match.group(1)), match.group(2) or "reps", match.group(3)))
+            continue
+        # Named without a quantity: "21-15-9 thrusters and pull-ups", Tabata stations
+        if scheme and scheme.group(0) in item:
+            item = item.split(scheme.group(0), 1)[1]
+        for name in re.split(r"\band\b|&|\+", _NOT_MOVEMENT.sub(" ", item)):
+            if re.search(r"[a-z]{3,}", name):
+                f.movements.append((0.0, "reps", " ".join(name.split())))
+    return f
+
+
+def _explicit_duration(workout_type: Optional[str], items: list[str]) -> Optional[float]:
+    """
+    The work duration when the text states it for this workout type. A bare
+    number ("AMRAP 20") only counts at the end of its line, so the reps in
+    "AMRAP 10 burpees" are not read as minutes.
+    """
+    full = " ".join(items)
+    if workout_type == "AMRAP":
+        m = (
+            re.search(r"\b(\d+(?:\.\d+)?) min amrap\b", full)
+            or re.search(r"\bamrap (?:in |of |for )?(\d+(?:\.\d+)?) min\b", full)
+            or _search_items(r"\bamrap (?:in |of |for )?(\d+(?:\.\d+)?)$", items)
+        )
+        return float(m.group(1)) if m else None
+    if workout_type == "EMOM":
+        interval = (
+            re.search(r"\b(?:every|e) ?(\d+(?:\.\d+)?)(?: min| mom)\b (?:for |x )?(\d+)( min| rounds| sets)\b", full)
+            or _search_items(r"\b(?:every|e) ?(\d+(?:\.\d+)?)(?: min| mom) (?:for |x )?(\d+)()$", items)
+        )
+        if interval:
+            every, count, unit = float(interval.group(1)), int(interval.group(2)), interval.group(3)
+            return float(count) if unit == " min" else every * count
+        m = (
+            re.search(r"\b(\d+) min emom\b", full)
+            or re.search(r"\bemom (?:for |x |of )?(\d+)(?: min| rounds)\b", full)
+            or _search_items(r"\bemom (?:for |x |of )?(\d+)$", items)
+        )
+        return float(m.group(1)) if m else None
+    return None
+
+
+def _search_items(pattern: str, items: list[str]) -> Optional[re.Match]:
+    for item in items:
+        m = re.search(pattern, item)
+        if m:
+            return m
+    return None
+
+
+def _estimate_rft_minutes(f: WodFeatures) -> float:
+    """Work time from rounds x reps, for for-time workouts without a cap."""
+    round_s = 0.0
+    for amount, unit, _ in f.movements:
+        if unit in ("m", "km", "mile", "miles"):
+            meters = amount * {"m": 1, "km": 1000, "mile": 1609, "miles": 1609}[unit]
+            round_s += meters / METERS_PER_MIN * 60
+        elif unit == "cal":
+            round_s += amount * SECONDS_PER_CAL
+        elif f.rep_scheme and amount == 0:
+            continue
+        else:
+            round_s += amount * SECONDS_PER_REP
+    if f.rep_scheme:
+        per_movement = sum(f.rep_scheme) * SECONDS_PER_REP
+        round_s += per_movement * max(1, sum(1 for a, _, _ in f.movements if a == 0))
+        return round_s / 60
+    return round_s * (f.rounds or 1) / 60
+
+
+class RuleBasedParser:
+    """
+    Parse workout text with rules and report confidence in [0, 1].
+    parse() never calls a network service; it returns None when the text
+    is empty.
+    """
+
+    def parse(self, workout_text: str) -> Optional[RuleParse]:
+        if not workout_text.strip():
+            return None
+        f = extract_features(workout_text)
+        workout_type = f.workout_type
+
+        if workout_type in ("AMRAP", "EMOM") and f.explicit_min:
+            work_min, confidence = f.explicit_min, CONFIDENCE_EXPLICIT
+            name = f"{round(work_min)} Minute {workout_type}"
+        elif workout_type == "Tabata":
+            stations = len(f.movements)
+            work_min = max(1, stations) * TABATA_STATION_MIN
+            confidence = CONFIDENCE_LOOSE if stations else CONFIDENCE_ESTIMATED
+            name = "Tabata"
+        elif workout_type == "RFT":
+            name, work_min, confidence = self._for_time(f)
+        elif workout_type in ("Chipper", "Strength"):
+            name = workout_type
+            bare = _MINUTES.search(" ".join(_items(workout_text)))
+            if f.time_cap_min:
+                work_min, confidence = f.time_cap_min, CONFIDENCE_LOOSE
+            elif bare:
+                work_min, confidence = float(bare.group(1)), CONFIDENCE_LOOSE
+            elif workout_type == "Chipper":
+                work_min, confidence = max(len(f.movements) * 2, 15), CONFIDENCE_ESTIMATED
+            else:
+                work_min, confidence = 15, CONFIDENCE_ESTIMATED
+        elif workout_type in ("AMRAP", "EMOM"):
+            bare = _MINUTES.search(" ".join(_items(workout_text)))
+            work_min = float(bare.group(1)) if bare else (15 if workout_type == "AMRAP" else 12)
+            confidence = CONFIDENCE_LOOSE if bare else CONFIDENCE_ESTIMATED
+            name = f"{round(work_min)} Minute {workout_type}"
+        else:
+            workout_type, name = "Chipper", "Chipper"
+            work_min = max(len(f.movements) * 2, 15)
+            confidence = CONFIDENCE_UNKNOWN_TYPE
+
+        if f.multi_part:
+            confidence *= PENALTY_MULTI_PART
+        if not f.movements:
+            confidence *= PENALTY_NO_MOVEMENTS
+
+        phase_name, intensity, bpm_range = WORK_PHASES[workout_type]
+        work_min = max(1, int(math.ceil(work_min - 1e-9)))
+        workout = WorkoutStructure(
+            workout_name=name,
+            total_duration_min=WARM_UP.duration_min + work_min + COOLDOWN.duration_min,
+            phases=[
+                WARM_UP.model_copy(),
+                Phase(name=phase_name, duration_min=work_min, intensity=intensity, bpm_range=bpm_range),
+                COOLDOWN.model_copy(),
+            ],
+        )
+        return RuleParse(workout=workout, confidence=round(confidence, 3), features=f)
+
+    @staticmethod
+    def _for_time(f: WodFeatures) -> tuple[str, float, float]:
+        if f.rep_scheme:
+            name = "-".join(str(n) for n in f.rep_scheme)
+        elif f.rounds:
+            name = f"{f.rounds} Rounds For Time"
+        else:
+            name = "For Time"
+
+        if f.time_cap_min:
+            return name, f.time_cap_min, CONFIDENCE_LOOSE
+        if f.rep_scheme == [21, 15, 9] and len(f.movements) <= 2:
+            return name, 12, CONFIDENCE_PROMPT_EXAMPLE
+        return name, max(5.0, _estimate_rft_minutes(f)), CONFIDENCE_ESTIMATED
@@ -0,0 +1,95 @@
+"""
+Vectorized candidate scoring.
+MusicCuratorAgent.score_candidates() used to score Track objects one by one
+and fully sort the list for every phase; with the thousand-track pools a
+local catalog or a multi-page crawl returns, that loop dominates selection.
+Here the pool is held as BPM / energy / artist-id arrays, all four score
+terms are computed in one NumPy pass, and only the top k are ordered
+(partial selection) instead of the whole pool. Without NumPy the curator
+keeps its pure-Python loop.
+"""
+import logging
+from typing import Iterable, NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:  # score_candidates() falls back to its Python loop
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Score terms (see MusicCuratorAgent.score_candidates)
+BPM_POINTS = 50.0  # At the middle of the phase's BPM range, 0 a full range width away
+ENERGY_POINTS = 30.0  # At the phase's target energy, minus 30 per 1.0 of difference
+NEW_ARTIST_BONUS = 20.0
+REPEAT_ARTIST_PENALTY = -10.0
+BOOST_BONUS = 15.0
+LIKED_TRACK_BONUS = 10.0  # Learned per-user weights (services.preferences): a liked track itself
+
+# Below this many candidates, building arrays costs more than the Python loop
+MIN_VECTOR_POOL = 64
+
+
+def available(pool_size: int = MIN_VECTOR_POOL) -> bool:
+    """Whether to score a pool this size with NumPy."""
+    return np is not None and pool_size >= MIN_VECTOR_POOL
+
+
+class PoolArrays(NamedTuple):
+    """A candidate pool as columns; artist_ids index into artists."""
+    bpm: "np.ndarray"
+    energy: "np.ndarray"
+    artist_ids: "np.ndarray"
+    artists: dict[str, int]
+
+
+def _artist_mask(pool: PoolArrays, names: Optional[Iterable[str]]) -> "np.ndarray":
+    """Boolean array: which candidates are by one of `names`."""
+    flags = np.zeros(len(pool.artists), dtype=bool)
+    for name in names or ():
+        index = pool.artists.get(name)
+        if index is not None:
+            flags[index] = True
+    return flags[pool.artist_ids]
+
+
+def score(
+    pool: PoolArrays,
+    bpm_range: tuple[int, int],
+    target_energy: float,
+    used_artists: Optional[Iterable[str]] = None,
+    boost_artists: Optional[Iterable[str]] = None,
+    learned: Optional[Iterable[float]] = None,
+) -> "np.ndarray":
+    """
+    Scores for every candidate, term for term the same as the Python loop.
+    learned holds per-candidate points from the user's learned weights.
+    """
+    bpm_min, bpm_max = bpm_range
+    target_bpm = (bpm_min + bpm_max) / 2
+    bpm_score = np.maximum(0, BPM_POINTS - (np.abs(pool.bpm - target_bpm) / (bpm_max - bpm_min) * BPM_POINTS))
+    energy_score = np.maximum(0, ENERGY_POINTS - (np.abs(pool.energy - target_energy) * ENERGY_POINTS))
+    diversity = np.where(_artist_mask(pool, used_artists), REPEAT_ARTIST_PENALTY, NEW_ARTIST_BONUS)
+    scores = bpm_score + energy_score + diversity
+    if boost_artists:
+        scores += np.where(_artist_mask(pool, boost_artists), BOOST_BONUS, 0.0)
+    if learned is not None:
+        scores += np.asarray(learned, dtype=np.float64)
+    return scores
+
+
+def top_k(scores: "np.ndarray", k: Optional[int] = None) -> "np.ndarray":
+    """
+    Indices of the k highest scores, best first. Equal scores keep pool
+    order, exactly as a stable full sort would, but only k are sorted.
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.argsort(-scores[chosen], kind="stable")]
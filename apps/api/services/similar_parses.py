@@ -0,0 +1,148 @@
+"""
+Near-duplicate reuse of workout parses.
+Athletes type the same WOD differently ("AMRAP 20: 5 pullups 10 pushups 15
+squats" vs "20 min AMRAP - 5 pull-ups, 10 push-ups, 15 air squats"), which
+the exact-text ParseCache misses. Each parsed workout is indexed as a hashed
+character-trigram vector of its words; a lookup finds the nearest stored
+workout by cosine similarity through an inverted index, and reuses its parse
+only if the two texts also agree on format and on every number in them
+(durations, rounds, reps), so "AMRAP 20" never answers "AMRAP 12".
+"""
+import logging
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from models.schemas import WorkoutStructure
+from services import metrics
+from services.parse_cache import canonicalize
+from services.rule_parser import extract_features
+
+logger = logging.getLogger(__name__)
+
+NGRAM = 3
+HASH_BITS = 20  # Trigram buckets; collisions only ever add a little similarity
+_WORD = re.compile(r"[a-z]+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def vectorize(workout_text: str) -> dict[int, float]:
+    """L2-normalized hashed trigram counts of the canonical text's words (numbers excluded)."""
+    counts: Counter = Counter()
+    mask = (1 << HASH_BITS) - 1
+    for word in _WORD.findall(canonicalize(workout_text)):
+        padded = f" {word} "
+        for i in range(len(padded) - NGRAM + 1):
+            counts[zlib.crc32(padded[i:i + NGRAM].encode()) & mask] += 1
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {bucket: c / norm for bucket, c in counts.items()} if norm else {}
+
+
+def signature(workout_text: str) -> tuple:
+    """What two texts must share to reuse a parse: format, stated durations and all numbers."""
+    f = extract_features(workout_text)
+    numbers = sorted(float(n) for n in _NUMBER.findall(canonicalize(workout_text)))
+    return f.workout_type, f.explicit_min, f.time_cap_min, f.rounds, tuple(f.rep_scheme), tuple(numbers)
+
+
+@dataclass
+class _Entry:
+    vector: dict[int, float]
+    signature: tuple
+    workout: WorkoutStructure
+    expires_at: float
+
+
+class SimilarParseIndex:
+    """
+    In-memory LRU of parsed workouts, searchable by text similarity.
+
+    The index is sharded by signature(), and each shard's postings map a
+    trigram bucket to {entry key: weight}, so a lookup only scores entries
+    that agree on the numbers and share a trigram with the query (well
+    under a millisecond at the default 1024 entries).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 7 * 24 * 3600,
+        min_similarity: float = 0.85,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.min_similarity = min_similarity
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()  # By canonical text
+        self._shards: dict[tuple, dict[int, dict[str, float]]] = {}  # signature -> bucket -> {key: weight}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, workout_text: str) -> Optional[WorkoutStructure]:
+        """A copy of the most similar stored parse that agrees on numbers, or None."""
+        vector = vectorize(workout_text)
+        sig = signature(workout_text)
+        now = time.time()
+        with self._lock:
+            postings = self._shards.get(sig, {})
+            scores: dict[str, float] = defaultdict(float)
+            for bucket, weight in vector.items():
+                for key, other in postings.get(bucket, {}).items():
+                    scores[key] += weight * other
+
+            for key, score in sorted(scores.items(), key=lambda item: -item[1]):
+                if score < self.min_similarity:
+                    break
+                entry = self._entries[key]
+                if entry.expires_at <= now:
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.record_parse_cache("similar_hit")
+                logger.info(f"Similar parse ({score:.2f}): {entry.workout.workout_name}")
+                return entry.workout.model_copy(deep=True)
+
+            self.misses += 1
+            metrics.record_parse_cache("similar_miss")
+            return None
+
+    def put(self, workout_text: str, workout: WorkoutStructure) -> None:
+        key = canonicalize(workout_text)
+        vector = vectorize(workout_text)
+        if not vector:
+            return
+        entry = _Entry(vector, signature(workout_text), workout.model_copy(deep=True), time.time() + self.ttl_s)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            postings = self._shards.setdefault(entry.signature, defaultdict(dict))
+            for bucket, weight in vector.items():
+                postings[bucket][key] = weight
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        shard = self._shards[entry.signature]
+        for bucket in entry.vector:
+            shard[bucket].pop(key, None)
+            if not shard[bucket]:
+                del shard[bucket]
+        if not shard:
+            del self._shards[entry.signature]
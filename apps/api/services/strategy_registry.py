@@ -0,0 +1,108 @@
+"""
+Registry of long-lived playlist composers, one per music strategy.
+Strategy overrides (X-Music-Strategy) reuse a composer built once per process
+instead of constructing a new source, curator and API clients per request.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from agents.music_curator import MusicCuratorAgent, create_music_source_by_name
+from agents.playlist_composer import PlaylistComposerAgent
+from music_sources.base import MusicSource
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER_FAILURE_S = 60  # Don't rebuild a failing strategy on every request
+
+
+class StrategyRegistry:
+    """
+    Lazily builds and caches a PlaylistComposerAgent per allowed strategy.
+
+    Construction happens on first use under a per-strategy lock, so concurrent
+    first requests build one instance. A strategy whose source fails to build
+    is marked "failed" and callers get the default composer until the retry
+    interval passes. Request handlers use get_async(), which builds in a
+    worker thread so source construction never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        strategies: Iterable[str],
+        default_composer: PlaylistComposerAgent,
+        default_strategy: str,
+        source_factory: Callable[[str], Optional[MusicSource]] = create_music_source_by_name,
+    ):
+        self.default_composer = default_composer
+        self.default_strategy = default_strategy
+        self._source_factory = source_factory
+        self._composers: dict[str, PlaylistComposerAgent] = {}
+        self._failed_at: dict[str, float] = {}
+        self._locks = {name: threading.Lock() for name in strategies}
+
+    @property
+    def strategies(self) -> list[str]:
+        return sorted(self._locks)
+
+    def _built(self, strategy: str) -> Optional[PlaylistComposerAgent]:
+        """The composer to use without building anything, or None if one must be built."""
+        if not strategy or strategy == self.default_strategy or strategy not in self._locks:
+            return self.default_composer
+        return self._composers.get(strategy)
+
+    def get(self, strategy: str) -> PlaylistComposerAgent:
+        """Return the composer for a strategy, building it on first use."""
+        composer = self._built(strategy)
+        if composer is not None:
+            return composer
+
+        with self._locks[strategy]:
+            composer = self._composers.get(strategy)
+            if composer is not None:
+                return composer
+
+            failed_at = self._failed_at.get(strategy)
+            if failed_at is not None and time.monotonic() - failed_at < RETRY_AFTER_FAILURE_S:
+                return self.default_composer
+
+            start = time.monotonic()
+            source = self._source_factory(strategy)
+            if source is None:
+                self._failed_at[strategy] = time.monotonic()
+                logger.warning(f"Strategy '{strategy}' unavailable, using default composer")
+                metrics.record_fallback("strategy_unavailable")
+                return self.default_composer
+
+            composer = PlaylistComposerAgent(curator=MusicCuratorAgent(music_source=source))
+            self._composers[strategy] = composer
+            self._failed_at.pop(strategy, None)
+            logger.info(f"Initialized strategy '{strategy}' in {time.monotonic() - start:.2f}s")
+            return composer
+
+    async def get_async(self, strategy: str) -> PlaylistComposerAgent:
+        """get() for async callers: a first-use build (and lock wait) runs in a worker thread."""
+        composer = self._built(strategy)
+        if composer is not None:
+            return composer
+        return await asyncio.to_thread(self.get, strategy)
+
+    def warm(self, strategies: Iterable[str]) -> None:
+        """Build the given strategies now instead of on first request."""
+        for strategy in strategies:
+            self.get(strategy)
+
+    def health(self) -> dict[str, str]:
+        """Per-strategy state: ready, failed, or not_initialized (lazy, not yet used)."""
+        status = {}
+        for strategy in self.strategies:
+            if strategy == self.default_strategy or strategy in self._composers:
+                status[strategy] = "ready"
+            elif strategy in self._failed_at:
+                status[strategy] = "failed"
+            else:
+                status[strategy] = "not_initialized"
+        return status
@@ -0,0 +1,30 @@
+"""
+Token usage accounting for Claude calls.
+Every call's input and output tokens are counted per operation in
+crank_claude_tokens_total and summarized for its log line, so the cost of a
+prompt change shows up per operation rather than only on the monthly bill.
+"""
+import logging
+from typing import Any
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _tokens(usage: Any, field: str) -> int:
+    value = getattr(usage, field, None)
+    return value if isinstance(value, int) else 0
+
+
+def record_usage(operation: str, usage: Any) -> str:
+    """
+    Count the call's input and output tokens under `operation` and return a
+    short summary for the log line.
+    """
+    tokens = {
+        "input": _tokens(usage, "input_tokens"),
+        "output": _tokens(usage, "output_tokens"),
+    }
+    metrics.record_claude_tokens(operation, tokens)
+    return f"{tokens['input']}in/{tokens['output']}out"
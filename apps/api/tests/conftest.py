@@ -15,6 +15,18 @@ os.environ["USE_MOCK_SPOTIFY"] = "true"
 from models.schemas import Phase, WorkoutStructure, Track
 
 
+@pytest.fixture
+def mock_pipeline(monkeypatch):
+    """Pin the parser, music source and strategy to mocks, whatever keys the environment holds"""
+    from config import settings
+
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    monkeypatch.setattr(settings, "anthropic_api_key", None)
+    monkeypatch.setattr(settings, "use_mock_anthropic", True)
+    monkeypatch.setattr(settings, "music_source", "mock")
+    monkeypatch.setattr(settings, "music_strategy", "mock")
+
+
 @pytest.fixture
 def sample_workout_text():
     """Standard workout text for testing"""
@@ -0,0 +1,158 @@
+"""
+Tests for the background analytics exporter
+"""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services import analytics
+from services.analytics import (
+    AnalyticsExporter, AnalyticsSink, FileSink, StdoutSink, create_sink,
+)
+
+
+class RecordingSink(AnalyticsSink):
+    name = "recording"
+
+    def __init__(self, delay_s=0.0, fail=False):
+        self.batches = []
+        self.closed = False
+        self.delay_s = delay_s
+        self.fail = fail
+
+    def send(self, events):
+        time.sleep(self.delay_s)
+        if self.fail:
+            raise RuntimeError("analytics endpoint down")
+        self.batches.append([e["event"] for e in events])
+
+    def close(self):
+        self.closed = True
+
+
+def _wait_until(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+class TestAnalyticsExporter:
+    def test_overflow_drops_oldest(self):
+        sink = RecordingSink()
+        exporter = AnalyticsExporter(sink, capacity=3, batch_size=10)
+        for i in range(5):
+            exporter.capture("user", f"e{i}")
+        exporter.flush()
+
+        assert sink.batches == [["e2", "e3", "e4"]]
+        assert exporter.stats()["dropped"] == 2
+
+    def test_full_batch_is_flushed_without_waiting_for_interval(self):
+        sink = RecordingSink()
+        exporter = AnalyticsExporter(sink, batch_size=2, flush_interval_s=60)
+        exporter.start()
+        exporter.capture("user", "a")
+        exporter.capture("user", "b")
+        _wait_until(lambda: sink.batches)
+        exporter.stop()
+
+        assert sink.batches == [["a", "b"]]
+
+    def test_partial_batch_is_flushed_on_interval(self):
+        sink = RecordingSink()
+        exporter = AnalyticsExporter(sink, batch_size=100, flush_interval_s=0.01)
+        exporter.start()
+        exporter.capture("user", "lonely")
+        _wait_until(lambda: sink.batches)
+        exporter.stop()
+
+        assert sink.batches == [["lonely"]]
+
+    def test_stop_drains_buffer_and_closes_sink(self):
+        sink = RecordingSink()
+        exporter = AnalyticsExporter(sink, batch_size=2, flush_interval_s=60)
+        exporter.start()
+        for i in range(5):
+            exporter.capture("user", f"e{i}")
+        exporter.stop()
+
+        assert sum(len(b) for b in sink.batches) == 5
+        assert sink.closed
+        assert exporter.stats()["buffered"] == 0
+
+    def test_capture_does_not_wait_for_slow_sink(self):
+        sink = RecordingSink(delay_s=0.1)
+        exporter = AnalyticsExporter(sink, batch_size=5, flush_interval_s=60)
+        exporter.start()
+        start = time.perf_counter()
+        for i in range(20):
+            exporter.capture("user", f"e{i}")
+        elapsed = time.perf_counter() - start
+        exporter.stop()
+
+        assert elapsed < 0.05
+
+    def test_failed_batches_are_counted(self):
+        exporter = AnalyticsExporter(RecordingSink(fail=True), batch_size=2)
+        for i in range(3):
+            exporter.capture("user", f"e{i}")
+        exporter.flush()
+
+        assert exporter.stats()["failed"] == 3
+        assert exporter.stats()["exported"] == 0
+
+    def test_concurrent_captures_are_all_exported(self):
+        sink = RecordingSink()
+        exporter = AnalyticsExporter(sink, batch_size=7, flush_interval_s=0.01)
+        exporter.start()
+        threads = [
+            threading.Thread(target=lambda: [exporter.capture("user", "e") for _ in range(50)])
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        exporter.stop()
+
+        assert sum(len(b) for b in sink.batches) == 200
+
+
+class TestSinks:
+    def test_file_sink_appends_json_lines(self, tmp_path):
+        path = tmp_path / "events.jsonl"
+        sink = FileSink(str(path))
+        sink.send([{"distinct_id": "u", "event": "a", "properties": {"n": 1}, "timestamp": 1.0}])
+        sink.send([{"distinct_id": "u", "event": "b", "properties": {}, "timestamp": 2.0}])
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["event"] for line in lines] == ["a", "b"]
+        assert lines[0]["properties"] == {"n": 1}
+
+    def test_posthog_sink_sends_capture_time(self):
+        posthog = MagicMock()
+        with patch.object(analytics, "_posthog_module", posthog):
+            sink = analytics.PostHogSink("key")
+        sink.send([{"distinct_id": "u", "event": "a", "properties": {"n": 1}, "timestamp": 1_700_000_000.0}])
+
+        posthog.capture.assert_called_once_with(
+            distinct_id="u", event="a", properties={"n": 1},
+            timestamp=datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc),
+        )
+        posthog.flush.assert_called_once()
+
+    def test_sink_must_implement_send(self):
+        with pytest.raises(TypeError):
+            AnalyticsSink()
+
+    def test_create_sink(self):
+        assert isinstance(create_sink("stdout"), StdoutSink)
+        assert isinstance(create_sink("file", path="x.jsonl"), FileSink)
+        assert create_sink("posthog", posthog_api_key=None) is None
+        assert create_sink("none") is None
+        assert create_sink("kafka") is None
@@ -1,24 +1,32 @@
 """
 Integration tests for the FastAPI application
 """
+import json
 import pytest
 from fastapi.testclient import TestClient
 
 import main as main_module
+from config import settings
 from main import app
 from agents.workout_parser import WorkoutParserAgent
 from agents.music_curator import MusicCuratorAgent
 from agents.playlist_composer import PlaylistComposerAgent
+from services.strategy_registry import StrategyRegistry
 
 
 @pytest.fixture(autouse=True)
-def setup_agents():
-    """Initialize agents before each test (simulates lifespan)"""
+def setup_agents(mock_pipeline):
+    """Initialize agents on the mock pipeline before each test (simulates lifespan)"""
     main_module.workout_parser = WorkoutParserAgent()
     main_module.music_curator = MusicCuratorAgent()
     main_module.playlist_composer = PlaylistComposerAgent(
         curator=main_module.music_curator
     )
+    main_module.strategy_registry = StrategyRegistry(
+        main_module.ALLOWED_STRATEGIES,
+        default_composer=main_module.playlist_composer,
+        default_strategy=settings.music_source,
+    )
 
 
 @pytest.fixture
@@ -108,3 +116,77 @@ class TestGenerateEndpoint:
         )
         assert response.status_code == 400
         assert "mock" in response.json()["detail"].lower() or "not" in response.json()["detail"].lower()
+
+
+def _parse_sse(text: str) -> list[tuple[str, dict]]:
+    """Split an SSE body into (event, data) pairs."""
+    events = []
+    for frame in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestGenerateStreamEndpoint:
+    def test_stream_emits_events_in_order(self, client):
+        response = client.post(
+            "/api/v1/generate/stream",
+            json={"workout_text": "AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = _parse_sse(response.text)
+        names = [name for name, _ in events]
+        assert names[0] == "workout"
+        assert names[-1] == "done"
+        assert names.index("playlist") > max(i for i, n in enumerate(names) if n == "phase")
+
+        workout = events[0][1]
+        phases = [data for name, data in events if name == "phase"]
+        assert [p["phase"]["name"] for p in phases] == [p["name"] for p in workout["phases"]]
+        streamed_ids = [t["id"] for p in phases for t in p["tracks"]]
+        done = events[-1][1]
+        assert [t["id"] for t in done["playlist"]["tracks"]] == streamed_ids
+
+    def test_stream_emits_spotify_track_events(self, client, monkeypatch):
+        class FakeSpotify:
+            async def iter_resolve_tracks_async(self, tracks):
+                for i, t in reversed(list(enumerate(tracks))):
+                    yield i, {
+                        **t,
+                        "spotify_uri": f"spotify:track:{i}",
+                        "spotify_url": f"https://open.spotify.com/track/{i}",
+                        "album_art_url": "https://example.com/art.jpg",
+                    }
+
+        monkeypatch.setattr(main_module, "spotify_client", FakeSpotify())
+        response = client.post(
+            "/api/v1/generate/stream",
+            json={"workout_text": "5 rounds for time: 400m run, 15 overhead squats"},
+        )
+        events = _parse_sse(response.text)
+        track_events = [data for name, data in events if name == "track"]
+        done = events[-1][1]
+
+        assert len(track_events) == len(done["playlist"]["tracks"])
+        for update in track_events:
+            assert update["track"]["spotify_uri"] == f"spotify:track:{update['index']}"
+            assert update["track"]["album_art_url"] == "https://example.com/art.jpg"
+            assert done["playlist"]["tracks"][update["index"]] == update["track"]
+
+    def test_stream_no_input_fails_before_streaming(self, client):
+        response = client.post("/api/v1/generate/stream", json={})
+        assert response.status_code == 400
+
+    def test_stream_reports_pipeline_error_as_event(self, client):
+        response = client.post(
+            "/api/v1/generate/stream",
+            json={
+                "workout_image_base64": "abc123",
+                "image_media_type": "image/jpeg",
+            },
+        )
+        assert response.status_code == 200
+        events = _parse_sse(response.text)
+        assert events == [("error", {"status_code": 400, "detail": "This feature is not yet available."})]
@@ -0,0 +1,148 @@
+"""
+Tests for the async generate pipeline (parser → curator → composer → Spotify)
+"""
+import asyncio
+import pytest
+import httpx
+from unittest.mock import MagicMock, patch
+
+from agents.workout_parser import WorkoutParserAgent
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+
+
+def _mock_http_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestAsyncAgents:
+    def test_parse_and_validate_async(self, sample_amrap_text):
+        parser = WorkoutParserAgent()
+        workout = asyncio.run(parser.parse_and_validate_async(sample_amrap_text))
+        assert workout.workout_name == "20 Minute AMRAP"
+        assert len(workout.phases) == 3
+
+    def test_parse_image_async_in_mock_mode_raises(self):
+        parser = WorkoutParserAgent()
+        with pytest.raises(NotImplementedError):
+            asyncio.run(parser.parse_image_and_validate_async("abc", "image/jpeg"))
+
+    def test_batch_search_tracks_async_matches_sync(self, sample_workout):
+        curator = MusicCuratorAgent()
+        sync_pools = curator.batch_search_tracks(sample_workout.phases)
+        async_pools = asyncio.run(curator.batch_search_tracks_async(sample_workout.phases))
+        assert async_pools.keys() == sync_pools.keys()
+        for name in sync_pools:
+            assert [t.id for t in async_pools[name]] == [t.id for t in sync_pools[name]]
+
+    def test_compose_and_validate_async(self, sample_workout):
+        composer = PlaylistComposerAgent(curator=MusicCuratorAgent())
+        playlist = asyncio.run(composer.compose_and_validate_async(sample_workout))
+        assert len(playlist.tracks) >= len(sample_workout.phases)
+        assert sample_workout.workout_name in playlist.name
+
+
+class TestDeezerAsync:
+    def test_search_by_bpm_async_verifies_bpm(self):
+        from music_sources.deezer import DeezerMusicSource
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/search":
+                return httpx.Response(200, json={"data": [
+                    {"id": 1, "title": "Fast", "artist": {"name": "A"}, "duration": 200, "rank": 800000},
+                    {"id": 2, "title": "Slow", "artist": {"name": "B"}, "duration": 200, "rank": 800000},
+                ]})
+            bpm = 150.0 if request.url.path.endswith("/1") else 90.0
+            return httpx.Response(200, json={"bpm": bpm})
+
+        async def run():
+            with patch("music_sources.deezer.get_async_client", return_value=_mock_http_client(handler)):
+                return await DeezerMusicSource().search_by_bpm_async(140, 160, limit=5)
+
+        candidates = asyncio.run(run())
+        assert [c.name for c in candidates] == ["Fast"]
+        assert candidates[0].verified_bpm is True
+        assert candidates[0].source_id == "1"
+
+    def test_search_by_bpm_async_handles_http_error(self):
+        from music_sources.deezer import DeezerMusicSource
+
+        async def run():
+            client = _mock_http_client(lambda r: httpx.Response(503))
+            with patch("music_sources.deezer.get_async_client", return_value=client):
+                return await DeezerMusicSource().search_by_bpm_async(140, 160)
+
+        assert asyncio.run(run()) == []
+
+
+class TestSpotifyAsync:
+    def _make_client(self):
+        from clients.spotify_client import SpotifyClient
+        with patch("clients.spotify_client.spotipy.Spotify"), \
+             patch("clients.spotify_client.SpotifyClientCredentials") as mock_auth:
+            mock_auth.return_value.get_access_token.return_value = "token"
+            return SpotifyClient(client_id="test-id", client_secret="test-secret")
+
+    def test_resolve_tracks_async_preserves_order(self):
+        client = self._make_client()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.headers["Authorization"] == "Bearer token"
+            q = request.url.params["q"]
+            if "Missing" in q:
+                return httpx.Response(200, json={"tracks": {"items": []}})
+            title = q.split("track:")[1].split(" artist:")[0]
+            return httpx.Response(200, json={"tracks": {"items": [{
+                "uri": f"spotify:track:{title}",
+                "name": title,
+                "external_urls": {"spotify": f"https://open.spotify.com/track/{title}"},
+                "artists": [{"name": "Artist"}],
+                "album": {"images": [{"url": "https://example.com/art.jpg", "width": 300}]},
+                "duration_ms": 200000,
+            }]}})
+
+        tracks = [
+            {"name": "One", "artist": "Artist"},
+            {"name": "Missing", "artist": "Nobody"},
+            {"name": "Two", "artist": "Artist"},
+        ]
+
+        async def run():
+            with patch("clients.spotify_client.get_async_client", return_value=_mock_http_client(handler)):
+                return await client.resolve_tracks_async(tracks)
+
+        resolved = asyncio.run(run())
+        assert [r.get("spotify_uri") for r in resolved] == [
+            "spotify:track:One", None, "spotify:track:Two",
+        ]
+        assert resolved[0]["album_art_url"] == "https://example.com/art.jpg"
+
+
+class TestAnthropicClientAsync:
+    def test_parse_workout_async_uses_async_client(self):
+        from clients.anthropic_client import AnthropicClient
+
+        block = MagicMock()
+        block.type = "tool_use"
+        block.name = "parse_workout"
+        block.input = {
+            "workout_name": "Fran",
+            "total_duration_min": 20,
+            "phases": [
+                {"name": "Warm-up", "duration_min": 5, "intensity": "warm_up", "bpm_range": [100, 120]},
+                {"name": "Main WOD", "duration_min": 12, "intensity": "very_high", "bpm_range": [160, 175]},
+                {"name": "Cooldown", "duration_min": 3, "intensity": "cooldown", "bpm_range": [80, 100]},
+            ],
+        }
+        response = MagicMock(content=[block])
+
+        async def create(**kwargs):
+            return response
+
+        with patch("anthropic.Anthropic"), patch("anthropic.AsyncAnthropic"):
+            client = AnthropicClient(api_key="test-key")
+        client.async_client.messages.create = create
+
+        workout = asyncio.run(client.parse_workout_async("21-15-9 thrusters and pull-ups"))
+        assert workout.workout_name == "Fran"
+        assert workout.phases[1].bpm_range == (160, 175)
@@ -0,0 +1,115 @@
+"""
+Tests for batch generation (shared bucket prefetch + cross-playlist variety)
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_module
+from config import settings
+from main import app
+from agents.workout_parser import WorkoutParserAgent
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+from models.schemas import Phase, Track, WorkoutStructure
+from services.strategy_registry import StrategyRegistry
+
+
+def _workout(name, phases):
+    return WorkoutStructure(
+        workout_name=name,
+        total_duration_min=sum(p.duration_min for p in phases),
+        phases=phases,
+    )
+
+
+WARMUP = Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120))
+COOLDOWN = Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100))
+
+
+class TestPrefetchBatch:
+    def test_phases_with_same_bucket_share_one_pool(self):
+        composer = PlaylistComposerAgent(curator=MusicCuratorAgent())
+        fran = _workout("Fran", [
+            WARMUP, Phase(name="Main WOD", duration_min=8, intensity="very_high", bpm_range=(160, 175)), COOLDOWN,
+        ])
+        grace = _workout("Grace", [
+            WARMUP, Phase(name="For Time", duration_min=6, intensity="very_high", bpm_range=(160, 175)), COOLDOWN,
+        ])
+
+        original = composer.curator.batch_search_tracks_async
+        calls = []
+
+        async def spy(phases, **kwargs):
+            calls.append(phases)
+            return await original(phases, **kwargs)
+
+        with patch.object(composer.curator, "batch_search_tracks_async", spy):
+            pools = asyncio.run(composer.prefetch_batch_async([fran, grace]))
+
+        assert len(calls) == 1
+        buckets = calls[0]
+        assert len(buckets) == 3
+        main_bucket = next(b for b in buckets if b.intensity == "very_high")
+        assert main_bucket.duration_min == 14
+        assert pools[0]["Main WOD"] is pools[1]["For Time"]
+        assert pools[0]["Warm-up"] is pools[1]["Warm-up"]
+
+    def test_avoid_artists_penalizes_without_filtering(self):
+        composer = PlaylistComposerAgent(curator=MusicCuratorAgent())
+        phase = Phase(name="Main WOD", duration_min=3, intensity="high", bpm_range=(140, 160))
+        workout = _workout("Test", [phase])
+        pool = [
+            Track(id="a", name="Song A", artist="Used Before", bpm=150, energy=0.75, duration_ms=180000),
+            Track(id="b", name="Song B", artist="Fresh", bpm=150, energy=0.75, duration_ms=180000),
+        ]
+
+        async def first_track(avoid):
+            async for _, tracks in composer.iter_phases_async(
+                workout, track_pools={"Main WOD": pool}, avoid_artists=avoid,
+            ):
+                return tracks[0]
+
+        assert asyncio.run(first_track({"Used Before"})).artist == "Fresh"
+        assert asyncio.run(first_track({"Used Before", "Fresh"})).id in {"a", "b"}
+
+
+class TestBatchEndpoint:
+    @pytest.fixture(autouse=True)
+    def agents(self, mock_pipeline):
+        main_module.workout_parser = WorkoutParserAgent()
+        main_module.music_curator = MusicCuratorAgent()
+        main_module.playlist_composer = PlaylistComposerAgent(curator=main_module.music_curator)
+        main_module.strategy_registry = StrategyRegistry(
+            main_module.ALLOWED_STRATEGIES,
+            default_composer=main_module.playlist_composer,
+            default_strategy=settings.music_source,
+        )
+
+    def test_batch_returns_one_result_per_workout_in_order(self):
+        client = TestClient(app, raise_server_exceptions=False)
+        response = client.post("/api/v1/generate/batch", json={
+            "workouts": [
+                {"workout_text": "21-15-9 for time: thrusters and pull-ups"},
+                {},
+                {"workout_text": "AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats"},
+            ],
+            "artist_variety": "across_batch",
+        })
+        assert response.status_code == 200
+        results = response.json()["results"]
+
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert results[0]["workout"]["workout_name"] == "21-15-9"
+        assert results[2]["workout"]["workout_name"] == "20 Minute AMRAP"
+        assert len(results[0]["playlist"]["tracks"]) > 0
+        assert len(results[2]["playlist"]["tracks"]) > 0
+        assert results[1]["playlist"] is None
+        assert results[1]["error"]["status_code"] == 400
+
+    def test_batch_rejects_empty_list(self):
+        client = TestClient(app, raise_server_exceptions=False)
+        response = client.post("/api/v1/generate/batch", json={"workouts": []})
+        assert response.status_code == 422
@@ -0,0 +1,104 @@
+"""
+Tests for the columnar candidate pool
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+from models.candidate_pool import CandidatePool
+from models.schemas import Phase, Track
+from music_sources.base import TrackCandidate
+from services import scoring
+
+PHASE = Phase(name="Main WOD", duration_min=12, intensity="high", bpm_range=(145, 160))
+
+
+def _candidates(n=100, artists=10):
+    return [
+        TrackCandidate(
+            name=f"Song {i}", artist=f"Artist {i % artists}", bpm=140 + i % 25,
+            energy=0.5 + (i % 5) / 10, duration_ms=180_000 + i * 1000, source="test",
+            source_id=f"id{i}" if i % 2 else None,
+        )
+        for i in range(n)
+    ]
+
+
+class TestCandidatePool:
+    def test_columns_and_interned_artists(self):
+        pool = CandidatePool.from_candidates(_candidates())
+        assert len(pool) == 100
+        assert len(pool.artists) == 10
+        assert pool.ids[:2] == ["test:Song 0:Artist 0", "id1"]
+        assert pool.artist(13) == "Artist 3"
+
+    def test_energy_threshold_and_invalid_rows_dropped(self):
+        candidates = _candidates(10)
+        candidates[1].energy = 1.4
+        candidates[2].bpm = 0
+        pool = CandidatePool.from_candidates(candidates, energy_threshold=0.6)
+        assert all(t.energy >= 0.6 for t in pool)
+        assert "id1" not in pool.ids and "test:Song 2:Artist 2" not in pool.ids
+
+    def test_tracks_built_lazily_and_kept(self):
+        pool = CandidatePool.from_candidates(_candidates())
+        with patch.object(Track, "model_construct", wraps=Track.model_construct) as construct:
+            first = pool[3]
+            assert pool.track(3) is first
+            assert pool[-1].name == "Song 99"
+        assert construct.call_count == 2
+        assert first == Track(id="id3", name="Song 3", artist="Artist 3", bpm=143,
+                              energy=0.8, duration_ms=183_000)
+
+    def test_from_tracks_keeps_objects(self):
+        tracks = list(CandidatePool.from_candidates(_candidates(5)))
+        pool = CandidatePool.of(tracks)
+        assert all(a is b for a, b in zip(pool, tracks))
+        assert CandidatePool.of(pool) is pool
+
+    def test_without_artists_and_ids(self):
+        pool = CandidatePool.from_candidates(_candidates(20, artists=4))
+        assert pool.without_artists({"Nobody"}) is pool
+        filtered = pool.without_artists({"Artist 0", "Artist 1"})
+        assert len(filtered) == 10 and {t.artist for t in filtered} == {"Artist 2", "Artist 3"}
+
+        kept, rows = pool.without_ids({"id1", "id3"})
+        assert len(kept) == 18 and rows[:3] == [0, 2, 4]
+
+    @pytest.mark.skipif(scoring.np is None, reason="numpy not installed")
+    def test_arrays_are_views(self):
+        pool = CandidatePool.from_candidates(_candidates())
+        arrays = pool.arrays()
+        assert arrays.bpm.tolist() == list(pool.bpm)
+        assert arrays.energy.base is not None
+        assert pool.arrays() is arrays
+
+
+class TestSelection:
+    @pytest.mark.parametrize("size", [20, 300])
+    def test_rank_pool_matches_score_candidates_on_tracks(self, size):
+        curator = MusicCuratorAgent()
+        pool = CandidatePool.from_candidates(_candidates(size))
+        tracks = [Track(**t.model_dump()) for t in pool]
+        hidden = {"id1", "id5"}
+
+        ranked = curator.rank_pool(pool, PHASE, {"Artist 2"}, hidden_tracks=hidden, top_k=30)
+        scored = curator.score_candidates(tracks, PHASE, {"Artist 2"}, hidden_tracks=hidden, top_k=30)
+
+        assert [pool.ids[row] for row, _ in ranked] == [t.id for t, _ in scored]
+        assert [s for _, s in ranked] == pytest.approx([s for _, s in scored])
+
+    def test_only_selected_rows_become_tracks(self):
+        composer = PlaylistComposerAgent(curator=MusicCuratorAgent())
+        pool = CandidatePool.from_candidates(_candidates(500, artists=100))
+        tracks = composer._select_tracks_from_pool(PHASE, pool, set(), target_duration_ms=12 * 60_000)
+
+        assert 0 < len(tracks) < 10
+        assert sum(track is not None for track in pool._tracks) == len(tracks)
+
+    def test_search_returns_pool(self, sample_phase):
+        pools = asyncio.run(MusicCuratorAgent().batch_search_tracks_async([sample_phase]))
+        assert isinstance(pools[sample_phase.name], CandidatePool)
@@ -0,0 +1,163 @@
+"""
+Tests for single-flight coalescing of identical generate requests
+"""
+import asyncio
+import pytest
+
+import main as main_module
+from config import settings
+from agents.workout_parser import WorkoutParserAgent
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+from models.schemas import GeneratePlaylistRequest
+from services.coalescing import SingleFlight
+from services.strategy_registry import StrategyRegistry
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_computation(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def run():
+            return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+        assert asyncio.run(run()) == ["result"] * 5
+        assert len(calls) == 1
+        assert flight.stats() == {"started": 1, "coalesced": 4, "in_flight": 0}
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+
+        async def run():
+            return await asyncio.gather(
+                flight.do("a", lambda: asyncio.sleep(0, result="a")),
+                flight.do("b", lambda: asyncio.sleep(0, result="b")),
+            )
+
+        assert asyncio.run(run()) == ["a", "b"]
+        assert flight.started == 2
+
+    def test_result_is_not_cached_after_completion(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        async def run():
+            first = await flight.do("k", work)
+            second = await flight.do("k", work)
+            return first, second
+
+        assert asyncio.run(run()) == (1, 2)
+
+    def test_exception_propagates_to_all_waiters(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad workout")
+
+        async def run():
+            return await asyncio.gather(
+                flight.do("k", fail), flight.do("k", fail), return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.in_flight() == 0
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do("k", work))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do("k", work))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(run()) == "done"
+
+
+class TestGenerateCoalescing:
+    @pytest.fixture(autouse=True)
+    def setup_agents(self):
+        main_module.workout_parser = WorkoutParserAgent()
+        main_module.music_curator = MusicCuratorAgent()
+        main_module.playlist_composer = PlaylistComposerAgent(curator=main_module.music_curator)
+        main_module.strategy_registry = StrategyRegistry(
+            main_module.ALLOWED_STRATEGIES,
+            default_composer=main_module.playlist_composer,
+            default_strategy=settings.music_source,
+        )
+
+    def _run_concurrently(self, bodies, prefs_list):
+        async def consume(body, prefs):
+            async for event, payload in main_module._generate_events(body, prefs, "test", False):
+                if event == "done":
+                    return payload
+
+        async def run():
+            return await asyncio.gather(*(consume(b, p) for b, p in zip(bodies, prefs_list)))
+
+        return asyncio.run(run())
+
+    def test_identical_requests_parse_once(self, monkeypatch):
+        parser = main_module.workout_parser
+        calls = []
+        original = parser.parse_and_validate_async
+
+        async def counting_parse(text, **kwargs):
+            calls.append(text)
+            await asyncio.sleep(0.01)
+            return await original(text, **kwargs)
+
+        monkeypatch.setattr(parser, "parse_and_validate_async", counting_parse)
+
+        bodies = [
+            GeneratePlaylistRequest(workout_text="AMRAP 20 minutes: 5 pull-ups, 10 push-ups"),
+            GeneratePlaylistRequest(workout_text="  amrap 20 MINUTES:   5 pull-ups, 10 push-ups "),
+        ]
+        prefs = [main_module.GenerationPreferences(music_strategy="mock")] * 2
+        first, second = self._run_concurrently(bodies, prefs)
+
+        assert len(calls) == 1
+        assert first.workout == second.workout
+
+    def test_each_request_applies_its_own_filters(self):
+        text = "5 rounds for time: 400m run, 15 overhead squats"
+        baseline = self._run_concurrently(
+            [GeneratePlaylistRequest(workout_text=text)],
+            [main_module.GenerationPreferences(music_strategy="mock")],
+        )[0]
+        hidden_id = baseline.playlist.tracks[0].id
+        excluded_artist = baseline.playlist.tracks[1].artist
+
+        plain, filtered = self._run_concurrently(
+            [GeneratePlaylistRequest(workout_text=text)] * 2,
+            [
+                main_module.GenerationPreferences(music_strategy="mock"),
+                main_module.GenerationPreferences(
+                    music_strategy="mock",
+                    hidden_tracks={hidden_id},
+                    exclude_artists={excluded_artist},
+                ),
+            ],
+        )
+
+        assert hidden_id in [t.id for t in plain.playlist.tracks]
+        assert hidden_id not in [t.id for t in filtered.playlist.tracks]
+        assert excluded_artist not in [t.artist for t in filtered.playlist.tracks]
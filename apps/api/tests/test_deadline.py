@@ -0,0 +1,141 @@
+"""
+Tests for per-request deadlines and stage degradation
+"""
+import asyncio
+import math
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_module
+from config import settings
+from main import app
+from agents.workout_parser import WorkoutParserAgent
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+from music_sources.base import TrackCandidate
+from music_sources.claude_deezer_verify import ClaudeDeezerVerifySource
+from music_sources.deezer_claude_rerank import DeezerClaudeRerankSource
+from models.schemas import Phase
+from services import deadline
+from services.strategy_registry import StrategyRegistry
+
+
+def _candidates(n, source="deezer", verified=True):
+    return [
+        TrackCandidate(name=f"Track {i}", artist=f"Artist {i}", bpm=150, energy=0.8,
+                       duration_ms=200000, source=source, verified_bpm=verified)
+        for i in range(n)
+    ]
+
+
+class TestDeadlineHelpers:
+    def test_no_budget_is_unlimited(self):
+        assert deadline.current() is None
+        assert deadline.remaining() == math.inf
+        assert deadline.has_budget(1000)
+        assert deadline.timeout(10.0) == 10.0
+
+    def test_budget_caps_timeouts_and_resets(self):
+        with deadline.budget(5):
+            assert 4 < deadline.remaining() <= 5
+            assert deadline.timeout(10.0) <= 5
+            assert deadline.timeout(2.0) == 2.0
+        assert deadline.current() is None
+
+    def test_expired_budget_uses_minimum_timeout(self):
+        with deadline.budget(0.01):
+            time.sleep(0.02)
+            assert deadline.current().expired()
+            assert not deadline.has_budget(0.1)
+            assert deadline.timeout(10.0) == deadline.MIN_TIMEOUT_S
+
+    def test_budget_follows_into_tasks_and_threads(self):
+        async def scenario():
+            with deadline.budget(30):
+                in_task = await asyncio.ensure_future(asyncio.sleep(0, result=deadline.remaining()))
+                in_thread = await asyncio.to_thread(deadline.remaining)
+            return in_task, in_thread
+
+        in_task, in_thread = asyncio.run(scenario())
+        assert in_task <= 30 and in_thread <= 30
+
+
+class TestStageDegradation:
+    @patch("music_sources.deezer_claude_rerank.settings")
+    @patch("music_sources.deezer_claude_rerank.anthropic")
+    def test_rerank_skipped_when_budget_low(self, mock_anthropic, mock_settings):
+        client = MagicMock()
+        mock_anthropic.Anthropic.return_value = client
+        deezer = MagicMock()
+        deezer.search_by_bpm.return_value = _candidates(10)
+
+        source = DeezerClaudeRerankSource(deezer=deezer)
+        with deadline.budget(1):
+            candidates = source.search_by_bpm(140, 160, genre="rock", limit=3)
+
+        client.messages.create.assert_not_called()
+        assert [c.name for c in candidates] == ["Track 0", "Track 1", "Track 2"]
+
+    @patch("music_sources.claude_deezer_verify.requests.get")
+    def test_verification_skipped_when_budget_low(self, mock_get):
+        claude = MagicMock()
+        claude.search_by_bpm_async = MagicMock(
+            side_effect=lambda *a, **kw: asyncio.sleep(0, result=_candidates(3, "claude", False)),
+        )
+        source = ClaudeDeezerVerifySource(claude_source=claude)
+
+        async def search():
+            with deadline.budget(1):
+                return await source.search_by_bpm_async(140, 160)
+
+        candidates = asyncio.run(search())
+        assert len(candidates) == 3
+        assert not any(c.verified_bpm for c in candidates)
+
+    def test_curator_uses_local_catalog_when_budget_spent(self):
+        network_source = MagicMock()
+        network_source.name = "deezer"
+        curator = MusicCuratorAgent(music_source=network_source)
+        phase = Phase(name="Main", duration_min=10, intensity="high", bpm_range=(145, 160))
+
+        with deadline.budget(0.5):
+            tracks = asyncio.run(curator.search_tracks_async(phase))
+
+        network_source.search_by_bpm_async.assert_not_called()
+        assert tracks and all(145 <= t.bpm <= 160 for t in tracks)
+
+
+class TestGenerateDeadline:
+    @pytest.fixture(autouse=True)
+    def agents(self, mock_pipeline):
+        main_module.workout_parser = WorkoutParserAgent()
+        main_module.music_curator = MusicCuratorAgent()
+        main_module.playlist_composer = PlaylistComposerAgent(curator=main_module.music_curator)
+        main_module.strategy_registry = StrategyRegistry(
+            main_module.ALLOWED_STRATEGIES,
+            default_composer=main_module.playlist_composer,
+            default_strategy=settings.music_source,
+        )
+
+    def test_budget_for_strategy_falls_back_to_default(self):
+        with patch.object(settings, "strategy_budgets_s", {"deezer": 12.0}), \
+                patch.object(settings, "generate_budget_s", 40.0):
+            assert main_module._budget_for_strategy("deezer") == 12.0
+            assert main_module._budget_for_strategy("claude") == 40.0
+
+    def test_spotify_skipped_when_budget_spent(self):
+        spotify = MagicMock()
+        client = TestClient(app)
+        with patch.object(main_module, "spotify_client", spotify), \
+                patch.object(main_module, "SPOTIFY_MIN_BUDGET_S", math.inf):
+            response = client.post("/api/v1/generate", json={
+                "workout_text": "AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats",
+            })
+
+        assert response.status_code == 200
+        spotify.iter_resolve_tracks_async.assert_not_called()
+        tracks = response.json()["playlist"]["tracks"]
+        assert tracks and all(t["spotify_uri"] is None for t in tracks)
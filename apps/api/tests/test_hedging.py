@@ -0,0 +1,161 @@
+"""
+Tests for hedged Claude parse requests
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from clients.anthropic_client import AnthropicClient
+from config import settings
+from services import hedging
+from services.hedging import Hedge
+
+
+def _attempt(delay, result=None, error=None, log=None, name=None):
+    async def run():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        if error is not None:
+            raise error
+        return result
+
+    return run
+
+
+def _tool_response(name):
+    block = SimpleNamespace(type="tool_use", name="parse_workout", input={
+        "workout_name": name,
+        "total_duration_min": 20,
+        "phases": [
+            {"name": "Warm-up", "duration_min": 5, "intensity": "warm_up", "bpm_range": [100, 120]},
+            {"name": "Main WOD", "duration_min": 12, "intensity": "high", "bpm_range": [145, 160]},
+            {"name": "Cooldown", "duration_min": 3, "intensity": "cooldown", "bpm_range": [80, 100]},
+        ],
+    })
+    return SimpleNamespace(content=[block], usage=MagicMock(input_tokens=100, output_tokens=50))
+
+
+class TestHedgeDelay:
+    def test_default_until_enough_samples(self):
+        hedge = Hedge("parse_workout", default_delay_s=4.0)
+        for _ in range(hedging.MIN_SAMPLES - 1):
+            hedge.observe(1.5)
+        assert hedge.delay() == 4.0
+
+    def test_percentile_of_recent_latencies(self):
+        hedge = Hedge("parse_workout", percentile=0.9, min_delay_s=0.1)
+        for i in range(1, 101):
+            hedge.observe(i / 10)
+        assert hedge.delay() == pytest.approx(9.0)
+
+    def test_floor(self):
+        hedge = Hedge("parse_workout", min_delay_s=1.0)
+        for _ in range(hedging.MIN_SAMPLES):
+            hedge.observe(0.2)
+        assert hedge.delay() == 1.0
+
+
+class TestHedgeRun:
+    def test_fast_primary_never_starts_backup(self):
+        hedge = Hedge("op", default_delay_s=0.2)
+        backup = AsyncMock()
+        assert asyncio.run(hedge.run(_attempt(0, "primary"), backup)) == "primary"
+        backup.assert_not_called()
+        assert hedge.stats()["fired"] == 0
+
+    def test_slow_primary_loses_to_backup_and_is_cancelled(self):
+        hedge = Hedge("op", default_delay_s=0.01)
+        log = []
+        with patch("services.hedging.metrics.record_hedge") as record:
+            result = asyncio.run(hedge.run(
+                _attempt(5, "primary", log=log, name="primary"), _attempt(0, "backup"),
+            ))
+
+        assert result == "backup"
+        assert log == ["primary cancelled"]
+        assert [c.args[1] for c in record.call_args_list] == ["fired", "backup_won", "cancelled"]
+        assert hedge.stats()["backup_wins"] == 1
+
+    def test_primary_can_still_win_after_hedge_fires(self):
+        hedge = Hedge("op", default_delay_s=0.01)
+        log = []
+        result = asyncio.run(hedge.run(
+            _attempt(0.05, "primary"), _attempt(5, "backup", log=log, name="backup"),
+        ))
+        assert result == "primary"
+        assert log == ["backup cancelled"]
+
+    def test_failed_attempt_defers_to_the_other(self):
+        hedge = Hedge("op", default_delay_s=0.01)
+        result = asyncio.run(hedge.run(
+            _attempt(0.05, error=RuntimeError("overloaded")), _attempt(0.1, "backup"),
+        ))
+        assert result == "backup"
+
+    def test_both_failing_raises_primary_error(self):
+        hedge = Hedge("op", default_delay_s=0.01)
+        with pytest.raises(RuntimeError, match="primary"):
+            asyncio.run(hedge.run(
+                _attempt(0.05, error=RuntimeError("primary")), _attempt(0, error=ValueError("backup")),
+            ))
+
+    def test_early_primary_failure_is_not_retried(self):
+        hedge = Hedge("op", default_delay_s=1.0)
+        backup = AsyncMock()
+        with pytest.raises(RuntimeError):
+            asyncio.run(hedge.run(_attempt(0, error=RuntimeError("bad request")), backup))
+        backup.assert_not_called()
+
+    def test_fast_failures_do_not_lower_the_delay(self):
+        hedge = Hedge("op", min_delay_s=0.0, default_delay_s=1.0)
+        for _ in range(hedging.MIN_SAMPLES):
+            with pytest.raises(RuntimeError):
+                asyncio.run(hedge.run(_attempt(0, error=RuntimeError("unauthorized")), AsyncMock()))
+        assert hedge.stats()["samples"] == 0
+        assert hedge.delay() == 1.0
+
+
+class TestClientHedging:
+    @pytest.fixture
+    def client(self):
+        with patch("anthropic.Anthropic"), patch("anthropic.AsyncAnthropic"):
+            client = AnthropicClient(api_key="test-key", model="fast-model", hedge_model="backup-model")
+        for hedge in client.hedges.values():
+            hedge.default_delay_s = 0.01
+        return client
+
+    def _create(self, delays):
+        async def create(**kwargs):
+            await asyncio.sleep(delays[kwargs["model"]])
+            return _tool_response(kwargs["model"])
+
+        return create
+
+    def test_backup_model_answers_a_slow_parse(self, client):
+        client.async_client.messages.create = self._create({"fast-model": 5, "backup-model": 0})
+        workout = asyncio.run(client.parse_workout_async("AMRAP 20"))
+        assert workout.workout_name == "backup-model"
+        assert client.hedges["parse_workout"].stats()["backup_wins"] == 1
+
+    def test_image_parse_is_hedged_separately(self, client):
+        client.async_client.messages.create = self._create({"fast-model": 0, "backup-model": 5})
+        workout = asyncio.run(client.parse_workout_from_image_async("aGk=", "image/png"))
+        assert workout.workout_name == "fast-model"
+        assert client.hedges["parse_workout"].stats()["samples"] == 0
+        assert client.hedges["parse_workout_from_image"].stats()["samples"] == 1
+
+    def test_hedging_can_be_disabled(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "parse_hedging", False)
+        client.async_client.messages.create = AsyncMock(return_value=_tool_response("fast-model"))
+        asyncio.run(client.parse_workout_async("AMRAP 20"))
+        assert [c.kwargs["model"] for c in client.async_client.messages.create.call_args_list] == ["fast-model"]
+
+    def test_backup_defaults_to_primary_model(self):
+        with patch("anthropic.Anthropic"), patch("anthropic.AsyncAnthropic"):
+            assert AnthropicClient(api_key="test-key", model="m").hedge_model == "m"
@@ -0,0 +1,121 @@
+"""
+Tests for the whiteboard photo parse cache
+"""
+import asyncio
+import base64
+import io
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from agents.workout_parser import WorkoutParserAgent
+from models.schemas import Phase, WorkoutStructure
+from services.image_cache import ImageParseCache
+
+
+def _workout(name="Whiteboard WOD"):
+    return WorkoutStructure(
+        workout_name=name,
+        total_duration_min=20,
+        phases=[
+            Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120)),
+            Phase(name="Main WOD", duration_min=12, intensity="very_high", bpm_range=(160, 175)),
+            Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100)),
+        ],
+    )
+
+
+def _whiteboard(lines, size=(3000, 2000)):
+    """A photo-sized board with the workout written on it in large marker-like text."""
+    img = Image.new("RGB", size, (235, 235, 230))
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=90)
+    for i, line in enumerate(lines):
+        draw.text((300, 250 + i * 180), line, fill=(20, 20, 60), font=font)
+    return img
+
+
+AMRAP = ["AMRAP 20 min", "5 pull-ups", "10 push-ups", "15 air squats"]
+FOR_TIME = ["FOR TIME", "21-15-9", "thrusters 95/65", "pull-ups"]
+
+
+def _encode(img, fmt="PNG", **kwargs):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **kwargs)
+    return buf.getvalue()
+
+
+class TestImageParseCache:
+    def test_exact_reupload_hits(self):
+        cache = ImageParseCache()
+        data = _encode(_whiteboard(AMRAP))
+        cache.put(cache.fingerprint(data), _workout())
+
+        assert cache.get(cache.fingerprint(data)).workout_name == "Whiteboard WOD"
+        assert cache.stats()["hits"] == 1
+
+    def test_same_board_with_a_different_workout_misses(self):
+        cache = ImageParseCache()
+        cache.put(cache.fingerprint(_encode(_whiteboard(AMRAP))), _workout())
+
+        assert cache.get(cache.fingerprint(_encode(_whiteboard(FOR_TIME)))) is None
+        assert cache.get(cache.fingerprint(_encode(_whiteboard(["AMRAP 12 min"] + AMRAP[1:])))) is None
+        assert cache.stats()["misses"] == 2
+
+    def test_additional_text_separates_entries(self):
+        cache = ImageParseCache()
+        data = _encode(_whiteboard(AMRAP))
+        cache.put(cache.fingerprint(data, "scaled version"), _workout())
+
+        assert cache.get(cache.fingerprint(data, "Scaled  version.")) is not None
+        assert cache.get(cache.fingerprint(data)) is None
+
+    def test_lru_eviction(self):
+        cache = ImageParseCache(max_entries=1)
+        first, second = b"first photo", b"second photo"
+        cache.put(cache.fingerprint(first), _workout("A"))
+        cache.put(cache.fingerprint(second), _workout("B"))
+
+        assert cache.get(cache.fingerprint(first)) is None
+        assert cache.get(cache.fingerprint(second)).workout_name == "B"
+
+
+class TestParserUsesImageCache:
+    @pytest.fixture
+    def parser(self):
+        return WorkoutParserAgent()
+
+    def test_reuploaded_photo_skips_vision_call(self, parser):
+        image = base64.b64encode(_encode(_whiteboard(AMRAP))).decode()
+
+        with patch.object(parser, "execute_from_image_async", return_value=_workout()) as vision:
+            asyncio.run(parser.parse_image_and_validate_async(image, "image/png"))
+            workout = asyncio.run(parser.parse_image_and_validate_async(image, "image/png"))
+
+        assert vision.call_count == 1
+        assert workout.workout_name == "Whiteboard WOD"
+
+    def test_new_workout_on_the_same_board_is_parsed_again(self, parser):
+        first = base64.b64encode(_encode(_whiteboard(AMRAP))).decode()
+        second = base64.b64encode(_encode(_whiteboard(FOR_TIME))).decode()
+
+        with patch.object(parser, "execute_from_image_async",
+                          side_effect=[_workout("AMRAP"), _workout("For Time")]) as vision:
+            asyncio.run(parser.parse_image_and_validate_async(first, "image/png"))
+            workout = asyncio.run(parser.parse_image_and_validate_async(second, "image/png"))
+
+        assert vision.call_count == 2
+        assert workout.workout_name == "For Time"
+
+    def test_invalid_parses_are_not_cached(self, parser):
+        bad = _workout()
+        bad.total_duration_min = 99
+        image = base64.b64encode(_encode(_whiteboard(FOR_TIME))).decode()
+
+        with patch.object(parser, "execute_from_image", return_value=bad):
+            for _ in range(2):
+                with pytest.raises(ValueError):
+                    parser.parse_image_and_validate(image, "image/png")
+
+        assert parser.image_cache.stats()["entries"] == 0
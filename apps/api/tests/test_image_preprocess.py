@@ -0,0 +1,140 @@
+"""
+Tests for whiteboard photo preprocessing
+"""
+import asyncio
+import base64
+import io
+import random
+from unittest.mock import patch
+
+from PIL import Image, ImageDraw
+
+from agents.workout_parser import WorkoutParserAgent
+from config import settings
+from models.schemas import Phase, WorkoutStructure
+from services import image_preprocess
+
+
+def _workout():
+    return WorkoutStructure(
+        workout_name="Whiteboard WOD",
+        total_duration_min=20,
+        phases=[
+            Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120)),
+            Phase(name="Main WOD", duration_min=12, intensity="very_high", bpm_range=(160, 175)),
+            Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100)),
+        ],
+    )
+
+
+def _photo(size=(3000, 2250), low=0, high=255, seed=0):
+    """A noisy 'phone photo' of a board with marker strokes."""
+    rng = random.Random(seed)
+    img = Image.effect_noise(size, 20).convert("RGB")
+    img = Image.eval(img, lambda v: low + (v * (high - low)) // 255)
+    draw = ImageDraw.Draw(img)
+    for _ in range(30):
+        x, y = rng.randrange(size[0] - 400), rng.randrange(size[1] - 100)
+        draw.rectangle((x, y, x + 400, y + 60), fill=(low, low, low))
+    return img
+
+
+def _b64(img, fmt="JPEG", **kwargs):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **kwargs)
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def _decode(image_base64):
+    return Image.open(io.BytesIO(base64.b64decode(image_base64)))
+
+
+class TestShrink:
+    def test_phone_photo_is_downscaled_and_smaller(self):
+        original = _b64(_photo(), quality=95)
+        shrunk = image_preprocess.shrink(image_preprocess.load(original), original, "image/jpeg")
+
+        out = _decode(shrunk.image_base64)
+        assert max(out.size) <= image_preprocess.MAX_EDGE_PX
+        assert out.width * out.height <= image_preprocess.MAX_PIXELS
+        assert out.mode == "L"
+        assert shrunk.media_type == "image/jpeg"
+        assert shrunk.bytes_saved > shrunk.bytes_before // 2
+
+    def test_exif_orientation_is_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees clockwise
+        image_base64 = _b64(_photo(size=(800, 400)), exif=exif)
+
+        loaded = image_preprocess.load(image_base64)
+        assert loaded.image.size == (400, 800)
+
+    def test_washed_out_photo_gets_contrast_stretched(self):
+        original = _b64(_photo(size=(1200, 900), low=110, high=150), "PNG")
+        shrunk = image_preprocess.shrink(image_preprocess.load(original), original, "image/png")
+
+        lo, hi = _decode(shrunk.image_base64).getextrema()
+        assert hi - lo > 200
+
+    def test_transparent_png_is_flattened_onto_white(self):
+        img = Image.new("RGBA", (600, 400), (0, 0, 0, 0))
+        ImageDraw.Draw(img).rectangle((100, 100, 300, 200), fill=(0, 0, 0, 255))
+
+        flat = image_preprocess._flatten(img)
+        assert flat.mode == "RGB"
+        assert flat.getpixel((10, 10)) == (255, 255, 255)
+        assert flat.getpixel((150, 150)) == (0, 0, 0)
+
+    def test_webp_output(self):
+        original = _b64(_photo(), quality=95)
+        shrunk = image_preprocess.shrink(
+            image_preprocess.load(original, grayscale=False), original, "image/jpeg",
+            grayscale=False, output_format="webp",
+        )
+
+        assert shrunk.media_type == "image/webp"
+        assert _decode(shrunk.image_base64).format == "WEBP"
+
+    def test_already_compact_upload_is_kept(self):
+        original = _b64(Image.new("RGB", (64, 64), "white"), "PNG")
+        shrunk = image_preprocess.shrink(image_preprocess.load(original), original, "image/png")
+
+        assert shrunk.image_base64 == original
+        assert shrunk.media_type == "image/png"
+        assert shrunk.bytes_saved == 0
+
+    def test_undecodable_uploads(self):
+        assert image_preprocess.load("not base64!") is None
+
+        garbage = base64.b64encode(b"not an image").decode()
+        loaded = image_preprocess.load(garbage)
+        assert loaded.image is None
+        assert image_preprocess.shrink(loaded, garbage, "image/png").image_base64 == garbage
+
+    def test_target_size_never_upscales(self):
+        assert image_preprocess.target_size(800, 600) == (800, 600)
+        assert max(image_preprocess.target_size(4032, 3024)) <= 1568
+
+
+class TestParserPreprocessesImages:
+    def test_vision_call_receives_shrunk_image(self):
+        parser = WorkoutParserAgent()
+        original = _b64(_photo(seed=1), quality=95)
+
+        with patch.object(parser, "execute_from_image_async", return_value=_workout()) as vision:
+            asyncio.run(parser.parse_image_and_validate_async(original, "image/jpeg", "scaled"))
+
+        sent_base64, sent_media_type, additional_text = vision.call_args.args
+        assert len(sent_base64) < len(original) // 2
+        assert max(_decode(sent_base64).size) <= image_preprocess.MAX_EDGE_PX
+        assert (sent_media_type, additional_text) == ("image/jpeg", "scaled")
+
+    def test_preprocessing_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "image_preprocess", False)
+        parser = WorkoutParserAgent()
+        original = _b64(_photo(size=(2000, 1500), seed=2))
+
+        with patch.object(parser, "execute_from_image", return_value=_workout()) as vision:
+            parser.parse_image_and_validate(original, "image/jpeg")
+
+        assert vision.call_args.args[0] == original
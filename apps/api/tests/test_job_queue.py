@@ -0,0 +1,164 @@
+"""
+Tests for background generate jobs (worker pool + polling endpoint)
+"""
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main as main_module
+from main import app, limiter
+from services.job_queue import JobQueue, QueueFullError
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _wait_for(queue, job, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while job.status in ("queued", "running"):
+        assert time.monotonic() < deadline, "job did not finish"
+        await asyncio.sleep(0.005)
+    return job
+
+
+class TestJobQueue:
+    def test_job_runs_and_stores_result(self):
+        async def scenario():
+            queue = JobQueue(workers=1, max_depth=5, ttl_s=60)
+            await queue.start()
+            job = queue.submit(lambda: asyncio.sleep(0, result="playlist"))
+            await _wait_for(queue, job)
+            await queue.stop()
+            return job
+
+        job = _run(scenario())
+        assert job.status == "succeeded"
+        assert job.result == "playlist"
+        assert job.started_at is not None and job.finished_at >= job.started_at
+
+    def test_http_errors_are_recorded(self):
+        async def fail():
+            raise HTTPException(status_code=400, detail="Invalid workout data. Please check your input.")
+
+        async def boom():
+            raise RuntimeError("upstream exploded")
+
+        async def scenario():
+            queue = JobQueue(workers=2, max_depth=5, ttl_s=60)
+            await queue.start()
+            bad_input = queue.submit(fail)
+            crashed = queue.submit(boom)
+            await _wait_for(queue, bad_input)
+            await _wait_for(queue, crashed)
+            await queue.stop()
+            return bad_input, crashed
+
+        bad_input, crashed = _run(scenario())
+        assert bad_input.status == "failed"
+        assert bad_input.error.status_code == 400
+        assert crashed.error.status_code == 500
+        assert "upstream" not in crashed.error.detail
+
+    def test_full_queue_rejects_submissions(self):
+        async def scenario():
+            queue = JobQueue(workers=1, max_depth=1, ttl_s=60)
+            await queue.start()
+            release = asyncio.Event()
+            running = queue.submit(release.wait)
+            await asyncio.sleep(0.01)  # let the worker pick it up
+            queued = queue.submit(release.wait)
+            with pytest.raises(QueueFullError):
+                queue.submit(release.wait)
+            position = queue.to_response(queued).queue_position
+            release.set()
+            await _wait_for(queue, queued)
+            await queue.stop()
+            return running, queue, position
+
+        running, queue, position = _run(scenario())
+        assert running.status == "succeeded"
+        assert position == 0
+        assert queue.stats()["rejected"] == 1
+
+    def test_finished_jobs_expire_after_ttl(self):
+        async def scenario():
+            queue = JobQueue(workers=1, max_depth=5, ttl_s=0)
+            await queue.start()
+            job = queue.submit(lambda: asyncio.sleep(0, result="x"))
+            await _wait_for(queue, job)
+            await asyncio.sleep(0.01)
+            found = queue.get(job.id)
+            await queue.stop()
+            return found
+
+        assert _run(scenario()) is None
+
+    def test_stop_fails_pending_jobs(self):
+        async def scenario():
+            queue = JobQueue(workers=1, max_depth=5, ttl_s=60)
+            await queue.start()
+            running = queue.submit(lambda: asyncio.sleep(10))
+            await asyncio.sleep(0.01)
+            queued = queue.submit(lambda: asyncio.sleep(10))
+            await queue.stop()
+            return running, queued
+
+        running, queued = _run(scenario())
+        assert running.status == queued.status == "failed"
+        assert running.error.status_code == 503
+
+
+@pytest.mark.usefixtures("mock_pipeline")
+class TestJobEndpoints:
+    @pytest.fixture(autouse=True)
+    def fresh_rate_limits(self):
+        limiter.reset()
+
+    def _poll(self, client, job_id):
+        for _ in range(100):
+            response = client.get(f"/api/v1/jobs/{job_id}")
+            assert response.status_code != 429, "polling was rate limited"
+            assert response.status_code == 200
+            data = response.json()
+            if data["status"] in ("succeeded", "failed"):
+                return response
+            time.sleep(0.01)
+        raise AssertionError("job did not finish")
+
+    def test_submit_and_poll_job(self):
+        with TestClient(app) as client:
+            response = client.post(
+                "/api/v1/jobs/generate",
+                json={"workout_text": "AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats"},
+            )
+            assert response.status_code == 202
+            data = self._poll(client, response.json()["job_id"]).json()
+
+        assert data["status"] == "succeeded"
+        assert data["result"]["workout"]["workout_name"] == "20 Minute AMRAP"
+        assert len(data["result"]["playlist"]["tracks"]) > 0
+
+    def test_poll_hint_until_finished(self, monkeypatch):
+        async def slow_generate(*args, **kwargs):
+            await asyncio.sleep(0.2)
+
+        monkeypatch.setattr(main_module, "_run_generate", slow_generate)
+        with TestClient(app) as client:
+            job_id = client.post("/api/v1/jobs/generate", json={"workout_text": "21-15-9 thrusters"}).json()["job_id"]
+            pending = client.get(f"/api/v1/jobs/{job_id}")
+            assert pending.json()["status"] in ("queued", "running")
+            assert pending.headers["Retry-After"] == str(main_module.JOB_POLL_INTERVAL_S)
+
+            finished = self._poll(client, job_id)
+        assert "Retry-After" not in finished.headers
+
+    def test_unknown_job_returns_404(self):
+        with TestClient(app) as client:
+            assert client.get("/api/v1/jobs/does-not-exist").status_code == 404
+
+    def test_submit_requires_input(self):
+        with TestClient(app) as client:
+            assert client.post("/api/v1/jobs/generate", json={}).status_code == 400
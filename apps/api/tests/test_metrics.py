@@ -0,0 +1,85 @@
+"""
+Tests for Prometheus metrics and the /metrics endpoint
+"""
+import pytest
+from prometheus_client import REGISTRY
+from fastapi.testclient import TestClient
+
+import main as main_module
+from config import settings
+from main import app
+from agents.workout_parser import WorkoutParserAgent
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+from services import metrics
+from services.strategy_registry import StrategyRegistry
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def client(mock_pipeline):
+    main_module.workout_parser = WorkoutParserAgent()
+    main_module.music_curator = MusicCuratorAgent()
+    main_module.playlist_composer = PlaylistComposerAgent(curator=main_module.music_curator)
+    main_module.strategy_registry = StrategyRegistry(
+        main_module.ALLOWED_STRATEGIES,
+        default_composer=main_module.playlist_composer,
+        default_strategy=settings.music_source,
+    )
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class TestMetricHelpers:
+    def test_upstream_records_outcome_and_in_flight(self):
+        before_ok = _sample("crank_upstream_request_seconds_count", service="deezer", operation="test", outcome="ok")
+        before_err = _sample("crank_upstream_request_seconds_count", service="deezer", operation="test", outcome="error")
+
+        with metrics.upstream("deezer", "test"):
+            assert _sample("crank_upstream_in_flight", service="deezer") == 1
+        with pytest.raises(TimeoutError):
+            with metrics.upstream("deezer", "test"):
+                raise TimeoutError()
+
+        assert _sample("crank_upstream_in_flight", service="deezer") == 0
+        assert _sample("crank_upstream_request_seconds_count", service="deezer", operation="test", outcome="ok") == before_ok + 1
+        assert _sample("crank_upstream_request_seconds_count", service="deezer", operation="test", outcome="error") == before_err + 1
+
+    def test_record_fallback(self):
+        before = _sample("crank_fallbacks_total", kind="test_kind")
+        metrics.record_fallback("test_kind")
+        assert _sample("crank_fallbacks_total", kind="test_kind") == before + 1
+
+
+class TestMetricsEndpoint:
+    def test_generate_populates_stage_histograms(self, client):
+        parse_before = _sample("crank_parse_seconds_count", input_type="text")
+        prefetch_before = _sample("crank_prefetch_seconds_count", source="mock")
+        validation_before = _sample("crank_validation_seconds_count", target="playlist")
+
+        response = client.post(
+            "/api/v1/generate",
+            json={"workout_text": "EMOM 12 minutes: 10 kettlebell swings"},
+        )
+        assert response.status_code == 200
+
+        assert _sample("crank_parse_seconds_count", input_type="text") == parse_before + 1
+        assert _sample("crank_prefetch_seconds_count", source="mock") == prefetch_before + 1
+        assert _sample("crank_validation_seconds_count", target="playlist") == validation_before + 1
+        assert _sample("crank_selection_seconds_count") > 0
+        assert _sample("crank_in_flight", endpoint="generate") == 0
+
+    def test_metrics_endpoint_exposes_prometheus_text(self, client):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "crank_upstream_request_seconds" in response.text
+        assert "crank_fallbacks_total" in response.text
+
+    def test_metrics_token_required_when_configured(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "metrics_token", "secret")
+        assert client.get("/metrics").status_code == 401
+        ok = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+        assert ok.status_code == 200
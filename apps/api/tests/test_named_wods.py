@@ -0,0 +1,71 @@
+"""
+Tests for the named-WOD registry (benchmark/hero workouts without an LLM call)
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+
+from agents.workout_parser import WorkoutParserAgent
+from services.named_wods import NamedWodRegistry, alias_key
+
+
+@pytest.fixture
+def registry():
+    return NamedWodRegistry.load(validate=WorkoutParserAgent().validate)
+
+
+class TestNamedWodRegistry:
+    def test_bundled_wods_load_and_validate(self, registry):
+        assert set(registry.names()) == {"Fran", "Murph", "Grace", "DT", "Cindy"}
+
+    @pytest.mark.parametrize("text,name", [
+        ("Fran", "Fran"),
+        ("fran 95/65", "Fran"),
+        ("21-15-9 thrusters pull-ups", "Fran"),
+        ("21-15-9 Thrusters 95lbs and Pull-ups", "Fran"),
+        ("21-15-9 thrusters (95/65 lbs) and pull-ups. ~5-10 min.", "Fran"),
+        ("MURPH", "Murph"),
+        ("Grace 135 lb", "Grace"),
+        ("DT 155/105", "DT"),
+        ("20 min AMRAP: 5 pull-ups, 10 push-ups, 15 squats.", "Cindy"),
+    ])
+    def test_aliases_resolve(self, registry, text, name):
+        assert registry.match(text).workout_name == name
+
+    @pytest.mark.parametrize("text", [
+        "Fran then 5k row",
+        "15-12-9 thrusters and pull-ups",
+        "AMRAP 12 minutes: 5 pull-ups, 10 push-ups, 15 squats",
+    ])
+    def test_variations_are_not_matched(self, registry, text):
+        assert registry.match(text) is None
+
+    def test_match_returns_copy(self, registry):
+        registry.match("fran").workout_name = "mutated"
+        assert registry.match("fran").workout_name == "Fran"
+
+    def test_alias_key_drops_weights_and_estimates(self):
+        assert alias_key("Fran (95/65 lbs) ~5-10 min") == "fran"
+
+    def test_invalid_entries_and_missing_file_are_skipped(self, tmp_path):
+        path = tmp_path / "wods.json"
+        path.write_text(json.dumps({"wods": [
+            {"name": "Broken", "aliases": [], "workout": {
+                "workout_name": "Broken", "total_duration_min": 99,
+                "phases": [{"name": "Work", "duration_min": 5, "intensity": "high", "bpm_range": [145, 160]}],
+            }},
+            {"name": "Bad Schema", "workout": {"workout_name": "x"}},
+        ]}))
+        assert len(NamedWodRegistry.load(path, validate=WorkoutParserAgent().validate)) == 0
+        assert len(NamedWodRegistry.load(tmp_path / "missing.json")) == 0
+
+
+class TestParserUsesRegistry:
+    def test_named_wod_skips_client_and_cache(self):
+        parser = WorkoutParserAgent()
+        with patch.object(parser.client, "parse_workout", side_effect=AssertionError("client called")):
+            workout = parser.parse_and_validate("Fran 95/65")
+
+        assert workout.workout_name == "Fran"
+        assert parser.cache.stats()["misses"] == 0
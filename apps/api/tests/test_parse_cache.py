@@ -0,0 +1,147 @@
+"""
+Tests for the workout parse cache
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from agents.workout_parser import WorkoutParserAgent
+from models.schemas import Phase, WorkoutStructure
+from services.parse_cache import ParseCache, canonicalize
+
+
+def _workout(name="Fran"):
+    return WorkoutStructure(
+        workout_name=name,
+        total_duration_min=20,
+        phases=[
+            Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120)),
+            Phase(name="Main WOD", duration_min=12, intensity="very_high", bpm_range=(160, 175)),
+            Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100)),
+        ],
+    )
+
+
+class TestCanonicalize:
+    def test_equivalent_spellings_share_a_form(self):
+        variants = [
+            "21-15-9 Thrusters 95lbs and Pull-ups",
+            "21 – 15 – 9 thrusters 95 lb and pullups",
+            "21/15/9:  THRUSTERS 95# and pull-ups.",
+            "21, 15, 9 thrusters 95 pounds and pull-ups",
+        ]
+        assert len({canonicalize(v) for v in variants}) == 1
+
+    def test_units_and_durations(self):
+        assert canonicalize("AMRAP 20 minutes") == canonicalize("amrap 20min")
+        assert canonicalize("Row 500 meters") == canonicalize("row 500m")
+        assert canonicalize("1.5 mile run") == "1.5 mile run"
+
+    def test_different_workouts_stay_different(self):
+        assert canonicalize("AMRAP 20 min") != canonicalize("AMRAP 12 min")
+        assert canonicalize("21-15-9 thrusters") != canonicalize("15-12-9 thrusters")
+        assert canonicalize("thrusters 95/65") != canonicalize("thrusters 135/95")
+
+
+class TestParseCache:
+    def test_hit_returns_copy(self):
+        cache = ParseCache()
+        cache.put("Fran: 21-15-9", _workout())
+
+        first = cache.get("fran 21 - 15 - 9")
+        first.workout_name = "mutated"
+        assert cache.get("FRAN 21/15/9").workout_name == "Fran"
+        assert cache.stats()["hits"] == 2
+
+    def test_lru_eviction(self):
+        cache = ParseCache(max_entries=2)
+        cache.put("a", _workout("A"))
+        cache.put("b", _workout("B"))
+        cache.get("a")
+        cache.put("c", _workout("C"))
+
+        assert cache.get("b") is None
+        assert cache.get("a").workout_name == "A"
+        assert cache.get("c").workout_name == "C"
+
+    def test_expired_entries_miss(self):
+        cache = ParseCache(ttl_s=0.01)
+        cache.put("fran", _workout())
+        time.sleep(0.02)
+        assert cache.get("fran") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_sqlite_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "parse_cache.db")
+        cache = ParseCache(sqlite_path=path)
+        cache.put("Fran", _workout())
+        cache.flush()
+
+        restarted = ParseCache(sqlite_path=path)
+        assert restarted.get("fran").workout_name == "Fran"
+        assert restarted.stats()["sqlite_hits"] == 1
+        assert restarted.get("fran").workout_name == "Fran"
+        assert restarted.stats()["sqlite_hits"] == 1  # Second hit served from memory
+
+    def test_namespaces_do_not_share_entries(self, tmp_path):
+        path = str(tmp_path / "parse_cache.db")
+        cache = ParseCache(sqlite_path=path, namespace="haiku")
+        cache.put("Fran", _workout())
+        cache.flush()
+        assert ParseCache(sqlite_path=path, namespace="sonnet").get("Fran") is None
+
+    def test_sqlite_io_runs_off_the_calling_thread(self, tmp_path):
+        path = str(tmp_path / "parse_cache.db")
+        cache = ParseCache(sqlite_path=path)
+        threads = []
+
+        def on_thread(original):
+            def wrapper(*args):
+                threads.append(threading.get_ident())
+                return original(*args)
+            return wrapper
+
+        with patch.object(cache, "_sqlite_put", on_thread(cache._sqlite_put)):
+            cache.put("Fran", _workout())
+            cache.flush()
+
+        restarted = ParseCache(sqlite_path=path)
+        with patch.object(restarted, "_sqlite_get", on_thread(restarted._sqlite_get)):
+            assert asyncio.run(restarted.get_async("fran")).workout_name == "Fran"
+
+        assert len(threads) == 2 and threading.get_ident() not in threads
+        assert restarted.stats()["sqlite_hits"] == 1
+
+
+class TestParserUsesCache:
+    def test_repeat_parse_skips_client(self):
+        parser = WorkoutParserAgent()
+        original = parser.client.parse_workout
+        calls = []
+
+        def spy(text, **kwargs):
+            calls.append(text)
+            return original(text, **kwargs)
+
+        with patch.object(parser.client, "parse_workout", spy):
+            first = parser.parse_and_validate("AMRAP 20 minutes: 5 pull-ups, 10 push-ups")
+            second = parser.parse_and_validate("amrap 20 min 5 pullups, 10 pushups")
+
+        assert len(calls) == 1
+        assert second == first
+        assert parser.cache.stats()["hits"] == 1
+
+    def test_invalid_parses_are_not_cached(self):
+        parser = WorkoutParserAgent()
+        bad = _workout()
+        bad.total_duration_min = 99
+
+        with patch.object(parser.client, "parse_workout", return_value=bad):
+            for _ in range(2):
+                try:
+                    parser.parse_and_validate("broken")
+                except ValueError:
+                    pass
+
+        assert parser.cache.stats()["entries"] == 0
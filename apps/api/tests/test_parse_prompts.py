@@ -0,0 +1,86 @@
+"""
+Tests for the per-format parse prompts routed from plan()
+"""
+from unittest.mock import patch
+
+import pytest
+
+from agents.workout_parser import WORK_BUCKETS, WorkoutParserAgent
+from benchmarks.parse_prompts import run
+from clients.anthropic_client import (
+    BPM_MAPPING, SYSTEM_PROMPT, TYPE_PROMPTS, WORKOUT_TOOL, AnthropicClient,
+)
+from config import settings
+
+
+@pytest.fixture
+def client():
+    with patch("anthropic.Anthropic"), patch("anthropic.AsyncAnthropic"):
+        return AnthropicClient(api_key="test-key")
+
+
+class TestRouting:
+    @pytest.mark.parametrize("text,prompt_type", [
+        ("AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats", "AMRAP"),
+        ("21-15-9 thrusters and pull-ups", "RFT"),
+        ("EMOM 12 minutes: 10 burpees", "EMOM"),
+        ("Tabata: push-ups, air squats, sit-ups, burpees", "Tabata"),
+        ("Back squat 5x5", None),
+        ("A) EMOM 10: 3 cleans\nB) 21-15-9 burpees and wall balls", None),
+        ("Strength: back squat 5-5-5-5-5\nThen: 10 min AMRAP of 5 burpees", None),
+        ("Partner WOD: 100 cal row, 80 wall balls, 60 burpees", None),
+    ])
+    def test_plan_routes_only_unambiguous_formats(self, text, prompt_type):
+        assert WorkoutParserAgent().plan(text)["prompt_type"] == prompt_type
+
+    def test_parser_passes_prompt_type_to_client(self):
+        parser = WorkoutParserAgent()
+        original = parser.client.parse_workout
+        with patch.object(parser.client, "parse_workout", side_effect=original) as parse:
+            parser.parse_and_validate("EMOM 14 minutes: 8 toes-to-bar")
+        assert parse.call_args.kwargs["workout_type"] == "EMOM"
+
+    def test_routing_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "specialized_prompts", False)
+        parser = WorkoutParserAgent()
+        original = parser.client.parse_workout
+        with patch.object(parser.client, "parse_workout", side_effect=original) as parse:
+            parser.parse_and_validate("EMOM 14 minutes: 8 toes-to-bar")
+        assert parse.call_args.kwargs["workout_type"] is None
+
+
+class TestTypePrompts:
+    def test_request_uses_short_prompt_and_narrow_tool(self, client):
+        request = client._text_request("AMRAP 20: 5 pull-ups", workout_type="AMRAP")
+        prompt, tool = TYPE_PROMPTS["AMRAP"]
+
+        assert request["system"] == prompt
+        assert len(prompt) < len(SYSTEM_PROMPT) / 2
+        intensity = tool["input_schema"]["properties"]["phases"]["items"]["properties"]["intensity"]
+        assert intensity["enum"] == ["warm_up", "high", "cooldown"]
+        assert request["tools"] == [tool]
+
+    @pytest.mark.parametrize("workout_type", [None, "Strength"])
+    def test_other_workouts_keep_full_prompt(self, client, workout_type):
+        request = client._text_request("Back squat 5x5", workout_type=workout_type)
+        assert request["system"] == SYSTEM_PROMPT
+        assert request["tools"] == [WORKOUT_TOOL]
+
+    @pytest.mark.parametrize("workout_type", sorted(WORK_BUCKETS))
+    def test_prompt_rules_match_prefetch_buckets(self, workout_type):
+        intensity, bpm_range = WORK_BUCKETS[workout_type]
+        prompt, tool = TYPE_PROMPTS[workout_type]
+        assert f'"{intensity}", BPM [{bpm_range[0]}, {bpm_range[1]}]' in prompt
+        assert tuple(BPM_MAPPING[intensity]) == bpm_range
+
+    def test_full_tool_is_not_modified(self):
+        intensity = WORKOUT_TOOL["input_schema"]["properties"]["phases"]["items"]["properties"]["intensity"]
+        assert len(intensity["enum"]) == 6
+
+
+class TestHarness:
+    def test_routed_requests_are_much_smaller(self):
+        report = run()
+        assert report["routed"] >= 0.5
+        assert report["routed_tokens_mean"] < 0.7 * report["monolithic_tokens_mean"]
+        assert report["token_savings"] > 0
@@ -0,0 +1,106 @@
+"""
+Tests for the concurrent per-phase search fallback
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agents.music_curator import MusicCuratorAgent
+from config import settings
+from models.schemas import Phase
+from music_sources.base import MusicSource, TrackCandidate
+from services import deadline
+
+SEARCH_S = 0.1
+
+
+class SlowSource(MusicSource):
+    """Every search takes SEARCH_S; records peak concurrency and budgets seen."""
+
+    def __init__(self, max_concurrent=4):
+        self.max_concurrent_searches = max_concurrent
+        self.active = 0
+        self.peak = 0
+        self.remaining = []
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return "slow"
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.remaining.append(deadline.remaining())
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    @staticmethod
+    def _tracks(bpm_min, limit):
+        return [
+            TrackCandidate(name=f"{bpm_min}-{i}", artist=f"Artist {i}", bpm=bpm_min + 1,
+                           energy=0.9, duration_ms=200_000, source="slow")
+            for i in range(limit)
+        ]
+
+    def search_by_bpm(self, bpm_min, bpm_max, genre="rock", limit=10):
+        self._enter()
+        # Later phases finish first, so results arrive out of order
+        time.sleep(SEARCH_S * (1 + (200 - bpm_min) / 200))
+        self._exit()
+        return self._tracks(bpm_min, limit)
+
+    async def search_by_bpm_async(self, bpm_min, bpm_max, genre="rock", limit=10):
+        self._enter()
+        await asyncio.sleep(SEARCH_S * (1 + (200 - bpm_min) / 200))
+        self._exit()
+        return self._tracks(bpm_min, limit)
+
+
+PHASES = [
+    Phase(name=f"Phase {i}", duration_min=5, intensity="high", bpm_range=(100 + 20 * i, 115 + 20 * i))
+    for i in range(4)
+]
+
+
+def _search(curator, mode):
+    if mode == "sync":
+        return curator.batch_search_tracks(PHASES)
+    return asyncio.run(curator.batch_search_tracks_async(PHASES))
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+class TestPhaseSearch:
+    def test_phases_run_concurrently_in_order(self, mode):
+        source = SlowSource()
+        start = time.perf_counter()
+        pools = _search(MusicCuratorAgent(music_source=source), mode)
+        elapsed = time.perf_counter() - start
+
+        assert list(pools) == [p.name for p in PHASES]
+        assert [pools[p.name][0].bpm for p in PHASES] == [101, 121, 141, 161]
+        assert source.peak == 4
+        assert elapsed < 2 * 2 * SEARCH_S  # Slowest phase is ~1.5x SEARCH_S; sequential is ~5x
+
+    def test_source_limit_caps_concurrency(self, mode):
+        source = SlowSource(max_concurrent=2)
+        _search(MusicCuratorAgent(music_source=source), mode)
+        assert source.peak == 2
+
+    def test_setting_of_one_is_sequential(self, mode, monkeypatch):
+        monkeypatch.setattr(settings, "phase_search_concurrency", 1)
+        source = SlowSource()
+        _search(MusicCuratorAgent(music_source=source), mode)
+        assert source.peak == 1
+
+    def test_searches_see_request_deadline(self, mode):
+        source = SlowSource()
+        with deadline.budget(30):
+            _search(MusicCuratorAgent(music_source=source), mode)
+        assert len(source.remaining) == 4
+        assert all(0 < r <= 30 for r in source.remaining)
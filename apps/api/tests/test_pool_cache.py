@@ -0,0 +1,173 @@
+"""
+Tests for the cross-request candidate pool cache
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from agents.music_curator import MusicCuratorAgent
+from config import settings
+from models.candidate_pool import CandidatePool
+from models.schemas import Phase
+from music_sources.base import MusicSource, TrackCandidate
+from services.pool_cache import PoolCache, pool_key
+
+HIGH = Phase(name="Main WOD", duration_min=20, intensity="high", bpm_range=(145, 160))
+WARM = Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120))
+
+
+def _candidates(bpm_min, limit, tag=""):
+    return [
+        TrackCandidate(name=f"{tag}{bpm_min}-{i}", artist=f"Artist {i}", bpm=bpm_min + 2,
+                       energy=0.9, duration_ms=200_000, source="counting", source_id=f"{tag}{bpm_min}-{i}")
+        for i in range(limit)
+    ]
+
+
+class CountingSource(MusicSource):
+    """Per-phase source that counts upstream searches."""
+
+    def __init__(self, name="deezer"):
+        self._name = name
+        self.searches = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def search_by_bpm(self, bpm_min, bpm_max, genre="rock", limit=10):
+        self.searches += 1
+        return _candidates(bpm_min, limit, tag=f"s{self.searches}-")
+
+    async def search_by_bpm_async(self, bpm_min, bpm_max, genre="rock", limit=10):
+        return self.search_by_bpm(bpm_min, bpm_max, genre, limit)
+
+
+class CountingBatchSource(CountingSource):
+    """Batch source returning 2 tracks per minute of each phase."""
+
+    def __init__(self):
+        super().__init__(name="claude")
+        self.batches = []
+
+    def batch_search(self, phases_info, genre="rock", exclude_artists=None, boost_artists=None):
+        self.batches.append([p["name"] for p in phases_info])
+        return {p["name"]: _candidates(p["bpm_min"], 2 * p["duration_min"]) for p in phases_info}
+
+    async def batch_search_async(self, phases_info, **kwargs):
+        return self.batch_search(phases_info, **kwargs)
+
+
+def _pool(n):
+    return CandidatePool.from_candidates(_candidates(140, n))
+
+
+class TestPoolCache:
+    def test_sample_is_random_subset_in_order(self):
+        cache = PoolCache(sample=0.5)
+        cache.put(("deezer", 140, 160, "rock", 0.75), _pool(40))
+        pool, stale = cache.get(("deezer", 140, 160, "rock", 0.75))
+        assert not stale and len(pool) == 20
+        rows = [int(i.split("-")[1]) for i in pool.ids]
+        assert rows == sorted(rows)
+
+    def test_sample_respects_limit_and_phase_need(self):
+        cache = PoolCache(sample=0.5)
+        assert len(cache.sample(_pool(40), limit=10)) == 10
+        assert len(cache.sample(_pool(40), need=0.9)) == 36
+
+    def test_shorter_coverage_misses(self):
+        cache = PoolCache()
+        key = ("claude", 145, 160, "rock", 0.75)
+        cache.put(key, _pool(20), covers_min=10)
+        assert cache.get(key, duration_min=20) is None
+        assert cache.get(key, duration_min=10) is not None
+
+    def test_per_source_ttl_and_stale_window(self):
+        cache = PoolCache(ttl_s=100, source_ttls_s={"mock": 0, "deezer": 10}, stale_s=5)
+        cache.put(("mock", 140, 160, "rock", 0.75), _pool(5))
+        assert cache.stats()["entries"] == 0
+
+        key = ("deezer", 140, 160, "rock", 0.75)
+        cache.put(key, _pool(5))
+        now = time.monotonic()
+        with patch("services.pool_cache.time.monotonic", return_value=now + 12):
+            assert cache.get(key)[1] is True
+            assert cache.start_refresh(key) and not cache.start_refresh(key)
+        with patch("services.pool_cache.time.monotonic", return_value=now + 16):
+            assert cache.get(key) is None
+
+    def test_lru_eviction(self):
+        cache = PoolCache(max_entries=2)
+        for bpm in (100, 120, 140):
+            cache.put(("deezer", bpm, bpm + 20, "rock", 0.5), _pool(3))
+        assert cache.get(("deezer", 100, 120, "rock", 0.5)) is None
+        assert cache.stats()["entries"] == 2
+
+
+class TestCuratorCache:
+    def test_repeat_searches_skip_upstream_and_vary(self):
+        source = CountingSource()
+        curator = MusicCuratorAgent(music_source=source)
+        first = curator.search_tracks(HIGH)
+        samples = {tuple(curator.search_tracks(HIGH).ids) for _ in range(5)}
+
+        assert source.searches == 1
+        assert len(first) == 20  # Drawn from an over-fetched pool of 40
+        assert len(samples) > 1
+
+    def test_mock_source_is_not_cached(self):
+        curator = MusicCuratorAgent()
+        curator.search_tracks(HIGH)
+        assert curator.pool_cache.stats()["entries"] == 0
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "pool_cache_size", 0)
+        assert MusicCuratorAgent(music_source=CountingSource()).pool_cache is None
+
+    def test_stale_pool_served_while_refreshed(self):
+        source = CountingSource()
+        curator = MusicCuratorAgent(music_source=source)
+
+        async def run():
+            await curator.search_tracks_async(HIGH)
+            key = pool_key("deezer", HIGH.bpm_range, "rock", 0.75)
+            curator.pool_cache._entries[key].fresh_until = 0
+            served = await curator.search_tracks_async(HIGH)
+            await asyncio.gather(*curator._refresh_tasks)
+            return served, key
+
+        served, key = asyncio.run(run())
+        assert served.ids[0].startswith("s1-")
+        assert source.searches == 2
+        assert curator.pool_cache._entries[key].pool.ids[0].startswith("s2-")
+        assert curator.pool_cache.stats()["stale_hits"] == 1
+
+    @pytest.mark.parametrize("mode", ["sync", "async"])
+    def test_batch_searches_only_uncached_phases(self, mode):
+        source = CountingBatchSource()
+        curator = MusicCuratorAgent(music_source=source)
+
+        def search(phases, **kwargs):
+            if mode == "sync":
+                return curator.batch_search_tracks(phases, **kwargs)
+            return asyncio.run(curator.batch_search_tracks_async(phases, **kwargs))
+
+        search([HIGH])
+        pools = search([WARM, HIGH])
+        assert source.batches == [["Main WOD"], ["Warm-up"]]
+        assert list(pools) == ["Warm-up", "Main WOD"]
+        assert len(pools["Main WOD"]) >= 30  # 75% of 40, enough for the 20 minutes
+
+        longer = Phase(name="Long", duration_min=30, intensity="high", bpm_range=(145, 160))
+        search([longer])
+        assert source.batches[-1] == ["Long"]
+
+    def test_personalized_batch_results_not_cached(self):
+        source = CountingBatchSource()
+        curator = MusicCuratorAgent(music_source=source)
+        curator.batch_search_tracks([HIGH], boost_artists={"Artist 1"})
+        curator.batch_search_tracks([HIGH])
+        assert len(source.batches) == 2
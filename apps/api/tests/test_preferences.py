@@ -0,0 +1,223 @@
+"""
+Tests for online per-user preference learning
+"""
+import hashlib
+import hmac
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_module
+from agents.music_curator import MusicCuratorAgent
+from config import settings
+from main import app
+from models.candidate_pool import CandidatePool
+from models.schemas import Phase
+from music_sources.base import TrackCandidate
+from services import scoring
+from services.preferences import PreferenceStore
+
+PHASE = Phase(name="Main WOD", duration_min=12, intensity="high", bpm_range=(145, 160))
+DAY = 86400.0
+
+
+def _pool(n=40, artists=8):
+    return CandidatePool.from_candidates(
+        TrackCandidate(name=f"Song {i}", artist=f"Artist {i % artists}", bpm=145 + i % 15,
+                       energy=0.7 + (i % 3) / 10, duration_ms=200_000, source="test", source_id=f"id{i}")
+        for i in range(n)
+    )
+
+
+class TestPreferenceStore:
+    def test_weights_decay_with_half_life(self):
+        store = PreferenceStore(half_life_s=10 * DAY)
+        store.learn("u1", "id1", "Artist 1", 1, now=1000.0)
+        weights = store.get("u1")
+        assert weights.artist("artist 1", 1000.0) == pytest.approx(1.0)
+        assert weights.track("id1", 1000.0 + 10 * DAY) == pytest.approx(0.5)
+
+    def test_rerating_replaces_previous_rating(self):
+        store = PreferenceStore(half_life_s=10 * DAY)
+        store.learn("u1", "id1", "Artist 1", 1, now=0.0)
+        store.learn("u1", "id1", "Artist 1", -1, now=5 * DAY)
+        weights = store.get("u1")
+        assert weights.track("id1", 5 * DAY) == pytest.approx(-1.0)
+        assert weights.artist("Artist 1", 5 * DAY) == pytest.approx(-1.0)
+
+        store.learn("u1", "id1", "Artist 1", 0, now=6 * DAY)
+        assert weights.track("id1", 6 * DAY) == pytest.approx(0.0, abs=1e-6)
+        assert store.stats() == {"users": 1, "events": 3}
+
+    def test_rescale_keeps_weights(self):
+        store = PreferenceStore(half_life_s=DAY)
+        store.learn("u1", "id1", "Artist 1", 1, now=0.0)
+        store.learn("u1", "id2", "Artist 2", 1, now=30 * DAY)  # Past RESCALE_AFTER: slots are rescaled
+        weights = store.get("u1")
+        assert weights.ref == 30 * DAY
+        assert weights.track("id1", 30 * DAY) == pytest.approx(2.0 ** -30)
+        store.learn("u1", "id1", "Artist 1", 0, now=31 * DAY)
+        assert weights.track("id1", 31 * DAY) == pytest.approx(0.0, abs=1e-9)
+
+    def test_seed_merges_header_changes(self):
+        store = PreferenceStore()
+        store.seed("u1", boost_artists={"Artist 1"}, hidden_tracks={"id3"}, now=0.0)
+        store.seed("u1", boost_artists={"Artist 1"}, hidden_tracks={"id3"}, now=0.0)  # Already applied
+        weights = store.get("u1")
+        assert weights.artist("Artist 1", 0.0) == pytest.approx(1.0)
+        assert weights.track("id3", 0.0) == pytest.approx(-1.0)
+
+        store.seed("u1", boost_artists={"Artist 2"}, now=0.0)
+        assert weights.artist("Artist 1", 0.0) == pytest.approx(0.0, abs=1e-6)
+        assert weights.artist("Artist 2", 0.0) == pytest.approx(1.0)
+        assert weights.track("id3", 0.0) == 0.0
+        assert store.get("u2") is None
+
+    def test_header_boosts_apply_after_feedback_created_the_user(self):
+        store = PreferenceStore()
+        store.learn("u1", "id1", "Artist 1", 1, now=0.0)
+        store.seed("u1", boost_artists={"Artist 2"}, hidden_tracks={"id1", "id3"}, now=0.0)
+        weights = store.get("u1")
+        assert weights.artist("Artist 2", 0.0) == pytest.approx(1.0)
+        assert weights.track("id1", 0.0) == pytest.approx(1.0)  # Rated directly: the user's own rating stands
+        assert weights.track("id3", 0.0) == pytest.approx(-1.0)
+
+    def test_ratings_are_capped_oldest_first(self):
+        store = PreferenceStore(max_ratings=2)
+        for i in range(3):
+            store.learn("u1", f"id{i}", "Artist 1", 1, now=0.0)
+        weights = store.get("u1")
+        assert list(weights.ratings) == ["id1", "id2"]
+        assert weights.artist("Artist 1", 0.0) == pytest.approx(2.0)
+
+    def test_unrated_tracks_never_hidden_or_liked(self):
+        store = PreferenceStore()
+        store.seed("u1", boost_artists={f"Fan {i}" for i in range(100)},
+                   hidden_tracks={f"hidden{i}" for i in range(100)}, now=0.0)
+        pool = CandidatePool.from_candidates(
+            TrackCandidate(name=f"Song {i}", artist="Someone Else", bpm=150, energy=0.8,
+                           duration_ms=200_000, source="test", source_id=f"unseen{i}")
+            for i in range(5000)
+        )
+        points = store.get("u1").points(pool, now=0.0)
+        assert None not in points
+        assert len(set(points)) == 1  # Only the (possibly colliding) artist slot, never a track bonus
+
+    def test_artist_slots_allocated_on_first_use(self):
+        store = PreferenceStore()
+        store.seed("u1", hidden_tracks={"id1"})
+        assert store.get("u1").slots is None
+        store.learn("u1", "id2", "Artist 2", 1)
+        assert len(store.get("u1").slots) == store.buckets
+
+    def test_lru_eviction(self):
+        store = PreferenceStore(max_users=2)
+        for user in ("u1", "u2", "u3"):
+            store.learn(user, "id1", None, 1)
+        assert store.get("u1") is None and store.stats()["users"] == 2
+
+
+class TestLearnedRanking:
+    def _curator(self):
+        return MusicCuratorAgent(preferences=PreferenceStore())
+
+    def test_liked_artist_rises_and_disliked_track_is_hidden(self):
+        curator = self._curator()
+        pool = _pool()
+        baseline = [row for row, _ in curator.rank_pool(pool, PHASE, set(), user_id="u1")]
+        worst_artist = pool.artist(baseline[-1])
+
+        curator.learn("u1", "elsewhere", worst_artist, 1)
+        curator.learn("u1", pool.ids[baseline[0]], None, -1)
+        ranked = [row for row, _ in curator.rank_pool(pool, PHASE, set(), user_id="u1")]
+
+        assert baseline[0] not in ranked
+        assert pool.artist(ranked[0]) == worst_artist
+
+    def test_header_boost_survives_feedback_before_first_generate(self):
+        curator = self._curator()
+        pool = _pool()
+        baseline = curator.rank_pool(pool, PHASE, set(), boost_artists={"Artist 3"})
+        curator.learn("u1", "elsewhere", "Artist 5", 1)  # Feedback reaches this instance first
+        curator.preferences.seed("u1", boost_artists={"Artist 3"})
+
+        learned = dict(curator.rank_pool(pool, PHASE, set(), boost_artists={"Artist 3"}, user_id="u1"))
+        for row, score in baseline:
+            if pool.artist(row) == "Artist 3":
+                assert learned[row] == pytest.approx(score)
+
+    def test_learned_weights_replace_header_boosts(self):
+        curator = self._curator()
+        pool = _pool()
+        curator.preferences.seed("u1", boost_artists={"Artist 3"})
+        curator.learn("u1", "id3", "Artist 3", -1)
+
+        ranked = curator.rank_pool(pool, PHASE, set(), boost_artists={"Artist 3"}, user_id="u1")
+        assert all(pool.artist(row) != "Artist 3" for row, _ in ranked[:10])
+
+    @pytest.mark.skipif(scoring.np is None, reason="numpy not installed")
+    def test_vectorized_matches_python(self, monkeypatch):
+        curator = self._curator()
+        pool = _pool(200, artists=30)
+        curator.learn("u1", "id5", "Artist 5", 1)
+        curator.learn("u1", "id7", "Artist 7", -1)
+        curator.learn("u1", "id9", None, -1)
+
+        vectorized = curator.rank_pool(pool, PHASE, {"Artist 1"}, hidden_tracks={"id2"}, user_id="u1")
+        monkeypatch.setattr(scoring, "MIN_VECTOR_POOL", 10 ** 9)
+        python = curator.rank_pool(pool, PHASE, {"Artist 1"}, hidden_tracks={"id2"}, user_id="u1")
+
+        assert [row for row, _ in vectorized] == [row for row, _ in python]
+        assert [s for _, s in vectorized] == pytest.approx([s for _, s in python])
+        assert not {"id2", "id7", "id9"} & {pool.ids[row] for row, _ in python}
+
+    def test_anonymous_ranking_unchanged(self):
+        curator = self._curator()
+        curator.learn("u1", "id1", "Artist 1", 1)
+        pool = _pool()
+        assert curator.rank_pool(pool, PHASE, set()) == \
+            MusicCuratorAgent(preferences=PreferenceStore()).rank_pool(pool, PHASE, set())
+
+
+class TestFeedbackEndpoint:
+    @pytest.fixture
+    def curator(self, monkeypatch):
+        monkeypatch.setattr(settings, "api_shared_secret", "test-secret")
+        curator = MusicCuratorAgent(preferences=PreferenceStore())
+        monkeypatch.setattr(main_module, "music_curator", curator, raising=False)
+        return curator
+
+    def _headers(self, user_id):
+        signature = hmac.new(b"test-secret", user_id.encode(), hashlib.sha256).hexdigest()
+        return {"X-User-ID": user_id, "X-User-Signature": signature}
+
+    def test_records_signed_feedback(self, curator):
+        response = TestClient(app).post(
+            "/api/v1/feedback",
+            json={"track_id": "id1", "artist": "Artist 1", "rating": -1},
+            headers=self._headers("user-1"),
+        )
+        assert response.status_code == 204
+        assert curator.preferences.get("user-1").track("id1", time.time()) < -0.99
+
+    def test_rejects_unsigned_or_invalid(self, curator):
+        client = TestClient(app)
+        body = {"track_id": "id1", "rating": 1}
+        assert client.post("/api/v1/feedback", json=body, headers={"X-User-ID": "user-1"}).status_code == 401
+        assert client.post("/api/v1/feedback", json={**body, "rating": 5},
+                           headers=self._headers("user-1")).status_code == 422
+        assert curator.preferences.stats()["events"] == 0
+
+    def test_feedback_before_first_generate_keeps_header_boosts(self, curator):
+        response = TestClient(app).post(
+            "/api/v1/feedback",
+            json={"track_id": "id1", "artist": "Artist 1", "rating": 1},
+            headers=self._headers("user-1"),
+        )
+        assert response.status_code == 204
+
+        composer = main_module.PlaylistComposerAgent(curator=curator)
+        prefs = main_module.GenerationPreferences(user_id="user-1", boost_artists={"Artist 3"})
+        assert main_module._seed_preferences(composer, prefs) == "user-1"
+        assert curator.preferences.get("user-1").artist("Artist 3", time.time()) == pytest.approx(1.0, abs=1e-3)
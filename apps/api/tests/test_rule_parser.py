@@ -0,0 +1,106 @@
+"""
+Tests for the local rule-based workout parser
+"""
+from unittest.mock import patch
+
+import pytest
+
+from agents.workout_parser import WorkoutParserAgent
+from benchmarks.rule_parser import run
+from config import settings
+from services.rule_parser import RuleBasedParser, extract_features
+
+
+@pytest.fixture
+def rules():
+    return RuleBasedParser()
+
+
+class TestExtractFeatures:
+    @pytest.mark.parametrize("text,workout_type,explicit_min", [
+        ("AMRAP 20 minutes: 5 pull-ups", "AMRAP", 20),
+        ("15:00 AMRAP\n3 power cleans", "AMRAP", 15),
+        ("AMRAP 10 burpees, 12 min", "AMRAP", None),
+        ("E2MOM x 10: 5 power cleans", "EMOM", 20),
+        ("Every 2:00 for 20:00\n3 deadlifts", "EMOM", 20),
+        ("EMOM x 16\nOdd: 12 cal row", "EMOM", 16),
+        ("21-15-9 thrusters and pull-ups", "RFT", None),
+        ("Back squat 5x5", "Strength", None),
+    ])
+    def test_type_and_duration(self, text, workout_type, explicit_min):
+        f = extract_features(text)
+        assert f.workout_type == workout_type
+        assert f.explicit_min == explicit_min
+
+    def test_rounds_cap_scheme_and_movements(self):
+        f = extract_features("3 rounds for time (TC 15:00): 400m run, 21 KB swings, 12 pull-ups")
+        assert (f.rounds, f.time_cap_min) == (3, 15)
+        assert [(amount, unit) for amount, unit, _ in f.movements] == [(400, "m"), (21, "reps"), (12, "reps")]
+
+        f = extract_features("21/15/9: Deadlifts and handstand push-ups")
+        assert f.rep_scheme == [21, 15, 9]
+        assert [name for _, _, name in f.movements] == ["deadlifts", "handstand pushups"]
+
+    @pytest.mark.parametrize("text", [
+        "Part A: 5x3 front squat\nPart B: 12 min AMRAP 10 burpees",
+        "A) EMOM 10: 3 cleans\nB) 21-15-9 burpees and wall balls",
+        "AMRAP 8 min: 10 burpees\nRest 2 min\nAMRAP 8 min: 10 thrusters",
+    ])
+    def test_multi_part_workouts_are_flagged(self, text):
+        assert extract_features(text).multi_part
+
+
+class TestRuleBasedParser:
+    def test_explicit_amrap_is_confident(self, rules):
+        result = rules.parse("AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats")
+        assert result.confidence >= settings.rule_parser_min_confidence
+        assert result.workout.workout_name == "20 Minute AMRAP"
+        assert [p.duration_min for p in result.workout.phases] == [5, 20, 3]
+        assert result.workout.phases[1].bpm_range == (145, 160)
+
+    @pytest.mark.parametrize("text", [
+        "Part A: 5x3 front squat\nPart B: 12 min AMRAP 10 burpees",
+        "5 rounds for time: 400m run, 15 overhead squats, 15 pull-ups",
+        "Partner WOD: 100 cal row, 80 wall balls, 60 burpees",
+    ])
+    def test_ambiguous_text_falls_below_threshold(self, rules, text):
+        assert rules.parse(text).confidence < settings.rule_parser_min_confidence
+
+    def test_empty_text(self, rules):
+        assert rules.parse("   ") is None
+
+    def test_parses_validate(self, rules):
+        parser = WorkoutParserAgent()
+        for wod in ["Tabata squats", "For time, 12 min cap: 100 wall balls", "hello"]:
+            assert parser.validate(rules.parse(wod).workout)[0]
+
+
+class TestBenchmark:
+    def test_corpus_precision_coverage_and_latency(self):
+        report = run(settings.rule_parser_min_confidence, repeat=3)
+        assert report["precision"] >= 0.95
+        assert report["coverage"] >= 0.5
+        assert report["p50_ms"] < 1.0
+
+
+class TestParserUsesRules:
+    @pytest.fixture
+    def parser(self):
+        parser = WorkoutParserAgent()
+        parser.rule_parser = RuleBasedParser()
+        parser.cache = None
+        return parser
+
+    def test_confident_parse_skips_client(self, parser):
+        with patch.object(parser.client, "parse_workout", side_effect=AssertionError("client called")):
+            workout = parser.parse_and_validate("EMOM 12 minutes: 10 burpees")
+        assert workout.workout_name == "12 Minute EMOM"
+
+    def test_ambiguous_text_goes_to_client(self, parser):
+        original = parser.client.parse_workout
+        with patch.object(parser.client, "parse_workout", side_effect=original) as client:
+            parser.parse_and_validate("AMRAP 8 min: 10 burpees\nRest 2 min\nAMRAP 8 min: 10 thrusters")
+        client.assert_called_once()
+
+    def test_disabled_for_mock_client(self):
+        assert WorkoutParserAgent().rule_parser is None
@@ -0,0 +1,77 @@
+"""
+Tests for vectorized candidate scoring
+"""
+import random
+from unittest.mock import patch
+
+import pytest
+
+from agents.music_curator import MusicCuratorAgent
+from benchmarks.scoring import make_pool, run
+from models.candidate_pool import CandidatePool
+from models.schemas import Phase
+from services import scoring
+
+np = pytest.importorskip("numpy")
+
+PHASE = Phase(name="Main WOD", duration_min=20, intensity="high", bpm_range=(145, 160))
+
+
+def _python_scores(curator, pool, **kwargs):
+    with patch.object(scoring, "np", None):
+        return curator.score_candidates(pool, PHASE, **kwargs)
+
+
+class TestScoreCandidates:
+    @pytest.mark.parametrize("size", [100, 1000])
+    def test_vectorized_matches_python_loop(self, size):
+        curator = MusicCuratorAgent()
+        pool = make_pool(size, seed=size)
+        kwargs = dict(used_artists={pool[0].artist}, boost_artists={pool[5].artist})
+
+        expected = _python_scores(curator, pool, **kwargs)
+        actual = curator.score_candidates(pool, PHASE, **kwargs)
+
+        assert [t.id for t, _ in actual] == [t.id for t, _ in expected]
+        assert [s for _, s in actual] == pytest.approx([s for _, s in expected])
+
+    def test_top_k_is_prefix_of_full_ranking(self):
+        curator = MusicCuratorAgent()
+        pool = make_pool(500)
+        full = _python_scores(curator, pool, used_artists=set())
+        top = curator.score_candidates(pool, PHASE, set(), top_k=20)
+        assert [t.id for t, _ in top] == [t.id for t, _ in full[:20]]
+
+    def test_small_pools_use_python_loop(self):
+        curator = MusicCuratorAgent()
+        with patch.object(scoring, "score", side_effect=AssertionError("vectorized")):
+            assert len(curator.score_candidates(make_pool(20), PHASE, set())) == 20
+
+    def test_hidden_tracks_removed(self):
+        curator = MusicCuratorAgent()
+        pool = make_pool(100)
+        hidden = {t.id for t in pool[:100]}
+        assert curator.score_candidates(pool, PHASE, set(), hidden_tracks=hidden) == []
+        hidden = {t.id for t in pool[:10]}
+        ranked = curator.score_candidates(pool, PHASE, set(), hidden_tracks=hidden)
+        assert len(ranked) == 90 and not hidden & {t.id for t, _ in ranked}
+
+
+class TestTopK:
+    @pytest.mark.parametrize("k", [0, 1, 7, 50, 99, 100, 150, None])
+    def test_matches_stable_sort_with_ties(self, k):
+        rng = random.Random(k or 0)
+        scores = np.array([float(rng.randint(0, 10)) for _ in range(100)])
+        expected = sorted(range(100), key=lambda i: -scores[i])[:k]
+        assert scoring.top_k(scores, k).tolist() == expected
+
+    def test_artist_mask_ignores_unknown_names(self):
+        pool = CandidatePool.of(make_pool(100)).arrays()
+        assert not scoring._artist_mask(pool, {"Nobody"}).any()
+
+
+class TestHarness:
+    def test_reports_each_path(self):
+        (row,) = run([200], top_k=10)
+        assert row["pool"] == 200
+        assert row["pool_build_ms"] > 0 and row["python_ms"] > 0 and row["rank_ms"] > 0
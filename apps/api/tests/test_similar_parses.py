@@ -0,0 +1,118 @@
+"""
+Tests for near-duplicate workout parse reuse
+"""
+import statistics
+import time
+from unittest.mock import patch
+
+import pytest
+
+from agents.workout_parser import WorkoutParserAgent
+from models.schemas import Phase, WorkoutStructure
+from services.similar_parses import SimilarParseIndex, signature, vectorize
+
+MOVEMENTS = ["thrusters", "pull-ups", "burpees", "wall balls", "box jumps", "deadlifts",
+             "KB swings", "toes-to-bar", "cal row", "double unders", "push-ups", "air squats"]
+
+
+def _workout(name="20 Minute AMRAP", work_min=20):
+    return WorkoutStructure(
+        workout_name=name,
+        total_duration_min=5 + work_min + 3,
+        phases=[
+            Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120)),
+            Phase(name="AMRAP Work", duration_min=work_min, intensity="high", bpm_range=(145, 160)),
+            Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100)),
+        ],
+    )
+
+
+def _cosine(a, b):
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+@pytest.fixture
+def index():
+    index = SimilarParseIndex(min_similarity=0.85)
+    index.put("20 min AMRAP - 5 pull-ups, 10 push-ups, 15 air squats", _workout())
+    return index
+
+
+class TestVectors:
+    def test_spelling_variants_are_close(self):
+        a = vectorize("AMRAP 20: 5 pullups 10 pushups 15 squats")
+        b = vectorize("20 min AMRAP - 5 pull-ups, 10 push-ups, 15 air squats")
+        assert _cosine(a, b) > 0.85
+
+    def test_different_movements_are_far(self):
+        a = vectorize("21-15-9 thrusters and pull-ups")
+        b = vectorize("21-15-9 deadlifts and handstand push-ups")
+        assert _cosine(a, b) < 0.5
+
+    def test_signature_covers_durations_and_reps(self):
+        assert signature("AMRAP 20: 5 pullups") == signature("20 minute amrap, 5 pull-ups")
+        assert signature("AMRAP 20: 5 pullups") != signature("AMRAP 12: 5 pullups")
+        assert signature("AMRAP 20: 5 pullups") != signature("EMOM 20: 5 pullups")
+
+
+class TestSimilarParseIndex:
+    def test_near_duplicate_reuses_parse(self, index):
+        workout = index.get("AMRAP 20: 5 pullups 10 pushups 15 squats")
+        assert workout == _workout()
+        assert index.stats()["hits"] == 1
+
+    @pytest.mark.parametrize("text", [
+        "AMRAP 12: 5 pullups 10 pushups 15 squats",  # Different duration
+        "AMRAP 20: 5 pullups 12 pushups 15 squats",  # Different reps
+        "EMOM 20: 5 pullups 10 pushups 15 squats",  # Different format
+        "AMRAP 20: 5 muscle-ups 10 handstand walks 15 pistols",  # Different movements
+    ])
+    def test_disagreeing_workouts_miss(self, index, text):
+        assert index.get(text) is None
+
+    def test_returned_parse_is_a_copy(self, index):
+        index.get("AMRAP 20: 5 pullups 10 pushups 15 squats").phases[1].duration_min = 99
+        assert index.get("AMRAP 20: 5 pullups 10 pushups 15 squats").phases[1].duration_min == 20
+
+    def test_lru_eviction_drops_postings(self):
+        index = SimilarParseIndex(max_entries=2)
+        index.put("AMRAP 20: 5 pull-ups", _workout())
+        index.put("EMOM 12: 10 burpees", _workout("12 Minute EMOM", 12))
+        index.put("21-15-9 thrusters and pull-ups", _workout("21-15-9", 12))
+
+        assert index.get("amrap 20 - 5 pullups") is None
+        assert index.stats()["entries"] == 2
+        assert signature("AMRAP 20: 5 pull-ups") not in index._shards
+
+    def test_expired_entries_are_ignored(self):
+        index = SimilarParseIndex(ttl_s=-1)
+        index.put("AMRAP 20: 5 pull-ups", _workout())
+        assert index.get("amrap 20 - 5 pullups") is None
+
+    def test_lookup_is_sub_millisecond(self):
+        index = SimilarParseIndex(max_entries=1024)
+        for i in range(1024):
+            a, b, c = MOVEMENTS[i % 12], MOVEMENTS[(i // 12) % 12], MOVEMENTS[(i // 144) % 12]
+            index.put(f"AMRAP {10 + i % 15}: {i % 7 + 3} {a}, {i % 9 + 5} {b}, {c}", _workout())
+
+        timings = []
+        for _ in range(50):
+            start = time.perf_counter()
+            index.get("AMRAP 18 minutes: 6 thrusters, 9 pull-ups, burpees")
+            timings.append(time.perf_counter() - start)
+        assert statistics.median(timings) < 0.001
+
+
+class TestParserUsesIndex:
+    def test_rephrased_workout_skips_client(self):
+        parser = WorkoutParserAgent()
+        parser.parse_and_validate("5 rounds for time: 400m run, 15 overhead squats, 15 pull-ups")
+
+        with patch.object(parser.client, "parse_workout", side_effect=AssertionError("client called")):
+            workout = parser.parse_and_validate("5 Rounds For Time - 400m Run / 15 Overhead Squats / 15 Pullups")
+        assert workout.workout_name
+
+    def test_disabled(self, monkeypatch):
+        from config import settings
+        monkeypatch.setattr(settings, "similar_parse_size", 0)
+        assert WorkoutParserAgent().similar is None
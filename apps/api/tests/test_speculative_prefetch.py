@@ -0,0 +1,135 @@
+"""
+Tests for speculative candidate prefetch (overlapped with workout parsing)
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_module
+from config import settings
+from main import app
+from agents.workout_parser import WorkoutParserAgent
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+from models.schemas import Phase, Track, WorkoutStructure
+from services.strategy_registry import StrategyRegistry
+
+
+def _spy_batch_search(curator, calls):
+    original = curator.batch_search_tracks_async
+
+    async def spy(phases, **kwargs):
+        calls.append([p.name for p in phases])
+        return await original(phases, **kwargs)
+
+    return patch.object(curator, "batch_search_tracks_async", spy)
+
+
+class TestPredictedPhases:
+    def test_amrap_predicts_high_bucket_with_stated_duration(self):
+        plan = WorkoutParserAgent().plan("AMRAP 20 minutes: 5 pull-ups, 10 push-ups")
+        warm_up, work, cooldown = plan["predicted_phases"]
+        assert (warm_up.intensity, tuple(warm_up.bpm_range)) == ("warm_up", (100, 120))
+        assert (work.intensity, tuple(work.bpm_range), work.duration_min) == ("high", (145, 160), 20)
+        assert (cooldown.intensity, tuple(cooldown.bpm_range)) == ("cooldown", (80, 100))
+
+    def test_descending_reps_predict_very_high(self):
+        plan = WorkoutParserAgent().plan("21-15-9 thrusters and pull-ups")
+        assert plan["workout_type"] == "RFT"
+        assert plan["predicted_phases"][1].intensity == "very_high"
+
+    def test_no_text_predicts_only_warm_up_and_cooldown(self):
+        phases = WorkoutParserAgent().plan("")["predicted_phases"]
+        assert [p.intensity for p in phases] == ["warm_up", "cooldown"]
+
+
+class TestPrefetchWithSpeculation:
+    def _workout(self):
+        return WorkoutStructure(
+            workout_name="Test",
+            total_duration_min=18,
+            phases=[
+                Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120)),
+                Phase(name="Main", duration_min=10, intensity="very_high", bpm_range=(160, 175)),
+                Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100)),
+            ],
+        )
+
+    def test_matching_guesses_are_used_and_only_misses_searched(self):
+        composer = PlaylistComposerAgent(curator=MusicCuratorAgent())
+        guessed = [
+            Phase(name="Warm-up", duration_min=5, intensity="warm_up", bpm_range=(100, 120)),
+            Phase(name="AMRAP Work", duration_min=20, intensity="high", bpm_range=(145, 160)),
+            Phase(name="Cooldown", duration_min=3, intensity="cooldown", bpm_range=(80, 100)),
+        ]
+        calls = []
+        with _spy_batch_search(composer.curator, calls):
+            speculative = asyncio.run(composer.prefetch_speculative_async(guessed))
+            pools = asyncio.run(composer.prefetch_async(self._workout(), speculative_pools=speculative))
+
+        assert calls == [["Warm-up", "AMRAP Work", "Cooldown"], ["Main"]]
+        assert pools["Warm-up"] is speculative[((100, 120), "warm_up")][1]
+        assert pools["Cooldown"] is speculative[((80, 100), "cooldown")][1]
+        assert all(t.bpm >= 160 for t in pools["Main"])
+
+    def test_guess_shorter_than_phase_is_refetched(self):
+        composer = PlaylistComposerAgent(curator=MusicCuratorAgent())
+        pool = [Track(id="w", name="W", artist="A", bpm=110, energy=0.5, duration_ms=180000)]
+        short_guess = Phase(name="Warm-up", duration_min=2, intensity="warm_up", bpm_range=(100, 120))
+        calls = []
+        with _spy_batch_search(composer.curator, calls):
+            pools = asyncio.run(composer.prefetch_async(
+                self._workout(),
+                speculative_pools={((100, 120), "warm_up"): (short_guess, pool)},
+            ))
+
+        assert calls == [["Warm-up", "Main", "Cooldown"]]
+        assert pools["Warm-up"] is not pool
+
+    def test_failed_speculation_returns_no_guesses(self):
+        composer = PlaylistComposerAgent(curator=MusicCuratorAgent())
+
+        async def boom(phases, **kwargs):
+            raise RuntimeError("source down")
+
+        with patch.object(composer.curator, "batch_search_tracks_async", boom):
+            speculative = asyncio.run(composer.prefetch_speculative_async(self._workout().phases))
+        assert speculative == {}
+
+
+class TestGenerateSpeculation:
+    @pytest.fixture(autouse=True)
+    def agents(self, mock_pipeline):
+        main_module.workout_parser = WorkoutParserAgent()
+        main_module.music_curator = MusicCuratorAgent()
+        main_module.playlist_composer = PlaylistComposerAgent(curator=main_module.music_curator)
+        main_module.strategy_registry = StrategyRegistry(
+            main_module.ALLOWED_STRATEGIES,
+            default_composer=main_module.playlist_composer,
+            default_strategy=settings.music_source,
+        )
+
+    def test_correct_guess_skips_post_parse_search(self):
+        calls = []
+        client = TestClient(app)
+        with _spy_batch_search(main_module.music_curator, calls):
+            response = client.post("/api/v1/generate", json={
+                "workout_text": "AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats",
+            })
+
+        assert response.status_code == 200
+        assert len(response.json()["playlist"]["tracks"]) > 0
+        assert calls == [["Warm-up", "AMRAP Work", "Cooldown"]]
+
+    def test_speculation_can_be_disabled(self):
+        client = TestClient(app)
+        with patch.object(settings, "speculative_prefetch", False), \
+                patch.object(PlaylistComposerAgent, "prefetch_speculative_async") as speculate:
+            response = client.post("/api/v1/generate", json={
+                "workout_text": "AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats",
+            })
+
+        assert response.status_code == 200
+        speculate.assert_not_called()
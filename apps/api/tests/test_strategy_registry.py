@@ -0,0 +1,119 @@
+"""
+Tests for the per-strategy composer registry
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent
+from music_sources.mock_source import MockMusicSource
+from services.strategy_registry import StrategyRegistry
+
+STRATEGIES = {"mock", "deezer", "claude"}
+
+
+def _registry(factory):
+    default = PlaylistComposerAgent(curator=MusicCuratorAgent(music_source=MockMusicSource()))
+    return StrategyRegistry(
+        STRATEGIES, default_composer=default, default_strategy="mock", source_factory=factory,
+    )
+
+
+class TestStrategyRegistry:
+    def test_default_and_unknown_strategies_use_default_composer(self):
+        registry = _registry(lambda name: MockMusicSource())
+        assert registry.get("mock") is registry.default_composer
+        assert registry.get("not_a_strategy") is registry.default_composer
+        assert registry.get("") is registry.default_composer
+
+    def test_override_is_built_once_and_reused(self):
+        calls = []
+
+        def factory(name):
+            calls.append(name)
+            return MockMusicSource()
+
+        registry = _registry(factory)
+        first = registry.get("deezer")
+        second = registry.get("deezer")
+
+        assert first is second
+        assert first is not registry.default_composer
+        assert calls == ["deezer"]
+
+    def test_concurrent_first_use_builds_one_instance(self):
+        calls = []
+
+        def slow_factory(name):
+            calls.append(name)
+            time.sleep(0.02)
+            return MockMusicSource()
+
+        registry = _registry(slow_factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("claude"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert calls == ["claude"]
+        assert all(r is results[0] for r in results)
+
+    def test_failed_strategy_falls_back_and_retries_later(self):
+        calls = []
+
+        def failing_factory(name):
+            calls.append(name)
+            return None
+
+        registry = _registry(failing_factory)
+        assert registry.get("deezer") is registry.default_composer
+        assert registry.get("deezer") is registry.default_composer
+        assert calls == ["deezer"]
+        assert registry.health()["deezer"] == "failed"
+
+        with patch("services.strategy_registry.RETRY_AFTER_FAILURE_S", 0):
+            registry.get("deezer")
+        assert calls == ["deezer", "deezer"]
+
+    def test_health_reports_each_strategy(self):
+        registry = _registry(lambda name: MockMusicSource())
+        registry.warm(["deezer"])
+        assert registry.health() == {
+            "claude": "not_initialized",
+            "deezer": "ready",
+            "mock": "ready",
+        }
+
+    def test_async_first_use_builds_off_the_event_loop(self):
+        calls = []
+
+        def slow_factory(name):
+            calls.append(name)
+            time.sleep(0.1)
+            return MockMusicSource()
+
+        registry = _registry(slow_factory)
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            composers = await asyncio.gather(*(registry.get_async("claude") for _ in range(4)))
+            task.cancel()
+            return composers, ticks
+
+        composers, ticks = asyncio.run(scenario())
+        assert calls == ["claude"]
+        assert all(c is composers[0] for c in composers)
+        assert ticks >= 5  # The loop kept running while the source was built
+        assert asyncio.run(registry.get_async("mock")) is registry.default_composer
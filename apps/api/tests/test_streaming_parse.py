@@ -0,0 +1,319 @@
+"""
+Tests for streaming workout parses that report phases incrementally
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import main as main_module
+from agents.music_curator import MusicCuratorAgent
+from agents.playlist_composer import PlaylistComposerAgent, merge_speculative_pools
+from agents.workout_parser import WorkoutParserAgent
+from clients.anthropic_client import AnthropicClient, PhaseStream
+from config import settings
+from models.schemas import GeneratePlaylistRequest, Phase
+from services.strategy_registry import StrategyRegistry
+
+TOOL_INPUT = {
+    "workout_name": 'The "Chipper"',
+    "total_duration_min": 28,
+    "phases": [
+        {"name": "Warm-up {easy}", "duration_min": 5, "intensity": "warm_up", "bpm_range": [100, 120]},
+        {"name": "Main \\ WOD", "duration_min": 20, "intensity": "very_high", "bpm_range": [160, 175]},
+        {"name": "Cooldown", "duration_min": 3, "intensity": "cooldown", "bpm_range": [80, 100]},
+    ],
+}
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _events(tool_input, size=7):
+    events = [SimpleNamespace(
+        type="message_start",
+        message=SimpleNamespace(usage=SimpleNamespace(input_tokens=900, output_tokens=1)),
+    )]
+    events += [
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="input_json_delta", partial_json=c))
+        for c in _chunks(json.dumps(tool_input), size)
+    ]
+    events.append(SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=180)))
+    return events
+
+
+class _Stream:
+    """Stands in for anthropic's AsyncStream: iterates the events, close() releases it."""
+
+    def __init__(self, events, seen, delay_s=0.0):
+        self.events = events
+        self.seen = seen
+        self.delay_s = delay_s
+        self.closed = False
+
+    async def __aiter__(self):
+        for event in self.events:
+            if self.delay_s:
+                await asyncio.sleep(self.delay_s)
+            if event.type == "content_block_delta":
+                self.seen.append(event.delta.partial_json)
+            yield event
+
+    async def close(self):
+        self.closed = True
+
+
+def _stream(events, seen):
+    return _Stream(events, seen)
+
+
+def _phase(name, duration_min, bpm_range=(160, 175), intensity="very_high"):
+    return Phase(name=name, duration_min=duration_min, intensity=intensity, bpm_range=bpm_range)
+
+
+class TestPhaseStream:
+    @pytest.mark.parametrize("size", [1, 3, 16, 10_000])
+    def test_phases_complete_in_order(self, size):
+        stream = PhaseStream()
+        phases = []
+        for chunk in _chunks(json.dumps(TOOL_INPUT), size):
+            phases.extend(stream.feed(chunk))
+
+        assert phases == TOOL_INPUT["phases"]
+        assert json.loads(stream.text) == TOOL_INPUT
+
+    def test_phase_is_emitted_on_its_closing_brace(self):
+        stream = PhaseStream()
+        text = json.dumps(TOOL_INPUT)
+        first = json.dumps(TOOL_INPUT["phases"][0])
+        first_end = text.index(first) + len(first)
+
+        assert stream.feed(text[:first_end - 1]) == []
+        assert stream.feed(text[first_end - 1:first_end]) == [TOOL_INPUT["phases"][0]]
+
+    def test_nested_objects_outside_phases_are_ignored(self):
+        stream = PhaseStream()
+        data = {"meta": [{"name": "x"}], "phases": [{"name": "a"}]}
+        assert stream.feed(json.dumps(data)) == [{"name": "a"}]
+
+
+class TestClientStreaming:
+    @pytest.fixture
+    def client(self):
+        with patch("anthropic.Anthropic"), patch("anthropic.AsyncAnthropic"):
+            return AnthropicClient(api_key="test-key")
+
+    def test_phases_arrive_before_the_stream_ends(self, client):
+        seen_chunks = []
+        client.async_client.messages.create = AsyncMock(return_value=_stream(_events(TOOL_INPUT), seen_chunks))
+        emitted = []
+
+        def on_phase(phase):
+            emitted.append((phase.name, len(seen_chunks)))
+
+        with patch("clients.anthropic_client.token_usage.record_usage", return_value="") as usage:
+            workout = asyncio.run(client.parse_workout_stream_async("chipper", on_phase))
+
+        assert client.async_client.messages.create.call_args.kwargs["stream"] is True
+        assert [name for name, _ in emitted] == [p.name for p in workout.phases]
+        assert emitted[0][1] < len(_chunks(json.dumps(TOOL_INPUT), 7))
+        assert workout.workout_name == 'The "Chipper"'
+        assert workout.phases[1].bpm_range == (160, 175)
+        assert usage.call_args.args[1].output_tokens == 180
+
+    def test_malformed_phase_is_skipped_but_reported_by_full_parse(self, client):
+        bad = {"workout_name": "x", "phases": [{"name": "No duration"}]}
+        client.async_client.messages.create = AsyncMock(return_value=_stream(_events(bad), []))
+        emitted = []
+
+        with pytest.raises(KeyError):
+            asyncio.run(client.parse_workout_stream_async("x", emitted.append))
+        assert emitted == []
+
+
+    def test_hedged_streams_report_each_phase_once(self, client):
+        async def create(**kwargs):
+            if kwargs["model"] == client.model:
+                await asyncio.sleep(0.05)  # Slow primary: the backup stream starts meanwhile
+            return _stream(_events(TOOL_INPUT), [])
+
+        client.async_client.messages.create = create
+        client.hedges["parse_workout"].default_delay_s = 0.01
+        emitted = []
+
+        with patch("clients.anthropic_client.token_usage.record_usage", return_value=""):
+            asyncio.run(client.parse_workout_stream_async("chipper", emitted.append))
+
+        assert [p.name for p in emitted] == [p["name"] for p in TOOL_INPUT["phases"]]
+
+    def test_losing_hedged_stream_is_closed(self, client):
+        streams = []
+
+        async def create(**kwargs):
+            slow = kwargs["model"] == client.model  # Primary streams slowly; the backup wins
+            streams.append(_Stream(_events(TOOL_INPUT), [], delay_s=0.05 if slow else 0.0))
+            return streams[-1]
+
+        client.async_client.messages.create = create
+        client.hedges["parse_workout"].default_delay_s = 0.01
+
+        async def parse():
+            workout = await client.parse_workout_stream_async("chipper", lambda phase: None)
+            await asyncio.sleep(0.01)  # Let the cancelled primary unwind
+            return workout
+
+        with patch("clients.anthropic_client.token_usage.record_usage", return_value=""):
+            asyncio.run(parse())
+
+        assert len(streams) == 2
+        assert all(stream.closed for stream in streams)
+
+
+class TestParserStreaming:
+    def test_on_phase_uses_streaming_client(self):
+        parser = WorkoutParserAgent()
+        emitted = []
+        workout = asyncio.run(parser.parse_and_validate_async(
+            "AMRAP 8 min: 10 burpees\nRest 2 min\nAMRAP 8 min: 10 thrusters", on_phase=emitted.append,
+        ))
+        assert emitted == workout.phases
+
+    def test_streaming_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "streaming_parse", False)
+        parser = WorkoutParserAgent()
+        emitted = []
+        asyncio.run(parser.parse_and_validate_async("AMRAP 12: 10 burpees", on_phase=emitted.append))
+        assert emitted == []
+
+
+class TestMergeSpeculativePools:
+    def test_longer_guess_wins_per_bucket(self):
+        short, long = _phase("Guess", 10), _phase("Main WOD", 20)
+        warm = _phase("Warm-up", 5, (100, 120), "warm_up")
+        key = ((160, 175), "very_high")
+
+        merged = merge_speculative_pools([
+            {key: (short, ["a"]), ((100, 120), "warm_up"): (warm, ["w"])},
+            {key: (long, ["b"])},
+        ])
+
+        assert merged[key] == (long, ["b"])
+        assert merged[((100, 120), "warm_up")] == (warm, ["w"])
+
+
+class TestGenerateStreamsPrefetch:
+    def setup_method(self):
+        main_module.workout_parser = WorkoutParserAgent()
+        main_module.music_curator = MusicCuratorAgent()
+        main_module.playlist_composer = PlaylistComposerAgent(curator=main_module.music_curator)
+        main_module.strategy_registry = StrategyRegistry(
+            main_module.ALLOWED_STRATEGIES,
+            default_composer=main_module.playlist_composer,
+            default_strategy=settings.music_source,
+        )
+
+    def _generate(self, predicted):
+        calls = []
+        curator = main_module.music_curator
+        original = curator.batch_search_tracks_async
+
+        async def spy(phases, **kwargs):
+            calls.append([p.name for p in phases])
+            return await original(phases, **kwargs)
+
+        plan = {"workout_type": "AMRAP", "prompt_type": "AMRAP", "predicted_phases": predicted}
+        body = GeneratePlaylistRequest(workout_text="AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats")
+        prefs = main_module.GenerationPreferences(music_strategy="mock")
+
+        async def consume():
+            async for event, payload in main_module._generate_events(body, prefs, "test", False):
+                if event == "done":
+                    return payload
+
+        with patch.object(curator, "batch_search_tracks_async", spy), \
+                patch.object(main_module.workout_parser, "plan", return_value=plan):
+            assert asyncio.run(consume()).playlist.tracks
+        return [c for c in calls if c]
+
+    def test_each_streamed_phase_is_prefetched_before_the_parse_ends(self):
+        calls = self._generate(predicted=[])
+        assert sorted(calls) == [["AMRAP Work"], ["Cooldown"], ["Warm-up"]]
+
+    def test_phases_covered_by_a_guess_are_not_fetched_twice(self):
+        warm_up = _phase("Warm-up", 10, (100, 120), "warm_up")
+        calls = self._generate(predicted=[warm_up])
+        assert calls[0] == ["Warm-up"]
+        assert sorted(calls[1:]) == [["AMRAP Work"], ["Cooldown"]]
+
+    def _generate_with_slow_prefetch(self, stop_after=None):
+        started, cancelled = [], []
+
+        async def slow_prefetch(phases, **kwargs):
+            started.append(phases[0].name)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(phases[0].name)
+                raise
+
+        async def follow(key, fn):
+            return {}  # The leader's pools; this request's prefetch() never runs
+
+        plan = {"workout_type": "AMRAP", "prompt_type": "AMRAP", "predicted_phases": []}
+        body = GeneratePlaylistRequest(workout_text="AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats")
+        prefs = main_module.GenerationPreferences(music_strategy="mock")
+
+        async def consume():
+            events = main_module._generate_events(body, prefs, "test", False)
+            async for event, _ in events:
+                if event == stop_after:
+                    await events.aclose()
+                    break
+            await asyncio.sleep(0)  # Let cancelled tasks unwind before asyncio.run() cancels the rest
+            return list(cancelled)
+
+        with patch.object(main_module.playlist_composer, "prefetch_speculative_async", slow_prefetch), \
+                patch.object(main_module.workout_parser, "plan", return_value=plan), \
+                patch.object(main_module._prefetch_flights, "do", follow):
+            return started, asyncio.run(consume())
+
+    def test_prefetch_follower_cancels_its_streamed_prefetches(self):
+        started, cancelled = self._generate_with_slow_prefetch()
+        assert sorted(started) == sorted(cancelled) == ["AMRAP Work", "Cooldown", "Warm-up"]
+
+    def test_abandoned_request_cancels_its_streamed_prefetches(self):
+        started, cancelled = self._generate_with_slow_prefetch(stop_after="workout")
+        assert sorted(started) == sorted(cancelled) == ["AMRAP Work", "Cooldown", "Warm-up"]
+
+    def test_leader_cancelled_before_its_prefetch_runs_keeps_the_streamed_prefetches(self):
+        composer = main_module.playlist_composer
+        original = composer.prefetch_speculative_async
+        leader = []
+
+        async def slow_prefetch(phases, **kwargs):
+            await asyncio.sleep(0.05)
+            return await original(phases, **kwargs)
+
+        async def lead_then_cancel(key, fn):
+            leader.append(asyncio.ensure_future(fn()))  # As SingleFlight starts the shared task
+            raise asyncio.CancelledError  # This request disconnects before the task first runs
+
+        plan = {"workout_type": "AMRAP", "prompt_type": "AMRAP", "predicted_phases": []}
+        body = GeneratePlaylistRequest(workout_text="AMRAP 20 minutes: 5 pull-ups, 10 push-ups, 15 air squats")
+        prefs = main_module.GenerationPreferences(music_strategy="mock")
+
+        async def consume():
+            with pytest.raises(asyncio.CancelledError):
+                async for _ in main_module._generate_events(body, prefs, "test", False):
+                    pass
+            return await leader[0]  # What followers of the flight receive
+
+        with patch.object(composer, "prefetch_speculative_async", slow_prefetch), \
+                patch.object(main_module.workout_parser, "plan", return_value=plan), \
+                patch.object(main_module._prefetch_flights, "do", lead_then_cancel):
+            pools = asyncio.run(consume())
+
+        assert sorted(pools) == ["AMRAP Work", "Cooldown", "Warm-up"]
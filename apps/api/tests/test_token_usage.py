@@ -0,0 +1,39 @@
+"""
+Tests for Claude token usage accounting
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from services import token_usage
+
+
+class TestTokenUsage:
+    def test_record_usage_counts_tokens(self):
+        usage = SimpleNamespace(input_tokens=40, output_tokens=200)
+        with patch("services.token_usage.metrics.record_claude_tokens") as record:
+            summary = token_usage.record_usage("parse_workout", usage)
+
+        record.assert_called_once_with("parse_workout", {"input": 40, "output": 200})
+        assert summary == "40in/200out"
+
+    def test_record_usage_tolerates_missing_fields(self):
+        assert token_usage.record_usage("suggest", MagicMock(input_tokens=10)) == "10in/0out"
+
+
+class TestPrompts:
+    @patch("music_sources.claude_suggestions.anthropic")
+    def test_suggestion_request_is_one_user_message(self, mock_anthropic):
+        from music_sources.claude_suggestions import ClaudeMusicSource
+
+        client = MagicMock()
+        mock_anthropic.Anthropic.return_value = client
+        client.messages.create.return_value.content = [MagicMock(text="[]")]
+        client.messages.create.return_value.usage = SimpleNamespace(input_tokens=300, output_tokens=2)
+
+        ClaudeMusicSource(api_key="test-key").search_by_bpm(140, 160, genre="rock", limit=5)
+
+        kwargs = client.messages.create.call_args.kwargs
+        assert "system" not in kwargs
+        user_prompt = kwargs["messages"][0]["content"]
+        assert "140-160 BPM" in user_prompt
+        assert "Return ONLY" in user_prompt
@@ -342,6 +342,30 @@ export async function submitTrackFeedback(
         updatedAt: new Date(),
       },
     })
+
+  // Update the API's learned preference weights (best effort — the
+  // taste profile above is the durable record and reseeds them)
+  if (API_SHARED_SECRET) {
+    const parts = trackId.split(':')
+    try {
+      await fetch(`${API_URL}/api/v1/feedback`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'X-User-ID': session.user.id,
+          'X-User-Signature': createHmac('sha256', API_SHARED_SECRET).update(session.user.id).digest('hex'),
+        },
+        body: JSON.stringify({
+          track_id: trackId,
+          artist: parts.length >= 3 ? parts[parts.length - 1] : null,
+          rating,
+        }),
+        signal: AbortSignal.timeout(5000),
+      })
+    } catch (error) {
+      console.warn('Failed to send track feedback to API:', error instanceof Error ? error.message : error)
+    }
+  }
 }
 
 export async function aggregateArtistFeedback(): Promise<{